@@ -1,7 +1,9 @@
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_socketio import SocketIO
+from app.utils.sqlite_profile import apply_pragmas, is_file_database, profile_from_env
 import os
 
 db = SQLAlchemy()
@@ -17,6 +19,12 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['WTF_CSRF_ENABLED'] = False  # For mobile app compatibility
     
+    # Production SQLite profile (WAL, pragmas, pooled engine); SQLITE_PROFILE=off to disable
+    sqlite_profile = profile_from_env()
+    use_sqlite_profile = sqlite_profile['enabled'] and is_file_database(app.config['SQLALCHEMY_DATABASE_URI'])
+    if use_sqlite_profile:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_profile['engine_options']
+    
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
@@ -50,62 +58,41 @@ def create_app():
     app.register_blueprint(storytelling_bp)
     app.register_blueprint(language_bp)
     
-    # Create database tables
-    with app.app_context():
+    def run_bootstrap():
+        from app.bootstrap import bootstrap
         db.create_all()
+        with db.engine.begin() as connection:
+            return bootstrap(connection)
+    
+    with app.app_context():
+        if use_sqlite_profile:
+            apply_pragmas(db.engine, sqlite_profile['pragmas'])
         
-        # Initialize default data
-        from app.models.pet import PetType
-        from app.models.lesson import Subject
-        
-        # Create default pet types if they don't exist
-        if not PetType.query.first():
-            pet_types = [
-                {'name': 'Dragon', 'description': 'A magical fire-breathing companion', 'emoji': '🐉'},
-                {'name': 'Unicorn', 'description': 'A mystical rainbow friend', 'emoji': '🦄'},
-                {'name': 'Phoenix', 'description': 'A beautiful bird of rebirth', 'emoji': '🔥'},
-                {'name': 'Griffin', 'description': 'A majestic eagle-lion hybrid', 'emoji': '🦅'},
-                {'name': 'Fairy', 'description': 'A tiny magical helper', 'emoji': '🧚'},
-                {'name': 'Robot', 'description': 'A futuristic AI companion', 'emoji': '🤖'},
-                {'name': 'Alien', 'description': 'A friendly space visitor', 'emoji': '👽'},
-                {'name': 'Mermaid', 'description': 'An ocean princess', 'emoji': '🧜'},
-                {'name': 'Wizard', 'description': 'A wise magic master', 'emoji': '🧙'},
-                {'name': 'Angel', 'description': 'A heavenly guardian', 'emoji': '😇'},
-                {'name': 'Butterfly', 'description': 'A colorful flying friend', 'emoji': '🦋'},
-                {'name': 'Tiger', 'description': 'A brave jungle guardian', 'emoji': '🐅'},
-                {'name': 'Panda', 'description': 'A cuddly bamboo lover', 'emoji': '🐼'},
-                {'name': 'Owl', 'description': 'A wise night companion', 'emoji': '🦉'},
-                {'name': 'Fox', 'description': 'A clever forest friend', 'emoji': '🦊'},
-                {'name': 'Dolphin', 'description': 'A playful ocean buddy', 'emoji': '🐬'},
-                {'name': 'Pegasus', 'description': 'A winged horse of dreams', 'emoji': '🐴'},
-                {'name': 'Crystal Bear', 'description': 'A shimmering magical bear', 'emoji': '💎'},
-                {'name': 'Star Cat', 'description': 'A cosmic feline friend', 'emoji': '⭐'},
-                {'name': 'Rainbow Bird', 'description': 'A colorful sky dancer', 'emoji': '🌈'},
-                {'name': 'Moon Wolf', 'description': 'A mysterious lunar companion', 'emoji': '🌙'},
-                {'name': 'Sun Lion', 'description': 'A radiant golden protector', 'emoji': '☀️'},
-            ]
-            
-            for pet_data in pet_types:
-                pet_type = PetType(**pet_data)
-                db.session.add(pet_type)
-        
-        # Create default subjects
-        if not Subject.query.first():
-            subjects = [
-                {'name': 'Mathematics', 'description': 'Numbers and problem solving', 'color': '#FF6B6B'},
-                {'name': 'Science', 'description': 'Discover the world around us', 'color': '#4ECDC4'},
-                {'name': 'Language Arts', 'description': 'Reading and writing adventures', 'color': '#45B7D1'},
-                {'name': 'History', 'description': 'Stories from the past', 'color': '#FFA07A'},
-                {'name': 'Geography', 'description': 'Explore our amazing planet', 'color': '#98D8C8'},
-                {'name': 'Art', 'description': 'Express your creativity', 'color': '#F7DC6F'},
-                {'name': 'Music', 'description': 'Rhythm and melody fun', 'color': '#BB8FCE'},
-                {'name': 'Life Skills', 'description': 'Important everyday knowledge', 'color': '#85C1E9'},
-            ]
-            
-            for subject_data in subjects:
-                subject = Subject(**subject_data)
-                db.session.add(subject)
-        
-        db.session.commit()
+        # Creating tables and seeding is a separate deploy step; startup only checks it has run
+        from app.bootstrap import SEED_VERSION, is_current
+        with db.engine.connect() as connection:
+            current = is_current(connection)
+        if not current:
+            if os.environ.get('AUTO_BOOTSTRAP') == '1':
+                run_bootstrap()
+            else:
+                app.logger.error(f"Database is not bootstrapped, or its seed data is older than version "
+                                 f"{SEED_VERSION}; run `flask --app \"app:create_app\" bootstrap`")
+    
+    @app.cli.command('forecast')
+    def forecast_command():
+        """Refit learning forecasts and rebuild peer sketches (the nightly job; run it from cron)"""
+        from app.services.container import services
+        counts = services.get('analytics').run_nightly()
+        if counts is None:
+            click.echo("Nightly analytics jobs are already running; skipped")
+        else:
+            click.echo(f"{counts['forecasts']} learners forecast, {counts['peers']} learners in peer sketches")
+    
+    @app.cli.command('bootstrap')
+    def bootstrap_command():
+        """Create the tables and seed the catalogues (idempotent)"""
+        added = run_bootstrap()
+        click.echo(', '.join(f"{table}: {count} added" for table, count in added.items()))
     
     return app
\ No newline at end of file
@@ -0,0 +1,323 @@
+"""
+Bootstrap
+Idempotent schema creation, bulk seeding of the catalogue tables and one-off
+data backfills.  Run once per deploy with `flask --app "app:create_app" bootstrap`;
+app startup only checks the recorded seed version.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, List
+
+from sqlalchemy import (Column, DateTime, Integer, MetaData, String, Table, bindparam, func, inspect, insert, select,
+                        update)
+
+from app.models.achievement import Achievement
+from app.models.emotion import EmotionalState, SupportSession
+from app.models.game_progress import GameProgress
+from app.models.learner_profile import GAME_STYLES, LearnerProfile
+from app.models.lesson import Lesson, Subject, UserProgress
+from app.models.pet import Pet, PetType
+from app.models.user import LearningSession, User
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the seed data below (or the catalogues it pulls in) or a backfill changes
+SEED_VERSION = 5
+
+metadata = MetaData()
+bootstrap_state = Table(
+    'bootstrap_state', metadata,
+    Column('name', String(50), primary_key=True),
+    Column('version', Integer, nullable=False),
+    Column('applied_at', DateTime)
+)
+
+PET_TYPES = [
+    {'name': 'Dragon', 'description': 'A magical fire-breathing companion', 'emoji': '🐉'},
+    {'name': 'Unicorn', 'description': 'A mystical rainbow friend', 'emoji': '🦄'},
+    {'name': 'Phoenix', 'description': 'A beautiful bird of rebirth', 'emoji': '🔥'},
+    {'name': 'Griffin', 'description': 'A majestic eagle-lion hybrid', 'emoji': '🦅'},
+    {'name': 'Fairy', 'description': 'A tiny magical helper', 'emoji': '🧚'},
+    {'name': 'Robot', 'description': 'A futuristic AI companion', 'emoji': '🤖'},
+    {'name': 'Alien', 'description': 'A friendly space visitor', 'emoji': '👽'},
+    {'name': 'Mermaid', 'description': 'An ocean princess', 'emoji': '🧜'},
+    {'name': 'Wizard', 'description': 'A wise magic master', 'emoji': '🧙'},
+    {'name': 'Angel', 'description': 'A heavenly guardian', 'emoji': '😇'},
+    {'name': 'Butterfly', 'description': 'A colorful flying friend', 'emoji': '🦋'},
+    {'name': 'Tiger', 'description': 'A brave jungle guardian', 'emoji': '🐅'},
+    {'name': 'Panda', 'description': 'A cuddly bamboo lover', 'emoji': '🐼'},
+    {'name': 'Owl', 'description': 'A wise night companion', 'emoji': '🦉'},
+    {'name': 'Fox', 'description': 'A clever forest friend', 'emoji': '🦊'},
+    {'name': 'Dolphin', 'description': 'A playful ocean buddy', 'emoji': '🐬'},
+    {'name': 'Pegasus', 'description': 'A winged horse of dreams', 'emoji': '🐴'},
+    {'name': 'Crystal Bear', 'description': 'A shimmering magical bear', 'emoji': '💎'},
+    {'name': 'Star Cat', 'description': 'A cosmic feline friend', 'emoji': '⭐'},
+    {'name': 'Rainbow Bird', 'description': 'A colorful sky dancer', 'emoji': '🌈'},
+    {'name': 'Moon Wolf', 'description': 'A mysterious lunar companion', 'emoji': '🌙'},
+    {'name': 'Sun Lion', 'description': 'A radiant golden protector', 'emoji': '☀️'},
+]
+
+SUBJECTS = [
+    {'name': 'Mathematics', 'description': 'Numbers and problem solving', 'color': '#FF6B6B'},
+    {'name': 'Science', 'description': 'Discover the world around us', 'color': '#4ECDC4'},
+    {'name': 'Language Arts', 'description': 'Reading and writing adventures', 'color': '#45B7D1'},
+    {'name': 'History', 'description': 'Stories from the past', 'color': '#FFA07A'},
+    {'name': 'Geography', 'description': 'Explore our amazing planet', 'color': '#98D8C8'},
+    {'name': 'Art', 'description': 'Express your creativity', 'color': '#F7DC6F'},
+    {'name': 'Music', 'description': 'Rhythm and melody fun', 'color': '#BB8FCE'},
+    {'name': 'Life Skills', 'description': 'Important everyday knowledge', 'color': '#85C1E9'},
+]
+
+
+def seeds():
+    """(model, rows, key, key_is_unique) for every catalogue, in insert order"""
+    return [
+        (PetType, PET_TYPES, ['name'], True),
+        (Subject, SUBJECTS, ['name'], True),
+        (Achievement, Achievement.create_default_achievements(), ['name'], True),
+        # Teachers may reuse lesson titles, so sample lessons are matched on (title, subject) under lock_seeding
+        (Lesson, Lesson.create_sample_lessons(), ['title', 'subject'], False)
+    ]
+
+
+def _uniform(table, rows: Iterable[Dict]) -> List[Dict]:
+    """Give every row the same keys, as executemany needs, filling gaps with column defaults"""
+    rows = [dict(row) for row in rows]
+    keys = {key for row in rows for key in row}
+    for row in rows:
+        for key in keys - row.keys():
+            default = table.c[key].default
+            row[key] = default.arg if default is not None and default.is_scalar else None
+    return rows
+
+
+def insert_missing(connection, table, rows: Iterable[Dict], key: List[str], key_is_unique: bool) -> int:
+    """Bulk insert the rows whose key is not in the table yet; returns how many were new.
+
+    Keys already present are found with one query and the rest go in one
+    executemany.  Where the key is unique the insert is also ON CONFLICT DO
+    NOTHING, so a bootstrap running concurrently cannot make it fail.
+    """
+    columns = [table.c[name] for name in key]
+    existing = {tuple(row) for row in connection.execute(select(*columns))}
+    missing = [row for row in _uniform(table, rows) if tuple(row[name] for name in key) not in existing]
+    if not missing:
+        return 0
+
+    statement = insert(table)
+    if key_is_unique and connection.dialect.name in ('sqlite', 'postgresql'):
+        if connection.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table).on_conflict_do_nothing(index_elements=key)
+    connection.execute(statement, missing)
+    return len(missing)
+
+
+# Columns declared after databases were deployed; create_all never alters a table that exists
+ADDED_COLUMNS = [
+    User.__table__.c.average_score,
+    User.__table__.c.last_active_date,
+    User.__table__.c.activity_bitmap,
+    GameProgress.__table__.c.difficulty,
+    GameProgress.__table__.c.completed,
+]
+
+
+def add_missing_columns(connection) -> List[str]:
+    """ALTER TABLE ADD COLUMN for each added column an existing table lacks; returns 'table.column' names.
+
+    Existing rows get the column's default, so they read the same as rows
+    inserted since.
+    """
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+    added = []
+    for column in ADDED_COLUMNS:
+        table = column.table
+        if not inspector.has_table(table.name):
+            continue
+        if column.name in {existing['name'] for existing in inspector.get_columns(table.name)}:
+            continue
+        column_type = column.type.compile(dialect=connection.dialect)
+        connection.exec_driver_sql(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}")
+        if column.default is not None and column.default.is_scalar:
+            connection.execute(update(table).values({column.name: column.default.arg}))
+        added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def backfill_average_scores(connection) -> int:
+    """Set users.average_score, the mean best_score over lesson progress; returns the students updated.
+
+    The class summary listeners keep it current from then on, so this only
+    runs when the column has just been added.
+    """
+    users, progress = User.__table__, UserProgress.__table__
+    if not inspect(connection).has_table(progress.name):
+        return 0
+    average = (
+        select(func.coalesce(func.avg(progress.c.best_score), 0.0))
+        .where(progress.c.user_id == users.c.id)
+        .scalar_subquery()
+    )
+    return connection.execute(
+        update(users).where(users.c.id.in_(select(progress.c.user_id))).values(average_score=average)
+    ).rowcount
+
+
+def backfill_activity(connection) -> int:
+    """Build the streak bitmap of every user with learning sessions but none yet; returns how many.
+
+    Streaks are read on request paths, which only ever use the bitmap, so
+    this runs here once rather than lazily on the first read.
+    """
+    users, sessions = User.__table__, LearningSession.__table__
+    inspector = inspect(connection)
+    if not (inspector.has_table(users.name) and inspector.has_table(sessions.name)):
+        return 0
+
+    since = datetime.now().date() - timedelta(days=User.STREAK_WINDOW_DAYS)
+    day_column = func.date(sessions.c.timestamp)
+    rows = connection.execute(
+        select(users.c.id, users.c.longest_streak, day_column).distinct()
+        .join(sessions, sessions.c.user_id == users.c.id)
+        .where(users.c.last_active_date.is_(None), sessions.c.timestamp >= since)
+    )
+    days, longest = defaultdict(list), {}
+    for user_id, longest_streak, day in rows:
+        days[user_id].append(date.fromisoformat(day) if isinstance(day, str) else day)
+        longest[user_id] = longest_streak or 0
+    if not days:
+        return 0
+
+    values = []
+    for user_id, active_days in days.items():
+        last, bitmap, current, longest_run = User.activity_from_days(active_days)
+        values.append({'user': user_id, 'last_active_date': last, 'activity_bitmap': bitmap,
+                       'learning_streak': current, 'longest_streak': max(longest[user_id], longest_run)})
+    connection.execute(
+        update(users).where(users.c.id == bindparam('user')).values(
+            last_active_date=bindparam('last_active_date'), activity_bitmap=bindparam('activity_bitmap'),
+            learning_streak=bindparam('learning_streak'), longest_streak=bindparam('longest_streak')),
+        values
+    )
+    return len(values)
+
+
+def backfill_learner_profiles(connection) -> int:
+    """Build the learner profile of every player with game history but none yet; returns how many.
+
+    The adaptive learning service only folds new results into a profile and
+    never writes on its read paths, so older history is folded in here once.
+    """
+    games, profiles = GameProgress.__table__, LearnerProfile.__table__
+    inspector = inspect(connection)
+    if not (inspector.has_table(games.name) and inspector.has_table(profiles.name)):
+        return 0
+
+    rows = connection.execute(
+        select(games.c.user_id, games.c.game_type, games.c.score, games.c.time_spent, games.c.completed,
+               games.c.difficulty, games.c.created_at)
+        .where(games.c.user_id.not_in(select(profiles.c.user_id)))
+        .order_by(games.c.user_id, games.c.created_at)
+    )
+    values = []
+    now = datetime.utcnow()
+    for user_id, history in groupby(rows, key=lambda row: row.user_id):
+        profile = LearnerProfile(user_id)
+        for row in history:
+            profile.record(row.score, row.time_spent, completed=row.completed, difficulty=row.difficulty,
+                           style=GAME_STYLES.get(row.game_type), played_at=row.created_at)
+        values.append({column.name: getattr(profile, column.key) for column in profiles.columns
+                       if column.name not in ('id', 'updated_at')})
+        values[-1]['updated_at'] = now
+    if values:
+        connection.execute(insert(profiles), values)
+    return len(values)
+
+
+# Tables that gained or changed indexes after databases were deployed; create_all skips tables that exist
+INDEXED_TABLES = [
+    User.__table__, LearningSession.__table__, UserProgress.__table__, GameProgress.__table__,
+    Pet.__table__, EmotionalState.__table__, SupportSession.__table__,
+]
+
+
+def create_missing_indexes(connection) -> List[str]:
+    """Create every declared index an existing table lacks; returns their names.
+
+    An index whose name exists with other columns, like a single-column
+    index since widened with id as a tie-breaker, is dropped and recreated.
+    """
+    inspector = inspect(connection)
+    created = []
+    for table in INDEXED_TABLES:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name']: index['column_names'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            columns = [column.name for column in index.columns]
+            if existing.get(index.name) == columns:
+                continue
+            if index.name in existing:
+                index.drop(connection)
+            index.create(connection)
+            created.append(index.name)
+    return created
+
+
+def seed_version(connection) -> int:
+    """Recorded seed version, 0 if the database was never bootstrapped"""
+    if not inspect(connection).has_table(bootstrap_state.name):
+        return 0
+    version = connection.execute(
+        select(bootstrap_state.c.version).where(bootstrap_state.c.name == 'seed')
+    ).scalar()
+    return version or 0
+
+
+def is_current(connection) -> bool:
+    """The cheap startup check: a table lookup and one primary-key select"""
+    return seed_version(connection) >= SEED_VERSION
+
+
+def lock_seeding(connection):
+    """Take the seed row's write lock for the rest of the transaction.
+
+    Lessons have no unique key to fall back on, so two bootstraps that both
+    read the existing keys before either commits would both insert the
+    missing lessons.  Writing the seed row first makes a concurrent run wait
+    here until this one commits, and then find everything already seeded.
+    """
+    insert_missing(connection, bootstrap_state, [{'name': 'seed', 'version': 0}], ['name'], True)
+    connection.execute(
+        update(bootstrap_state).where(bootstrap_state.c.name == 'seed').values(version=bootstrap_state.c.version)
+    )
+
+
+def bootstrap(connection) -> Dict[str, int]:
+    """Create the catalogue tables if needed and seed them; safe to run any number of times"""
+    metadata.create_all(connection)
+    lock_seeding(connection)
+    columns = add_missing_columns(connection)
+    scored = backfill_average_scores(connection) if 'users.average_score' in columns else 0
+    added = {}
+    for model, rows, key, key_is_unique in seeds():
+        model.__table__.create(connection, checkfirst=True)
+        added[model.__table__.name] = insert_missing(connection, model.__table__, rows, key, key_is_unique)
+    backfilled = backfill_activity(connection)
+    profiled = backfill_learner_profiles(connection)
+    indexes = create_missing_indexes(connection)
+
+    connection.execute(
+        update(bootstrap_state).where(bootstrap_state.c.name == 'seed')
+        .values(version=SEED_VERSION, applied_at=datetime.utcnow())
+    )
+    logger.info(f"Bootstrapped seed version {SEED_VERSION}: {added}, columns added: {columns or 'none'}, "
+                f"{scored} average scores, {backfilled} activity bitmaps and {profiled} learner profiles "
+                f"backfilled, indexes created: {indexes or 'none'}")
+    return added
@@ -54,6 +54,22 @@ class Config:
     SUPPORTED_LANGUAGES = ['en', 'es', 'fr', 'de', 'hi', 'ar', 'zh', 'ja', 'pt', 'ru']
     DEFAULT_LANGUAGE = 'en'
     
+    # Learning analytics event store (day-partitioned columnar files)
+    ANALYTICS_EVENT_DIR = os.environ.get('ANALYTICS_EVENT_DIR') or 'data/analytics/events'
+    # The nightly forecast fit and peer sketch rebuild run from cron: `flask --app "app:create_app" forecast`
+    
+    # Background report rendering (worker processes and cached report files)
+    REPORT_DIR = os.environ.get('REPORT_DIR') or 'data/reports'
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS') or 2)
+    
+    # SQLite production profile, applied by create_app to file databases
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE') or 'production'  # 'off' keeps SQLite defaults
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000)
+    SQLITE_MMAP_MB = int(os.environ.get('SQLITE_MMAP_MB') or 256)
+    SQLITE_CACHE_MB = int(os.environ.get('SQLITE_CACHE_MB') or 64)
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE') or 5)
+    SQLITE_MAX_OVERFLOW = int(os.environ.get('SQLITE_MAX_OVERFLOW') or 10)
+    
     # Performance Settings
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
     CACHE_TYPE = 'simple'  # Use 'redis' in production
@@ -7,6 +7,7 @@ import os
 import json
 import random
 import logging
+import atexit
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # Initialize Flask app
@@ -35,6 +36,7 @@ from routes import auth, education, support, social, teacher, pet_companion, sto
 from services.llm_service import LLMService
 from services.voice_service import VoiceService
 from services.sentiment_service import SentimentService
+from services.learning_events import InteractionBuffer, LearningEventWriter
 from assessment_games.knowledge_assessment import KnowledgeAssessment
 from assessment_games.emotional_assessment import EmotionalAssessment
 
@@ -61,67 +63,48 @@ def load_user(user_id):
 
 # Real-time learning analytics
 class RealTimeLearning:
-    def __init__(self):
+    def __init__(self, buffer_capacity=256, event_writer=None):
         self.user_sessions = {}
         self.learning_patterns = {}
+        self.buffer_capacity = buffer_capacity
+        self.event_writer = event_writer or LearningEventWriter(app, db, LearningSession, User)
+        self.event_writer.on_preferences_saved = self._preferences_saved
     
     def track_interaction(self, user_id, action, content_type, performance=None):
         """Track user interactions for real-time personalization"""
         if user_id not in self.user_sessions:
             self.user_sessions[user_id] = {
                 'start_time': datetime.now(),
-                'interactions': [],
+                'interactions': InteractionBuffer(self.buffer_capacity),
                 'performance_metrics': {},
                 'learning_style': 'visual',  # Default
                 'attention_span': 300,  # seconds
                 'difficulty_preference': 'medium'
             }
         
-        interaction = {
-            'timestamp': datetime.now(),
-            'action': action,
-            'content_type': content_type,
-            'performance': performance
-        }
-        
-        self.user_sessions[user_id]['interactions'].append(interaction)
+        self.user_sessions[user_id]['interactions'].append(datetime.now(), action, content_type, performance)
         self._analyze_learning_pattern(user_id)
         self._adapt_content_difficulty(user_id)
         
-        # Save to database
-        session_record = LearningSession(
-            user_id=user_id,
-            action=action,
-            content_type=content_type,
-            performance=performance,
-            timestamp=datetime.now()
-        )
-        db.session.add(session_record)
-        db.session.commit()
+        # Queue for the next batched write
+        self.event_writer.record(user_id, action, content_type, performance)
     
     def _analyze_learning_pattern(self, user_id):
         """Analyze user's learning patterns in real-time"""
         session = self.user_sessions[user_id]
         interactions = session['interactions']
         
-        if len(interactions) < 5:
+        if interactions.total < 5:
             return
         
-        # Analyze response times
-        response_times = []
-        for i in range(1, len(interactions)):
-            if interactions[i-1]['action'] == 'question_presented' and interactions[i]['action'] == 'answer_submitted':
-                response_time = (interactions[i]['timestamp'] - interactions[i-1]['timestamp']).total_seconds()
-                response_times.append(response_time)
-        
-        if response_times:
-            avg_response_time = sum(response_times) / len(response_times)
+        # Analyze response times (accumulated as answers arrive)
+        avg_response_time = interactions.average_response_time
+        if avg_response_time is not None:
             session['attention_span'] = min(600, max(60, avg_response_time * 10))
         
         # Analyze performance patterns
-        recent_performances = [i['performance'] for i in interactions[-10:] if i['performance'] is not None]
-        if recent_performances:
-            avg_performance = sum(recent_performances) / len(recent_performances)
+        avg_performance = interactions.recent_performance()
+        if avg_performance is not None:
             if avg_performance > 0.8:
                 session['difficulty_preference'] = 'hard'
             elif avg_performance < 0.6:
@@ -132,13 +115,21 @@ class RealTimeLearning:
     def _adapt_content_difficulty(self, user_id):
         """Adapt content difficulty based on performance"""
         session = self.user_sessions[user_id]
-        user = User.query.get(user_id)
+        preferences = {
+            'learning_style': session['learning_style'],
+            'attention_span': session['attention_span'],
+            'difficulty_preference': session['difficulty_preference']
+        }
         
-        if user:
-            user.learning_style = session['learning_style']
-            user.attention_span = session['attention_span']
-            user.difficulty_preference = session['difficulty_preference']
-            db.session.commit()
+        # Only queue a user write when something changed since the last committed one
+        if preferences != session.get('saved_preferences'):
+            self.event_writer.update_preferences(user_id, preferences)
+    
+    def _preferences_saved(self, user_id, preferences):
+        """Called by the event writer once a user's preferences are committed"""
+        session = self.user_sessions.get(user_id)
+        if session is not None:
+            session['saved_preferences'] = preferences
     
     def get_personalized_content(self, user_id, content_type):
         """Get personalized content recommendations"""
@@ -167,6 +158,7 @@ class RealTimeLearning:
 
 # Initialize real-time learning
 real_time_learning = RealTimeLearning()
+atexit.register(real_time_learning.event_writer.stop)
 
 @app.route('/')
 def index():
@@ -8,7 +8,7 @@ class Achievement(db.Model):
     __tablename__ = 'achievements'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), unique=True, nullable=False)  # seeding upserts on name
     description = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50), nullable=False)  # learning, pet_care, social, emotional, creative
     
@@ -28,7 +28,7 @@ class ChatSession(db.Model):
     __tablename__ = 'chat_sessions'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     session_name = db.Column(db.String(100))
     chat_type = db.Column(db.Enum(ChatType), default=ChatType.GENERAL)
     initial_emotion = db.Column(db.Enum(EmotionLevel), default=EmotionLevel.NEUTRAL)
@@ -102,10 +102,14 @@ class ChatSession(db.Model):
 
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        # A child's recent messages, oldest first
+        db.Index('ix_chat_messages_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('chat_sessions.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     message_type = db.Column(db.String(20), default='text')  # 'text', 'emotion', 'image', 'audio'
     content = db.Column(db.Text, nullable=False)
     is_from_user = db.Column(db.Boolean, default=True)
@@ -0,0 +1,52 @@
+"""
+Class Summary Model holding the teacher dashboard's incrementally maintained aggregates
+"""
+from app import db
+from datetime import datetime, timedelta
+import json
+
+class ClassSummary(db.Model):
+    """One row per class with everything the teacher dashboard shows.
+
+    ClassSummaryService applies each user and lesson-progress change to the
+    row as it is flushed, so the dashboard reads one row instead of scanning
+    every student.
+    """
+    __tablename__ = 'class_summaries'
+
+    TOP_N = 10
+    ACTIVE_WINDOW_DAYS = 7
+
+    id = db.Column(db.Integer, primary_key=True)
+    class_key = db.Column(db.String(50), nullable=False, unique=True, index=True)
+
+    total_students = db.Column(db.Integer, default=0)
+    level_sum = db.Column(db.Integer, default=0)
+    top_students = db.Column(db.Text, default='[]')  # [{id, username, level, total_points}], best first
+    active_days = db.Column(db.Text, default='{}')  # ISO day -> students last active that day
+    subject_stats = db.Column(db.Text, default='{}')  # subject -> [completions, score_sum]
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self, now=None):
+        """Dashboard figures as of now"""
+        cutoff = ((now or datetime.now()) - timedelta(days=self.ACTIVE_WINDOW_DAYS)).date().isoformat()
+        active_days = json.loads(self.active_days or '{}')
+        subject_stats = json.loads(self.subject_stats or '{}')
+        total = self.total_students or 0
+
+        return {
+            'total_students': total,
+            'active_students': sum(count for day, count in active_days.items() if day >= cutoff),
+            'avg_level': (self.level_sum or 0) / total if total else 0,
+            'top_students': json.loads(self.top_students or '[]'),
+            'lesson_stats': [
+                {'name': subject, 'completions': completions,
+                 'avg_score': score_sum / completions if completions else 0}
+                for subject, (completions, score_sum) in sorted(subject_stats.items())
+            ],
+            'updated_at': self.updated_at
+        }
+
+    def __repr__(self):
+        return f'<ClassSummary {self.class_key} students:{self.total_students}>'
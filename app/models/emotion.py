@@ -6,7 +6,7 @@ db = SQLAlchemy()
 
 class EmotionalState(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # Current emotional metrics
     happiness = db.Column(db.Float, default=50.0)
@@ -320,8 +320,13 @@ class EmotionalState(db.Model):
 
 class SupportSession(db.Model):
     """Track emotional support sessions"""
+    __table_args__ = (
+        # A child's recent support sessions
+        db.Index('ix_support_session_user_started', 'user_id', 'started_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     session_type = db.Column(db.String(50), nullable=False)  # chat, breathing, activity, etc.
     duration_minutes = db.Column(db.Integer, default=0)
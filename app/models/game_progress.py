@@ -7,9 +7,15 @@ import json
 
 class GameProgress(db.Model):
     __tablename__ = 'game_progress'
+    __table_args__ = (
+        # Every learner analysis filters on one user over a recent time window
+        db.Index('ix_game_progress_user_created', 'user_id', 'created_at'),
+        # Covers cohort analysis: a range scan over the window that never reads the table
+        db.Index('ix_game_progress_created_cohort', 'created_at', 'user_id', 'game_type', 'score', 'difficulty'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     game_type = db.Column(db.String(50), nullable=False)  # 'memory', 'math', 'language', 'creativity'
     level = db.Column(db.Integer, default=1)
     score = db.Column(db.Integer, default=0)
@@ -18,13 +24,15 @@ class GameProgress(db.Model):
     attempts = db.Column(db.Integer, default=0)
     success_rate = db.Column(db.Float, default=0.0)
     streak_count = db.Column(db.Integer, default=0)
+    difficulty = db.Column(db.String(20), default='intermediate')
+    completed = db.Column(db.Boolean, default=False)
     last_played = db.Column(db.DateTime, default=datetime.utcnow)
     game_data = db.Column(db.Text)  # JSON string for specific game data
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Relationships
-    user = db.relationship('User', backref='game_progress')
+    # No relationship to User: it is mapped on another SQLAlchemy registry, where
+    # the string 'User' cannot resolve and would fail mapper configuration
 
     def __init__(self, user_id, game_type, **kwargs):
         self.user_id = user_id
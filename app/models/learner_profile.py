@@ -0,0 +1,184 @@
+"""
+Learner Profile Model holding incrementally maintained learning statistics
+"""
+from app import db
+from datetime import datetime
+import json
+import math
+
+# Which learning style each game type exercises
+GAME_STYLES = {
+    'color_match': 'visual', 'pattern_game': 'visual', 'visual_memory': 'visual',
+    'sound_match': 'auditory', 'music_rhythm': 'auditory', 'story_listening': 'auditory',
+    'drag_drop': 'kinesthetic', 'gesture_game': 'kinesthetic', 'movement_puzzle': 'kinesthetic',
+    'word_puzzle': 'reading', 'reading_game': 'reading', 'text_adventure': 'reading'
+}
+
+class LearnerProfile(db.Model):
+    """Running, time-decayed summary of a child's game results.
+
+    Every sum is exponentially decayed with a half-life of HALF_LIFE_DAYS, so
+    recent play dominates the way a fixed look-back window would, while each
+    new result is folded in with a constant amount of work.
+    """
+    __tablename__ = 'learner_profiles'
+
+    HALF_LIFE_DAYS = 7.0
+    RECENT_ALPHA = 0.5  # weight of the newest score in the short-term average
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True, index=True)
+
+    # Lifetime counters
+    total_sessions = db.Column(db.Integer, default=0)
+    lifetime_score_sum = db.Column(db.Float, default=0.0)
+    lifetime_time_sum = db.Column(db.Float, default=0.0)
+
+    # Decayed sums; weight is the decayed session count
+    weight = db.Column(db.Float, default=0.0)
+    score_sum = db.Column(db.Float, default=0.0)
+    score_sq_sum = db.Column(db.Float, default=0.0)
+    time_sum = db.Column(db.Float, default=0.0)
+    completed_sum = db.Column(db.Float, default=0.0)
+    recent_score = db.Column(db.Float)  # EWMA over sessions, not time
+
+    # JSON buckets: style -> decayed score sum, difficulty/hour -> [count, weight, score_sum]
+    style_buckets = db.Column(db.Text, default='{}')
+    difficulty_buckets = db.Column(db.Text, default='{}')
+    hour_buckets = db.Column(db.Text, default='{}')
+
+    decayed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, user_id, **kwargs):
+        self.user_id = user_id
+        self.total_sessions = 0
+        self.lifetime_score_sum = 0.0
+        self.lifetime_time_sum = 0.0
+        self.weight = 0.0
+        self.score_sum = 0.0
+        self.score_sq_sum = 0.0
+        self.time_sum = 0.0
+        self.completed_sum = 0.0
+        self.style_buckets = '{}'
+        self.difficulty_buckets = '{}'
+        self.hour_buckets = '{}'
+        self.decayed_at = datetime.utcnow()
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    @staticmethod
+    def _load(raw):
+        try:
+            return json.loads(raw) if raw else {}
+        except json.JSONDecodeError:
+            return {}
+
+    def _decay_factor(self, now):
+        if not self.decayed_at or now <= self.decayed_at:
+            return 1.0
+        days = (now - self.decayed_at).total_seconds() / 86400.0
+        return 0.5 ** (days / self.HALF_LIFE_DAYS)
+
+    def _decay_to(self, now):
+        """Age every decayed sum to now; touches a bounded number of buckets"""
+        factor = self._decay_factor(now)
+        if factor < 1.0:
+            self.weight = (self.weight or 0.0) * factor
+            self.score_sum = (self.score_sum or 0.0) * factor
+            self.score_sq_sum = (self.score_sq_sum or 0.0) * factor
+            self.time_sum = (self.time_sum or 0.0) * factor
+            self.completed_sum = (self.completed_sum or 0.0) * factor
+
+            styles = self._load(self.style_buckets)
+            self.style_buckets = json.dumps({k: v * factor for k, v in styles.items()})
+            for column in ('difficulty_buckets', 'hour_buckets'):
+                buckets = self._load(getattr(self, column))
+                setattr(self, column, json.dumps({
+                    k: [count, w * factor, s * factor] for k, (count, w, s) in buckets.items()
+                }))
+        self.decayed_at = now
+
+    def record(self, score, time_spent, completed=False, difficulty=None, style=None, played_at=None):
+        """Fold one game result into the profile in O(1)"""
+        played_at = played_at or datetime.utcnow()
+        if not self.total_sessions:
+            self.decayed_at = played_at  # start the clock at the first result
+        self._decay_to(max(played_at, self.decayed_at or played_at))
+        # Results older than the profile's clock are discounted to their age
+        weight = self._decay_factor_between(played_at, self.decayed_at)
+
+        accuracy = (score or 0) / 100.0
+        time_spent = float(time_spent or 0)
+
+        self.total_sessions = (self.total_sessions or 0) + 1
+        self.lifetime_score_sum = (self.lifetime_score_sum or 0.0) + accuracy
+        self.lifetime_time_sum = (self.lifetime_time_sum or 0.0) + time_spent
+
+        self.weight += weight
+        self.score_sum += weight * accuracy
+        self.score_sq_sum += weight * accuracy * accuracy
+        self.time_sum += weight * time_spent
+        self.completed_sum += weight * (1.0 if completed else 0.0)
+        if self.recent_score is None:
+            self.recent_score = accuracy
+        else:
+            self.recent_score = self.RECENT_ALPHA * accuracy + (1 - self.RECENT_ALPHA) * self.recent_score
+
+        if style:
+            styles = self._load(self.style_buckets)
+            styles[style] = styles.get(style, 0.0) + weight * (accuracy if score else 0.5)
+            self.style_buckets = json.dumps(styles)
+
+        difficulty_score = accuracy if score else 0.5
+        self._add_bucket('difficulty_buckets', difficulty or 'intermediate', weight, difficulty_score)
+        engagement_score = accuracy * (1.0 if completed else 0.5)
+        self._add_bucket('hour_buckets', str(played_at.hour), weight, engagement_score)
+
+    def _decay_factor_between(self, earlier, later):
+        if not later or earlier >= later:
+            return 1.0
+        days = (later - earlier).total_seconds() / 86400.0
+        return 0.5 ** (days / self.HALF_LIFE_DAYS)
+
+    def _add_bucket(self, column, key, weight, value):
+        buckets = self._load(getattr(self, column))
+        count, w, s = buckets.get(key, [0, 0.0, 0.0])
+        buckets[key] = [count + 1, w + weight, s + weight * value]
+        setattr(self, column, json.dumps(buckets))
+
+    def snapshot(self, now=None):
+        """Statistics aged to now without mutating the stored row"""
+        factor = self._decay_factor(now or datetime.utcnow())
+        weight = (self.weight or 0.0) * factor
+
+        def mean(total, default):
+            return total / (self.weight or 0.0) if self.weight else default
+
+        accuracy = mean(self.score_sum, 0.5)
+        variance = max(0.0, mean(self.score_sq_sum, 0.0) - accuracy ** 2)
+
+        def bucket_means(raw):
+            return {
+                key: {'count': count, 'weight': w * factor, 'mean': s / w if w else 0.0}
+                for key, (count, w, s) in self._load(raw).items()
+            }
+
+        return {
+            'total_sessions': self.total_sessions or 0,
+            'weight': weight,
+            # Expected sessions in the last 7 days given the decayed count
+            'sessions_per_week': weight * 7 * (1 - 0.5 ** (1 / self.HALF_LIFE_DAYS)),
+            'accuracy': accuracy,
+            'accuracy_std': math.sqrt(variance),
+            'recent_accuracy': self.recent_score if self.recent_score is not None else accuracy,
+            'avg_time': mean(self.time_sum, 60.0),
+            'completion_rate': mean(self.completed_sum, 0.0),
+            'style_scores': self._load(self.style_buckets),
+            'difficulty': bucket_means(self.difficulty_buckets),
+            'hours': bucket_means(self.hour_buckets)
+        }
+
+    def __repr__(self):
+        return f'<LearnerProfile {self.user_id} sessions:{self.total_sessions}>'
@@ -256,6 +256,9 @@ class Lesson(db.Model):
 
 class UserProgress(db.Model):
     __tablename__ = 'user_progress'
+    __table_args__ = (
+        db.Index('ix_user_progress_user', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -405,4 +408,21 @@ class LessonFeedback(db.Model):
             'suggestions': self.suggestions,
             'would_recommend': self.would_recommend,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+class Subject(db.Model):
+    """Catalogue of school subjects, seeded by the bootstrap command"""
+    __tablename__ = 'subjects'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    description = db.Column(db.Text)
+    color = db.Column(db.String(7))  # hex color
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'color': self.color
+        }
@@ -6,7 +6,7 @@ db = SQLAlchemy()
 
 class Pet(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     pet_type = db.Column(db.String(50), nullable=False)
     
@@ -374,4 +374,21 @@ class Pet(db.Model):
             'personality_traits': self.get_personality_traits(),
             'mood': self.get_mood(),
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+class PetType(db.Model):
+    """Catalogue of pets children can adopt, seeded by the bootstrap command"""
+    __tablename__ = 'pet_types'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    description = db.Column(db.Text)
+    emoji = db.Column(db.String(10))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'emoji': self.emoji
+        }
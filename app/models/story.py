@@ -175,6 +175,10 @@ class Story(db.Model):
 
 class StoryCollaboration(db.Model):
     __tablename__ = 'story_collaborations'
+    __table_args__ = (
+        # One child's contributions to a story
+        db.Index('ix_story_collaborations_story_user', 'story_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
@@ -9,6 +9,14 @@ db = SQLAlchemy()
 class User(UserMixin, db.Model):
     """Enhanced User model with real-time learning capabilities"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Teacher dashboard top students, active counts and the keyset-paginated
+        # student list: each sort key with id as the tie-breaker
+        db.Index('ix_users_total_points', 'total_points', 'id'),
+        db.Index('ix_users_level', 'level', 'id'),
+        db.Index('ix_users_last_active', 'last_active', 'id'),
+        db.Index('ix_users_average_score', 'average_score', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -37,9 +45,12 @@ class User(UserMixin, db.Model):
     # Gamification & Progress
     total_points = db.Column(db.Integer, default=0)
     level = db.Column(db.Integer, default=1)
+    average_score = db.Column(db.Float, default=0.0)  # mean best_score over lesson progress
     experience_points = db.Column(db.Integer, default=0)
     learning_streak = db.Column(db.Integer, default=0)
     longest_streak = db.Column(db.Integer, default=0)
+    last_active_date = db.Column(db.Date)  # most recent day with a learning session
+    activity_bitmap = db.Column(db.LargeBinary)  # bit i set = active i days before last_active_date
     
     # Engagement Metrics
     total_lessons_completed = db.Column(db.Integer, default=0)
@@ -254,59 +265,81 @@ class User(UserMixin, db.Model):
                     )
                     db.session.add(user_achievement)
     
+    STREAK_WINDOW_DAYS = 366
+    
+    def _activity_bits(self):
+        return int.from_bytes(self.activity_bitmap or b'', 'little')
+    
+    def _set_activity_bits(self, bits):
+        self.activity_bitmap = self._pack_activity_bits(bits)
+    
+    @classmethod
+    def _pack_activity_bits(cls, bits):
+        bits &= (1 << cls.STREAK_WINDOW_DAYS) - 1
+        return bits.to_bytes((cls.STREAK_WINDOW_DAYS + 7) // 8, 'little')
+    
+    @staticmethod
+    def _streaks_from_bits(bits):
+        """(run of active days ending at bit 0, longest run anywhere in the window)"""
+        current = ((bits ^ (bits + 1)).bit_length() - 1) if bits & 1 else 0
+        longest = 0
+        while bits:
+            bits &= bits >> 1
+            longest += 1
+        return current, longest
+    
+    def record_activity(self, day=None):
+        """Mark a day as active and keep the streak counters current without queries"""
+        day = day or datetime.now().date()
+        last = self.last_active_date
+        bits = self._activity_bits()
+        
+        if last is None or day > last:
+            gap = (day - last).days if last else self.STREAK_WINDOW_DAYS
+            bits = (bits << gap) | 1 if gap < self.STREAK_WINDOW_DAYS else 1
+            self.learning_streak = (self.learning_streak or 0) + 1 if gap == 1 else 1
+            self.last_active_date = day
+        else:
+            offset = (last - day).days
+            if offset >= self.STREAK_WINDOW_DAYS or bits >> offset & 1:
+                return
+            # A late event filled in an older day, which may join two runs
+            bits |= 1 << offset
+            self.learning_streak = self._streaks_from_bits(bits)[0]
+        
+        self._set_activity_bits(bits)
+        self.longest_streak = max(self.longest_streak or 0, self.learning_streak,
+                                  self._streaks_from_bits(bits)[1])
+    
+    @classmethod
+    def activity_from_days(cls, days):
+        """(last_active_date, activity_bitmap, current streak, longest streak) for a set of active days.
+
+        Used by the bootstrap step that builds the bitmap once from existing
+        learning sessions; record_activity keeps it current from then on.
+        """
+        if not days:
+            return None, None, 0, 0
+        last = max(days)
+        bits = 0
+        for day in days:
+            offset = (last - day).days
+            if offset < cls.STREAK_WINDOW_DAYS:
+                bits |= 1 << offset
+        current, longest = cls._streaks_from_bits(bits)
+        return last, cls._pack_activity_bits(bits), current, longest
+    
     def update_learning_streak(self):
-        """Update learning streak based on activity"""
-        today = datetime.now().date()
-        
-        # Check if user was active yesterday
-        yesterday = today - timedelta(days=1)
-        yesterday_sessions = LearningSession.query.filter(
-            LearningSession.user_id == self.id,
-            LearningSession.timestamp >= yesterday,
-            LearningSession.timestamp < today
-        ).count()
-        
-        # Check if user is active today
-        today_sessions = LearningSession.query.filter(
-            LearningSession.user_id == self.id,
-            LearningSession.timestamp >= today
-        ).count()
-        
-        if today_sessions > 0:
-            if yesterday_sessions > 0:
-                self.learning_streak += 1
-            else:
-                self.learning_streak = 1
-            
-            if self.learning_streak > self.longest_streak:
-                self.longest_streak = self.learning_streak
-        elif yesterday_sessions == 0:
+        """Reset the current streak once a full day has passed without activity"""
+        yesterday = datetime.now().date() - timedelta(days=1)
+        if self.last_active_date is None or self.last_active_date < yesterday:
             self.learning_streak = 0
     
     def calculate_learning_streak(self):
-        """Calculate current learning streak"""
-        today = datetime.now().date()
-        streak = 0
-        
-        current_date = today
-        while True:
-            sessions = LearningSession.query.filter(
-                LearningSession.user_id == self.id,
-                LearningSession.timestamp >= current_date,
-                LearningSession.timestamp < current_date + timedelta(days=1)
-            ).count()
-            
-            if sessions > 0:
-                streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
-                
-            # Limit to prevent infinite loops
-            if streak > 365:
-                break
-        
-        return streak
+        """Calculate current learning streak (consecutive active days ending today)"""
+        if self.last_active_date != datetime.now().date():
+            return 0
+        return min(self.learning_streak or 0, 365)
     
     def get_preferred_subjects(self):
         """Get list of preferred subjects"""
@@ -368,6 +401,10 @@ class User(UserMixin, db.Model):
 class LearningSession(db.Model):
     """Track individual learning sessions for real-time adaptation"""
     __tablename__ = 'learning_sessions'
+    __table_args__ = (
+        # Recent sessions for one learner
+        db.Index('ix_learning_sessions_user_timestamp', 'user_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -0,0 +1,110 @@
+"""
+Voice Pattern Model for persisting each child's recent speech clarity and confidence
+"""
+from app import db
+from datetime import datetime
+import numpy as np
+
+class VoicePattern(db.Model):
+    """Fixed-size ring buffer of recent voice scores with running window sums"""
+    __tablename__ = 'voice_patterns'
+
+    CAPACITY = 10
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True, index=True)
+
+    # Ring buffers stored as packed float32 arrays of length CAPACITY
+    clarity_ring = db.Column(db.LargeBinary, nullable=False)
+    confidence_ring = db.Column(db.LargeBinary, nullable=False)
+    head = db.Column(db.Integer, default=0)  # next slot to overwrite
+    count = db.Column(db.Integer, default=0)  # filled slots, at most CAPACITY
+
+    # Running sums over the filled window, kept in step with the ring
+    clarity_sum = db.Column(db.Float, default=0.0)
+    confidence_sum = db.Column(db.Float, default=0.0)
+
+    total_sessions = db.Column(db.Integer, default=0)
+    preferred_pace = db.Column(db.String(20), default='normal')
+    last_analysis = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Bumped on every write; an UPDATE from a stale read matches no row and raises StaleDataError
+    version = db.Column(db.Integer, nullable=False, default=1)
+    __mapper_args__ = {'version_id_col': version}
+
+    def __init__(self, user_id, **kwargs):
+        self.user_id = user_id
+        empty = np.zeros(self.CAPACITY, dtype=np.float32).tobytes()
+        self.clarity_ring = empty
+        self.confidence_ring = empty
+        self.head = 0
+        self.count = 0
+        self.clarity_sum = 0.0
+        self.confidence_sum = 0.0
+        self.total_sessions = 0
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    def record(self, clarity, confidence, timestamp=None):
+        """Push one analysis into the ring in O(1), evicting the oldest when full"""
+        clarity_ring = np.frombuffer(self.clarity_ring, dtype=np.float32).copy()
+        confidence_ring = np.frombuffer(self.confidence_ring, dtype=np.float32).copy()
+        head = self.head or 0
+        count = self.count or 0
+
+        if count == self.CAPACITY:
+            self.clarity_sum -= float(clarity_ring[head])
+            self.confidence_sum -= float(confidence_ring[head])
+        else:
+            count += 1
+
+        clarity_ring[head] = clarity
+        confidence_ring[head] = confidence
+        self.clarity_sum = (self.clarity_sum or 0.0) + float(clarity_ring[head])
+        self.confidence_sum = (self.confidence_sum or 0.0) + float(confidence_ring[head])
+        head = (head + 1) % self.CAPACITY
+
+        # Re-anchor the sums once per lap so float drift never accumulates
+        if head == 0:
+            self.clarity_sum = float(clarity_ring[:count].sum(dtype=np.float64))
+            self.confidence_sum = float(confidence_ring[:count].sum(dtype=np.float64))
+
+        self.clarity_ring = clarity_ring.tobytes()
+        self.confidence_ring = confidence_ring.tobytes()
+        self.head = head
+        self.count = count
+        self.total_sessions = (self.total_sessions or 0) + 1
+        self.last_analysis = timestamp or datetime.utcnow()
+
+    def _ordered(self, ring_bytes):
+        """Ring contents from oldest to newest"""
+        ring = np.frombuffer(ring_bytes, dtype=np.float32)
+        count = self.count or 0
+        if count < self.CAPACITY:
+            return ring[:count].tolist()
+        return np.roll(ring, -(self.head or 0)).tolist()
+
+    @property
+    def average_clarity(self):
+        return self.clarity_sum / self.count if self.count else 0.0
+
+    @property
+    def average_confidence(self):
+        return self.confidence_sum / self.count if self.count else 0.0
+
+    def to_dict(self):
+        """Snapshot in the shape VoiceService has always used for voice patterns"""
+        return {
+            'clarity_scores': self._ordered(self.clarity_ring),
+            'confidence_scores': self._ordered(self.confidence_ring),
+            'average_clarity': self.average_clarity,
+            'average_confidence': self.average_confidence,
+            'total_sessions': self.total_sessions or 0,
+            'preferred_pace': self.preferred_pace,
+            'last_analysis': self.last_analysis
+        }
+
+    def __repr__(self):
+        return f'<VoicePattern {self.user_id} sessions:{self.total_sessions}>'
@@ -5,16 +5,15 @@ from app.models.user import User
 from app.models.achievement import Achievement
 from app.models.pet import Pet
 from app.models.emotion import EmotionData
-from app.services.llm_service import LLMService
-from app.services.sentiment_service import SentimentService
+from app.services.container import services
 from app.database import db
 import random
 import json
 from datetime import datetime
 
 education_bp = Blueprint('education', __name__)
-llm_service = LLMService()
-sentiment_service = SentimentService()
+llm_service = services.proxy('llm')
+sentiment_service = services.proxy('sentiment')
 
 @education_bp.route('/learn')
 @login_required
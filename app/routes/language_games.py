@@ -1,22 +1,23 @@
 from flask import Blueprint, render_template, request, jsonify, session
 from flask_login import login_required, current_user
+from flask_socketio import emit
 from app.models.user import User
 from app.models.lesson import Lesson
 from app.models.achievement import Achievement
 from app.models.pet import Pet
-from app.services.voice_service import VoiceService
-from app.services.translation_service import TranslationService
-from app.services.llm_service import LLMService
-from app import db
+from app.services.container import services
+from app.services.audio_stream_service import AudioStreamService
+from app import db, socketio
 import random
 import json
 from datetime import datetime
 import logging
 
 language_games_bp = Blueprint('language_games', __name__)
-voice_service = VoiceService()
-translation_service = TranslationService()
-llm_service = LLMService()
+voice_service = services.proxy('voice')
+translation_service = services.proxy('translation')
+llm_service = services.proxy('llm')
+audio_streams = AudioStreamService()
 
 # Enhanced vocabulary database with child-friendly words
 VOCABULARY_SETS = {
@@ -329,6 +330,91 @@ def translation_game():
     
     return jsonify(game_data)
 
+# Socket.IO events for streamed pronunciation practice
+@socketio.on('start_audio_stream')
+def handle_start_audio_stream(data):
+    """Open a VAD-gated PCM stream for the current pronunciation word"""
+    if not current_user.is_authenticated:
+        emit('error', {'message': 'Please log in to practice speaking!'})
+        return
+    
+    data = data if isinstance(data, dict) else {}
+    try:
+        audio_streams.open_stream(
+            request.sid,
+            target_word=data.get('word'),
+            language=data.get('language', 'en'),
+            sample_rate=int(data.get('sample_rate', 16000))
+        )
+    except ValueError as e:
+        emit('audio_stream_error', {'message': str(e)})
+        return
+    
+    emit('audio_stream_ready', {'word': data.get('word')})
+
+@socketio.on('audio_chunk')
+def handle_audio_chunk(chunk):
+    """Feed a chunk of 16-bit mono PCM into the caller's stream"""
+    stream = audio_streams.get_stream(request.sid)
+    if not stream or not isinstance(chunk, (bytes, bytearray)):
+        return
+    
+    for event in stream.feed(bytes(chunk)):
+        dispatch_stream_event(request.sid, stream, event)
+
+@socketio.on('stop_audio_stream')
+def handle_stop_audio_stream(data=None):
+    """Close the caller's stream and score whatever was still being said"""
+    sid = request.sid
+    stream = audio_streams.get_stream(sid)
+    event = audio_streams.close_stream(sid)
+    if stream and event:
+        dispatch_stream_event(sid, stream, event)
+
+@socketio.on('disconnect')
+def handle_audio_disconnect():
+    """Drop any open audio stream when the browser goes away"""
+    audio_streams.close_stream(request.sid)
+
+def dispatch_stream_event(sid, stream, event):
+    """Turn a VAD event into client feedback, recognizing speech off the socket thread"""
+    if event['type'] == 'speech_start':
+        socketio.emit('speech_started', {'word': stream.target_word}, room=sid)
+    elif event['type'] == 'partial':
+        # Skip this partial if the previous one is still being recognized
+        if stream.recognizing:
+            return
+        stream.recognizing = True
+        socketio.start_background_task(recognize_partial_utterance, sid, stream, event['pcm'])
+    elif event['type'] == 'final':
+        socketio.start_background_task(score_final_utterance, sid, stream, event['pcm'])
+
+def recognize_partial_utterance(sid, stream, pcm):
+    """Send provisional feedback while the child is still speaking"""
+    try:
+        recognized = voice_service.transcribe_pcm(pcm, stream.sample_rate, stream.language)
+        if recognized:
+            # Same 0-1 scale as the final result's accuracy_score
+            accuracy = calculate_pronunciation_accuracy(recognized, stream.target_word) / 100
+            socketio.emit('pronunciation_partial', {
+                'word': stream.target_word,
+                'recognized': recognized,
+                'accuracy_score': accuracy
+            }, room=sid)
+    finally:
+        stream.recognizing = False
+
+def score_final_utterance(sid, stream, pcm):
+    """Score a completed utterance and send the full result"""
+    if not stream.target_word:
+        return
+    
+    analysis = voice_service.analyze_pronunciation_pcm(
+        stream.target_word, pcm, stream.sample_rate, stream.language
+    )
+    analysis['word'] = stream.target_word
+    socketio.emit('pronunciation_result', analysis, room=sid)
+
 # Helper functions
 def get_user_language_level(user_id):
     """Determine user's language level based on performance"""
@@ -4,12 +4,12 @@ from flask_socketio import emit, join_room, leave_room
 from app import db, socketio
 from app.models.user import User
 from app.models.pet import Pet
-from app.services.moderation_service import ModerationService
+from app.services.container import services
 import json
 from datetime import datetime
 
 social_bp = Blueprint('social', __name__, url_prefix='/social')
-moderation = ModerationService()
+moderation = services.proxy('moderation')
 
 # Active chat rooms and users
 active_rooms = {}
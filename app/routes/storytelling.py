@@ -4,15 +4,14 @@ from flask_socketio import emit, join_room, leave_room
 from app import db, socketio
 from app.models.user import User
 from app.models.story import Story, StoryContribution, StoryVote
-from app.services.llm_service import LLMService
-from app.services.moderation_service import ModerationService
+from app.services.container import services
 from datetime import datetime, timedelta
 import json
 import random
 
 storytelling_bp = Blueprint('storytelling', __name__, url_prefix='/storytelling')
-llm_service = LLMService()
-moderation = ModerationService()
+llm_service = services.proxy('llm')
+moderation = services.proxy('moderation')
 
 # Active storytelling sessions
 active_stories = {}
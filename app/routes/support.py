@@ -3,16 +3,15 @@ from flask_login import login_required, current_user
 from app.models.emotion import EmotionData
 from app.models.user import User
 from app.models.pet import Pet
-from app.services.sentiment_service import SentimentService
-from app.services.llm_service import LLMService
+from app.services.container import services
 from app.database import db
 import json
 from datetime import datetime, timedelta
 import random
 
 support_bp = Blueprint('support', __name__)
-sentiment_service = SentimentService()
-llm_service = LLMService()
+sentiment_service = services.proxy('sentiment')
+llm_service = services.proxy('llm')
 
 @support_bp.route('/emotion-check')
 @login_required
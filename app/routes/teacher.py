@@ -1,46 +1,66 @@
-from flask import Blueprint, render_template, request, jsonify, session
+from flask import Blueprint, render_template, request, jsonify, session, send_file
 from flask_login import login_required, current_user
-from app import db
+from flask_socketio import join_room
+from app import db, socketio
 from app.models.user import User
-from app.models.lesson import Lesson, Subject, UserLessonProgress
+from app.models.lesson import Lesson, Subject, UserProgress
 from app.models.achievement import Achievement, UserAchievement
 from app.models.pet import Pet
-from app.services.llm_service import LLMService
+from app.services.container import services
+from app.services.class_summary_service import ClassSummaryService
+from app.services.report_jobs import ReportJobQueue
 from datetime import datetime, timedelta
 import json
+import os
 
 teacher_bp = Blueprint('teacher', __name__, url_prefix='/teacher')
-llm_service = LLMService()
+llm_service = services.proxy('llm')
+adaptive_service = services.proxy('adaptive')
+class_summaries = ClassSummaryService()
+_report_jobs = None
+
+def get_report_jobs():
+    """Report queue for this process, created on first use with the app's database (where its jobs are kept)"""
+    global _report_jobs
+    if _report_jobs is None:
+        _report_jobs = ReportJobQueue(
+            db.engine.url.render_as_string(hide_password=False),
+            root=os.environ.get('REPORT_DIR') or None,
+            max_workers=int(os.environ.get('REPORT_WORKERS', 2)),
+            engine=db.engine,
+            notify=lambda job: socketio.emit('report_ready', job, room=f"reports_{job['requested_by']}")
+        )
+    return _report_jobs
 
 @teacher_bp.route('/dashboard')
 @login_required
 def dashboard():
     """Teacher dashboard with student progress overview"""
-    # Get all students (in production, filter by teacher's class)
-    students = User.query.filter(User.role == 'student').all()
-    
-    # Calculate overall statistics
-    total_students = len(students)
-    active_students = len([s for s in students if s.last_active > datetime.utcnow() - timedelta(days=7)])
-    avg_level = sum(s.level for s in students) / total_students if total_students > 0 else 0
-    
-    # Get top performing students
-    top_students = sorted(students, key=lambda s: s.total_points, reverse=True)[:10]
-    
-    # Get lesson completion stats
-    lesson_stats = db.session.query(
-        Subject.name,
-        db.func.count(UserLessonProgress.id).label('completions'),
-        db.func.avg(UserLessonProgress.score).label('avg_score')
-    ).join(Lesson).join(UserLessonProgress).group_by(Subject.id).all()
+    # Kept current by ClassSummaryService as students and progress change
+    # (in production, key the summary by the teacher's class)
+    summary = class_summaries.get()
     
     return render_template('teacher_dashboard.html',
-                         students=students,
-                         total_students=total_students,
-                         active_students=active_students,
-                         avg_level=round(avg_level, 1),
-                         top_students=top_students,
-                         lesson_stats=lesson_stats)
+                         total_students=summary['total_students'],
+                         active_students=summary['active_students'],
+                         avg_level=round(summary['avg_level'], 1),
+                         top_students=summary['top_students'],
+                         lesson_stats=summary['lesson_stats'])
+
+@teacher_bp.route('/api/students')
+@login_required
+def list_students():
+    """One page of students, sorted server-side; pass next_cursor back as ?after= for the next"""
+    sort = request.args.get('sort', 'points')
+    descending = request.args.get('order', 'desc') != 'asc'
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    
+    try:
+        page = class_summaries.list_students(sort, descending, limit, request.args.get('after'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(page)
 
 @teacher_bp.route('/student/<int:student_id>')
 @login_required
@@ -49,18 +69,18 @@ def student_detail(student_id):
     student = User.query.get_or_404(student_id)
     
     # Get student's lesson progress
-    progress = UserLessonProgress.query.filter_by(user_id=student_id)\
-        .join(Lesson).join(Subject).all()
+    progress = UserProgress.query.filter_by(user_id=student_id)\
+        .join(Lesson).all()
     
     # Group progress by subject
     subject_progress = {}
     for p in progress:
-        subject_name = p.lesson.subject.name
+        subject_name = p.lesson.subject
         if subject_name not in subject_progress:
             subject_progress[subject_name] = []
         subject_progress[subject_name].append({
             'lesson_title': p.lesson.title,
-            'score': p.score,
+            'score': p.best_score,
             'completed_at': p.completed_at,
             'attempts': p.attempts
         })
@@ -126,19 +146,19 @@ def lesson_analytics(lesson_id):
     lesson = Lesson.query.get_or_404(lesson_id)
     
     # Get completion data
-    progress_data = UserLessonProgress.query.filter_by(lesson_id=lesson_id).all()
+    progress_data = UserProgress.query.filter_by(lesson_id=lesson_id).all()
     
     # Calculate statistics
     total_attempts = len(progress_data)
-    completed = len([p for p in progress_data if p.completed])
-    avg_score = sum(p.score for p in progress_data) / total_attempts if total_attempts > 0 else 0
+    completed = len([p for p in progress_data if p.is_completed])
+    avg_score = sum(p.best_score for p in progress_data) / total_attempts if total_attempts > 0 else 0
     avg_time = sum(p.time_spent for p in progress_data if p.time_spent) / total_attempts if total_attempts > 0 else 0
     
     # Group by difficulty/performance
     performance_groups = {
-        'struggling': [p for p in progress_data if p.score < 60],
-        'average': [p for p in progress_data if 60 <= p.score < 80],
-        'excellent': [p for p in progress_data if p.score >= 80]
+        'struggling': [p for p in progress_data if p.best_score < 60],
+        'average': [p for p in progress_data if 60 <= p.best_score < 80],
+        'excellent': [p for p in progress_data if p.best_score >= 80]
     }
     
     return render_template('lesson_analytics.html',
@@ -191,38 +211,28 @@ def send_encouragement():
 @login_required
 def class_performance():
     """Overall class performance metrics"""
-    # Get performance data for charts
-    students = User.query.filter(User.role == 'student').all()
-    
-    # Performance by subject
-    subject_performance = {}
-    for subject in Subject.query.all():
-        avg_score = db.session.query(db.func.avg(UserLessonProgress.score))\
-            .join(Lesson).filter(Lesson.subject_id == subject.id).scalar() or 0
-        subject_performance[subject.name] = round(avg_score, 1)
-    
-    # Learning time distribution
-    time_distribution = {}
-    for student in students:
-        total_time = sum(p.time_spent for p in student.lesson_progress if p.time_spent)
-        time_range = get_time_range(total_time)
-        time_distribution[time_range] = time_distribution.get(time_range, 0) + 1
-    
-    # Pet happiness correlation with learning
-    pet_learning_correlation = []
-    for student in students:
-        if student.pet:
-            avg_score = sum(p.score for p in student.lesson_progress) / len(student.lesson_progress) if student.lesson_progress else 0
-            pet_learning_correlation.append({
-                'pet_happiness': student.pet.happiness,
-                'learning_score': avg_score,
-                'student_name': student.username
-            })
+    # Subject averages, time distribution and pet correlation come from a
+    # fixed number of grouped queries rather than per-student lazy loads
+    performance = class_summaries.class_performance()
     
     return render_template('class_performance.html',
-                         subject_performance=subject_performance,
-                         time_distribution=time_distribution,
-                         pet_learning_correlation=pet_learning_correlation)
+                         subject_performance=performance['subject_performance'],
+                         time_distribution=performance['time_distribution'],
+                         pet_learning_correlation=performance['pet_learning_correlation'])
+
+@teacher_bp.route('/api/cohort')
+@login_required
+def cohort_analysis():
+    """Learning patterns of every student (or ?student_ids=1,2,3) over the last ?days=30"""
+    days = max(1, min(request.args.get('days', 30, type=int), 365))
+    student_ids = None
+    if request.args.get('student_ids'):
+        try:
+            student_ids = [int(student_id) for student_id in request.args['student_ids'].split(',')]
+        except ValueError:
+            return jsonify({'error': 'student_ids must be a comma-separated list of student ids'}), 400
+    
+    return jsonify(adaptive_service.analyze_cohort(student_ids, days_back=days))
 
 @teacher_bp.route('/generate_report/<int:student_id>')
 @login_required
@@ -231,7 +241,7 @@ def generate_report(student_id):
     student = User.query.get_or_404(student_id)
     
     # Collect all relevant data
-    progress_data = UserLessonProgress.query.filter_by(user_id=student_id).all()
+    progress_data = UserProgress.query.filter_by(user_id=student_id).all()
     achievements = UserAchievement.query.filter_by(user_id=student_id).all()
     
     # Generate AI-powered insights and recommendations
@@ -248,6 +258,54 @@ def generate_report(student_id):
     
     return render_template('student_report.html', **report_data)
 
+@teacher_bp.route('/reports', methods=['POST'])
+@login_required
+def request_reports():
+    """Queue CSV/PDF reports for one student or a whole class; poll or listen for report_ready"""
+    data = request.get_json() or {}
+    student_ids = data.get('student_ids') or [data.get('student_id')]
+    try:
+        student_ids = [int(student_id) for student_id in student_ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'student_ids must be a list of student ids'}), 400
+    
+    try:
+        jobs = get_report_jobs().submit(student_ids, data.get('format', 'csv'),
+                                        db.session.connection(), requested_by=current_user.id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'jobs': jobs}), 202
+
+@teacher_bp.route('/reports/<job_id>')
+@login_required
+def report_status(job_id):
+    """Status of a queued report"""
+    job = get_report_jobs().get(job_id)
+    if job is None or job['requested_by'] != current_user.id:
+        return jsonify({'error': 'Report not found'}), 404
+    return jsonify(job)
+
+@teacher_bp.route('/reports/<job_id>/download')
+@login_required
+def download_report(job_id):
+    """Download a finished report"""
+    jobs = get_report_jobs()
+    job = jobs.get(job_id)
+    if job is None or job['requested_by'] != current_user.id:
+        return jsonify({'error': 'Report not found'}), 404
+    path = jobs.path_for(job)
+    if path is None:
+        return jsonify({'error': 'Report is not ready yet', 'status': job['status']}), 409
+    return send_file(os.path.abspath(path), as_attachment=True,
+                     download_name=f"student_{job['student_id']}_report.{job['format']}")
+
+@socketio.on('watch_reports')
+def handle_watch_reports():
+    """Deliver report_ready events for this teacher's report jobs"""
+    if current_user.is_authenticated:
+        join_room(f"reports_{current_user.id}")
+
 # Helper functions
 def generate_student_insights(student, subject_progress):
     """Generate AI-powered insights about student learning"""
@@ -277,34 +335,23 @@ def generate_student_insights(student, subject_progress):
 
 def get_student_recent_activity(student):
     """Get recent activity for personalized messages"""
-    recent_progress = UserLessonProgress.query.filter_by(user_id=student.id)\
-        .filter(UserLessonProgress.completed_at > datetime.utcnow() - timedelta(days=7))\
-        .order_by(UserLessonProgress.completed_at.desc()).limit(5).all()
+    recent_progress = UserProgress.query.filter_by(user_id=student.id)\
+        .filter(UserProgress.completed_at > datetime.utcnow() - timedelta(days=7))\
+        .order_by(UserProgress.completed_at.desc()).limit(5).all()
     
     return [
         {
             'lesson': p.lesson.title,
-            'score': p.score,
-            'subject': p.lesson.subject.name
+            'score': p.best_score,
+            'subject': p.lesson.subject
         }
         for p in recent_progress
     ]
 
-def get_time_range(total_minutes):
-    """Categorize learning time into ranges"""
-    if total_minutes < 60:
-        return "0-1 hours"
-    elif total_minutes < 180:
-        return "1-3 hours"
-    elif total_minutes < 300:
-        return "3-5 hours"
-    else:
-        return "5+ hours"
-
 def generate_student_summary(student, progress_data):
     """Generate comprehensive student summary"""
     total_lessons = len(progress_data)
-    avg_score = sum(p.score for p in progress_data) / total_lessons if total_lessons > 0 else 0
+    avg_score = sum(p.best_score for p in progress_data) / total_lessons if total_lessons > 0 else 0
     
     return {
         'total_lessons_completed': total_lessons,
@@ -319,10 +366,10 @@ def identify_strengths(progress_data):
     """Identify student's academic strengths"""
     subject_scores = {}
     for progress in progress_data:
-        subject = progress.lesson.subject.name
+        subject = progress.lesson.subject
         if subject not in subject_scores:
             subject_scores[subject] = []
-        subject_scores[subject].append(progress.score)
+        subject_scores[subject].append(progress.best_score)
     
     strengths = []
     for subject, scores in subject_scores.items():
@@ -338,10 +385,10 @@ def identify_improvement_areas(progress_data):
     """Identify areas needing improvement"""
     subject_scores = {}
     for progress in progress_data:
-        subject = progress.lesson.subject.name
+        subject = progress.lesson.subject
         if subject not in subject_scores:
             subject_scores[subject] = []
-        subject_scores[subject].append(progress.score)
+        subject_scores[subject].append(progress.best_score)
     
     improvements = []
     for subject, scores in subject_scores.items():
@@ -359,7 +406,7 @@ def generate_recommendations(student, progress_data):
     
     # Based on performance patterns
     if progress_data:
-        recent_scores = [p.score for p in progress_data[-5:]]
+        recent_scores = [p.best_score for p in progress_data[-5:]]
         if len(recent_scores) >= 3:
             if all(s < 70 for s in recent_scores[-3:]):
                 recommendations.append("Consider breaking lessons into smaller chunks")
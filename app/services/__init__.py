@@ -1,24 +1,32 @@
 """
 EduHope Services Package
 Provides AI-powered services for personalized learning, emotional support, and content generation.
+
+The service classes are imported on first access, so importing one service (or
+the container) does not load the models and libraries behind all the others.
+Shared instances come from app.services.container.services.
 """
+from importlib import import_module
+
+_EXPORTS = {
+    'LLMService': 'llm_service',
+    'VoiceService': 'voice_service',
+    'TranslationService': 'translation_service',
+    'SentimentService': 'sentiment_service',
+    'ModerationService': 'moderation_service',
+    'AdaptiveLearningService': 'adaptive_learning_services',
+    'AnalyticsService': 'analytic_services',
+    'PetAIService': 'pet_ai_service',
+    'ServiceContainer': 'container',
+    'services': 'container'
+}
+
+__all__ = list(_EXPORTS)
 
-from .llm_service import LLMService
-from .voice_service import VoiceService
-from .translation_service import TranslationService
-from .sentiment_service import SentimentService
-from .moderation_service import ModerationService
-from .adaptive_learning_service import AdaptiveLearningService
-from .analytics_service import AnalyticsService
-from .pet_ai_service import PetAIService
 
-__all__ = [
-    'LLMService',
-    'VoiceService', 
-    'TranslationService',
-    'SentimentService',
-    'ModerationService',
-    'AdaptiveLearningService',
-    'AnalyticsService',
-    'PetAIService'
-]
\ No newline at end of file
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
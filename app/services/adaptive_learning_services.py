@@ -5,18 +5,56 @@ Personalizes learning experiences based on user interactions and performance
 import json
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict, defaultdict
+import copy
 import logging
+import threading
+import time
+import weakref
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from app.models.user import User
 from app.models.lesson import Lesson
 from app.models.game_progress import GameProgress
+from app.models.learner_profile import GAME_STYLES, LearnerProfile
 from app import db
 
 logger = logging.getLogger(__name__)
 
+# Every service holding a profile cache; weak so the session listeners below
+# never keep a discarded service alive
+_profile_caches = weakref.WeakSet()
+
+def _invalidate_profiles(user_ids):
+    for service in list(_profile_caches):
+        for user_id in user_ids:
+            service.invalidate_profile(user_id)
+
+def _game_progress_users(session) -> set:
+    changed = set(session.new) | set(session.dirty) | set(session.deleted)
+    return {obj.user_id for obj in changed if isinstance(obj, GameProgress)}
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed_game_progress(session, flush_context):
+    user_ids = _game_progress_users(session)
+    if user_ids:
+        session.info.setdefault('game_progress_users', set()).update(user_ids)
+        _invalidate_profiles(user_ids)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_game_progress(session):
+    # A read between flush and commit may have cached pre-commit state; drop it now the rows are visible
+    _invalidate_profiles(session.info.pop('game_progress_users', ()))
+
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_rolled_back_game_progress(session):
+    # Reads on this session may have cached rows that no longer exist
+    _invalidate_profiles(session.info.pop('game_progress_users', ()))
+
 class AdaptiveLearningService:
     """Real-time adaptive learning system with AI personalization"""
     
@@ -34,6 +72,9 @@ class AdaptiveLearningService:
             'advanced': {'multiplier': 1.2, 'min_accuracy': 0.8, 'max_accuracy': 1.0}
         }
         
+        # Which learning style each game type exercises
+        self.game_styles = GAME_STYLES
+        
         self.engagement_factors = {
             'time_spent': 0.3,
             'interaction_frequency': 0.2,
@@ -41,80 +82,191 @@ class AdaptiveLearningService:
             'retry_attempts': 0.15,
             'pet_interaction': 0.1
         }
+        
+        # Cohort loads: ids per IN list (SQLite allows 999 bound parameters on older builds) and rows per fetch
+        self.cohort_chunk_size = 500
+        self.cohort_partition_rows = 50000
+        
+        # Read-through cache of computed profiles, user_id -> {view: (expires_at, result)}.
+        # Committed GameProgress changes in this process evict a user's entries;
+        # the TTL bounds staleness from other workers and time-dependent views.
+        self.profile_cache_size = 5000
+        self.profile_cache_ttl = 300
+        self._profile_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        # cache_stats() is logged every this many lookups
+        self.cache_stats_log_every = 1000
+        _profile_caches.add(self)
+    
+    def invalidate_profile(self, user_id: int):
+        """Drop every cached view of a user's learning profile"""
+        with self._cache_lock:
+            self._profile_cache.pop(user_id, None)
+    
+    def _read_through(self, user_id: int, view: Tuple, compute: Callable[[], Dict]) -> Dict:
+        """Serve a copy of a cached profile view, computing and caching it on a miss"""
+        with self._cache_lock:
+            entry = self._profile_cache.get(user_id, {}).get(view)
+            hit = entry is not None and entry[0] > time.monotonic()
+            if hit:
+                self._cache_hits += 1
+                self._profile_cache.move_to_end(user_id)
+                cached = copy.deepcopy(entry[1])
+            else:
+                self._cache_misses += 1
+            report = (self._cache_hits + self._cache_misses) % self.cache_stats_log_every == 0
+        
+        if report:
+            logger.info(f"Profile cache: {self.cache_stats()}")
+        if hit:
+            return cached
+        
+        result = compute()
+        
+        # Fallback defaults (unknown user, errors) carry no user_id and are not cached
+        if 'user_id' in result.get('learning_profile', result):
+            entry = (time.monotonic() + self.profile_cache_ttl, copy.deepcopy(result))
+            with self._cache_lock:
+                self._profile_cache.setdefault(user_id, {})[view] = entry
+                self._profile_cache.move_to_end(user_id)
+                while len(self._profile_cache) > self.profile_cache_size:
+                    self._profile_cache.popitem(last=False)
+        return result
+    
+    def cache_stats(self) -> Dict:
+        """Hit rate and size of the profile cache"""
+        with self._cache_lock:
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                'hits': self._cache_hits,
+                'misses': self._cache_misses,
+                'hit_rate': round(self._cache_hits / lookups, 3) if lookups else 0.0,
+                'cached_users': len(self._profile_cache)
+            }
     
     def analyze_learning_pattern(self, user_id: int, days_back: int = 7) -> Dict:
-        """Analyze user's learning patterns with real-time updates"""
+        """Analyze user's learning patterns from their incremental learner profile.
+
+        The profile is time-decayed rather than windowed, so days_back is only
+        honoured by analyze_learning_window.
+        """
+        return self._read_through(user_id, ('pattern',), lambda: self._compute_learning_pattern(user_id))
+    
+    def _compute_learning_pattern(self, user_id: int) -> Dict:
         try:
             user = User.query.get(user_id)
             if not user:
                 return self._default_learning_profile()
             
-            # Get recent learning data
-            cutoff_date = datetime.utcnow() - timedelta(days=days_back)
-            recent_progress = GameProgress.query.filter(
-                GameProgress.user_id == user_id,
-                GameProgress.created_at >= cutoff_date
-            ).all()
-            
-            if not recent_progress:
+            profile = self._get_learner_profile(user_id)
+            if not profile or not profile.total_sessions:
                 return self._default_learning_profile()
             
-            # Analyze performance patterns
-            performance_data = self._analyze_performance(recent_progress)
-            learning_style = self._detect_learning_style(recent_progress)
-            engagement_level = self._calculate_engagement(recent_progress)
-            difficulty_preference = self._assess_difficulty_preference(recent_progress)
-            
-            # Real-time adaptation
-            adaptations = self._generate_adaptations(
-                performance_data, learning_style, engagement_level, difficulty_preference
+            stats = profile.snapshot()
+            return self._build_learning_profile(
+                user,
+                self._performance_from_profile(stats),
+                self._style_from_profile(stats),
+                self._engagement_from_profile(stats),
+                self._difficulty_from_profile(stats)
             )
             
-            # Update user profile
-            self._update_user_profile(user, {
-                'learning_style': learning_style,
-                'performance_metrics': performance_data,
-                'engagement_level': engagement_level,
-                'difficulty_preference': difficulty_preference,
-                'adaptations': adaptations
-            })
+        except Exception as e:
+            logger.error(f"Error analyzing learning pattern for user {user_id}: {str(e)}")
+            return self._default_learning_profile()
+    
+    def analyze_learning_window(self, user_id: int, days_back: int = 30) -> Dict:
+        """Exact analysis over a fixed window of game results, for reports"""
+        return self._read_through(user_id, ('window', days_back),
+                                  lambda: self._compute_learning_window(user_id, days_back))
+    
+    def _compute_learning_window(self, user_id: int, days_back: int) -> Dict:
+        try:
+            user = User.query.get(user_id)
+            if not user:
+                return self._default_learning_profile()
             
-            return {
-                'user_id': user_id,
-                'learning_style': learning_style,
-                'performance_metrics': performance_data,
-                'engagement_level': engagement_level,
-                'difficulty_preference': difficulty_preference,
-                'recommended_activities': adaptations['activities'],
-                'suggested_schedule': adaptations['schedule'],
-                'motivation_triggers': adaptations['motivation'],
-                'last_updated': datetime.utcnow().isoformat()
-            }
+            # Aggregate the window in SQL; only a few summary rows come back
+            cutoff_date = datetime.utcnow() - timedelta(days=days_back)
+            performance_data = self._analyze_performance(user_id, cutoff_date)
+            if not performance_data.get('total_sessions'):
+                return self._default_learning_profile()
+            
+            return self._build_learning_profile(
+                user,
+                performance_data,
+                self._detect_learning_style(user_id, cutoff_date),
+                self._calculate_engagement(user_id, cutoff_date),
+                self._assess_difficulty_preference(user_id, cutoff_date)
+            )
             
         except Exception as e:
-            logger.error(f"Error analyzing learning pattern for user {user_id}: {str(e)}")
+            logger.error(f"Error analyzing learning window for user {user_id}: {str(e)}")
             return self._default_learning_profile()
     
-    def _analyze_performance(self, progress_data: List[GameProgress]) -> Dict:
-        """Analyze performance metrics from game progress"""
-        if not progress_data:
-            return {'accuracy': 0.5, 'speed': 1.0, 'consistency': 0.5, 'improvement_rate': 0.0}
+    def _build_learning_profile(self, user: User, performance_data: Dict, learning_style: Dict,
+                                engagement_level: Dict, difficulty_preference: Dict) -> Dict:
+        """Turn analysed metrics into adaptations and the profile payload"""
+        # Real-time adaptation
+        adaptations = self._generate_adaptations(
+            performance_data, learning_style, engagement_level, difficulty_preference
+        )
         
-        accuracies = [p.score / 100.0 for p in progress_data if p.score is not None]
-        times = [p.time_spent for p in progress_data if p.time_spent is not None]
-        
-        accuracy = np.mean(accuracies) if accuracies else 0.5
-        avg_time = np.mean(times) if times else 60.0
-        speed = max(0.1, min(2.0, 60.0 / avg_time))  # Normalize to 0.1-2.0 range
-        
-        # Calculate consistency (inverse of standard deviation)
-        consistency = 1.0 - (np.std(accuracies) if len(accuracies) > 1 else 0.5)
-        
-        # Calculate improvement rate
-        if len(accuracies) >= 3:
-            recent_avg = np.mean(accuracies[-3:])
-            older_avg = np.mean(accuracies[:-3])
-            improvement_rate = (recent_avg - older_avg) / older_avg if older_avg > 0 else 0.0
+        return {
+            'user_id': user.id,
+            'learning_style': learning_style,
+            'performance_metrics': performance_data,
+            'engagement_level': engagement_level,
+            'difficulty_preference': difficulty_preference,
+            'recommended_activities': adaptations['activities'],
+            'suggested_schedule': adaptations['schedule'],
+            'motivation_triggers': adaptations['motivation'],
+            'last_updated': datetime.utcnow().isoformat()
+        }
+    
+    def _get_learner_profile(self, user_id: int) -> Optional[LearnerProfile]:
+        """The learner profile, or None before the first game (bootstrap builds them for older history)"""
+        return LearnerProfile.query.filter_by(user_id=user_id).first()
+    
+    def _insert_learner_profile(self, profile: LearnerProfile) -> LearnerProfile:
+        """Add a new profile inside a savepoint, returning the stored one if another request won the race.
+
+        A duplicate user_id only rolls back the savepoint, so whatever else the
+        caller has pending in the session (the GameProgress row) survives.
+        """
+        try:
+            with db.session.begin_nested():
+                db.session.add(profile)
+        except IntegrityError:
+            return LearnerProfile.query.filter_by(user_id=profile.user_id).populate_existing().one()
+        return profile
+    
+    def _record_game_result(self, user_id: int, game_data: Dict, played_at: datetime):
+        """Fold a new game result into the learner profile; caller commits"""
+        profile = self._get_learner_profile(user_id)
+        if not profile:
+            profile = self._insert_learner_profile(LearnerProfile(user_id))
+        
+        profile.record(
+            game_data.get('score', 0),
+            game_data.get('time_spent', 0),
+            completed=game_data.get('completed', False),
+            difficulty=game_data.get('difficulty', 'intermediate'),
+            style=self.game_styles.get(game_data.get('game_type', 'unknown')),
+            played_at=played_at
+        )
+    
+    def _performance_from_profile(self, stats: Dict) -> Dict:
+        """Performance metrics from decayed profile sums"""
+        accuracy = stats['accuracy']
+        speed = max(0.1, min(2.0, 60.0 / max(stats['avg_time'], 1.0)))
+        consistency = 1.0 - (stats['accuracy_std'] if stats['total_sessions'] > 1 else 0.5)
+        
+        # Short-term average against the longer decayed average
+        if stats['total_sessions'] >= 3 and accuracy > 0:
+            improvement_rate = (stats['recent_accuracy'] - accuracy) / accuracy
         else:
             improvement_rate = 0.0
         
@@ -123,26 +275,119 @@ class AdaptiveLearningService:
             'speed': round(speed, 3),
             'consistency': round(consistency, 3),
             'improvement_rate': round(improvement_rate, 3),
-            'total_sessions': len(progress_data)
+            'total_sessions': stats['total_sessions']
         }
     
-    def _detect_learning_style(self, progress_data: List[GameProgress]) -> Dict:
-        """Detect preferred learning style based on activity performance"""
-        style_scores = defaultdict(float)
+    def _style_from_profile(self, stats: Dict) -> Dict:
+        """Normalized learning style weights from per-style decayed scores"""
+        style_scores = stats['style_scores']
+        total_score = sum(style_scores.values())
+        if total_score <= 0:
+            return {style: 0.25 for style in self.learning_styles.keys()}
+        return {style: score / total_score for style, score in style_scores.items()}
+    
+    def _engagement_from_profile(self, stats: Dict) -> Dict:
+        """Engagement metrics from decayed completion, time and frequency"""
+        sessions_per_week = stats['sessions_per_week']
+        avg_session_time = stats['avg_time'] if stats['weight'] else 0.0
+        completion_rate = stats['completion_rate']
         
-        for progress in progress_data:
-            game_type = progress.game_type
-            score = progress.score / 100.0 if progress.score else 0.5
-            
-            # Map game types to learning styles
-            if game_type in ['color_match', 'pattern_game', 'visual_memory']:
-                style_scores['visual'] += score
-            elif game_type in ['sound_match', 'music_rhythm', 'story_listening']:
-                style_scores['auditory'] += score
-            elif game_type in ['drag_drop', 'gesture_game', 'movement_puzzle']:
-                style_scores['kinesthetic'] += score
-            elif game_type in ['word_puzzle', 'reading_game', 'text_adventure']:
-                style_scores['reading'] += score
+        peak_hours = [
+            int(hour) for hour, bucket in stats['hours'].items()
+            if bucket['count'] >= 2 and bucket['mean'] > 0.7
+        ]
+        
+        engagement_level = (completion_rate * 0.4 +
+                            min(avg_session_time / 300, 1.0) * 0.3 +  # Cap at 5 minutes
+                            (sessions_per_week / 7) * 0.3)  # Weekly frequency
+        
+        return {
+            'level': round(min(engagement_level, 1.0), 3),
+            'avg_session_time': round(avg_session_time, 1),
+            'completion_rate': round(completion_rate, 3),
+            'peak_hours': sorted(peak_hours),
+            'consistency': sessions_per_week / 7  # Sessions per day
+        }
+    
+    def _difficulty_from_profile(self, stats: Dict) -> Dict:
+        """Optimal difficulty from per-level decayed averages"""
+        level_means = {level: bucket['mean'] for level, bucket in stats['difficulty'].items()}
+        
+        optimal_difficulty = 'intermediate'
+        best_score = 0.0
+        for level, bucket in stats['difficulty'].items():
+            if bucket['count'] >= 2 and bucket['mean'] > best_score:
+                best_score = bucket['mean']
+                optimal_difficulty = level
+        
+        return {
+            'current_optimal': optimal_difficulty,
+            'performance_by_level': {level: round(mean, 3) for level, mean in level_means.items()},
+            'recommended_progression': self._suggest_difficulty_progression(level_means)
+        }
+    
+    def _window_filter(self, user_id: int, since: datetime) -> Tuple:
+        """Criteria for one user's results in a window; served by ix_game_progress_user_created"""
+        return (GameProgress.user_id == user_id, GameProgress.created_at >= since)
+    
+    def _analyze_performance(self, user_id: int, since: datetime) -> Dict:
+        """Analyze performance metrics with SQL aggregates over the window"""
+        accuracy_expr = GameProgress.score / 100.0
+        totals = db.session.query(
+            db.func.count(GameProgress.id),
+            db.func.count(GameProgress.score),
+            db.func.avg(accuracy_expr),
+            db.func.avg(accuracy_expr * accuracy_expr),
+            db.func.sum(accuracy_expr),
+            db.func.avg(GameProgress.time_spent)
+        ).filter(*self._window_filter(user_id, since)).one()
+        
+        sessions, scored, mean_accuracy, mean_square, accuracy_sum, avg_time = totals
+        if not sessions:
+            return {'accuracy': 0.5, 'speed': 1.0, 'consistency': 0.5, 'improvement_rate': 0.0}
+        
+        accuracy = mean_accuracy if scored else 0.5
+        avg_time = avg_time or 60.0
+        speed = max(0.1, min(2.0, 60.0 / avg_time))  # Normalize to 0.1-2.0 range
+        
+        # Calculate consistency (inverse of population standard deviation)
+        if scored > 1:
+            consistency = 1.0 - np.sqrt(max(0.0, mean_square - mean_accuracy ** 2))
+        else:
+            consistency = 0.5
+        
+        # Calculate improvement rate: last three results against everything before them
+        improvement_rate = 0.0
+        if scored >= 3:
+            recent = db.session.query(accuracy_expr).filter(
+                *self._window_filter(user_id, since), GameProgress.score.isnot(None)
+            ).order_by(GameProgress.created_at.desc()).limit(3).all()
+            recent_sum = sum(row[0] for row in recent)
+            recent_avg = recent_sum / 3
+            older_avg = (accuracy_sum - recent_sum) / (scored - 3) if scored > 3 else float('nan')
+            if older_avg > 0:
+                improvement_rate = (recent_avg - older_avg) / older_avg
+        
+        return {
+            'accuracy': round(float(accuracy), 3),
+            'speed': round(float(speed), 3),
+            'consistency': round(float(consistency), 3),
+            'improvement_rate': round(float(improvement_rate), 3),
+            'total_sessions': sessions
+        }
+    
+    def _detect_learning_style(self, user_id: int, since: datetime) -> Dict:
+        """Detect preferred learning style from per-game-type score sums"""
+        score_expr = db.case((GameProgress.score > 0, GameProgress.score / 100.0), else_=0.5)
+        rows = db.session.query(
+            GameProgress.game_type, db.func.sum(score_expr)
+        ).filter(*self._window_filter(user_id, since)).group_by(GameProgress.game_type).all()
+        
+        style_scores = defaultdict(float)
+        for game_type, score_sum in rows:
+            style = self.game_styles.get(game_type)
+            if style:
+                style_scores[style] += score_sum or 0.0
         
         # Normalize scores
         total_score = sum(style_scores.values())
@@ -155,72 +400,71 @@ class AdaptiveLearningService:
         
         return dict(style_scores)
     
-    def _calculate_engagement(self, progress_data: List[GameProgress]) -> Dict:
-        """Calculate engagement metrics"""
-        if not progress_data:
+    def _calculate_engagement(self, user_id: int, since: datetime, days: int = 7) -> Dict:
+        """Calculate engagement metrics with an hour-of-day grouped aggregate"""
+        completed_expr = db.case((GameProgress.completed.is_(True), 1.0), else_=0.0)
+        engagement_expr = (db.func.coalesce(GameProgress.score, 0) / 100.0 *
+                           db.case((GameProgress.completed.is_(True), 1.0), else_=0.5))
+        hour_expr = db.func.extract('hour', GameProgress.created_at)
+        
+        hours = db.session.query(
+            hour_expr,
+            db.func.count(GameProgress.id),
+            db.func.sum(db.func.coalesce(GameProgress.time_spent, 0)),
+            db.func.sum(completed_expr),
+            db.func.avg(engagement_expr)
+        ).filter(*self._window_filter(user_id, since)).group_by(hour_expr).all()
+        
+        sessions = sum(row[1] for row in hours)
+        if not sessions:
             return {'level': 0.5, 'patterns': {}, 'peak_times': []}
         
-        total_time = sum(p.time_spent for p in progress_data if p.time_spent)
-        avg_session_time = total_time / len(progress_data) if progress_data else 0
+        total_time = sum(row[2] or 0 for row in hours)
+        avg_session_time = total_time / sessions
+        avg_completion = sum(row[3] or 0 for row in hours) / sessions
         
-        completion_rates = [1.0 if p.completed else 0.0 for p in progress_data]
-        avg_completion = np.mean(completion_rates)
-        
-        # Analyze time patterns
-        hour_engagement = defaultdict(list)
-        for progress in progress_data:
-            hour = progress.created_at.hour
-            engagement_score = (progress.score / 100.0) * (1.0 if progress.completed else 0.5)
-            hour_engagement[hour].append(engagement_score)
-        
-        peak_hours = []
-        for hour, scores in hour_engagement.items():
-            if len(scores) >= 2 and np.mean(scores) > 0.7:
-                peak_hours.append(hour)
+        peak_hours = [int(hour) for hour, count, _, _, mean_engagement in hours
+                      if count >= 2 and mean_engagement > 0.7]
         
         # Overall engagement level
         engagement_level = (avg_completion * 0.4 + 
                           min(avg_session_time / 300, 1.0) * 0.3 +  # Cap at 5 minutes
-                          (len(progress_data) / 7) * 0.3)  # Weekly frequency
+                          (sessions / days) * 0.3)  # Weekly frequency
         
         return {
             'level': round(min(engagement_level, 1.0), 3),
             'avg_session_time': round(avg_session_time, 1),
             'completion_rate': round(avg_completion, 3),
             'peak_hours': sorted(peak_hours),
-            'consistency': len(progress_data) / 7  # Sessions per day
+            'consistency': sessions / days  # Sessions per day
         }
     
-    def _assess_difficulty_preference(self, progress_data: List[GameProgress]) -> Dict:
-        """Assess optimal difficulty level for user"""
-        difficulty_performance = defaultdict(list)
-        
-        for progress in progress_data:
-            difficulty = progress.difficulty or 'intermediate'
-            score = progress.score / 100.0 if progress.score else 0.5
-            difficulty_performance[difficulty].append(score)
+    def _assess_difficulty_preference(self, user_id: int, since: datetime) -> Dict:
+        """Assess optimal difficulty level from per-level average scores"""
+        difficulty_expr = db.func.coalesce(GameProgress.difficulty, 'intermediate')
+        score_expr = db.case((GameProgress.score > 0, GameProgress.score / 100.0), else_=0.5)
+        rows = db.session.query(
+            difficulty_expr, db.func.count(GameProgress.id), db.func.avg(score_expr)
+        ).filter(*self._window_filter(user_id, since)).group_by(difficulty_expr).all()
         
         optimal_difficulty = 'intermediate'
         best_score = 0.0
         
-        for difficulty, scores in difficulty_performance.items():
-            if len(scores) >= 2:
-                avg_score = np.mean(scores)
-                if avg_score > best_score:
-                    best_score = avg_score
-                    optimal_difficulty = difficulty
+        for difficulty, count, avg_score in rows:
+            if count >= 2 and avg_score > best_score:
+                best_score = avg_score
+                optimal_difficulty = difficulty
+        
+        level_means = {difficulty: float(avg_score or 0.0) for difficulty, _, avg_score in rows}
         
         return {
             'current_optimal': optimal_difficulty,
-            'performance_by_level': {
-                level: round(np.mean(scores), 3) if scores else 0.0
-                for level, scores in difficulty_performance.items()
-            },
-            'recommended_progression': self._suggest_difficulty_progression(difficulty_performance)
+            'performance_by_level': {level: round(mean, 3) for level, mean in level_means.items()},
+            'recommended_progression': self._suggest_difficulty_progression(level_means)
         }
     
     def _suggest_difficulty_progression(self, difficulty_data: Dict) -> List[str]:
-        """Suggest difficulty progression path"""
+        """Suggest difficulty progression path from average score per level"""
         current_levels = list(difficulty_data.keys())
         
         if not current_levels:
@@ -230,14 +474,14 @@ class AdaptiveLearningService:
         progression = []
         
         if 'beginner' in current_levels:
-            beginner_avg = np.mean(difficulty_data['beginner'])
+            beginner_avg = difficulty_data['beginner']
             if beginner_avg >= 0.8:
                 progression.append('intermediate')
             else:
                 progression.append('beginner')
         
         if 'intermediate' in current_levels:
-            intermediate_avg = np.mean(difficulty_data['intermediate'])
+            intermediate_avg = difficulty_data['intermediate']
             if intermediate_avg >= 0.8:
                 progression.append('advanced')
             elif intermediate_avg >= 0.6:
@@ -291,23 +535,6 @@ class AdaptiveLearningService:
             'difficulty_adjustment': difficulty['current_optimal']
         }
     
-    def _update_user_profile(self, user: User, learning_data: Dict):
-        """Update user's learning profile in database"""
-        try:
-            # Store learning profile as JSON
-            user.learning_profile = json.dumps({
-                'learning_style': learning_data['learning_style'],
-                'performance_metrics': learning_data['performance_metrics'],
-                'engagement_level': learning_data['engagement_level'],
-                'difficulty_preference': learning_data['difficulty_preference'],
-                'last_analysis': datetime.utcnow().isoformat()
-            })
-            
-            db.session.commit()
-        except Exception as e:
-            logger.error(f"Error updating user profile: {str(e)}")
-            db.session.rollback()
-    
     def _default_learning_profile(self) -> Dict:
         """Return default learning profile for new users"""
         return {
@@ -376,6 +603,9 @@ class AdaptiveLearningService:
                 hints_used=game_data.get('hints_used', 0)
             )
             
+            # Fold into the learner profile before the new row can be autoflushed
+            # into a first-time history backfill
+            self._record_game_result(user_id, game_data, datetime.utcnow())
             db.session.add(progress)
             db.session.commit()
             
@@ -459,7 +689,10 @@ class AdaptiveLearningService:
     
     def get_learning_insights(self, user_id: int) -> Dict:
         """Get comprehensive learning insights for teachers/parents"""
-        learning_profile = self.analyze_learning_pattern(user_id, days_back=30)
+        return self._read_through(user_id, ('insights',), lambda: self._compute_learning_insights(user_id))
+    
+    def _compute_learning_insights(self, user_id: int) -> Dict:
+        learning_profile = self.analyze_learning_window(user_id, days_back=30)
         
         # Get recent progress
         recent_progress = GameProgress.query.filter(
@@ -478,6 +711,184 @@ class AdaptiveLearningService:
             'recommendations': self._generate_teacher_recommendations(learning_profile)
         }
     
+    def analyze_cohort(self, user_ids: Optional[List[int]] = None, days_back: int = 30) -> Dict:
+        """Compare learning patterns across many learners in one pass.
+
+        Loads the window's results as columns ordered by user and time, then
+        computes every per-user metric with grouped NumPy reductions instead
+        of running the single-user analysis once per learner.
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=days_back)
+        columns = self._load_cohort_columns(cutoff_date, user_ids)
+        if columns is None:
+            return {'users': [], 'summary': {'learners': 0}}
+        
+        metrics = self._cohort_metrics(*columns)
+        return self._summarize_cohort(metrics)
+    
+    def _load_cohort_columns(self, cutoff_date: datetime, user_ids: Optional[List[int]] = None) -> Optional[Tuple]:
+        """User, game type, score and difficulty columns for the window, sorted by user then time.
+
+        Reads plain Core rows in partitions straight into NumPy blocks.  Rows
+        come back in time order, which the covering created_at index yields
+        without a sort; a stable argsort on user then groups them.  Explicit
+        ids are queried in chunks so no IN list nears SQLite's bound
+        parameter limit.
+        """
+        table = GameProgress.__table__
+        base = select(
+            table.c.user_id, table.c.game_type, table.c.score,
+            func.coalesce(table.c.difficulty, 'intermediate')
+        ).where(table.c.created_at >= cutoff_date, table.c.score.is_not(None)) \
+            .order_by(table.c.created_at)
+        
+        if user_ids is None:
+            statements = [base]
+        else:
+            ids = sorted(set(user_ids))
+            statements = [base.where(table.c.user_id.in_(ids[i:i + self.cohort_chunk_size]))
+                          for i in range(0, len(ids), self.cohort_chunk_size)]
+        
+        blocks = ([], [], [], [])
+        connection = db.session.connection()
+        for statement in statements:
+            for rows in connection.execute(statement).partitions(self.cohort_partition_rows):
+                users, game_types, scores, difficulties = zip(*rows)
+                blocks[0].append(np.fromiter(users, dtype=np.int64, count=len(users)))
+                blocks[1].append(np.array(game_types, dtype=object))
+                blocks[2].append(np.fromiter(scores, dtype=np.float64, count=len(scores)))
+                blocks[3].append(np.array(difficulties, dtype=object))
+        if not blocks[0]:
+            return None
+        columns = [np.concatenate(column) for column in blocks]
+        # Stable, so each user's rows keep their time order
+        order = np.argsort(columns[0], kind='stable')
+        return tuple(column[order] for column in columns)
+    
+    def _cohort_metrics(self, users: np.ndarray, game_types: np.ndarray, scores: np.ndarray,
+                        difficulties: np.ndarray) -> Dict:
+        """Per-user metrics from columns sorted by user, then time"""
+        # Rows arrive grouped by user, so group boundaries are where the id changes
+        starts = np.concatenate(([0], np.flatnonzero(users[1:] != users[:-1]) + 1))
+        counts = np.diff(np.append(starts, len(users)))
+        user_keys = users[starts]
+        n_users = len(user_keys)
+        group = np.repeat(np.arange(n_users), counts)
+        
+        # Accuracy and consistency from grouped first and second moments
+        accuracy = scores / 100.0
+        acc_sum = np.bincount(group, weights=accuracy, minlength=n_users)
+        acc_sq_sum = np.bincount(group, weights=accuracy ** 2, minlength=n_users)
+        mean_accuracy = acc_sum / counts
+        std = np.sqrt(np.maximum(acc_sq_sum / counts - mean_accuracy ** 2, 0.0))
+        consistency = np.where(counts > 1, 1.0 - std, 0.5)
+        
+        # Least-squares slope of score against play order within each user,
+        # the closed form of np.polyfit(arange(n), scores, 1)[0]
+        x = np.arange(len(scores)) - starts[group]
+        sum_y = np.bincount(group, weights=scores, minlength=n_users)
+        sum_xy = np.bincount(group, weights=x * scores, minlength=n_users)
+        sum_x = counts * (counts - 1) / 2.0
+        sum_xx = (counts - 1) * counts * (2 * counts - 1) / 6.0
+        denominator = counts * sum_xx - sum_x ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(denominator > 0, (counts * sum_xy - sum_x * sum_y) / denominator, 0.0)
+        trend = np.select(
+            [counts < 3, slope > 2, slope > 0.5, slope > -0.5, slope > -2],
+            ['insufficient_data', 'improving_fast', 'improving', 'stable', 'declining'],
+            default='declining_fast'
+        )
+        
+        # Style scores: user x style table of score sums
+        style_names = list(self.learning_styles.keys())
+        type_keys, type_codes = self._factorize(game_types)
+        style_lookup = np.array([
+            style_names.index(self.game_styles[t]) if t in self.game_styles else -1 for t in type_keys
+        ])
+        style_codes = style_lookup[type_codes]
+        mapped = style_codes >= 0
+        style_value = np.where(scores > 0, accuracy, 0.5)
+        style_table = np.bincount(
+            group[mapped] * len(style_names) + style_codes[mapped],
+            weights=style_value[mapped], minlength=n_users * len(style_names)
+        ).reshape(n_users, len(style_names))
+        style_totals = style_table.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            style_share = np.where(style_totals > 0, style_table / style_totals, 1.0 / len(style_names))
+        
+        # Optimal difficulty: best average among levels played at least twice
+        level_keys, level_codes = self._factorize(difficulties)
+        cells = group * len(level_keys) + level_codes
+        level_counts = np.bincount(cells, minlength=n_users * len(level_keys)).reshape(n_users, -1)
+        level_sums = np.bincount(cells, weights=style_value,
+                                 minlength=n_users * len(level_keys)).reshape(n_users, -1)
+        level_avg = np.where(level_counts >= 2, level_sums / np.maximum(level_counts, 1), -1.0)
+        best_level = level_avg.argmax(axis=1)
+        optimal = np.where(level_avg.max(axis=1) > 0, level_keys[best_level], 'intermediate')
+        
+        return {
+            'user_ids': user_keys,
+            'sessions': counts,
+            'accuracy': mean_accuracy,
+            'consistency': consistency,
+            'slope': slope,
+            'trend': trend,
+            'style_names': style_names,
+            'style_scores': style_share,
+            'optimal_difficulty': optimal
+        }
+    
+    @staticmethod
+    def _factorize(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Integer codes for a low-cardinality string column, avoiding an object sort"""
+        index = {}
+        codes = np.fromiter((index.setdefault(value, len(index)) for value in values),
+                            dtype=np.int64, count=len(values))
+        return np.array(list(index), dtype=object), codes
+    
+    def _summarize_cohort(self, metrics: Dict) -> Dict:
+        """Cohort-wide distributions plus one row per learner"""
+        style_names = metrics['style_names']
+        preferred = metrics['style_scores'].argmax(axis=1)
+        style_counts = np.bincount(preferred, minlength=len(style_names))
+        difficulty_keys, difficulty_counts = np.unique(metrics['optimal_difficulty'], return_counts=True)
+        trend_keys, trend_counts = np.unique(metrics['trend'], return_counts=True)
+        
+        users = [
+            {
+                'user_id': int(user_id),
+                'sessions': int(sessions),
+                'accuracy': round(float(accuracy), 3),
+                'consistency': round(float(consistency), 3),
+                'slope': round(float(slope), 2),
+                'trend': str(trend),
+                'preferred_style': style_names[style],
+                'optimal_difficulty': str(difficulty)
+            }
+            for user_id, sessions, accuracy, consistency, slope, trend, style, difficulty in zip(
+                metrics['user_ids'], metrics['sessions'], metrics['accuracy'], metrics['consistency'],
+                metrics['slope'], metrics['trend'], preferred, metrics['optimal_difficulty']
+            )
+        ]
+        
+        return {
+            'users': users,
+            'summary': {
+                'learners': len(users),
+                'average_accuracy': round(float(metrics['accuracy'].mean()), 3),
+                'average_consistency': round(float(metrics['consistency'].mean()), 3),
+                'style_distribution': {name: int(count) for name, count in zip(style_names, style_counts)},
+                'style_weights': {
+                    name: round(float(weight), 3)
+                    for name, weight in zip(style_names, metrics['style_scores'].mean(axis=0))
+                },
+                'difficulty_distribution': {
+                    str(key): int(count) for key, count in zip(difficulty_keys, difficulty_counts)
+                },
+                'trend_distribution': {str(key): int(count) for key, count in zip(trend_keys, trend_counts)}
+            }
+        }
+    
     def _calculate_learning_trends(self, progress_data: List[GameProgress]) -> Dict:
         """Calculate learning trends over time"""
         if len(progress_data) < 3:
@@ -1,19 +1,60 @@
+import os
 import json
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict, Counter
 import logging
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines run a single process
+    fcntl = None
+
+from app.services.event_store import DEFAULT_ENGAGEMENT, ColumnarEventStore, empty_stats, merge_stats
+from app.services.forecast_engine import ForecastEngine
+from app.services.quantile_sketch import QuantileSketch
 
 logger = logging.getLogger(__name__)
 
+PEER_METRICS = ('accuracy', 'learning_time', 'engagement')
+PEER_TOTALS = ('n', 'accuracy', 'duration', 'engagement')  # the sums a learner's peer averages come from
+AGE_GROUPS = ((4, 6), (7, 9), (10, 12), (13, 15))  # same bands as Lesson.age_group
+
 class AnalyticsService:
     """
     Advanced learning analytics service that tracks, analyzes, and provides insights
     on user learning patterns, progress, and educational outcomes.
     """
     
-    def __init__(self):
+    def __init__(self, event_dir: Optional[str] = None):
+        # Learning events live in the on-disk columnar store; user_analytics
+        # only keeps the small per-user structures
+        self.event_store = ColumnarEventStore(
+            event_dir or os.environ.get('ANALYTICS_EVENT_DIR', 'data/analytics/events')
+        )
+        # Trend coefficients refitted nightly by forecasts.run_nightly()
+        self.forecasts = ForecastEngine(self.event_store)
+        # Distributions of per-learner averages by age group.  The nightly
+        # rebuild covers every learner's window up to midnight; each worker
+        # adds what it has ingested since through its own snapshot, and
+        # readers merge the snapshots of all workers into the rebuild
+        self.peer_window_days = 30
+        self.peer_refresh_seconds = 60
+        self._peer_dir = os.path.join(self.event_store.root, 'sketches')
+        self._peer_base_path = os.path.join(self._peer_dir, 'peers.json')
+        self._peer_base = {'through': None, 'learners': {}, 'sketches': {}}
+        self._peer_base_mtime = None
+        self._peer_partials = {}  # day -> user_id -> totals ingested by this worker
+        self._peer_groups = {}  # user_id -> age group of learners in the partials
+        self._peer_snapshots = {}  # snapshot path of another worker -> (mtime, days, groups)
+        self._peer_sketches = {}  # age group -> metric -> merged sketch
+        self._peer_checked = None
+        self._peer_save_timer = None
+        self._sketch_lock = threading.Lock()
+        self._peer_refresh_lock = threading.Lock()
         self.user_analytics = {}
         self.global_analytics = {
             'total_users': 0,
@@ -26,62 +67,33 @@ class AnalyticsService:
     def track_learning_event(self, user_id: int, event_type: str, event_data: Dict) -> None:
         """Track individual learning events for analytics"""
         try:
-            if user_id not in self.user_analytics:
-                self.user_analytics[user_id] = {
-                    'sessions': [],
-                    'learning_events': [],
-                    'achievements': [],
-                    'skill_progress': defaultdict(list),
-                    'engagement_timeline': [],
-                    'emotional_journey': []
-                }
-            
-            event = {
-                'timestamp': datetime.now(),
-                'type': event_type,
-                'data': event_data,
-                'session_id': event_data.get('session_id'),
-                'subject': event_data.get('subject'),
-                'difficulty': event_data.get('difficulty', 0.5)
-            }
-            
-            self.user_analytics[user_id]['learning_events'].append(event)
-            self._update_skill_progress(user_id, event)
-            self._update_engagement_metrics(user_id, event)
-            
+            timestamp = datetime.now()
+            # Rollups and forecasts are derived from the stored event
+            self.event_store.append(user_id, event_type, event_data, timestamp)
+            self._update_peer_partials(user_id, event_data, timestamp)
         except Exception as e:
             logger.error(f"Error tracking learning event: {e}")
     
     def generate_progress_report(self, user_id: int, period_days: int = 30) -> Dict[str, Any]:
         """Generate comprehensive progress report for a user"""
         try:
-            if user_id not in self.user_analytics:
-                return {'error': 'No analytics data available for this user'}
-            
-            analytics = self.user_analytics[user_id]
             end_date = datetime.now()
             start_date = end_date - timedelta(days=period_days)
             
-            # Filter events within the period
-            period_events = [
-                event for event in analytics['learning_events']
-                if start_date <= event['timestamp'] <= end_date
-            ]
+            # Merge the period's hourly/daily rollups instead of replaying raw events;
+            # only the order-dependent metrics read a few raw columns
+            rollup = self.event_store.rollup(user_id, start_date, end_date)
+            if not rollup['total']['n'] and not self.event_store.has_events(user_id):
+                return {'error': 'No analytics data available for this user'}
             
             report = {
                 'period': f"{period_days} days",
                 'start_date': start_date.strftime('%Y-%m-%d'),
-                'end_date': end_date.strftime('%Y-%m-%d'),
-                'summary': self._generate_summary_stats(period_events),
-                'skill_progression': self._analyze_skill_progression(user_id, period_events),
-                'engagement_analysis': self._analyze_engagement_patterns(period_events),
-                'learning_velocity': self._calculate_learning_velocity(period_events),
-                'subject_mastery': self._assess_subject_mastery(period_events),
-                'achievement_progress': self._track_achievement_progress(user_id, period_events),
-                'recommendations': self._generate_improvement_recommendations(period_events),
-                'celebration_moments': self._identify_celebration_moments(period_events),
-                'challenge_areas': self._identify_challenge_areas(period_events)
+                'end_date': end_date.strftime('%Y-%m-%d')
             }
+            series = self._load_series(user_id, start_date, end_date) if rollup['total']['n'] else \
+                {'timestamp': [], 'accuracy': [], 'engagement': [], 'duration': []}
+            report.update(self._report_sections(user_id, rollup, series))
             
             return report
             
@@ -89,24 +101,19 @@ class AnalyticsService:
             logger.error(f"Error generating progress report: {e}")
             return {'error': 'Failed to generate progress report'}
     
-    def analyze_learning_patterns(self, user_id: int) -> Dict[str, Any]:
-        """Analyze detailed learning patterns and behaviors"""
+    def analyze_learning_patterns(self, user_id: int, days_back: int = 30) -> Dict[str, Any]:
+        """Analyze learning patterns and behaviors over the last days_back days"""
         try:
-            if user_id not in self.user_analytics:
+            end = datetime.now()
+            rollup = self.event_store.rollup(user_id, end - timedelta(days=days_back), end)
+            if not rollup['total']['n']:
                 return {}
             
-            analytics = self.user_analytics[user_id]
-            events = analytics['learning_events']
-            
+            # Served from the window's rollups: hours of day, subjects and difficulty
             patterns = {
-                'optimal_learning_times': self._find_optimal_learning_times(events),
-                'session_length_preferences': self._analyze_session_lengths(events),
-                'subject_preferences': self._analyze_subject_preferences(events),
-                'difficulty_comfort_zone': self._find_difficulty_comfort_zone(events),
-                'learning_style_indicators': self._detect_learning_style_patterns(events),
-                'motivation_patterns': self._analyze_motivation_patterns(events),
-                'attention_span_trends': self._track_attention_span_trends(events),
-                'error_recovery_patterns': self._analyze_error_recovery(events)
+                'optimal_learning_times': self._find_optimal_learning_times(rollup['hours']),
+                'subject_preferences': self._analyze_subject_preferences(rollup),
+                'difficulty_comfort_zone': self._find_difficulty_comfort_zone(rollup)
             }
             
             return patterns
@@ -138,7 +145,7 @@ class AnalyticsService:
         """Compare user performance with anonymized peer data"""
         try:
             user_metrics = self._get_user_metrics(user_id)
-            peer_metrics = self._get_peer_metrics(age_group)
+            peer_metrics = self._get_peer_metrics(age_group or self._user_age_group(user_id))
             
             if not user_metrics or not peer_metrics:
                 return {'error': 'Insufficient data for comparison'}
@@ -161,20 +168,18 @@ class AnalyticsService:
     def predict_learning_outcomes(self, user_id: int, time_horizon: int = 30) -> Dict[str, Any]:
         """Predict learning outcomes based on current patterns"""
         try:
-            if user_id not in self.user_analytics:
+            forecast = self.forecasts.predict(user_id, time_horizon)
+            if not forecast:
                 return {}
             
-            analytics = self.user_analytics[user_id]
-            historical_data = self._prepare_historical_data(analytics)
-            
             predictions = {
-                'skill_progression_forecast': self._predict_skill_progression(historical_data, time_horizon),
-                'engagement_forecast': self._predict_engagement_trends(historical_data, time_horizon),
-                'achievement_timeline': self._predict_achievement_timeline(user_id, time_horizon),
-                'learning_goals_feasibility': self._assess_goal_feasibility(user_id, time_horizon),
-                'potential_challenges': self._predict_potential_challenges(historical_data),
-                'success_probability': self._calculate_success_probability(historical_data),
-                'recommended_interventions': self._recommend_interventions(historical_data)
+                'skill_progression_forecast': self._predict_skill_progression(forecast, time_horizon),
+                'engagement_forecast': self._predict_engagement_trends(forecast, time_horizon),
+                'achievement_timeline': self._predict_achievement_timeline(forecast, time_horizon),
+                'learning_goals_feasibility': self._assess_goal_feasibility(forecast, time_horizon),
+                'potential_challenges': self._predict_potential_challenges(forecast),
+                'success_probability': self._calculate_success_probability(forecast),
+                'recommended_interventions': self._recommend_interventions(forecast)
             }
             
             return predictions
@@ -183,6 +188,611 @@ class AnalyticsService:
             logger.error(f"Error predicting learning outcomes: {e}")
             return {}
     
+    @staticmethod
+    def _trend_label(slope_per_day: float) -> str:
+        if slope_per_day > 0.002:
+            return 'improving'
+        if slope_per_day < -0.002:
+            return 'declining'
+        return 'stable'
+    
+    def _predict_skill_progression(self, forecast: Dict, time_horizon: int) -> Dict[str, Any]:
+        accuracy = forecast['accuracy']
+        return {
+            'current_accuracy': accuracy['current'],
+            'predicted_accuracy': accuracy['predicted'],
+            'confidence_range': [accuracy['low'], accuracy['high']],
+            'trend': self._trend_label(accuracy['slope_per_day']),
+            'horizon_days': time_horizon
+        }
+    
+    def _predict_engagement_trends(self, forecast: Dict, time_horizon: int) -> Dict[str, Any]:
+        engagement, minutes = forecast['engagement'], forecast['minutes']
+        return {
+            'current_engagement': engagement['current'],
+            'predicted_engagement': engagement['predicted'],
+            'trend': self._trend_label(engagement['slope_per_day']),
+            'predicted_daily_minutes': minutes['predicted']
+        }
+    
+    def _predict_achievement_timeline(self, forecast: Dict, time_horizon: int) -> List[Dict]:
+        """Days until the question-count achievements at the current daily pace"""
+        timeline = []
+        for name, rate, target in (('Question Master', forecast['questions_per_day'], 100),
+                                   ('Accuracy Expert', forecast['correct_per_day'], 50)):
+            if rate > 0:
+                days = int(np.ceil(target / rate))
+                timeline.append({'achievement': name, 'estimated_days': days, 'within_horizon': days <= time_horizon})
+        return timeline
+    
+    def _assess_goal_feasibility(self, forecast: Dict, time_horizon: int, target_accuracy: float = 0.8) -> Dict[str, Any]:
+        accuracy = forecast['accuracy']
+        if accuracy['current'] >= target_accuracy:
+            days_needed = 0
+        elif accuracy['slope_per_day'] > 0:
+            days_needed = int(np.ceil((target_accuracy - accuracy['current']) / accuracy['slope_per_day']))
+        else:
+            days_needed = None
+        return {
+            'goal': f"Reach {int(target_accuracy * 100)}% accuracy",
+            'estimated_days': days_needed,
+            'feasible': days_needed is not None and days_needed <= time_horizon
+        }
+    
+    def _predict_potential_challenges(self, forecast: Dict) -> List[str]:
+        challenges = []
+        if forecast['accuracy']['slope_per_day'] < -0.002:
+            challenges.append('Accuracy is trending down')
+        if forecast['engagement']['predicted'] < 0.4:
+            challenges.append('Engagement may drop too low')
+        if forecast['days_since_active'] >= 7:
+            challenges.append('Has not practised for over a week')
+        return challenges
+    
+    def _calculate_success_probability(self, forecast: Dict) -> float:
+        """Share of the accuracy forecast band above 60%"""
+        accuracy = forecast['accuracy']
+        if accuracy['high'] <= accuracy['low']:
+            return 1.0 if accuracy['predicted'] >= 0.6 else 0.0
+        share = (accuracy['high'] - max(accuracy['low'], 0.6)) / (accuracy['high'] - accuracy['low'])
+        return float(np.clip(share, 0.0, 1.0))
+    
+    def _recommend_interventions(self, forecast: Dict) -> List[str]:
+        interventions = []
+        if forecast['accuracy']['predicted'] < 0.6:
+            interventions.append('Review fundamentals with easier activities')
+        if forecast['engagement']['slope_per_day'] < -0.002:
+            interventions.append('Introduce new game types to rebuild interest')
+        if forecast['days_since_active'] >= 3:
+            interventions.append('Send a friendly reminder to come back and learn')
+        return interventions
+    
+    @staticmethod
+    def _age_group_for_age(age: Optional[int]) -> Optional[str]:
+        if age is None:
+            return None
+        for low, high in AGE_GROUPS:
+            if age <= high:
+                return f"{low}-{high}"
+        return f"{AGE_GROUPS[-1][0]}-{AGE_GROUPS[-1][1]}"
+    
+    def _user_age_group(self, user_id: int) -> Optional[str]:
+        """Age group of one user, for a comparison request"""
+        return self._lookup_age_groups([user_id]).get(user_id)
+    
+    def _lookup_age_groups(self, user_ids: List[int], chunk_size: int = 500) -> Dict[int, str]:
+        """Age groups of many users in a few IN queries; empty when the database is unavailable"""
+        try:
+            from sqlalchemy import select
+            from app import db
+            from app.models.user import User
+            users = User.__table__
+            groups = {}
+            for i in range(0, len(user_ids), chunk_size):
+                rows = db.session.execute(
+                    select(users.c.id, users.c.age).where(users.c.id.in_(user_ids[i:i + chunk_size]))
+                )
+                for user_id, age in rows:
+                    group = self._age_group_for_age(age)
+                    if group:
+                        groups[user_id] = group
+            return groups
+        except Exception as e:
+            logger.debug(f"Could not look up ages for {len(user_ids)} users: {e}")
+            return {}
+    
+    @staticmethod
+    def _average_metrics(stats: Dict) -> Dict[str, float]:
+        """Per-event averages of merged statistics, in the units of the peer sketches"""
+        return {
+            'accuracy': stats['accuracy'] / stats['n'],
+            'learning_time': stats['duration'] / stats['n'],
+            'engagement': stats['engagement'] / stats['n']
+        }
+    
+    @staticmethod
+    def _sketch_learner(sketches: Dict, group: Optional[str], totals: Dict, count: int = 1) -> None:
+        """Add one learner's averages to the 'all' sketches and those of their age group; count=-1 takes them out"""
+        values = AnalyticsService._average_metrics(totals)
+        for name in {'all', group} - {None}:
+            group_sketches = sketches.setdefault(name, {metric: QuantileSketch() for metric in PEER_METRICS})
+            for metric in PEER_METRICS:
+                group_sketches[metric].add(values[metric], count)
+    
+    def rebuild_peer_sketches(self, as_of: Optional[datetime] = None,
+                              age_groups: Optional[Dict[int, str]] = None) -> int:
+        """Sketch every active learner's averages by age group up to the start of as_of's day.
+
+        Each learner contributes one value per metric, their average over the
+        peer_window_days before that day taken from the daily rollups, so a
+        comparison ranks a learner among learners rather than among events.
+        Events from that day on reach the sketches through the workers'
+        snapshots.  Returns the number of learners sketched.
+        """
+        through = (as_of or datetime.now()).date()
+        first = through - timedelta(days=self.peer_window_days)
+        daily = self.event_store.daily_rollups(datetime.combine(first, datetime.min.time()),
+                                               datetime.combine(through - timedelta(days=1), datetime.min.time()))
+        learners = {}
+        for user_id, days in daily.items():
+            total = empty_stats()
+            for stats in days.values():
+                merge_stats(total, stats)
+            learners[user_id] = {key: total[key] for key in PEER_TOTALS}
+        if age_groups is None:
+            age_groups = self._lookup_age_groups(sorted(learners))
+        
+        os.makedirs(self._peer_dir, exist_ok=True)
+        with open(self._peer_base_path + '.tmp', 'w') as f:
+            json.dump({
+                'through': through.isoformat(),
+                'learners': {user_id: [age_groups.get(user_id), totals] for user_id, totals in learners.items()}
+            }, f)
+        os.replace(self._peer_base_path + '.tmp', self._peer_base_path)
+        
+        # Snapshots untouched since that midnight only hold days the rebuild now covers
+        cutoff = datetime.combine(through, datetime.min.time()).timestamp()
+        workers = os.path.join(self._peer_dir, 'workers')
+        for name in os.listdir(workers) if os.path.isdir(workers) else []:
+            path = os.path.join(workers, name)
+            try:
+                if name.endswith('.json') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._sketch_lock:
+            self._peer_checked = None
+        logger.info(f"Rebuilt peer sketches for {len(learners)} learners")
+        return len(learners)
+    
+    def run_nightly(self, as_of: Optional[datetime] = None) -> Optional[Dict[str, int]]:
+        """Batch jobs over the day's rollups: forecast coefficients and peer sketches.
+
+        Holds a lock file beside the events while it runs, so a run that
+        overlaps another one is skipped and returns None.
+        """
+        with open(os.path.join(self.event_store.root, 'nightly.lock'), 'w') as lock:
+            if fcntl:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    logger.info("Nightly analytics jobs are already running; skipped")
+                    return None
+            return {'forecasts': self.forecasts.run_nightly(as_of), 'peers': self.rebuild_peer_sketches(as_of)}
+    
+    def _first_partial_day(self) -> date:
+        """Oldest day of ingested totals that still counts; the rebuild covers the days before its own"""
+        oldest = date.today() - timedelta(days=self.peer_window_days - 1)
+        through = self._peer_base['through']
+        return max(oldest, through) if through else oldest
+    
+    def _update_peer_partials(self, user_id: int, event_data: Dict, timestamp: datetime) -> None:
+        """Fold one event into this worker's totals for its day; the snapshot is saved within peer_refresh_seconds"""
+        accuracy = event_data.get('accuracy')
+        engagement = event_data.get('engagement_score')
+        # Same defaults the rollups use for unreported values
+        values = {
+            'n': 1,
+            'accuracy': 0.0 if accuracy is None or accuracy != accuracy else accuracy,
+            'duration': event_data.get('duration', 0) or 0,
+            'engagement': DEFAULT_ENGAGEMENT if engagement is None else engagement
+        }
+        with self._sketch_lock:
+            day = self._peer_partials.setdefault(timestamp.date(), {})
+            totals = day.setdefault(user_id, dict.fromkeys(PEER_TOTALS, 0))
+            for key in PEER_TOTALS:
+                totals[key] += values[key]
+            if event_data.get('age_group'):
+                self._peer_groups[user_id] = event_data['age_group']
+            if self._peer_save_timer is None:
+                self._peer_save_timer = threading.Timer(self.peer_refresh_seconds, self._save_on_timer)
+                self._peer_save_timer.daemon = True
+                self._peer_save_timer.start()
+    
+    def _prune_peer_partials(self) -> None:
+        """Drop totals the rebuild has absorbed or the window has left; called under the sketch lock"""
+        first_day = self._first_partial_day()
+        for day in [day for day in self._peer_partials if day < first_day]:
+            del self._peer_partials[day]
+        active = {user_id for users in self._peer_partials.values() for user_id in users}
+        self._peer_groups = {user_id: group for user_id, group in self._peer_groups.items() if user_id in active}
+    
+    def _save_on_timer(self):
+        try:
+            self.save_peer_snapshot()
+        except Exception as e:
+            logger.error(f"Error saving peer snapshot: {e}")
+    
+    def save_peer_snapshot(self) -> None:
+        """Write this worker's totals since the last rebuild for the other workers to merge"""
+        with self._sketch_lock:
+            if self._peer_save_timer is not None:
+                self._peer_save_timer.cancel()
+                self._peer_save_timer = None
+            self._prune_peer_partials()
+            snapshot = {
+                'days': {day.isoformat(): users for day, users in self._peer_partials.items()},
+                'groups': {user_id: group for user_id, group in self._peer_groups.items() if group}
+            }
+            path = os.path.join(self._peer_dir, 'workers', f"{self.event_store.segment}.json")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(path + '.tmp', path)
+    
+    def _reload_peer_base(self) -> None:
+        """Read the nightly rebuild again when it has changed"""
+        try:
+            mtime = os.path.getmtime(self._peer_base_path)
+            if mtime == self._peer_base_mtime:
+                return
+            with open(self._peer_base_path) as f:
+                raw = json.load(f)
+            learners = {int(user_id): (group, totals) for user_id, (group, totals) in raw['learners'].items()}
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error reading peer sketches {self._peer_base_path}: {e}")
+            return
+        sketches = {}
+        for group, totals in learners.values():
+            self._sketch_learner(sketches, group, totals)
+        with self._sketch_lock:
+            self._peer_base = {'through': date.fromisoformat(raw['through']), 'learners': learners,
+                               'sketches': sketches}
+            self._peer_base_mtime = mtime
+    
+    def _other_peer_snapshots(self) -> List[Tuple[float, Dict, Dict]]:
+        """Latest snapshot of every other worker, reread only when it changes"""
+        directory = os.path.join(self._peer_dir, 'workers')
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            names = []
+        snapshots = {}
+        for name in sorted(names):
+            if not name.endswith('.json') or name == f"{self.event_store.segment}.json":
+                continue
+            path = os.path.join(directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+                cached = self._peer_snapshots.get(path)
+                if not cached or cached[0] != mtime:
+                    with open(path) as f:
+                        raw = json.load(f)
+                    cached = (mtime, {
+                        date.fromisoformat(day): {int(user_id): totals for user_id, totals in users.items()}
+                        for day, users in raw['days'].items()
+                    }, {int(user_id): group for user_id, group in raw['groups'].items()})
+                snapshots[path] = cached
+            except FileNotFoundError:
+                continue  # removed by a rebuild
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Error reading peer snapshot {path}: {e}")
+        self._peer_snapshots = snapshots
+        return list(snapshots.values())
+    
+    def _merge_peer_sketches(self) -> Dict[str, Dict[str, QuantileSketch]]:
+        """The rebuild's sketches with each learner seen since moved to their new averages"""
+        self._reload_peer_base()
+        learners, groups = {}, {}
+        
+        def add(days, day_groups):
+            for day, users in days.items():
+                if day < first_day:
+                    continue
+                for user_id, totals in users.items():
+                    merged = learners.setdefault(user_id, dict.fromkeys(PEER_TOTALS, 0))
+                    for key in PEER_TOTALS:
+                        merged[key] += totals[key]
+            groups.update(day_groups)
+        
+        with self._sketch_lock:
+            self._prune_peer_partials()
+            first_day = self._first_partial_day()
+            base = self._peer_base
+            add(self._peer_partials, self._peer_groups)
+        for _, days, day_groups in self._other_peer_snapshots():
+            add(days, day_groups)
+        
+        missing = [user_id for user_id in learners if user_id not in base['learners'] and user_id not in groups]
+        if missing:
+            groups.update(self._lookup_age_groups(missing))
+        
+        sketches = {
+            group: {metric: QuantileSketch(sketch.relative_accuracy, sketch.min_value).merge(sketch)
+                    for metric, sketch in group_sketches.items()}
+            for group, group_sketches in base['sketches'].items()
+        }
+        for user_id, totals in learners.items():
+            group = groups.get(user_id)
+            if user_id in base['learners']:
+                base_group, base_totals = base['learners'][user_id]
+                self._sketch_learner(sketches, base_group, base_totals, count=-1)
+                totals = {key: totals[key] + base_totals[key] for key in PEER_TOTALS}
+                group = base_group or group
+            self._sketch_learner(sketches, group, totals)
+        return sketches
+    
+    def _load_peer_sketches(self) -> Dict[str, Dict[str, QuantileSketch]]:
+        """Merged peer sketches of all workers, merged again at most every peer_refresh_seconds"""
+        with self._peer_refresh_lock:
+            with self._sketch_lock:
+                checked = self._peer_checked
+                if checked is not None and time.monotonic() - checked < self.peer_refresh_seconds:
+                    return self._peer_sketches
+            sketches = self._merge_peer_sketches()
+            with self._sketch_lock:
+                self._peer_sketches = sketches
+                self._peer_checked = time.monotonic()
+            return sketches
+    
+    def _get_peer_metrics(self, age_group: Optional[str] = None) -> Dict[str, QuantileSketch]:
+        """Distributions of learners' averages for an age group"""
+        sketches = self._load_peer_sketches().get(age_group or 'all', {})
+        if not sketches or not sketches['accuracy'].count:
+            return {}
+        return sketches
+    
+    def _get_user_metrics(self, user_id: int) -> Dict[str, float]:
+        """A user's averages over the peer window, in the units of the peer sketches"""
+        total = self.event_store.rollup(user_id, datetime.now() - timedelta(days=self.peer_window_days))['total']
+        if not total['n']:
+            return {}
+        return dict(self._average_metrics(total), events=total['n'])
+    
+    def _calculate_percentile_ranking(self, user_metrics: Dict, peer_metrics: Dict) -> Dict[str, float]:
+        """Percent of peers whose average is below the user's, counting ties as half, per metric"""
+        return {
+            metric: round(100 * peer_metrics[metric].rank(user_metrics[metric]), 1)
+            for metric in PEER_METRICS
+        }
+    
+    def _identify_relative_strengths(self, user_metrics: Dict, peer_metrics: Dict) -> List[str]:
+        percentiles = self._calculate_percentile_ranking(user_metrics, peer_metrics)
+        labels = {'accuracy': 'Answer accuracy', 'learning_time': 'Time spent learning',
+                  'engagement': 'Engagement'}
+        return [f"{labels[metric]} is higher than most learners your age"
+                for metric in PEER_METRICS if percentiles[metric] >= 75]
+    
+    def _identify_growth_opportunities(self, user_metrics: Dict, peer_metrics: Dict) -> List[str]:
+        percentiles = self._calculate_percentile_ranking(user_metrics, peer_metrics)
+        suggestions = {
+            'accuracy': 'Take a little more time on each question',
+            'learning_time': 'Try adding a few minutes to each learning session',
+            'engagement': 'Pick activities you enjoy to stay engaged'
+        }
+        return [suggestions[metric] for metric in PEER_METRICS if percentiles[metric] < 25]
+    
+    def _compare_learning_pace(self, user_metrics: Dict, peer_metrics: Dict) -> Dict[str, Any]:
+        peer_median = peer_metrics['learning_time'].quantile(0.5)
+        ratio = user_metrics['learning_time'] / peer_median if peer_median else 1.0
+        return {
+            'average_session_minutes': user_metrics['learning_time'],
+            'peer_median_minutes': peer_median,
+            'pace': 'longer' if ratio > 1.1 else 'shorter' if ratio < 0.9 else 'similar'
+        }
+    
+    def _compare_engagement_levels(self, user_metrics: Dict, peer_metrics: Dict) -> Dict[str, Any]:
+        return {
+            'average_engagement': user_metrics['engagement'],
+            'peer_median_engagement': peer_metrics['engagement'].quantile(0.5),
+            'percentile': round(100 * peer_metrics['engagement'].rank(user_metrics['engagement']), 1)
+        }
+    
+    def _compare_achievements(self, user_id: int, peer_metrics: Dict) -> Dict[str, Any]:
+        return {
+            'achievements_earned': len(self.user_analytics.get(user_id, {}).get('achievements', [])),
+            'peer_count': peer_metrics['accuracy'].count
+        }
+    
+    def _load_events(self, user_id: int, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> List[Dict]:
+        """A user's events from the columnar store as report-ready dicts"""
+        return self.event_store.to_events(self.event_store.query(user_id, start, end))
+    
+    def _load_series(self, user_id: int, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> Dict[str, List]:
+        """Time-ordered per-event values for the few report metrics that depend on order.
+
+        Trends, improvement streaks and session-length bands need every event
+        in sequence, which no rollup keeps, so only these four columns are
+        read raw, and only for the report window.
+        """
+        data = self.event_store.query(user_id, start, end, columns=['timestamp', 'accuracy', 'engagement', 'duration'])
+        engagement = data['engagement'].astype(np.float64)
+        return {
+            'timestamp': data['timestamp'].tolist(),
+            'accuracy': np.nan_to_num(data['accuracy'].astype(np.float64), nan=0.0).tolist(),
+            'engagement': np.where(np.isnan(engagement), DEFAULT_ENGAGEMENT, engagement).tolist(),
+            'duration': data['duration'].astype(np.float64).tolist()
+        }
+    
+    def _report_sections(self, user_id: int, rollup: Dict, series: Dict[str, List]) -> Dict[str, Any]:
+        """Progress report sections from merged rollups; matches the per-event helpers below"""
+        return {
+            'summary': self._summary_from_rollup(rollup),
+            'skill_progression': self._skill_progression_from_rollup(rollup),
+            'engagement_analysis': self._engagement_from_rollup(rollup, series),
+            'learning_velocity': self._velocity_from_rollup(rollup, series),
+            'subject_mastery': self._mastery_from_rollup(rollup),
+            'achievement_progress': self._achievements_from_rollup(rollup),
+            'recommendations': self._recommendations_from_rollup(rollup),
+            'celebration_moments': self._celebrations_from_rollup(rollup, series),
+            'challenge_areas': self._challenges_from_rollup(rollup)
+        }
+    
+    @staticmethod
+    def _rollup_mean(stats: Dict, key: str) -> float:
+        return stats[key] / stats['n']
+    
+    @staticmethod
+    def _rollup_std(stats: Dict, key: str) -> float:
+        mean = stats[key] / stats['n']
+        return float(np.sqrt(max(0.0, stats[f"{key}_sq"] / stats['n'] - mean ** 2)))
+    
+    def _summary_from_rollup(self, rollup: Dict) -> Dict[str, Any]:
+        total = rollup['total']
+        if not total['n']:
+            return {}
+        
+        return {
+            'total_sessions': len(total['sessions']),
+            'total_learning_time_minutes': total['duration'],
+            'total_questions_answered': total['questions'],
+            'overall_accuracy': total['correct'] / total['questions'] if total['questions'] > 0 else 0,
+            'average_session_length': total['duration'] / total['n'],
+            'subjects_explored': len(rollup['subjects']),
+            'learning_streak_days': self._longest_streak(rollup['days'])
+        }
+    
+    def _skill_progression_from_rollup(self, rollup: Dict) -> Dict[str, Any]:
+        progression = {}
+        for subject, stats in rollup['subjects'].items():
+            if stats['scored'] >= 2:
+                first, last = (
+                    {'timestamp': datetime.fromtimestamp(ts), 'accuracy': accuracy, 'difficulty': difficulty}
+                    for ts, accuracy, difficulty in (stats['first'], stats['last'])
+                )
+                improvement = last['accuracy'] - first['accuracy']
+                
+                progression[subject] = {
+                    'improvement': improvement,
+                    'current_level': last['accuracy'],
+                    'trend': 'improving' if improvement > 0.1 else 'stable' if abs(improvement) <= 0.1 else 'needs_attention',
+                    'sessions_count': stats['scored'],
+                    'difficulty_progression': self._analyze_difficulty_progression([first, last])
+                }
+        
+        return progression
+    
+    def _engagement_from_rollup(self, rollup: Dict, series: Dict[str, List]) -> Dict[str, Any]:
+        total = rollup['total']
+        if not total['n']:
+            return {}
+        
+        return {
+            'average_engagement': self._rollup_mean(total, 'engagement'),
+            'engagement_trend': self._calculate_trend(series['engagement']),
+            'peak_engagement_times': self._peak_engagement_hours(
+                {hour: (stats['n'], stats['engagement']) for hour, stats in rollup['hours'].items()}
+            ),
+            'engagement_consistency': self._rollup_std(total, 'engagement'),
+            'optimal_session_length': self._find_optimal_session_length(series['duration'], series['engagement'])
+        }
+    
+    def _velocity_from_rollup(self, rollup: Dict, series: Dict[str, List]) -> Dict[str, Any]:
+        total = rollup['total']
+        if total['n'] < 2:
+            return {}
+        
+        time_span = (datetime.fromtimestamp(total['max_ts']) - datetime.fromtimestamp(total['min_ts'])).days
+        accuracies = series['accuracy']
+        
+        return {
+            'concepts_per_day': len(total['concepts']) / max(time_span, 1),
+            'accuracy_improvement_rate': self._calculate_overall_accuracy_improvement(accuracies) / max(time_span, 1),
+            'learning_acceleration': self._calculate_learning_acceleration(accuracies),
+            'mastery_speed': self._calculate_mastery_speed(accuracies)
+        }
+    
+    def _mastery_from_rollup(self, rollup: Dict) -> Dict[str, Any]:
+        mastery_levels = {}
+        for subject, stats in rollup['subjects'].items():
+            avg_accuracy = self._rollup_mean(stats, 'accuracy')
+            avg_difficulty = self._rollup_mean(stats, 'difficulty')
+            consistency = 1 - self._rollup_std(stats, 'accuracy')
+            
+            mastery_score = (avg_accuracy * 0.5 + avg_difficulty * 0.3 + consistency * 0.2)
+            
+            mastery_levels[subject] = {
+                'mastery_score': mastery_score,
+                'level': self._determine_mastery_level(mastery_score),
+                'sessions_count': stats['n'],
+                'recommendation': self._get_mastery_recommendation(mastery_score, subject)
+            }
+        
+        return mastery_levels
+    
+    def _achievements_from_rollup(self, rollup: Dict) -> Dict[str, Any]:
+        total = rollup['total']
+        return self._achievements_for(total['questions'], total['correct'], len(rollup['subjects']))
+    
+    def _recommendations_from_rollup(self, rollup: Dict) -> List[str]:
+        total = rollup['total']
+        if not total['n']:
+            return ['Start your learning journey with basic lessons!']
+        
+        recommendations = []
+        if self._rollup_mean(total, 'accuracy') < 0.6:
+            recommendations.append("Focus on understanding fundamentals before moving to advanced topics")
+        
+        if self._rollup_mean(total, 'engagement') < 0.5:
+            recommendations.append("Try shorter learning sessions with more interactive activities")
+        
+        for subject, stats in rollup['subjects'].items():
+            if self._rollup_mean(stats, 'accuracy') < 0.7:
+                recommendations.append(f"Spend more time practicing {subject} fundamentals")
+        
+        return recommendations or ['Keep up the great work!']
+    
+    def _celebrations_from_rollup(self, rollup: Dict, series: Dict[str, List]) -> List[Dict]:
+        celebrations = self._improvement_streaks(
+            list(zip(map(datetime.fromtimestamp, series['timestamp']), series['accuracy']))
+        )
+        
+        perfect = rollup['total']['perfect']
+        if perfect:
+            celebrations.append({
+                'type': 'perfect_scores',
+                'description': f'Incredible! {perfect} perfect or near-perfect sessions!',
+                'count': perfect
+            })
+        
+        return celebrations
+    
+    def _challenges_from_rollup(self, rollup: Dict) -> List[Dict]:
+        challenge_areas = []
+        for subject, stats in rollup['subjects'].items():
+            average_accuracy = self._rollup_mean(stats, 'accuracy')
+            if average_accuracy < 0.6:
+                challenge_areas.append({
+                    'type': 'subject_difficulty',
+                    'subject': subject,
+                    'average_accuracy': average_accuracy,
+                    'recommendation': f'Consider reviewing {subject} basics or requesting help'
+                })
+        
+        total = rollup['total']
+        if total['n'] and self._rollup_mean(total, 'engagement') < 0.4:
+            challenge_areas.append({
+                'type': 'engagement_concern',
+                'description': 'Learning engagement seems low',
+                'recommendation': 'Try different learning activities or shorter sessions'
+            })
+        
+        return challenge_areas
+    
     def _generate_summary_stats(self, events: List[Dict]) -> Dict[str, Any]:
         """Generate summary statistics from events"""
         if not events:
@@ -263,13 +873,14 @@ class AnalyticsService:
         # Calculate velocity metrics
         time_span = (sorted_events[-1]['timestamp'] - sorted_events[0]['timestamp']).days
         concepts_learned = len(set(event['data'].get('concept') for event in events if event['data'].get('concept')))
-        accuracy_improvement = self._calculate_overall_accuracy_improvement(sorted_events)
+        accuracies = [event['data'].get('accuracy', 0) for event in sorted_events]
+        accuracy_improvement = self._calculate_overall_accuracy_improvement(accuracies)
         
         return {
             'concepts_per_day': concepts_learned / max(time_span, 1),
             'accuracy_improvement_rate': accuracy_improvement / max(time_span, 1),
-            'learning_acceleration': self._calculate_learning_acceleration(sorted_events),
-            'mastery_speed': self._calculate_mastery_speed(sorted_events)
+            'learning_acceleration': self._calculate_learning_acceleration(accuracies),
+            'mastery_speed': self._calculate_mastery_speed(accuracies)
         }
     
     def _assess_subject_mastery(self, events: List[Dict]) -> Dict[str, Any]:
@@ -306,6 +917,14 @@ class AnalyticsService:
     
     def _track_achievement_progress(self, user_id: int, events: List[Dict]) -> Dict[str, Any]:
         """Track progress toward achievements"""
+        # Calculate achievement metrics from events
+        total_questions = sum(event['data'].get('questions_answered', 0) for event in events)
+        total_correct = sum(event['data'].get('correct_answers', 0) for event in events)
+        subjects_explored = len(set(event.get('subject') for event in events if event.get('subject')))
+        return self._achievements_for(total_questions, total_correct, subjects_explored)
+    
+    def _achievements_for(self, total_questions: int, total_correct: int, subjects_explored: int) -> Dict[str, Any]:
+        """Achievement progress from period totals"""
         # This would integrate with the achievement system
         achievements_progress = {
             'completed_achievements': [],
@@ -314,11 +933,6 @@ class AnalyticsService:
             'achievement_points': 0
         }
         
-        # Calculate achievement metrics from events
-        total_questions = sum(event['data'].get('questions_answered', 0) for event in events)
-        total_correct = sum(event['data'].get('correct_answers', 0) for event in events)
-        subjects_explored = len(set(event.get('subject') for event in events if event.get('subject')))
-        
         # Example achievement tracking
         if total_questions >= 100:
             achievements_progress['completed_achievements'].append('Question Master')
@@ -367,12 +981,25 @@ class AnalyticsService:
     
     def _identify_celebration_moments(self, events: List[Dict]) -> List[Dict]:
         """Identify moments worthy of celebration"""
-        celebrations = []
-        
         # Look for improvement streaks
         accuracy_scores = [(event['timestamp'], event['data'].get('accuracy', 0)) for event in events]
         accuracy_scores.sort(key=lambda x: x[0])
+        celebrations = self._improvement_streaks(accuracy_scores)
         
+        # Look for perfect scores
+        perfect_sessions = [event for event in events if event['data'].get('accuracy', 0) >= 0.95]
+        if perfect_sessions:
+            celebrations.append({
+                'type': 'perfect_scores',
+                'description': f'Incredible! {len(perfect_sessions)} perfect or near-perfect sessions!',
+                'count': len(perfect_sessions)
+            })
+        
+        return celebrations
+    
+    def _improvement_streaks(self, accuracy_scores: List[Tuple[datetime, float]]) -> List[Dict]:
+        """Celebrations for runs of non-decreasing accuracy in time-ordered (timestamp, accuracy) pairs"""
+        celebrations = []
         streak_count = 0
         for i in range(1, len(accuracy_scores)):
             if accuracy_scores[i][1] >= accuracy_scores[i-1][1]:
@@ -386,15 +1013,6 @@ class AnalyticsService:
                     })
                 streak_count = 0
         
-        # Look for perfect scores
-        perfect_sessions = [event for event in events if event['data'].get('accuracy', 0) >= 0.95]
-        if perfect_sessions:
-            celebrations.append({
-                'type': 'perfect_scores',
-                'description': f'Incredible! {len(perfect_sessions)} perfect or near-perfect sessions!',
-                'count': len(perfect_sessions)
-            })
-        
         return celebrations
     
     def _identify_challenge_areas(self, events: List[Dict]) -> List[Dict]:
@@ -428,40 +1046,153 @@ class AnalyticsService:
         
         return challenge_areas
     
-    def _find_optimal_learning_times(self, events: List[Dict]) -> Dict[str, Any]:
-        """Find optimal learning times based on performance"""
-        hourly_performance = defaultdict(list)
-        
-        for event in events:
-            hour = event['timestamp'].hour
-            accuracy = event['data'].get('accuracy', 0)
-            engagement = event['data'].get('engagement_score', 0.5)
-            
-            hourly_performance[hour].append({
-                'accuracy': accuracy,
-                'engagement': engagement
-            })
-        
+    def _find_optimal_learning_times(self, hours: Dict[int, Dict]) -> Dict[str, Any]:
+        """Best hours of the day by accuracy and engagement, from hour -> rollup stats"""
         optimal_hours = []
-        for hour, performances in hourly_performance.items():
-            if len(performances) >= 2:  # Need multiple sessions to be significant
-                avg_accuracy = np.mean([p['accuracy'] for p in performances])
-                avg_engagement = np.mean([p['engagement'] for p in performances])
+        for hour, stats in hours.items():
+            if stats['n'] >= 2:  # Need multiple sessions to be significant
+                avg_accuracy = self._rollup_mean(stats, 'accuracy')
+                avg_engagement = self._rollup_mean(stats, 'engagement')
                 
                 if avg_accuracy > 0.7 and avg_engagement > 0.6:
                     optimal_hours.append({
                         'hour': hour,
                         'performance_score': avg_accuracy * 0.6 + avg_engagement * 0.4,
-                        'sessions_count': len(performances)
+                        'sessions_count': stats['n']
                     })
         
-        optimal_hours.sort(key=lambda x: x['performance_score'], reverse=True)
+        optimal_hours.sort(key=lambda x: (-x['performance_score'], x['hour']))
         
         return {
             'best_hours': optimal_hours[:3],
             'recommendation': self._generate_time_recommendation(optimal_hours)
         }
     
+    def _generate_time_recommendation(self, optimal_hours: List[Dict]) -> str:
+        if not optimal_hours:
+            return 'Keep learning at different times so we can find when you shine brightest!'
+        hour = optimal_hours[0]['hour']
+        period = 'morning' if 5 <= hour < 12 else 'afternoon' if 12 <= hour < 17 else 'evening'
+        return f"You learn best in the {period}, around {hour:02d}:00 - try to schedule lessons then!"
+    
+    def _analyze_subject_preferences(self, rollup: Dict) -> Dict[str, Any]:
+        """Share of learning time and average accuracy per subject"""
+        total_time = sum(stats['duration'] for stats in rollup['subjects'].values())
+        preferences = {
+            subject: {
+                'sessions_count': stats['n'],
+                'time_share': stats['duration'] / total_time if total_time else 0.0,
+                'average_accuracy': self._rollup_mean(stats, 'accuracy')
+            }
+            for subject, stats in rollup['subjects'].items()
+        }
+        favorite = max(preferences, key=lambda subject: (preferences[subject]['sessions_count'],
+                                                         preferences[subject]['time_share']), default=None)
+        return {'subjects': preferences, 'favorite': favorite}
+    
+    def _find_difficulty_comfort_zone(self, rollup: Dict) -> Dict[str, Any]:
+        """Average difficulty played and whether accuracy there calls for a change"""
+        total = rollup['total']
+        difficulty = self._rollup_mean(total, 'difficulty')
+        accuracy = self._rollup_mean(total, 'accuracy')
+        if accuracy >= 0.85:
+            adjustment = 'increase'
+        elif accuracy < 0.6:
+            adjustment = 'decrease'
+        else:
+            adjustment = 'maintain'
+        return {
+            'average_difficulty': difficulty,
+            'average_accuracy': accuracy,
+            'recommended_adjustment': adjustment
+        }
+    
+    def _calculate_learning_streak_from_events(self, events: List[Dict]) -> int:
+        """Longest run of consecutive days with at least one event"""
+        return self._longest_streak({event['timestamp'].date() for event in events})
+    
+    def _longest_streak(self, days) -> int:
+        longest = current = 0
+        previous = None
+        for day in sorted(days):
+            current = current + 1 if previous and (day - previous).days == 1 else 1
+            longest = max(longest, current)
+            previous = day
+        return longest
+    
+    def _analyze_difficulty_progression(self, sorted_data: List[Dict]) -> Dict[str, float]:
+        """Difficulty at the start and end of time-ordered sessions"""
+        starting = sorted_data[0]['difficulty']
+        current = sorted_data[-1]['difficulty']
+        return {
+            'starting_difficulty': starting,
+            'current_difficulty': current,
+            'change': current - starting
+        }
+    
+    def _find_peak_engagement_times(self, events: List[Dict]) -> List[Dict]:
+        """Hours of the day with the highest average engagement"""
+        hourly = defaultdict(lambda: [0, 0.0])
+        for event in events:
+            bucket = hourly[event['timestamp'].hour]
+            bucket[0] += 1
+            bucket[1] += event['data'].get('engagement_score', 0.5)
+        return self._peak_engagement_hours(hourly)
+    
+    def _peak_engagement_hours(self, hourly: Dict[int, Tuple[int, float]]) -> List[Dict]:
+        """Top three hours from hour -> (event count, engagement sum)"""
+        peaks = [
+            {'hour': hour, 'average_engagement': engagement / count, 'sessions_count': count}
+            for hour, (count, engagement) in hourly.items() if count >= 2
+        ]
+        peaks.sort(key=lambda x: (-x['average_engagement'], x['hour']))
+        return peaks[:3]
+    
+    def _find_optimal_session_length(self, session_lengths: List[float],
+                                     engagement_scores: List[float]) -> Optional[Dict[str, Any]]:
+        """Session length band, in minutes, with the highest average engagement"""
+        best = None
+        for low, high in ((0, 10), (10, 20), (20, 30), (30, None)):
+            scores = [score for length, score in zip(session_lengths, engagement_scores)
+                      if length >= low and (high is None or length < high)]
+            if scores and (best is None or np.mean(scores) > best['average_engagement']):
+                best = {
+                    'minutes': f"{low}-{high}" if high else f"{low}+",
+                    'average_engagement': np.mean(scores)
+                }
+        return best
+    
+    def _calculate_overall_accuracy_improvement(self, accuracies: List[float]) -> float:
+        """Mean accuracy of the latest sessions minus that of the earliest ones"""
+        if not accuracies:
+            return 0.0
+        window = max(1, min(5, len(accuracies) // 2))
+        return float(np.mean(accuracies[-window:]) - np.mean(accuracies[:window]))
+    
+    def _calculate_learning_acceleration(self, accuracies: List[float]) -> float:
+        """How much faster accuracy improved in the second half of the period than the first"""
+        half = len(accuracies) // 2
+        if half < 2:
+            return 0.0
+        return (self._calculate_overall_accuracy_improvement(accuracies[half:]) -
+                self._calculate_overall_accuracy_improvement(accuracies[:half]))
+    
+    def _calculate_mastery_speed(self, accuracies: List[float], threshold: float = 0.8) -> Optional[int]:
+        """Sessions needed to first reach the threshold accuracy"""
+        for sessions, accuracy in enumerate(accuracies, 1):
+            if accuracy >= threshold:
+                return sessions
+        return None
+    
+    def _get_mastery_recommendation(self, mastery_score: float, subject: str) -> str:
+        """Next step for a subject at the given mastery score"""
+        return {
+            'expert': f"Try advanced {subject} challenges or help a friend learn",
+            'proficient': f"Move up to harder {subject} activities",
+            'developing': f"Practice {subject} a little every day to build confidence",
+            'beginner': f"Start with {subject} basics and take it one step at a time"
+        }[self._determine_mastery_level(mastery_score)]
+    
     def _calculate_trend(self, values: List[float]) -> str:
         """Calculate trend direction from a list of values"""
         if len(values) < 2:
@@ -494,26 +1225,27 @@ class AnalyticsService:
             return 'beginner'
     
     def get_dashboard_metrics(self, user_id: int) -> Dict[str, Any]:
-        """Get key metrics for user dashboard"""
+        """Get key metrics for user dashboard, from the rollups of the last week and of every day"""
         try:
-            if user_id not in self.user_analytics:
+            now = datetime.now()
+            lifetime = self.event_store.rollup(user_id)
+            if not lifetime['total']['n']:
                 return self._get_default_dashboard_metrics()
             
-            analytics = self.user_analytics[user_id]
-            recent_events = [
-                event for event in analytics['learning_events']
-                if event['timestamp'] >= datetime.now() - timedelta(days=7)
-            ]
+            week = self.event_store.rollup(user_id, now - timedelta(days=7), now)
+            analytics = self.user_analytics.get(user_id, {})
             
             metrics = {
-                'weekly_progress': self._calculate_weekly_progress(recent_events),
-                'current_streak': self._calculate_current_streak(analytics['learning_events']),
-                'favorite_subject': self._identify_favorite_subject(recent_events),
+                'weekly_progress': self._calculate_weekly_progress(week),
+                'current_streak': self._calculate_current_streak(lifetime['days'], now.date()),
+                'favorite_subject': self._identify_favorite_subject(week),
                 'achievement_count': len(analytics.get('achievements', [])),
-                'total_learning_time': self._calculate_total_learning_time(analytics['learning_events']),
-                'accuracy_trend': self._get_accuracy_trend(recent_events),
-                'next_milestone': self._get_next_milestone(user_id),
-                'encouragement_message': self._generate_encouragement_message(recent_events)
+                'total_learning_time': lifetime['total']['duration'],
+                'accuracy_trend': self._calculate_trend(
+                    [self._rollup_mean(stats, 'accuracy') for stats in week['daily']]
+                ),
+                'next_milestone': self._get_next_milestone(lifetime),
+                'encouragement_message': self._generate_encouragement_message(week)
             }
             
             return metrics
@@ -522,6 +1254,47 @@ class AnalyticsService:
             logger.error(f"Error getting dashboard metrics: {e}")
             return self._get_default_dashboard_metrics()
     
+    def _calculate_weekly_progress(self, week: Dict) -> int:
+        """Percentage of the last seven days with any learning"""
+        return round(100 * min(len(week['days']), 7) / 7)
+    
+    def _calculate_current_streak(self, days: List, today) -> int:
+        """Consecutive active days ending today, or yesterday if today has no activity yet"""
+        active = set(days)
+        day = today if today in active else today - timedelta(days=1)
+        streak = 0
+        while day in active:
+            streak += 1
+            day -= timedelta(days=1)
+        return streak
+    
+    def _identify_favorite_subject(self, week: Dict) -> str:
+        subjects = week['subjects']
+        if not subjects:
+            return 'Not determined yet'
+        return max(subjects, key=lambda subject: (subjects[subject]['n'], subjects[subject]['duration']))
+    
+    def _get_next_milestone(self, lifetime: Dict) -> str:
+        """The first achievement from _achievements_for not reached yet"""
+        total = lifetime['total']
+        if total['questions'] < 100:
+            return f"Answer {100 - total['questions']} more questions to become a Question Master!"
+        if total['correct'] < 50:
+            return f"Get {50 - total['correct']} more answers right to become an Accuracy Expert!"
+        if len(lifetime['subjects']) < 3:
+            return f"Explore {3 - len(lifetime['subjects'])} more subjects to become an Explorer!"
+        return 'Every milestone reached - keep shining! 🏆'
+    
+    def _generate_encouragement_message(self, week: Dict) -> str:
+        total = week['total']
+        if not total['n']:
+            return "We missed you this week - let's learn something new today! 🌈"
+        if self._rollup_mean(total, 'accuracy') >= 0.8:
+            return 'Amazing work this week - you are a learning superstar! ⭐'
+        if len(week['days']) >= 4:
+            return 'You kept learning almost every day this week - fantastic! 🎉'
+        return 'Great effort! Every lesson makes you stronger! 💪'
+    
     def _get_default_dashboard_metrics(self) -> Dict[str, Any]:
         """Get default dashboard metrics for new users"""
         return {
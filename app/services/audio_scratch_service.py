@@ -0,0 +1,195 @@
+"""
+Audio Scratch Space
+Managed directory for temporary recordings with size and age based eviction
+shared by every worker, and a background sweeper
+"""
+import os
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AudioScratchSpace:
+    """Owns every temporary audio file the app writes.
+
+    Files are created inside root, a directory the scratch space has to
+    itself.  Each worker keeps an index of the files in root (size and
+    modified time, oldest first) and accounts for its own writes and
+    releases in it, so a write costs one stat of the directory rather than
+    a scan.  The index is rebuilt from disk when root's mtime shows another
+    worker created or removed a file, and on every sweep, so the byte budget
+    and age limit hold across every process sharing root.  Files younger
+    than grace_seconds are never evicted: a path just handed to a caller
+    (here or in another worker) stays readable while it is processed.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 200 * 1024 * 1024,
+                 max_age_seconds: float = 3600, sweep_interval: float = 300, grace_seconds: float = 60):
+        self.root = root or os.path.join(tempfile.gettempdir(), 'eduhope_audio')
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.sweep_interval = sweep_interval
+        self.grace_seconds = grace_seconds
+
+        # path -> (modified_at, size), oldest first; guarded by _lock
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        self._root_mtime = None
+        # Serializes this process's index updates; other processes may sweep concurrently
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            self._rescan()
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(modified_at, path, size) of every file in root, oldest first"""
+        entries = []
+        try:
+            for entry in os.scandir(self.root):
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.path, stat.st_size))
+                except FileNotFoundError:
+                    # Released or evicted by another worker mid-scan
+                    continue
+        except OSError as e:
+            logger.error(f"Error scanning audio scratch directory: {e}")
+        entries.sort()
+        return entries
+
+    def _current_root_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.root).st_mtime_ns
+        except OSError:
+            return None
+
+    def _rescan(self):
+        """Rebuild the index from disk; caller holds _lock"""
+        self._root_mtime = self._current_root_mtime()
+        self._index = OrderedDict((path, (modified_at, size)) for modified_at, path, size in self._scan())
+        self._total_bytes = sum(size for _, size in self._index.values())
+
+    def new_path(self, suffix: str = '.wav', prefix: str = 'speech_') -> str:
+        """Reserve a fresh path inside the scratch space"""
+        return os.path.join(self.root, f"{prefix}{uuid.uuid4().hex}{suffix}")
+
+    def write_bytes(self, data: bytes, suffix: str = '.wav', prefix: str = 'speech_') -> str:
+        """Write data to a new scratch file and return its path"""
+        path = self.new_path(suffix, prefix)
+        with self._lock:
+            # Only another worker can have changed root since our last write or scan
+            stale = self._current_root_mtime() != self._root_mtime
+            with open(path, 'wb') as f:
+                f.write(data)
+            if stale:
+                self._rescan()
+            else:
+                self._root_mtime = self._current_root_mtime()
+                self._index[path] = (time.time(), len(data))
+                self._total_bytes += len(data)
+            self._evict(time.time())
+        return path
+
+    def release(self, path: str):
+        """Delete a scratch file as soon as the caller is done with it"""
+        if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.root):
+            with self._lock:
+                stale = self._current_root_mtime() != self._root_mtime
+                self._remove(path)
+                if not stale:
+                    self._root_mtime = self._current_root_mtime()
+                self._forget(path)
+
+    def _forget(self, path: str):
+        entry = self._index.pop(path, None)
+        if entry:
+            self._total_bytes -= entry[1]
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.error(f"Error removing scratch file {path}: {e}")
+            return False
+
+    def _evict(self, now: float) -> int:
+        """Drop expired files, then the oldest until under max_bytes; caller holds _lock"""
+        evicted = 0
+        while self._index:
+            path, (modified_at, size) = next(iter(self._index.items()))
+            age = now - modified_at
+            if age < self.grace_seconds:
+                # Oldest first, so everything after this is in its grace period too
+                break
+            if age < self.max_age_seconds and self._total_bytes <= self.max_bytes:
+                break
+            if self._remove(path):
+                evicted += 1
+            self._forget(path)
+        if evicted:
+            self._root_mtime = self._current_root_mtime()
+        return evicted
+
+    def sweep(self) -> int:
+        """Resync the index with disk, then evict expired and over-budget files"""
+        with self._lock:
+            self._rescan()
+            return self._evict(time.time())
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info(f"Swept {removed} expired audio scratch files")
+            except Exception as e:
+                logger.error(f"Error sweeping audio scratch space: {e}")
+
+    def start_sweeper(self):
+        """Start the background sweeper thread if it is not already running"""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name='audio-scratch-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        if self._sweeper:
+            self._sweeper.join(timeout=1.0)
+            self._sweeper = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._rescan()
+            files, total_bytes = len(self._index), self._total_bytes
+        return {
+            'files': files,
+            'total_bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'max_age_seconds': self.max_age_seconds,
+            'grace_seconds': self.grace_seconds
+        }
+
+
+def get_audio_scratch_space() -> AudioScratchSpace:
+    """Build the scratch space from the AUDIO_SCRATCH_* environment variables"""
+    return AudioScratchSpace(
+        root=os.environ.get('AUDIO_SCRATCH_DIR') or None,
+        max_bytes=int(float(os.environ.get('AUDIO_SCRATCH_MAX_MB', 200)) * 1024 * 1024),
+        max_age_seconds=float(os.environ.get('AUDIO_SCRATCH_MAX_AGE', 3600)),
+        grace_seconds=float(os.environ.get('AUDIO_SCRATCH_GRACE', 60))
+    )
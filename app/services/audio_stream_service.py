@@ -0,0 +1,160 @@
+"""
+Streaming Audio Ingestion Service
+Gates small PCM chunks from the browser with voice activity detection so speech
+can be recognized while the child is still talking
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import webrtcvad
+    VAD_AVAILABLE = True
+except ImportError:
+    VAD_AVAILABLE = False
+    logging.warning("webrtcvad not available. Falling back to energy-based voice detection.")
+
+logger = logging.getLogger(__name__)
+
+VAD_SAMPLE_RATES = (8000, 16000, 32000, 48000)
+
+
+class AudioStream:
+    """Voice-activity gated buffer for one browser microphone stream.
+
+    Expects 16-bit little-endian mono PCM.  Chunks may be any size; they are
+    cut into fixed VAD frames internally and the remainder is carried over.
+    """
+
+    def __init__(self, target_word: Optional[str] = None, language: str = 'en',
+                 sample_rate: int = 16000, frame_ms: int = 30, aggressiveness: int = 2,
+                 preroll_ms: int = 300, end_silence_ms: int = 600,
+                 partial_interval_ms: int = 600, max_utterance_ms: int = 10000):
+        if sample_rate not in VAD_SAMPLE_RATES:
+            raise ValueError(f"Unsupported sample rate {sample_rate}; use one of {VAD_SAMPLE_RATES}")
+        if frame_ms not in (10, 20, 30):
+            raise ValueError("VAD frames must be 10, 20 or 30 ms")
+
+        self.target_word = target_word
+        self.language = language
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+
+        self.vad = webrtcvad.Vad(aggressiveness) if VAD_AVAILABLE else None
+        self.energy_threshold = 500.0  # int16 RMS used when webrtcvad is missing
+
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self.partial_interval_frames = max(1, partial_interval_ms // frame_ms)
+        self.max_utterance_frames = max(1, max_utterance_ms // frame_ms)
+
+        self._pending = b''
+        self._preroll = deque(maxlen=max(1, preroll_ms // frame_ms))
+        self._utterance = []
+        self._in_speech = False
+        self._silent_frames = 0
+        self._frames_since_partial = 0
+
+        # Set while a recognition task is running so partials never pile up
+        self.recognizing = False
+        self.last_activity = time.time()
+        self.lock = threading.Lock()
+
+    def is_speech(self, frame: bytes) -> bool:
+        """Classify a single frame as voiced or not"""
+        if self.vad is not None:
+            return self.vad.is_speech(frame, self.sample_rate)
+        samples = np.frombuffer(frame, dtype='<i2').astype(np.float32)
+        return float(np.sqrt(np.mean(samples ** 2))) > self.energy_threshold
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        """Consume a PCM chunk and return the speech events it completes"""
+        events = []
+        with self.lock:
+            self.last_activity = time.time()
+            data = self._pending + chunk
+            usable = len(data) - len(data) % self.frame_bytes
+            self._pending = data[usable:]
+
+            for offset in range(0, usable, self.frame_bytes):
+                event = self._process_frame(data[offset:offset + self.frame_bytes])
+                if event:
+                    events.append(event)
+        return events
+
+    def _process_frame(self, frame: bytes) -> Optional[Dict]:
+        voiced = self.is_speech(frame)
+
+        if not self._in_speech:
+            self._preroll.append(frame)
+            if voiced:
+                self._in_speech = True
+                self._utterance = list(self._preroll)
+                self._preroll.clear()
+                self._silent_frames = 0
+                self._frames_since_partial = 0
+                return {'type': 'speech_start'}
+            return None
+
+        self._utterance.append(frame)
+        self._silent_frames = 0 if voiced else self._silent_frames + 1
+        self._frames_since_partial += 1
+
+        if self._silent_frames >= self.end_silence_frames or len(self._utterance) >= self.max_utterance_frames:
+            return self._finish_utterance()
+
+        if self._frames_since_partial >= self.partial_interval_frames:
+            self._frames_since_partial = 0
+            return {'type': 'partial', 'pcm': b''.join(self._utterance)}
+
+        return None
+
+    def _finish_utterance(self) -> Dict:
+        pcm = b''.join(self._utterance)
+        self._utterance = []
+        self._in_speech = False
+        self._silent_frames = 0
+        return {'type': 'final', 'pcm': pcm}
+
+    def flush(self) -> Optional[Dict]:
+        """End the stream, returning the in-progress utterance if there is one"""
+        with self.lock:
+            self._pending = b''
+            if self._in_speech and self._utterance:
+                return self._finish_utterance()
+        return None
+
+
+class AudioStreamService:
+    """Tracks open audio streams per Socket.IO connection"""
+
+    def __init__(self, idle_timeout: int = 120):
+        self.streams = {}
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+
+    def open_stream(self, sid: str, **options) -> AudioStream:
+        stream = AudioStream(**options)
+        with self._lock:
+            self._expire_idle_streams()
+            self.streams[sid] = stream
+        return stream
+
+    def get_stream(self, sid: str) -> Optional[AudioStream]:
+        with self._lock:
+            return self.streams.get(sid)
+
+    def close_stream(self, sid: str) -> Optional[Dict]:
+        """Close a stream and return its trailing utterance, if any"""
+        with self._lock:
+            stream = self.streams.pop(sid, None)
+        return stream.flush() if stream else None
+
+    def _expire_idle_streams(self):
+        cutoff = time.time() - self.idle_timeout
+        for sid in [sid for sid, s in self.streams.items() if s.last_activity < cutoff]:
+            del self.streams[sid]
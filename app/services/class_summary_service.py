@@ -0,0 +1,463 @@
+"""
+Class Summary Service
+Keeps the teacher dashboard's class_summaries row current as students and
+lesson progress change
+"""
+import base64
+import json
+import logging
+import weakref
+from datetime import datetime, timedelta, time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import case, event, func, inspect, insert, select, tuple_, update
+
+from app import db
+from app.models.class_summary import ClassSummary
+from app.models.lesson import Lesson, UserProgress
+from app.models.pet import Pet
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Upper bound in minutes -> label for the class learning-time chart
+TIME_RANGES = ((60, "0-1 hours"), (180, "1-3 hours"), (300, "3-5 hours"), (None, "5+ hours"))
+
+# Student list sort keys -> users column; each has a (column, id) index
+STUDENT_SORTS = {'points': 'total_points', 'level': 'level', 'last_active': 'last_active',
+                 'avg_score': 'average_score'}
+
+# class_key -> the live service keeping that summary current
+_services = weakref.WeakValueDictionary()
+
+
+def _forward(handler: str):
+    """Mapper event listener that hands each flushed row to every live service"""
+    def listener(mapper, connection, target):
+        for service in list(_services.values()):
+            getattr(service, handler)(mapper, connection, target)
+    return listener
+
+
+# Registered once per process; services come and go through _services
+for _target, _name, _handler in ((User, 'after_insert', '_on_user_insert'),
+                                 (User, 'after_update', '_on_user_update'),
+                                 (User, 'after_delete', '_on_user_delete'),
+                                 (UserProgress, 'after_insert', '_on_progress_insert'),
+                                 (UserProgress, 'after_update', '_on_progress_update'),
+                                 (UserProgress, 'after_delete', '_on_progress_delete')):
+    event.listen(_target, _name, _forward(_handler))
+
+
+class ClassSummaryService:
+    """Incremental materialization of ClassSummary.
+
+    Mapper events on User and UserProgress turn each flushed change into a
+    delta against the summary row, inside the same transaction.  When a
+    delta cannot be worked out (an old value was never loaded, or a top
+    student drops down the list), the affected part is recomputed from the
+    indexed tables instead.
+
+    The mapper listeners are registered once for the module and forward to
+    the most recently created service for each class key, so creating
+    services does not pile up listeners and each change is applied once.
+    """
+
+    def __init__(self, class_key: str = 'all'):
+        self.class_key = class_key
+        self.table = ClassSummary.__table__
+        _services[class_key] = self
+
+    # Reads
+
+    def get(self, now: Optional[datetime] = None) -> Dict:
+        """Dashboard figures, building the summary on first use"""
+        summary = ClassSummary.query.filter_by(class_key=self.class_key).first()
+        if summary is None:
+            self.rebuild()
+            summary = ClassSummary.query.filter_by(class_key=self.class_key).first()
+        return summary.to_dict(now)
+
+    def list_students(self, sort: str = 'points', descending: bool = True, limit: int = 50,
+                      after: Optional[str] = None, connection=None) -> Dict:
+        """One page of the student list, continuing from an opaque cursor.
+
+        Pages are keyset-paginated on (sort column, id), so each one is a
+        range scan of the matching index however deep the teacher scrolls.
+        Students with no value for the sort column come last, in id order,
+        from a second range of the same index.  Raises ValueError for an
+        unknown sort or a malformed cursor.
+        """
+        if sort not in STUDENT_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        connection = connection or db.session.connection()
+        value, last_id = self._decode_cursor(after, sort) if after else (None, None)
+
+        rows = []
+        if value is not None or last_id is None:
+            rows = connection.execute(
+                self._page_query(sort, descending, limit + 1, value, last_id)
+            ).mappings().all()
+        if len(rows) <= limit:
+            # Past the valued students; continue into the NULLs, from the cursor if it is already there
+            rows += connection.execute(
+                self._page_query(sort, descending, limit + 1 - len(rows), None,
+                                 last_id if value is None else None, nulls=True)
+            ).mappings().all()
+
+        page = rows[:limit]
+        students = [{
+            'id': row['id'],
+            'username': row['username'],
+            'full_name': row['full_name'],
+            'level': row['level'] or 1,
+            'total_points': row['total_points'] or 0,
+            'average_score': round(row['average_score'] or 0, 1),
+            'last_active': row['last_active'].isoformat() if row['last_active'] else None
+        } for row in page]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = self._encode_cursor(last[STUDENT_SORTS[sort]], last['id'])
+        return {'students': students, 'next_cursor': next_cursor}
+
+    @staticmethod
+    def _page_query(sort: str, descending: bool, limit: int, value=None, last_id: Optional[int] = None,
+                    nulls: bool = False):
+        """Students after (value, last_id) among those with a value for the sort column, or without one"""
+        users = User.__table__
+        column = users.c[STUDENT_SORTS[sort]]
+        query = select(users.c.id, users.c.username, users.c.full_name, users.c.level, users.c.total_points,
+                       users.c.average_score, users.c.last_active).limit(limit)
+        if nulls:
+            query = (query.where(column.is_(None))
+                     .order_by(users.c.id.desc() if descending else users.c.id.asc()))
+            if last_id is not None:
+                query = query.where(users.c.id < last_id if descending else users.c.id > last_id)
+            return query
+
+        order = (column.desc(), users.c.id.desc()) if descending else (column.asc(), users.c.id.asc())
+        query = query.where(column.is_not(None)).order_by(*order)
+        if last_id is not None:
+            key, position = tuple_(column, users.c.id), tuple_(value, last_id)
+            query = query.where(key < position if descending else key > position)
+        return query
+
+    @staticmethod
+    def _encode_cursor(value, last_id: int) -> str:
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        return base64.urlsafe_b64encode(json.dumps([value, last_id]).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str):
+        try:
+            value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if value is None:
+                pass
+            elif sort == 'last_active':
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, (int, float)):
+                raise ValueError(value)
+            return value, int(last_id)
+        except (TypeError, ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    def class_performance(self, connection=None) -> Dict:
+        """Class performance charts in three grouped queries, whatever the class size"""
+        connection = connection or db.session.connection()
+        users, progress, lessons, pets = User.__table__, UserProgress.__table__, Lesson.__table__, Pet.__table__
+
+        subject_performance = {
+            subject: round(avg_score or 0, 1)
+            for subject, avg_score in connection.execute(
+                select(lessons.c.subject, func.avg(progress.c.best_score))
+                .select_from(lessons.outerjoin(progress, progress.c.lesson_id == lessons.c.id))
+                .group_by(lessons.c.subject)
+            )
+        }
+
+        per_student = (
+            select(users.c.id.label('user_id'),
+                   (func.coalesce(func.sum(progress.c.time_spent), 0) / 60.0).label('minutes'),
+                   func.coalesce(func.avg(progress.c.best_score), 0).label('avg_score'))
+            .select_from(users.outerjoin(progress, progress.c.user_id == users.c.id))
+            .group_by(users.c.id)
+            .subquery()
+        )
+        time_range = case(*((per_student.c.minutes < limit, label) for limit, label in TIME_RANGES if limit),
+                          else_=TIME_RANGES[-1][1])
+        time_distribution = dict(connection.execute(
+            select(time_range, func.count()).select_from(per_student).group_by(time_range)
+        ).all())
+
+        # A student's pet is their first one, as Pet.query.filter_by(user_id=...).first() picks
+        first_pet = select(pets.c.user_id, func.min(pets.c.id).label('pet_id')).group_by(pets.c.user_id).subquery()
+        pet_learning_correlation = [
+            {'pet_happiness': happiness, 'learning_score': avg_score, 'student_name': username}
+            for username, happiness, avg_score in connection.execute(
+                select(users.c.username, pets.c.happiness, per_student.c.avg_score)
+                .select_from(
+                    users.join(per_student, per_student.c.user_id == users.c.id)
+                    .join(first_pet, first_pet.c.user_id == users.c.id)
+                    .join(pets, pets.c.id == first_pet.c.pet_id)
+                )
+                .order_by(users.c.id)
+            )
+        ]
+
+        return {
+            'subject_performance': subject_performance,
+            'time_distribution': time_distribution,
+            'pet_learning_correlation': pet_learning_correlation
+        }
+
+    def rebuild(self):
+        """Recompute the summary from the source tables"""
+        try:
+            connection = db.session.connection()
+            self._refresh_average_scores(connection)
+            summary = self._compute(connection)
+            if self._load(connection) is None:
+                connection.execute(insert(self.table).values(class_key=self.class_key, **self._columns(summary)))
+            else:
+                self._save(connection, summary)
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error rebuilding class summary {self.class_key}: {e}")
+            db.session.rollback()
+            raise
+
+    # Storage
+
+    def _load(self, connection) -> Optional[Dict]:
+        row = connection.execute(
+            select(self.table).where(self.table.c.class_key == self.class_key)
+        ).mappings().first()
+        if row is None:
+            return None
+        return {
+            'total_students': row['total_students'] or 0,
+            'level_sum': row['level_sum'] or 0,
+            'top_students': json.loads(row['top_students'] or '[]'),
+            'active_days': json.loads(row['active_days'] or '{}'),
+            'subject_stats': json.loads(row['subject_stats'] or '{}')
+        }
+
+    def _columns(self, summary: Dict) -> Dict:
+        cutoff = self._active_cutoff().date().isoformat()
+        return {
+            'total_students': summary['total_students'],
+            'level_sum': summary['level_sum'],
+            'top_students': json.dumps(summary['top_students']),
+            'active_days': json.dumps({day: count for day, count in summary['active_days'].items()
+                                       if day >= cutoff and count > 0}),
+            'subject_stats': json.dumps(summary['subject_stats']),
+            'updated_at': datetime.utcnow()
+        }
+
+    def _save(self, connection, summary: Dict):
+        connection.execute(
+            update(self.table).where(self.table.c.class_key == self.class_key).values(**self._columns(summary))
+        )
+
+    def _apply(self, connection, change: Callable[[Dict], None]):
+        """Apply a delta to the summary row within the flushing transaction"""
+        summary = self._load(connection)
+        if summary is None:
+            # The flushed tables already include this change
+            summary = self._compute(connection)
+            connection.execute(insert(self.table).values(class_key=self.class_key, **self._columns(summary)))
+            return
+        change(summary)
+        self._save(connection, summary)
+
+    # Full computation, also the fallback when a delta is unknown
+
+    @staticmethod
+    def _active_cutoff() -> datetime:
+        return datetime.now() - timedelta(days=ClassSummary.ACTIVE_WINDOW_DAYS)
+
+    def _compute(self, connection) -> Dict:
+        users = User.__table__
+        total, level_sum = connection.execute(
+            select(func.count(users.c.id), func.coalesce(func.sum(users.c.level), 0))
+        ).one()
+        return {
+            'total_students': total,
+            'level_sum': level_sum,
+            'top_students': self._top_students(connection),
+            'active_days': self._active_days(connection),
+            'subject_stats': self._subject_stats(connection)
+        }
+
+    def _top_students(self, connection) -> List[Dict]:
+        users = User.__table__
+        rows = connection.execute(
+            select(users.c.id, users.c.username, users.c.level, users.c.total_points)
+            .order_by(users.c.total_points.desc(), users.c.id.desc())
+            .limit(ClassSummary.TOP_N)
+        ).mappings()
+        return [self._entry(row['id'], row['username'], row['level'], row['total_points']) for row in rows]
+
+    def _active_days(self, connection) -> Dict[str, int]:
+        users = User.__table__
+        day = func.date(users.c.last_active)
+        start = datetime.combine(self._active_cutoff().date(), time.min)
+        rows = connection.execute(
+            select(day, func.count(users.c.id)).where(users.c.last_active >= start).group_by(day)
+        )
+        return {str(active_day): count for active_day, count in rows}
+
+    @staticmethod
+    def _subject_stats(connection) -> Dict[str, List]:
+        progress, lessons = UserProgress.__table__, Lesson.__table__
+        rows = connection.execute(
+            select(lessons.c.subject, func.count(progress.c.id), func.coalesce(func.sum(progress.c.best_score), 0))
+            .select_from(progress.join(lessons, progress.c.lesson_id == lessons.c.id))
+            .where(progress.c.is_completed.is_(True))
+            .group_by(lessons.c.subject)
+        )
+        return {subject: [completions, float(score_sum)] for subject, completions, score_sum in rows}
+
+    # Deltas
+
+    @staticmethod
+    def _entry(user_id: int, username: str, level: Optional[int], total_points: Optional[int]) -> Dict:
+        return {'id': user_id, 'username': username, 'level': level or 1, 'total_points': total_points or 0}
+
+    @staticmethod
+    def _previous(history, current):
+        """(known, value) of an attribute before this flush"""
+        if not history.has_changes():
+            return True, current
+        if history.deleted:
+            return True, history.deleted[0]
+        return False, None
+
+    @staticmethod
+    def _move_active(summary: Dict, old: Optional[datetime], new: Optional[datetime]):
+        days = summary['active_days']
+        if old:
+            day = old.date().isoformat()
+            if day in days:
+                days[day] -= 1
+        if new:
+            day = new.date().isoformat()
+            days[day] = days.get(day, 0) + 1
+
+    def _rank(self, connection, summary: Dict, user, removed: bool = False):
+        """Keep top_students in step with one user's new points"""
+        top = [entry for entry in summary['top_students'] if entry['id'] != user.id]
+        listed = len(top) < len(summary['top_students'])
+        if removed:
+            if listed:
+                summary['top_students'] = self._top_students(connection)
+            return
+
+        entry = self._entry(user.id, user.username, user.level, user.total_points)
+        top.append(entry)
+        top.sort(key=lambda e: (-e['total_points'], -e['id']))
+        if listed and top[-1] is entry and summary['total_students'] > ClassSummary.TOP_N:
+            # A listed student fell to the bottom; someone unlisted may now rank higher
+            summary['top_students'] = self._top_students(connection)
+        else:
+            summary['top_students'] = top[:ClassSummary.TOP_N]
+
+    def _on_user_insert(self, mapper, connection, target):
+        def change(summary):
+            summary['total_students'] += 1
+            summary['level_sum'] += target.level or 0
+            self._move_active(summary, None, target.last_active)
+            self._rank(connection, summary, target)
+        self._apply(connection, change)
+
+    def _on_user_update(self, mapper, connection, target):
+        attrs = inspect(target).attrs
+        level, points, last_active, username = (attrs.level.history, attrs.total_points.history,
+                                                attrs.last_active.history, attrs.username.history)
+        if not any(h.has_changes() for h in (level, points, last_active, username)):
+            return
+
+        def change(summary):
+            known_level, old_level = self._previous(level, target.level)
+            known_active, old_active = self._previous(last_active, target.last_active)
+            if not (known_level and known_active):
+                summary.update(self._compute(connection))
+                return
+            summary['level_sum'] += (target.level or 0) - (old_level or 0)
+            if last_active.has_changes():
+                self._move_active(summary, old_active, target.last_active)
+            self._rank(connection, summary, target)
+        self._apply(connection, change)
+
+    def _on_user_delete(self, mapper, connection, target):
+        def change(summary):
+            summary['total_students'] -= 1
+            summary['level_sum'] -= target.level or 0
+            self._move_active(summary, target.last_active, None)
+            self._rank(connection, summary, target, removed=True)
+        self._apply(connection, change)
+
+    def _lesson_subject(self, connection, lesson_id: int) -> Optional[str]:
+        lessons = Lesson.__table__
+        return connection.execute(select(lessons.c.subject).where(lessons.c.id == lesson_id)).scalar()
+
+    @staticmethod
+    def _add_completion(summary: Dict, subject: Optional[str], completions: int, score: float):
+        if not subject:
+            return
+        stats = summary['subject_stats'].setdefault(subject, [0, 0.0])
+        stats[0] += completions
+        stats[1] += completions * (score or 0)
+        if stats[0] <= 0:
+            del summary['subject_stats'][subject]
+
+    @staticmethod
+    def _refresh_average_scores(connection, user_id: Optional[int] = None):
+        """Recompute users.average_score (for one student, or everyone) from user_progress"""
+        users, progress = User.__table__, UserProgress.__table__
+        average = (
+            select(func.coalesce(func.avg(progress.c.best_score), 0.0))
+            .where(progress.c.user_id == users.c.id)
+            .scalar_subquery()
+        )
+        statement = update(users).values(average_score=average)
+        if user_id is not None:
+            statement = statement.where(users.c.id == user_id)
+        connection.execute(statement)
+
+    def _on_progress_insert(self, mapper, connection, target):
+        self._refresh_average_scores(connection, target.user_id)
+        if not target.is_completed:
+            return
+        subject = self._lesson_subject(connection, target.lesson_id)
+        self._apply(connection, lambda summary: self._add_completion(summary, subject, 1, target.best_score))
+
+    def _on_progress_delete(self, mapper, connection, target):
+        self._refresh_average_scores(connection, target.user_id)
+        if not target.is_completed:
+            return
+        subject = self._lesson_subject(connection, target.lesson_id)
+        self._apply(connection, lambda summary: self._add_completion(summary, subject, -1, target.best_score))
+
+    def _on_progress_update(self, mapper, connection, target):
+        attrs = inspect(target).attrs
+        completed, score = attrs.is_completed.history, attrs.best_score.history
+        if not (completed.has_changes() or score.has_changes()):
+            return
+        if score.has_changes():
+            self._refresh_average_scores(connection, target.user_id)
+        subject = self._lesson_subject(connection, target.lesson_id)
+
+        def change(summary):
+            known_completed, was_completed = self._previous(completed, target.is_completed)
+            known_score, old_score = self._previous(score, target.best_score)
+            if not (known_completed and known_score):
+                summary['subject_stats'] = self._subject_stats(connection)
+                return
+            if was_completed:
+                self._add_completion(summary, subject, -1, old_score)
+            if target.is_completed:
+                self._add_completion(summary, subject, 1, target.best_score)
+        self._apply(connection, change)
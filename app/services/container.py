@@ -0,0 +1,92 @@
+"""
+Service Container
+Builds each service once per process, on first use, so importing the app does
+not load models, open the database or probe audio devices
+"""
+import threading
+from contextlib import contextmanager
+from importlib import import_module
+from typing import Callable, Dict, Union
+
+from werkzeug.local import LocalProxy
+
+# name -> factory, as "module:attribute" so the module is only imported when the service is first used
+DEFAULT_FACTORIES = {
+    'llm': 'app.services.llm_service:LLMService',
+    'sentiment': 'app.services.sentiment_service:SentimentService',
+    'moderation': 'app.services.moderation_service:ModerationService',
+    'voice': 'app.services.voice_service:VoiceService',
+    'translation': 'app.services.translation_service:TranslationService',
+    'analytics': 'app.services.analytic_services:AnalyticsService',
+    'adaptive': 'app.services.adaptive_learning_services:AdaptiveLearningService'
+}
+
+
+def _resolve(factory: Union[str, Callable]) -> Callable:
+    if callable(factory):
+        return factory
+    module, _, attribute = factory.partition(':')
+    return getattr(import_module(module), attribute)
+
+
+class ServiceContainer:
+    """Process-wide services, constructed lazily and swappable in tests.
+
+    Modules hold proxy(name) instead of an instance; the proxy builds the
+    service on its first attribute access.  register() replaces a factory and
+    override() swaps in an instance for the duration of a with block.
+    """
+
+    def __init__(self, factories: Dict[str, Union[str, Callable]] = None):
+        self._factories = dict(DEFAULT_FACTORIES if factories is None else factories)
+        self._instances = {}
+        # Reentrant: a service may get() another while it is being built
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Union[str, Callable]):
+        """Set the factory for a service, dropping any instance already built"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"No service registered as '{name}'")
+                self._instances[name] = _resolve(self._factories[name])()
+            return self._instances[name]
+
+    def proxy(self, name: str) -> LocalProxy:
+        """Stand-in that resolves to the service whenever it is used"""
+        return LocalProxy(lambda: self.get(name))
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    @contextmanager
+    def override(self, name: str, instance):
+        """Use `instance` for a service inside the block, restoring the previous one after"""
+        with self._lock:
+            missing = object()
+            previous = self._instances.get(name, missing)
+            self._instances[name] = instance
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                if previous is missing:
+                    self._instances.pop(name, None)
+                else:
+                    self._instances[name] = previous
+
+    def reset(self):
+        """Forget every built instance; the next use builds fresh ones"""
+        with self._lock:
+            self._instances.clear()
+
+
+services = ServiceContainer()
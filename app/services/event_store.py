@@ -0,0 +1,555 @@
+"""
+Columnar Learning Event Store
+Append-only, day-partitioned typed columns on disk, memory-mapped for range reads,
+with hourly and daily per-user rollups maintained as rows are flushed
+"""
+import os
+import json
+import atexit
+import socket
+import logging
+import threading
+import weakref
+from datetime import datetime, date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines run a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Column name -> dtype.  Strings are dictionary-encoded into int32 codes.
+COLUMNS = {
+    'timestamp': np.float64,  # POSIX seconds
+    'user_id': np.int64,
+    'event_type': np.int32,
+    'session': np.int32,
+    'subject': np.int32,
+    'concept': np.int32,
+    'accuracy': np.float32,  # NaN when not reported
+    'duration': np.float32,
+    'difficulty': np.float32,
+    'engagement': np.float32,  # NaN when not reported
+    'questions': np.int32,
+    'correct': np.int32
+}
+ENCODED_COLUMNS = ('event_type', 'session', 'subject', 'concept')
+MISSING = -1  # code for an absent string value
+
+DIFFICULTY_NAMES = {'easy': 0.25, 'beginner': 0.25, 'medium': 0.5, 'intermediate': 0.5,
+                    'hard': 0.75, 'advanced': 0.75}
+
+PERFECT_ACCURACY = 0.95  # accuracy counted as a perfect session
+DEFAULT_ENGAGEMENT = 0.5  # engagement assumed when an event does not report one
+
+
+def empty_stats() -> Dict:
+    """Rollup statistics for an empty set of events"""
+    return {
+        'n': 0, 'duration': 0.0, 'questions': 0, 'correct': 0,
+        'accuracy': 0.0, 'accuracy_sq': 0.0, 'engagement': 0.0, 'engagement_sq': 0.0,
+        'difficulty': 0.0, 'perfect': 0, 'scored': 0,
+        'first': None, 'last': None,  # [timestamp, accuracy, difficulty] of scored events
+        'min_ts': None, 'max_ts': None,
+        'sessions': set(), 'concepts': set()
+    }
+
+
+def merge_stats(target: Dict, other: Dict) -> Dict:
+    """Fold other into target; every field is a sum, a set union or an extreme"""
+    if not other['n']:
+        return target
+    for key in ('n', 'duration', 'questions', 'correct', 'accuracy', 'accuracy_sq',
+                'engagement', 'engagement_sq', 'difficulty', 'perfect', 'scored'):
+        target[key] += other[key]
+    if other['first'] and (not target['first'] or other['first'][0] < target['first'][0]):
+        target['first'] = other['first']
+    if other['last'] and (not target['last'] or other['last'][0] >= target['last'][0]):
+        target['last'] = other['last']
+    target['min_ts'] = other['min_ts'] if target['min_ts'] is None else min(target['min_ts'], other['min_ts'])
+    target['max_ts'] = other['max_ts'] if target['max_ts'] is None else max(target['max_ts'], other['max_ts'])
+    target['sessions'] |= other['sessions']
+    target['concepts'] |= other['concepts']
+    return target
+
+
+def rows_stats(data: Dict[str, np.ndarray]) -> Dict:
+    """Rollup statistics for a batch of rows given as columns"""
+    stats = empty_stats()
+    if not len(data['timestamp']):
+        return stats
+    timestamps = np.asarray(data['timestamp'], dtype=np.float64)
+    accuracy = np.nan_to_num(np.asarray(data['accuracy'], dtype=np.float64), nan=0.0)
+    engagement = np.asarray(data['engagement'], dtype=np.float64)
+    engagement = np.where(np.isnan(engagement), DEFAULT_ENGAGEMENT, engagement)
+    difficulty = np.asarray(data['difficulty'], dtype=np.float64)
+
+    stats.update({
+        'n': len(timestamps),
+        'duration': float(np.asarray(data['duration'], dtype=np.float64).sum()),
+        'questions': int(np.asarray(data['questions']).sum()),
+        'correct': int(np.asarray(data['correct']).sum()),
+        'accuracy': float(accuracy.sum()),
+        'accuracy_sq': float((accuracy * accuracy).sum()),
+        'engagement': float(engagement.sum()),
+        'engagement_sq': float((engagement * engagement).sum()),
+        'difficulty': float(difficulty.sum()),
+        'perfect': int((accuracy >= PERFECT_ACCURACY).sum()),
+        'min_ts': float(timestamps.min()),
+        'max_ts': float(timestamps.max()),
+        'sessions': set(np.asarray(data['session'])[np.asarray(data['session']) >= 0].tolist()),
+        'concepts': set(np.asarray(data['concept'])[np.asarray(data['concept']) >= 0].tolist())
+    })
+    scored = np.flatnonzero(accuracy != 0)
+    stats['scored'] = len(scored)
+    if len(scored):
+        # Stable order, so ties resolve the way a stable sort by timestamp would
+        order = scored[np.argsort(timestamps[scored], kind='stable')]
+        first, last = order[0], order[-1]
+        stats['first'] = [float(timestamps[first]), float(accuracy[first]), float(difficulty[first])]
+        stats['last'] = [float(timestamps[last]), float(accuracy[last]), float(difficulty[last])]
+    return stats
+
+
+# Every store with a write buffer; weak so the exit hook never keeps a discarded store alive
+_open_stores = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_stores():
+    for store in list(_open_stores):
+        try:
+            store.flush()
+        except Exception as e:
+            logger.error(f"Error flushing learning events at exit: {e}")
+
+
+def _dump_stats(stats: Dict) -> Dict:
+    return dict(stats, sessions=sorted(stats['sessions']), concepts=sorted(stats['concepts']))
+
+
+def _load_stats(raw: Dict) -> Dict:
+    return dict(raw, sessions=set(raw['sessions']), concepts=set(raw['concepts']))
+
+
+class ColumnarEventStore:
+    """Learning events stored column by column, one directory per day.
+
+    Each process appends to its own segment inside a day partition, so
+    concurrent writers never interleave rows.  Appends are buffered and
+    written every flush_size events, flush_interval seconds after the first
+    buffered event, and at interpreter exit.  Reads prune partitions by date
+    and memory-map only the columns they ask for.
+    """
+
+    def __init__(self, root: str = 'data/analytics/events', flush_size: int = 256, flush_interval: float = 5.0):
+        self.root = root
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.segment = f"{socket.gethostname()}-{os.getpid()}"
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_timer = None
+        self._rollups = {}  # (day, user_id) -> rollup for this process's segment
+        os.makedirs(root, exist_ok=True)
+        self._dictionaries = {}
+        self._codes = {}
+        for name in ENCODED_COLUMNS:
+            self._reload_dictionary(name)
+        _open_stores.add(self)
+
+    # Dictionary encoding
+
+    def _dictionary_path(self, name: str) -> str:
+        return os.path.join(self.root, f"{name}.dict.json")
+
+    def _load_dictionary(self, name: str) -> List[str]:
+        try:
+            with open(self._dictionary_path(name)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _reload_dictionary(self, name: str):
+        values = self._load_dictionary(name)
+        if len(values) >= len(self._dictionaries.get(name, [])):
+            self._dictionaries[name] = values
+            self._codes[name] = {value: code for code, value in enumerate(values)}
+
+    def _encode(self, name: str, value) -> int:
+        if value is None or value == '':
+            return MISSING
+        value = str(value)
+        code = self._codes[name].get(value)
+        if code is not None:
+            return code
+
+        # Hold an exclusive lock so two processes never hand out the same code
+        with open(self._dictionary_path(name) + '.lock', 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._reload_dictionary(name)
+            code = self._codes[name].get(value)
+            if code is None:
+                values = self._dictionaries[name]
+                code = len(values)
+                values.append(value)
+                self._codes[name][value] = code
+                with open(self._dictionary_path(name) + '.tmp', 'w') as f:
+                    json.dump(values, f)
+                os.replace(self._dictionary_path(name) + '.tmp', self._dictionary_path(name))
+        return code
+
+    def decode(self, name: str, codes: np.ndarray) -> List[Optional[str]]:
+        if codes.size and codes.max() >= len(self._dictionaries[name]):
+            self._reload_dictionary(name)
+        values = self._dictionaries[name]
+        return [values[code] if code >= 0 else None for code in codes.tolist()]
+
+    # Writes
+
+    @staticmethod
+    def _difficulty(value) -> float:
+        if isinstance(value, str):
+            return DIFFICULTY_NAMES.get(value.lower(), 0.5)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.5
+
+    def append(self, user_id: int, event_type: str, event_data: Dict, timestamp: Optional[datetime] = None):
+        """Buffer one event; written within flush_interval seconds or once flush_size events are buffered"""
+        timestamp = timestamp or datetime.now()
+        accuracy = event_data.get('accuracy')
+        engagement = event_data.get('engagement_score')
+        row = {
+            'timestamp': timestamp.timestamp(),
+            'user_id': user_id,
+            'event_type': self._encode('event_type', event_type),
+            'session': self._encode('session', event_data.get('session_id')),
+            'subject': self._encode('subject', event_data.get('subject')),
+            'concept': self._encode('concept', event_data.get('concept')),
+            'accuracy': np.nan if accuracy is None else accuracy,
+            'duration': event_data.get('duration', 0) or 0,
+            'difficulty': self._difficulty(event_data.get('difficulty', 0.5)),
+            'engagement': np.nan if engagement is None else engagement,
+            'questions': event_data.get('questions_answered', 0) or 0,
+            'correct': event_data.get('correct_answers', 0) or 0
+        }
+        with self._lock:
+            self._pending.append((timestamp.date(), row))
+            if len(self._pending) >= self.flush_size:
+                self._flush_locked()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing learning events: {e}")
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _segment_dir(self, day: date) -> str:
+        return os.path.join(self.root, day.isoformat(), self.segment)
+
+    def _flush_locked(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._pending:
+            return
+        by_day = {}
+        for day, row in self._pending:
+            by_day.setdefault(day, []).append(row)
+        self._pending = []
+
+        for day, rows in by_day.items():
+            directory = self._segment_dir(day)
+            os.makedirs(directory, exist_ok=True)
+            # timestamp goes last: readers size a segment by it, so a reader never
+            # sees a row before every column for that row is on disk
+            columns = {name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in COLUMNS.items()}
+            for name in sorted(COLUMNS, key=lambda column: column == 'timestamp'):
+                with open(os.path.join(directory, f"{name}.bin"), 'ab') as f:
+                    f.write(columns[name].tobytes())
+            self._update_rollups(day, directory, columns)
+
+    # Rollups
+
+    @staticmethod
+    def _rollup_path(directory: str, user_id: int) -> str:
+        return os.path.join(directory, 'rollups', f"{user_id}.json")
+
+    @staticmethod
+    def _read_rollup(path: str) -> Optional[Dict]:
+        """A user's rollup for one segment: 'day' and 'hours' map subject code -> stats"""
+        try:
+            with open(path) as f:
+                raw = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return {
+            'day': {int(code): _load_stats(stats) for code, stats in raw['day'].items()},
+            'hours': {
+                int(hour): {int(code): _load_stats(stats) for code, stats in subjects.items()}
+                for hour, subjects in raw['hours'].items()
+            }
+        }
+
+    def _update_rollups(self, day: date, directory: str, columns: Dict[str, np.ndarray]):
+        """Fold freshly written rows into the hourly and daily rollups of their users"""
+        # Built from the stored dtypes so rollups agree exactly with raw reads
+        groups = {}
+        for i, ts in enumerate(columns['timestamp'].tolist()):
+            key = (datetime.fromtimestamp(ts).hour, int(columns['subject'][i]))
+            groups.setdefault(int(columns['user_id'][i]), {}).setdefault(key, []).append(i)
+
+        for user_id, buckets in groups.items():
+            path = self._rollup_path(directory, user_id)
+            rollup = self._rollups.get((day, user_id)) or self._read_rollup(path) or {'day': {}, 'hours': {}}
+            for (hour, subject), rows in buckets.items():
+                stats = rows_stats({name: column[rows] for name, column in columns.items()})
+                hourly = rollup['hours'].setdefault(hour, {})
+                merge_stats(hourly.setdefault(subject, empty_stats()), stats)
+                merge_stats(rollup['day'].setdefault(subject, empty_stats()), stats)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump({
+                    'day': {code: _dump_stats(stats) for code, stats in rollup['day'].items()},
+                    'hours': {
+                        hour: {code: _dump_stats(stats) for code, stats in subjects.items()}
+                        for hour, subjects in rollup['hours'].items()
+                    }
+                }, f)
+            os.replace(path + '.tmp', path)
+            self._rollups[(day, user_id)] = rollup
+
+        # Only today's partition still receives rows in normal operation
+        for key in [key for key in self._rollups if key[0] < day]:
+            del self._rollups[key]
+
+    # Reads
+
+    def _partitions(self, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        first = start.date() if start else date.min
+        last = end.date() if end else date.max
+        partitions = []
+        for name in sorted(os.listdir(self.root)):
+            try:
+                day = date.fromisoformat(name)
+            except ValueError:
+                continue
+            if first <= day <= last:
+                partitions.append(os.path.join(self.root, name))
+        return partitions
+
+    @staticmethod
+    def _map(path: str, dtype, rows: Optional[int] = None) -> np.ndarray:
+        size = os.path.getsize(path) // np.dtype(dtype).itemsize if rows is None else rows
+        if size == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(size,))
+
+    def query(self, user_id: Optional[int] = None, start: Optional[datetime] = None,
+              end: Optional[datetime] = None, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Columns for matching events, ordered by timestamp"""
+        self.flush()
+        columns = list(columns or COLUMNS)
+        start_ts = start.timestamp() if start else -np.inf
+        end_ts = np.nextafter(end.timestamp(), np.inf) if end else np.inf
+
+        parts = {name: [] for name in columns}
+        for partition in self._partitions(start, end):
+            for segment in os.listdir(partition):
+                selected = self._select(os.path.join(partition, segment), user_id, start_ts, end_ts, columns)
+                if selected:
+                    for name in columns:
+                        parts[name].append(selected[name])
+
+        result = {
+            name: np.concatenate(chunks) if chunks else np.empty(0, dtype=COLUMNS[name])
+            for name, chunks in parts.items()
+        }
+        if 'timestamp' not in result:
+            return result
+        order = np.argsort(result['timestamp'], kind='stable')
+        return {name: result[name][order] for name in columns}
+
+    def _select(self, directory: str, user_id: Optional[int], start_ts: float, end_ts: float,
+                columns: List[str]) -> Optional[Dict[str, np.ndarray]]:
+        """Rows of one segment with start_ts <= timestamp < end_ts, in file order"""
+        try:
+            # Every column has the same row count once a flush finishes;
+            # size by the timestamp column to ignore a write in progress
+            rows = os.path.getsize(os.path.join(directory, 'timestamp.bin')) // 8
+            timestamps = self._map(os.path.join(directory, 'timestamp.bin'), np.float64, rows)
+            mask = (timestamps >= start_ts) & (timestamps < end_ts)
+            if user_id is not None:
+                mask &= self._map(os.path.join(directory, 'user_id.bin'), np.int64, rows) == user_id
+            if not mask.any():
+                return None
+            return {
+                name: np.asarray(self._map(os.path.join(directory, f"{name}.bin"), COLUMNS[name], rows)[mask])
+                for name in columns
+            }
+        except FileNotFoundError:
+            return None
+
+    def count(self, user_id: Optional[int] = None, start: Optional[datetime] = None,
+              end: Optional[datetime] = None) -> int:
+        return len(self.query(user_id, start, end, columns=['timestamp'])['timestamp'])
+
+    def daily_rollups(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      user_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[date, Dict]]:
+        """user_id -> day -> merged statistics, read from the daily rollups alone.
+
+        Whole days only: the days containing start and end count in full.
+        Without user_ids every user with a rollup in those days is included.
+        """
+        self.flush()
+        users = {}
+        for partition in self._partitions(start, end):
+            day = date.fromisoformat(os.path.basename(partition))
+            for segment in os.listdir(partition):
+                directory = os.path.join(partition, segment)
+                if user_ids is None:
+                    try:
+                        names = os.listdir(os.path.join(directory, 'rollups'))
+                    except FileNotFoundError:
+                        continue
+                    segment_users = [int(name[:-len('.json')]) for name in names if name.endswith('.json')]
+                else:
+                    segment_users = user_ids
+                for user_id in segment_users:
+                    rollup = self._read_rollup(self._rollup_path(directory, user_id))
+                    if not rollup:
+                        continue
+                    stats = users.setdefault(user_id, {}).setdefault(day, empty_stats())
+                    for subject_stats in rollup['day'].values():
+                        merge_stats(stats, subject_stats)
+        return users
+
+    def has_events(self, user_id: int) -> bool:
+        """Whether the user has any stored event, from the rollup files alone"""
+        self.flush()
+        for partition in reversed(self._partitions(None, None)):
+            for segment in os.listdir(partition):
+                if os.path.exists(self._rollup_path(os.path.join(partition, segment), user_id)):
+                    return True
+        return False
+
+    def rollup(self, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+        """Merged statistics for a user's events with start <= timestamp <= end.
+
+        Days wholly inside the window use the daily rollup and hours wholly
+        inside use the hourly one; only the hours the window cuts through are
+        read from the raw columns.  Returns 'total', per-subject 'subjects'
+        (ordered by first event), per hour of day 'hours', active 'days' and
+        per active day 'daily' (in day order).
+        """
+        self.flush()
+        start_ts = start.timestamp() if start else -np.inf
+        end_ts = np.nextafter(end.timestamp(), np.inf) if end else np.inf
+
+        subjects, hours, daily = {}, {}, {}
+
+        def inside(stats_list):
+            return all(start_ts <= s['min_ts'] and s['max_ts'] < end_ts for s in stats_list)
+
+        def outside(stats_list):
+            return all(s['max_ts'] < start_ts or s['min_ts'] >= end_ts for s in stats_list)
+
+        def add(day, hour, by_subject):
+            for code, stats in by_subject.items():
+                merge_stats(subjects.setdefault(code, empty_stats()), stats)
+                merge_stats(hours.setdefault(hour, empty_stats()), stats)
+                merge_stats(daily.setdefault(day, empty_stats()), stats)
+
+        for partition in self._partitions(start, end):
+            day = date.fromisoformat(os.path.basename(partition))
+            for segment in os.listdir(partition):
+                directory = os.path.join(partition, segment)
+                rollup = self._read_rollup(self._rollup_path(directory, user_id))
+                if not rollup or outside(rollup['day'].values()):
+                    continue
+                if inside(rollup['day'].values()):
+                    for code, stats in rollup['day'].items():
+                        merge_stats(subjects.setdefault(code, empty_stats()), stats)
+                        merge_stats(daily.setdefault(day, empty_stats()), stats)
+                    for hour, by_subject in rollup['hours'].items():
+                        for stats in by_subject.values():
+                            merge_stats(hours.setdefault(hour, empty_stats()), stats)
+                    continue
+
+                for hour, by_subject in rollup['hours'].items():
+                    if outside(by_subject.values()):
+                        continue
+                    if inside(by_subject.values()):
+                        add(day, hour, by_subject)
+                        continue
+                    first = max(start_ts, min(s['min_ts'] for s in by_subject.values()))
+                    last = min(end_ts, np.nextafter(max(s['max_ts'] for s in by_subject.values()), np.inf))
+                    data = self._select(directory, user_id, first, last, list(COLUMNS))
+                    if data:
+                        add(day, hour, {
+                            code: rows_stats({name: column[data['subject'] == code] for name, column in data.items()})
+                            for code in np.unique(data['subject']).tolist()
+                        })
+
+        total = empty_stats()
+        for stats in subjects.values():
+            merge_stats(total, stats)
+
+        named = {}
+        ordered = sorted((code for code in subjects if code != MISSING), key=lambda code: subjects[code]['min_ts'])
+        for code, name in zip(ordered, self.decode('subject', np.array(ordered, dtype=np.int32))):
+            named[name] = subjects[code]
+        days = sorted(daily)
+        return {'total': total, 'subjects': named, 'hours': hours, 'days': days,
+                'daily': [daily[day] for day in days]}
+
+    def to_events(self, data: Dict[str, np.ndarray]) -> List[Dict]:
+        """Rebuild event dicts in the shape AnalyticsService reports expect"""
+        if not len(data['timestamp']):
+            return []
+        event_types = self.decode('event_type', data['event_type'])
+        sessions = self.decode('session', data['session'])
+        subjects = self.decode('subject', data['subject'])
+        concepts = self.decode('concept', data['concept'])
+
+        events = []
+        for i, ts in enumerate(data['timestamp'].tolist()):
+            payload = {
+                'duration': float(data['duration'][i]),
+                'questions_answered': int(data['questions'][i]),
+                'correct_answers': int(data['correct'][i]),
+                'difficulty': float(data['difficulty'][i])
+            }
+            if not np.isnan(data['accuracy'][i]):
+                payload['accuracy'] = float(data['accuracy'][i])
+            if not np.isnan(data['engagement'][i]):
+                payload['engagement_score'] = float(data['engagement'][i])
+            for key, value in (('session_id', sessions[i]), ('subject', subjects[i]), ('concept', concepts[i])):
+                if value is not None:
+                    payload[key] = value
+
+            events.append({
+                'timestamp': datetime.fromtimestamp(ts),
+                'type': event_types[i],
+                'data': payload,
+                'session_id': sessions[i],
+                'subject': subjects[i],
+                'difficulty': payload['difficulty']
+            })
+        return events
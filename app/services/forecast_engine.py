@@ -0,0 +1,206 @@
+"""
+Forecast Engine
+Nightly batch fit of per-learner linear trends over daily activity series,
+stored as coefficients so real-time predictions are a cheap evaluation
+"""
+import os
+import logging
+import threading
+from datetime import datetime, timedelta, time as day_start
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORECAST_METRICS = ('accuracy', 'engagement', 'minutes')
+BOUNDS = {'accuracy': (0.0, 1.0), 'engagement': (0.0, 1.0), 'minutes': (0.0, None)}
+
+
+class ForecastEngine:
+    """Least-squares trend per learner and metric, fitted for everyone at once.
+
+    The daily rollups of the last lookback_days (whole days) fill a
+    learners x days grid, and y = intercept + slope * day is solved in closed
+    form across every row of the grid together.  Only days with activity
+    take part in a fit.  Coefficients are written to a single .npz file that
+    predict() memory-loads and evaluates without touching the events.
+    """
+
+    def __init__(self, event_store, root: Optional[str] = None, lookback_days: int = 60):
+        self.event_store = event_store
+        self.root = root or os.path.join(event_store.root, 'forecasts')
+        self.path = os.path.join(self.root, 'coefficients.npz')
+        self.lookback_days = lookback_days
+        self._model = None
+        self._model_mtime = None
+        self._lock = threading.Lock()
+        self._scheduler = None
+        self._stop = threading.Event()
+
+    # Fitting
+
+    def fit(self, as_of: Optional[datetime] = None, user_ids: Optional[Iterable[int]] = None) -> Dict[str, np.ndarray]:
+        """Fit every learner active in the lookback window (or just user_ids)"""
+        as_of = as_of or datetime.now()
+        days = self.lookback_days
+        origin = datetime.combine(as_of.date() - timedelta(days=days - 1), day_start.min)
+        rollups = self.event_store.daily_rollups(origin, as_of, user_ids)
+
+        users = np.array(sorted(rollups), dtype=np.int64)
+        fields = ('n', 'accuracy', 'engagement', 'duration', 'questions', 'correct')
+        totals = {field: np.zeros((len(users), days)) for field in fields}
+        for row, user_id in enumerate(users.tolist()):
+            for day, stats in rollups[user_id].items():
+                column = (day - origin.date()).days
+                for field in fields:
+                    totals[field][row, column] = stats[field]
+
+        count = totals['n']
+        active = count > 0
+        per_event = np.maximum(count, 1)
+        # Rollups already apply the progress report's defaults for unreported values
+        series = {
+            'accuracy': totals['accuracy'] / per_event,
+            'engagement': totals['engagement'] / per_event,
+            'minutes': totals['duration']
+        }
+
+        t = np.arange(days, dtype=np.float64)
+        n = active.sum(axis=1).astype(np.float64)
+        s_t = (active * t).sum(axis=1)
+        s_tt = (active * t * t).sum(axis=1)
+        denominator = n * s_tt - s_t ** 2
+        fitted = denominator > 0
+
+        model = {
+            'user_ids': users,
+            'origin': np.float64(origin.timestamp()),
+            'fitted_at': np.float64(as_of.timestamp()),
+            'active_days': n.astype(np.int32),
+            'last_active_day': (days - 1 - np.argmax(active[:, ::-1], axis=1)).astype(np.int32),
+            'questions_per_day': totals['questions'].sum(axis=1) / days,
+            'correct_per_day': totals['correct'].sum(axis=1) / days
+        }
+        for metric, values in series.items():
+            y = np.where(active, values, 0.0)
+            s_y = y.sum(axis=1)
+            s_ty = (y * t).sum(axis=1)
+            s_yy = (y * y).sum(axis=1)
+            slope = np.where(fitted, (n * s_ty - s_t * s_y) / np.where(fitted, denominator, 1), 0.0)
+            intercept = (s_y - slope * s_t) / np.maximum(n, 1)
+            residual = np.maximum(s_yy - intercept * s_y - slope * s_ty, 0.0)
+            model[f"{metric}_intercept"] = intercept
+            model[f"{metric}_slope"] = slope
+            model[f"{metric}_std"] = np.sqrt(residual / np.maximum(n - 2, 1))
+        return model
+
+    def run_nightly(self, as_of: Optional[datetime] = None) -> int:
+        """Refit all active learners and atomically replace the stored coefficients"""
+        model = self.fit(as_of)
+        os.makedirs(self.root, exist_ok=True)
+        # np.savez appends .npz unless the name already ends with it
+        temporary = self.path[:-len('.npz')] + '.tmp.npz'
+        np.savez(temporary, **model)
+        os.replace(temporary, self.path)
+        with self._lock:
+            self._model, self._model_mtime = model, os.path.getmtime(self.path)
+        logger.info(f"Fitted learning forecasts for {len(model['user_ids'])} learners")
+        return len(model['user_ids'])
+
+    # Prediction
+
+    def _load(self) -> Optional[Dict[str, np.ndarray]]:
+        """Stored coefficients, reloaded when another worker's nightly run replaces them"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if self._model is None or self._model_mtime != mtime:
+                with np.load(self.path) as stored:
+                    self._model = {name: stored[name] for name in stored.files}
+                self._model_mtime = mtime
+            return self._model
+
+    def predict(self, user_id: int, horizon_days: int = 30, as_of: Optional[datetime] = None) -> Optional[Dict]:
+        """Evaluate a learner's stored trends now and horizon_days ahead.
+
+        Learners missing from the last nightly run are fitted on the fly from
+        their own rollups, without storing the result.
+        """
+        model = self._load()
+        index = self._find(model, user_id)
+        if index is None:
+            model = self.fit(as_of, user_ids=[user_id])
+            index = self._find(model, user_id)
+            if index is None:
+                return None
+        return self.evaluate(model, index, horizon_days, as_of)
+
+    @staticmethod
+    def _find(model: Optional[Dict[str, np.ndarray]], user_id: int) -> Optional[int]:
+        if model is None or not len(model['user_ids']):
+            return None
+        index = int(np.searchsorted(model['user_ids'], user_id))
+        if index < len(model['user_ids']) and model['user_ids'][index] == user_id:
+            return index
+        return None
+
+    @staticmethod
+    def evaluate(model: Dict[str, np.ndarray], index: int, horizon_days: int,
+                 as_of: Optional[datetime] = None) -> Dict:
+        as_of = as_of or datetime.now()
+        now = (as_of.timestamp() - float(model['origin'])) / 86400
+        forecast = {
+            'active_days': int(model['active_days'][index]),
+            'days_since_active': max(0, int(now) - int(model['last_active_day'][index])),
+            'questions_per_day': float(model['questions_per_day'][index]),
+            'correct_per_day': float(model['correct_per_day'][index]),
+            'fitted_at': datetime.fromtimestamp(float(model['fitted_at']))
+        }
+        for metric in FORECAST_METRICS:
+            intercept = float(model[f"{metric}_intercept"][index])
+            slope = float(model[f"{metric}_slope"][index])
+            spread = 1.96 * float(model[f"{metric}_std"][index])
+            low, high = BOUNDS[metric]
+            predicted = intercept + slope * (now + horizon_days)
+            forecast[metric] = {
+                'current': float(np.clip(intercept + slope * now, low, high)),
+                'predicted': float(np.clip(predicted, low, high)),
+                'low': float(np.clip(predicted - spread, low, high)),
+                'high': float(np.clip(predicted + spread, low, high)),
+                'slope_per_day': slope
+            }
+        return forecast
+
+    # Scheduling
+
+    def _seconds_until(self, hour: int) -> float:
+        now = datetime.now()
+        next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def _schedule_loop(self, hour: int, job: Callable[[], object]):
+        while not self._stop.wait(self._seconds_until(hour)):
+            try:
+                job()
+            except Exception as e:
+                logger.error(f"Error running nightly learning forecasts: {e}")
+
+    def start_scheduler(self, hour: int = 2, job: Optional[Callable[[], object]] = None):
+        """Run the batch fit (or a job that includes it) every night at the given local hour"""
+        if self._scheduler and self._scheduler.is_alive():
+            return
+        self._stop.clear()
+        self._scheduler = threading.Thread(target=self._schedule_loop, args=(hour, job or self.run_nightly),
+                                           name='learning-forecasts', daemon=True)
+        self._scheduler.start()
+
+    def stop_scheduler(self):
+        self._stop.set()
+        if self._scheduler:
+            self._scheduler.join(timeout=1.0)
+            self._scheduler = None
@@ -0,0 +1,235 @@
+"""
+Learning Events
+Per-session interaction history for real-time personalization and the
+batched writer that stores interaction events
+"""
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionBuffer:
+    """Fixed-capacity ring of recent interactions with running session statistics.
+
+    Only the last `capacity` interactions are kept, in preallocated arrays;
+    response times are accumulated as each answer arrives, so appending is
+    O(1) and memory per child stays constant however long the session runs.
+    """
+    
+    def __init__(self, capacity=256, performance_window=10):
+        self.capacity = capacity
+        self.performance_window = performance_window
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.actions = np.empty(capacity, dtype=object)
+        self.content_types = np.empty(capacity, dtype=object)
+        self.performances = np.full(capacity, np.nan, dtype=np.float64)
+        self.head = 0  # next slot to write
+        self.total = 0  # interactions seen this session
+        
+        # Running statistics over the whole session
+        self.response_time_sum = 0.0
+        self.response_count = 0
+        self.performance_sum = 0.0
+        self.performance_count = 0
+        self._last_action = None
+        self._last_timestamp = None
+    
+    def __len__(self):
+        return min(self.total, self.capacity)
+    
+    def append(self, timestamp, action, content_type, performance=None):
+        # A question followed directly by an answer gives one response time
+        if self._last_action == 'question_presented' and action == 'answer_submitted':
+            self.response_time_sum += (timestamp - self._last_timestamp).total_seconds()
+            self.response_count += 1
+        self._last_action = action
+        self._last_timestamp = timestamp
+        
+        self.timestamps[self.head] = timestamp.timestamp()
+        self.actions[self.head] = action
+        self.content_types[self.head] = content_type
+        self.performances[self.head] = np.nan if performance is None else performance
+        self.head = (self.head + 1) % self.capacity
+        self.total += 1
+        
+        if performance is not None:
+            self.performance_sum += performance
+            self.performance_count += 1
+    
+    @property
+    def average_response_time(self):
+        return self.response_time_sum / self.response_count if self.response_count else None
+    
+    @property
+    def average_performance(self):
+        return self.performance_sum / self.performance_count if self.performance_count else None
+    
+    def recent_performance(self):
+        """Mean performance over the last performance_window interactions, or None"""
+        n = min(self.performance_window, len(self))
+        recent = self.performances[(self.head - 1 - np.arange(n)) % self.capacity]
+        recent = recent[~np.isnan(recent)]
+        return float(recent.mean()) if recent.size else None
+
+
+class LearningEventWriter:
+    """Buffers interaction events and writes them to the database in batches.
+
+    Events are bulk-inserted every flush_interval seconds (or as soon as
+    max_batch are waiting) in a single transaction, and preference updates
+    are coalesced so each user row is written at most once per flush.
+
+    A batch that fails because the database is busy or unreachable is put
+    back at the front of the queue (keeping at most max_backlog events).
+    Any other failure is retried row by row so one bad event or user update
+    is logged and dropped without losing the rest of the batch.
+    """
+    
+    def __init__(self, app, db, session_model, user_model, flush_interval=2.0, max_batch=500,
+                 max_backlog=10000, on_preferences_saved=None):
+        self.app = app
+        self.db = db
+        self.session_model = session_model
+        self.user_model = user_model
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_backlog = max_backlog
+        # Called with (user_id, preferences) after they are committed
+        self.on_preferences_saved = on_preferences_saved
+        self._events = []
+        self._preferences = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='learning-event-writer', daemon=True)
+            self._thread.start()
+    
+    def record(self, user_id, action, content_type, performance=None, timestamp=None):
+        with self._lock:
+            self._events.append({
+                'user_id': user_id,
+                'action': action,
+                'content_type': content_type,
+                'performance': performance,
+                'timestamp': timestamp or datetime.now()
+            })
+            full = len(self._events) >= self.max_batch
+            self._ensure_started()
+        if full:
+            self._wakeup.set()
+    
+    def update_preferences(self, user_id, preferences):
+        """Queue user column updates; later values for the same user replace earlier ones"""
+        with self._lock:
+            self._preferences.setdefault(user_id, {}).update(preferences)
+            self._ensure_started()
+    
+    def pending(self):
+        """Number of events and preference updates waiting to be written"""
+        with self._lock:
+            return len(self._events), len(self._preferences)
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+    
+    def flush(self):
+        """Write everything buffered so far, returning the number of events written"""
+        with self._lock:
+            events, self._events = self._events, []
+            preferences, self._preferences = self._preferences, {}
+        if not events and not preferences:
+            return 0
+        
+        with self.app.app_context():
+            try:
+                self._write(events, preferences)
+            except OperationalError as e:
+                self.db.session.rollback()
+                logger.warning(f"Database unavailable, keeping {len(events)} learning events for the next flush: {e}")
+                self._requeue(events, preferences)
+                return 0
+            except Exception as e:
+                self.db.session.rollback()
+                logger.error(f"Error writing {len(events)} learning events, retrying one by one: {e}")
+                return self._write_individually(events, preferences)
+        
+        self._saved(preferences)
+        return len(events)
+    
+    def _write(self, events, preferences):
+        if events:
+            self.db.session.execute(self.session_model.__table__.insert(), events)
+        self._record_active_days(events)
+        if preferences:
+            self.db.session.bulk_update_mappings(self.user_model, [
+                dict(values, id=user_id) for user_id, values in preferences.items()
+            ])
+        self.db.session.commit()
+    
+    def _write_individually(self, events, preferences):
+        """Isolate the rows that broke a batch; only those are dropped"""
+        written = 0
+        rows = [([event], {}) for event in events] + [([], {user_id: values}) for user_id, values in preferences.items()]
+        for row_events, row_preferences in rows:
+            try:
+                self._write(row_events, row_preferences)
+            except OperationalError as e:
+                self.db.session.rollback()
+                logger.warning(f"Database unavailable, keeping a learning event for the next flush: {e}")
+                self._requeue(row_events, row_preferences)
+                continue
+            except Exception as e:
+                self.db.session.rollback()
+                logger.error(f"Dropping unwritable learning event {row_events or row_preferences}: {e}")
+                continue
+            written += len(row_events)
+            self._saved(row_preferences)
+        return written
+    
+    def _requeue(self, events, preferences):
+        with self._lock:
+            self._events = events + self._events
+            overflow = len(self._events) - self.max_backlog
+            if overflow > 0:
+                logger.error(f"Learning event backlog full, dropping the {overflow} oldest events")
+                del self._events[:overflow]
+            for user_id, values in preferences.items():
+                # Anything queued since the failed flush is newer
+                self._preferences[user_id] = dict(values, **self._preferences.get(user_id, {}))
+    
+    def _saved(self, preferences):
+        if self.on_preferences_saved is None:
+            return
+        for user_id, values in preferences.items():
+            self.on_preferences_saved(user_id, values)
+    
+    def _record_active_days(self, events):
+        """Advance each user's streak bitmap once per distinct day in the batch"""
+        active_days = {}
+        for event in events:
+            active_days.setdefault(event['user_id'], set()).add(event['timestamp'].date())
+        if not active_days:
+            return
+        for user in self.user_model.query.filter(self.user_model.id.in_(list(active_days))).all():
+            for day in sorted(active_days[user.id]):
+                user.record_activity(day)
+    
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
@@ -2,17 +2,18 @@ import re
 import logging
 from typing import Dict, List, Optional, Set
 from better_profanity import profanity
-import sqlite3
 import json
-from datetime import datetime
-import os
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from app.services.container import services
+from app.services.storage import storage as default_storage, moderation_logs, positive_interactions, safety_alerts
 
 logger = logging.getLogger(__name__)
 
 class ModerationService:
-    def __init__(self):
-        self.db_path = "app/data/moderation.db"
-        self.init_database()
+    def __init__(self, storage=None):
+        # Tables live on the main database; they are created on first use
+        self.storage = storage or default_storage
         
         # Initialize profanity filter with custom words
         profanity.load_censor_words()
@@ -75,55 +76,6 @@ class ModerationService:
             ]
         }
     
-    def init_database(self):
-        """Initialize moderation database"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Moderation logs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS moderation_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                original_text TEXT,
-                filtered_text TEXT,
-                flags TEXT,
-                severity_level INTEGER,
-                action_taken TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Positive interactions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS positive_interactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                interaction_text TEXT,
-                positive_score REAL,
-                educational_value TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Safety alerts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS safety_alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                alert_type TEXT,
-                content TEXT,
-                severity INTEGER,
-                handled BOOLEAN DEFAULT FALSE,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
     def moderate_content(self, text: str, user_id: int, context: str = 'chat') -> Dict:
         """Comprehensive content moderation for children"""
         try:
@@ -155,16 +107,17 @@ class ModerationService:
             # Generate appropriate response
             response = self.generate_moderation_response(flags, severity, educational_value)
             
-            # Log the moderation action
-            self.log_moderation_action(user_id, original_text, filtered_text, flags, severity, context)
-            
-            # Handle high-severity content
-            if severity >= 3:
-                self.create_safety_alert(user_id, original_text, flags, severity)
-            
-            # Track positive interactions
-            if not flags and educational_value:
-                self.log_positive_interaction(user_id, text, educational_value)
+            with self.storage.transaction():
+                # Log the moderation action
+                self.log_moderation_action(user_id, original_text, filtered_text, flags, severity, context)
+                
+                # Handle high-severity content
+                if severity >= 3:
+                    self.create_safety_alert(user_id, original_text, flags, severity)
+                
+                # Track positive interactions
+                if not flags and educational_value:
+                    self.log_positive_interaction(user_id, text, educational_value)
             
             return {
                 'success': True,
@@ -263,34 +216,22 @@ class ModerationService:
     def log_moderation_action(self, user_id: int, original_text: str, filtered_text: str, 
                             flags: List[str], severity: int, context: str):
         """Log moderation action to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO moderation_logs 
-            (user_id, original_text, filtered_text, flags, severity_level, action_taken)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, original_text, filtered_text, json.dumps(flags), severity, context))
-        
-        conn.commit()
-        conn.close()
+        with self.storage.begin() as connection:
+            connection.execute(insert(moderation_logs).values(
+                user_id=user_id, original_text=original_text, filtered_text=filtered_text,
+                flags=json.dumps(flags), severity_level=severity, action_taken=context
+            ))
     
     def log_positive_interaction(self, user_id: int, text: str, educational_value: str):
         """Log positive interactions for analytics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         # Calculate positive score based on educational keywords
         positive_score = self.calculate_positive_score(text)
         
-        cursor.execute('''
-            INSERT INTO positive_interactions 
-            (user_id, interaction_text, positive_score, educational_value)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, text, positive_score, educational_value))
-        
-        conn.commit()
-        conn.close()
+        with self.storage.begin() as connection:
+            connection.execute(insert(positive_interactions).values(
+                user_id=user_id, interaction_text=text, positive_score=positive_score,
+                educational_value=educational_value
+            ))
     
     def calculate_positive_score(self, text: str) -> float:
         """Calculate positivity score of text"""
@@ -314,53 +255,40 @@ class ModerationService:
     
     def create_safety_alert(self, user_id: int, content: str, flags: List[str], severity: int):
         """Create safety alert for high-severity content"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         alert_type = 'high_severity' if severity >= 4 else 'moderate_concern'
         
-        cursor.execute('''
-            INSERT INTO safety_alerts (user_id, alert_type, content, severity)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, alert_type, content, severity))
-        
-        conn.commit()
-        conn.close()
+        with self.storage.begin() as connection:
+            connection.execute(insert(safety_alerts).values(
+                user_id=user_id, alert_type=alert_type, content=content, severity=severity
+            ))
         
         # Log for immediate attention
         logger.warning(f"Safety alert created for user {user_id}: {flags}")
     
     def get_user_safety_report(self, user_id: int, days: int = 7) -> Dict:
         """Generate safety report for a user"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get moderation history
-        cursor.execute('''
-            SELECT flags, severity_level, timestamp
-            FROM moderation_logs 
-            WHERE user_id=? AND timestamp > datetime('now', '-{} days')
-            ORDER BY timestamp DESC
-        '''.format(days), (user_id,))
-        
-        moderation_history = cursor.fetchall()
-        
-        # Get positive interactions
-        cursor.execute('''
-            SELECT positive_score, educational_value, timestamp
-            FROM positive_interactions
-            WHERE user_id=? AND timestamp > datetime('now', '-{} days')
-            ORDER BY timestamp DESC
-        '''.format(days), (user_id,))
-        
-        positive_interactions = cursor.fetchall()
-        
-        conn.close()
+        since = datetime.utcnow() - timedelta(days=days)
+        
+        with self.storage.begin() as connection:
+            # Get moderation history
+            moderation_history = connection.execute(
+                select(moderation_logs.c.flags, moderation_logs.c.severity_level, moderation_logs.c.timestamp)
+                .where(moderation_logs.c.user_id == user_id, moderation_logs.c.timestamp > since)
+                .order_by(moderation_logs.c.timestamp.desc())
+            ).all()
+            
+            # Get positive interactions
+            positive_history = connection.execute(
+                select(positive_interactions.c.positive_score, positive_interactions.c.educational_value,
+                       positive_interactions.c.timestamp)
+                .where(positive_interactions.c.user_id == user_id, positive_interactions.c.timestamp > since)
+                .order_by(positive_interactions.c.timestamp.desc())
+            ).all()
         
         # Analyze data
-        total_interactions = len(moderation_history) + len(positive_interactions)
+        total_interactions = len(moderation_history) + len(positive_history)
         flagged_interactions = len([m for m in moderation_history if json.loads(m[0])])
-        positive_ratio = len(positive_interactions) / max(total_interactions, 1)
+        positive_ratio = len(positive_history) / max(total_interactions, 1)
         
         safety_score = max(0, min(100, (positive_ratio * 100) - (flagged_interactions * 10)))
         
@@ -368,7 +296,7 @@ class ModerationService:
             'user_id': user_id,
             'period_days': days,
             'total_interactions': total_interactions,
-            'positive_interactions': len(positive_interactions),
+            'positive_interactions': len(positive_history),
             'flagged_interactions': flagged_interactions,
             'safety_score': round(safety_score, 1),
             'status': 'excellent' if safety_score >= 90 else 'good' if safety_score >= 70 else 'needs_attention',
@@ -461,5 +389,5 @@ class ModerationService:
         
         return suggestions
 
-# Global moderation service instance
-moderation_service = ModerationService()
\ No newline at end of file
+# Shared instance, built on first use
+moderation_service = services.proxy('moderation')
@@ -10,7 +10,6 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Any
 import tensorflow as tf
 from transformers import pipeline, AutoTokenizer, AutoModel
-import sqlite3
 from ..models.pet import Pet
 from ..models.user import User
 from .emotion_ai_services import EmotionAIService
@@ -217,14 +216,14 @@ class PetAIService:
         # Determine dominant personality trait
         dominant_trait = max(personality_scores, key=personality_scores.get)
         
-        # Update pet in database
-        with sqlite3.connect('app.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE pets SET personality_trait = ?, 
-                personality_strength = ? WHERE id = ?
-            ''', (dominant_trait, personality_scores[dominant_trait], pet_id))
-            conn.commit()
+        # Update pet in database, strongest traits first
+        traits = sorted((trait for trait, score in personality_scores.items() if score > 0),
+                        key=personality_scores.get, reverse=True) or [dominant_trait]
+        # Through the session holding the pet, so copies it already loaded see the new traits
+        pet = Pet.query.get(pet_id)
+        if pet is not None:
+            pet.personality_traits = json.dumps(traits)
+            Pet.query.session.commit()
         
         return {
             'dominant_trait': dominant_trait,
@@ -0,0 +1,244 @@
+"""
+Acoustic Pronunciation Scoring Service
+Compares a child's recording with a reference clip using MFCC features and DTW alignment
+"""
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+    logging.warning("librosa not available. Acoustic pronunciation scoring will be disabled.")
+
+logger = logging.getLogger(__name__)
+
+
+def dtw_align(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Align two feature sequences (frames x dims) with DTW.
+
+    The local cost matrix is computed in one broadcast and the accumulated cost
+    is filled one anti-diagonal at a time, so the Python loop runs n + m times
+    instead of n * m.  Returns (cost matrix, accumulated cost, warping path).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n, m = len(x), len(y)
+    if n == 0 or m == 0:
+        raise ValueError("Cannot align empty feature sequences")
+
+    sq = (x ** 2).sum(axis=1)[:, None] + (y ** 2).sum(axis=1)[None, :] - 2.0 * (x @ y.T)
+    cost = np.sqrt(np.maximum(sq, 0.0))
+
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for d in range(2, n + m + 1):
+        i = np.arange(max(1, d - m), min(n, d - 1) + 1)
+        j = d - i
+        best_prev = np.minimum(np.minimum(acc[i - 1, j - 1], acc[i - 1, j]), acc[i, j - 1])
+        acc[i, j] = cost[i - 1, j - 1] + best_prev
+
+    return cost, acc, _backtrack(acc)
+
+
+def _backtrack(acc: np.ndarray) -> np.ndarray:
+    """Recover the optimal warping path from an accumulated cost matrix"""
+    i, j = acc.shape[0] - 1, acc.shape[1] - 1
+    path = [(i - 1, j - 1)]
+    while i > 1 or j > 1:
+        steps = (acc[i - 1, j - 1], acc[i - 1, j], acc[i, j - 1])
+        move = int(np.argmin(steps))
+        if move == 0:
+            i, j = i - 1, j - 1
+        elif move == 1:
+            i -= 1
+        else:
+            j -= 1
+        path.append((i - 1, j - 1))
+    return np.array(path[::-1], dtype=np.int64)
+
+
+class PronunciationScorer:
+    """MFCC + DTW pronunciation scorer with per-window feedback"""
+
+    def __init__(self, reference_dir: str = "data/audio/reference", sample_rate: int = 16000,
+                 n_mfcc: int = 13, window_ms: int = 80, reference_cache_size: int = 256):
+        self.reference_dir = reference_dir
+        self.sample_rate = sample_rate
+        self.n_mfcc = n_mfcc
+        self.hop_length = sample_rate // 100  # 10 ms frames
+        self.n_fft = sample_rate // 40  # 25 ms analysis window
+        self.window_frames = max(1, window_ms // 10)
+
+        # Frame distances at or below good_distance score 1.0, at or above bad_distance 0.0
+        self.good_distance = 2.0
+        self.bad_distance = 6.0
+
+        self.reference_cache_size = reference_cache_size
+        self._reference_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return LIBROSA_AVAILABLE
+
+    def reference_path(self, word: str, language: str = 'en') -> str:
+        """Location of the reference clip for a word"""
+        slug = re.sub(r'[^a-z0-9]+', '_', word.lower().strip()).strip('_')
+        return os.path.join(self.reference_dir, language, f"{slug}.wav")
+
+    def has_reference(self, word: str, language: str = 'en') -> bool:
+        return os.path.exists(self.reference_path(word, language))
+
+    def load_audio(self, audio_path: str) -> np.ndarray:
+        """Load mono audio at the scorer's sample rate with leading/trailing silence trimmed"""
+        y, _ = librosa.load(audio_path, sr=self.sample_rate, mono=True)
+        trimmed, _ = librosa.effects.trim(y, top_db=30)
+        return trimmed if len(trimmed) >= self.n_fft else y
+
+    def extract_features(self, y: np.ndarray) -> np.ndarray:
+        """MFCCs (frames x coefficients) without c0, mean/variance normalized per utterance"""
+        mfcc = librosa.feature.mfcc(y=y, sr=self.sample_rate, n_mfcc=self.n_mfcc + 1,
+                                    n_fft=self.n_fft, hop_length=self.hop_length)[1:].T
+        mfcc -= mfcc.mean(axis=0)
+        mfcc /= mfcc.std(axis=0) + 1e-8
+        return mfcc
+
+    def _reference_features(self, path: str) -> np.ndarray:
+        """Reference MFCCs, cached by path and modification time"""
+        key = (path, os.path.getmtime(path))
+        with self._cache_lock:
+            if key in self._reference_cache:
+                self._reference_cache.move_to_end(key)
+                return self._reference_cache[key]
+
+        features = self.extract_features(self.load_audio(path))
+
+        with self._cache_lock:
+            self._reference_cache[key] = features
+            while len(self._reference_cache) > self.reference_cache_size:
+                self._reference_cache.popitem(last=False)
+        return features
+
+    def _distance_to_score(self, distance):
+        span = self.bad_distance - self.good_distance
+        return np.clip(1.0 - (np.asarray(distance) - self.good_distance) / span, 0.0, 1.0)
+
+    def compare_features(self, user_features: np.ndarray, reference_features: np.ndarray) -> Dict:
+        """Align user features to the reference and score each reference window"""
+        cost, acc, path = dtw_align(user_features, reference_features)
+        step_costs = cost[path[:, 0], path[:, 1]]
+
+        # Group path steps by the reference window they land in
+        windows = path[:, 1] // self.window_frames
+        n_windows = int(windows.max()) + 1
+        window_cost = np.bincount(windows, weights=step_costs, minlength=n_windows)
+        window_steps = np.bincount(windows, minlength=n_windows)
+        window_scores = self._distance_to_score(window_cost / np.maximum(window_steps, 1))
+
+        frame_seconds = self.hop_length / self.sample_rate
+        window_seconds = self.window_frames * frame_seconds
+        phoneme_windows = [
+            {
+                'start': round(k * window_seconds, 3),
+                'end': round(min((k + 1) * self.window_frames, len(reference_features)) * frame_seconds, 3),
+                'score': round(float(score), 3)
+            }
+            for k, score in enumerate(window_scores)
+        ]
+
+        overall_distance = acc[-1, -1] / len(path)
+        return {
+            'overall_score': round(float(self._distance_to_score(overall_distance)), 3),
+            'dtw_distance': round(float(overall_distance), 3),
+            'phoneme_windows': phoneme_windows,
+            'weak_windows': [k for k, score in enumerate(window_scores) if score < 0.5],
+            'tempo_ratio': round(len(user_features) / len(reference_features), 3)
+        }
+
+    def score(self, target_word: str, user_audio_path: str, language: str = 'en') -> Optional[Dict]:
+        """Score a recording against the reference clip for target_word"""
+        if not LIBROSA_AVAILABLE or not self.has_reference(target_word, language):
+            return None
+
+        try:
+            return self.score_samples(target_word, self.load_audio(user_audio_path), self.sample_rate, language)
+        except Exception as e:
+            logger.error(f"Error scoring pronunciation for '{target_word}': {e}")
+            return None
+
+    def score_samples(self, target_word: str, y: np.ndarray, sample_rate: int,
+                      language: str = 'en') -> Optional[Dict]:
+        """Score in-memory float samples, e.g. an utterance streamed from the browser"""
+        if not LIBROSA_AVAILABLE:
+            return None
+
+        reference = self.reference_path(target_word, language)
+        if not os.path.exists(reference):
+            return None
+
+        try:
+            started = time.perf_counter()
+            if sample_rate != self.sample_rate:
+                y = librosa.resample(y, orig_sr=sample_rate, target_sr=self.sample_rate)
+            user_features = self.extract_features(y)
+            result = self.compare_features(user_features, self._reference_features(reference))
+            result['word'] = target_word
+            result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            return result
+        except Exception as e:
+            logger.error(f"Error scoring pronunciation for '{target_word}': {e}")
+            return None
+
+    def score_batch(self, items: List[Tuple[str, str]], language: str = 'en') -> List[Optional[Dict]]:
+        """Score a whole exercise of (target_word, audio_path) pairs"""
+        started = time.perf_counter()
+        results = [self.score(word, path, language) for word, path in items]
+
+        if items:
+            per_word_ms = (time.perf_counter() - started) * 1000 / len(items)
+            if per_word_ms > 100:
+                logger.warning(f"Pronunciation batch scoring took {per_word_ms:.1f} ms per word")
+        return results
+
+    def analyze_voice_quality(self, audio_path: str) -> Optional[Dict]:
+        """Estimate clarity and confidence from the signal itself.
+
+        Clarity follows the speech-to-noise ratio between loud and quiet frames;
+        confidence combines speaking level with the share of voiced frames.
+        """
+        if not LIBROSA_AVAILABLE:
+            return None
+
+        try:
+            y, _ = librosa.load(audio_path, sr=self.sample_rate, mono=True)
+            rms = librosa.feature.rms(y=y, frame_length=self.n_fft, hop_length=self.hop_length)[0]
+            if rms.size == 0 or not np.any(rms > 0):
+                return None
+
+            noise_floor, speech_level = np.percentile(rms, [10, 90]) + 1e-8
+            snr_db = 20.0 * np.log10(speech_level / noise_floor)
+            level_dbfs = 20.0 * np.log10(speech_level)
+            voiced_fraction = float(np.mean(rms > noise_floor + 0.5 * (speech_level - noise_floor)))
+
+            clarity = np.clip((snr_db - 5.0) / 25.0, 0.0, 1.0)
+            loudness = np.clip((level_dbfs + 40.0) / 30.0, 0.0, 1.0)
+            confidence = 0.5 * loudness + 0.5 * np.clip(voiced_fraction / 0.6, 0.0, 1.0)
+
+            return {
+                'clarity_score': round(float(clarity), 3),
+                'confidence_score': round(float(confidence), 3),
+                'snr_db': round(float(snr_db), 1),
+                'voiced_fraction': round(voiced_fraction, 3)
+            }
+        except Exception as e:
+            logger.error(f"Error analyzing voice quality: {e}")
+            return None
@@ -0,0 +1,122 @@
+"""
+Quantile Sketch
+Mergeable, fixed-memory summary of a value distribution with relative-error
+quantiles and constant-time rank lookups
+"""
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class QuantileSketch:
+    """DDSketch-style histogram over logarithmically sized buckets.
+
+    A value x lands in bucket ceil(log_gamma(x)), so any quantile is within
+    relative_accuracy of the true value.  Buckets are plain counts, which
+    makes two sketches with the same relative_accuracy mergeable by adding
+    counts, whichever worker built them and in whatever order.  Values at or
+    below min_value (including zero) share a single zero bucket.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-4):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zero_count = 0
+        self.count = 0
+        self._buckets = {}
+        self._cumulative = None  # (first index, cumulative counts), rebuilt after changes
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float, count: int = 1):
+        """Record value count times; a negative count takes back values added earlier"""
+        if value is None or value != value:  # skip missing and NaN values
+            return
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            remaining = self._buckets.get(index, 0) + count
+            if remaining:
+                self._buckets[index] = remaining
+            else:
+                self._buckets.pop(index, None)
+        self.count += count
+        self._cumulative = None
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self._cumulative = None
+        return self
+
+    def _table(self):
+        if self._cumulative is None:
+            if self._buckets:
+                first, last = min(self._buckets), max(self._buckets)
+                counts = np.zeros(last - first + 1, dtype=np.int64)
+                for index, count in self._buckets.items():
+                    counts[index - first] = count
+                self._cumulative = (first, self.zero_count + np.cumsum(counts))
+            else:
+                self._cumulative = (0, np.empty(0, dtype=np.int64))
+        return self._cumulative
+
+    def rank(self, value: float) -> float:
+        """Mid-rank of value: the fraction of recorded values below it plus half of those in its own bucket.
+
+        Values sharing a bucket are indistinguishable, so ties count half;
+        O(1) once the table is built.
+        """
+        if not self.count:
+            return 0.0
+        first, cumulative = self._table()
+        if value <= self.min_value:
+            below, inside = 0, self.zero_count
+        else:
+            offset = self._index(value) - first
+            if offset < 0:
+                return self.zero_count / self.count
+            if offset >= len(cumulative):
+                return 1.0
+            below = cumulative[offset - 1] if offset else self.zero_count
+            inside = cumulative[offset] - below
+        # Count half of the value's own bucket, which it is assumed to sit in the middle of
+        return float(below + inside / 2) / self.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q in [0, 1], within relative_accuracy of the exact answer"""
+        if not self.count:
+            return None
+        target = q * (self.count - 1)
+        if target < self.zero_count:
+            return 0.0
+        first, cumulative = self._table()
+        offset = int(np.searchsorted(cumulative, target, side='right'))
+        offset = min(offset, len(cumulative) - 1)
+        # Midpoint of the bucket (gamma^(i-1), gamma^i] in the relative-error sense
+        return 2 * self.gamma ** (first + offset) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'min_value': self.min_value,
+            'zero_count': self.zero_count,
+            'buckets': {str(index): count for index, count in self._buckets.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'], data['min_value'])
+        sketch.zero_count = data['zero_count']
+        sketch._buckets = {int(index): count for index, count in data['buckets'].items()}
+        sketch.count = sketch.zero_count + sum(sketch._buckets.values())
+        return sketch
@@ -0,0 +1,394 @@
+"""
+Report Jobs
+Renders student progress reports to CSV or PDF in worker processes, streaming
+rows from the database and caching finished files by the student's data version
+"""
+import os
+import csv
+import time
+import uuid
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, Text, create_engine, delete, func,
+                        insert, select, update)
+
+from app.models.achievement import Achievement, UserAchievement
+from app.models.lesson import Lesson, UserProgress
+from app.models.user import User
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+    logging.warning("reportlab not available. PDF reports will be disabled.")
+
+logger = logging.getLogger(__name__)
+
+# Bump when the report layout changes so cached files are rendered again
+REPORT_LAYOUT_VERSION = 1
+STREAM_BATCH_ROWS = 500
+
+PENDING, READY, FAILED = 'pending', 'ready', 'failed'
+
+metadata = MetaData()
+report_jobs = Table(
+    'report_jobs', metadata,
+    Column('id', String(32), primary_key=True),
+    Column('student_id', Integer, nullable=False),
+    Column('format', String(10), nullable=False),
+    Column('version', String(16), nullable=False),
+    Column('status', String(10), nullable=False),
+    Column('requested_by', Integer),
+    Column('created_at', DateTime),
+    Column('finished_at', DateTime),
+    Column('error', Text),
+    Index('ix_report_jobs_artifact', 'student_id', 'version', 'format', 'status'),
+    Index('ix_report_jobs_finished_at', 'finished_at')
+)
+
+LESSON_HEADERS = ['Lesson', 'Subject', 'Started', 'Completed', 'Best score', 'Minutes', 'Attempts']
+ACHIEVEMENT_HEADERS = ['Achievement', 'Category', 'Earned']
+
+
+def report_formats() -> List[str]:
+    return ['csv', 'pdf'] if REPORTLAB_AVAILABLE else ['csv']
+
+
+def data_versions(connection, user_ids: Iterable[int]) -> Dict[int, str]:
+    """Fingerprint of everything a report shows, per student, in three grouped queries.
+
+    Any new or changed lesson progress, achievement or profile figure gives
+    the student a new version, and with it a new cache entry.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    users, progress, earned = User.__table__, UserProgress.__table__, UserAchievement.__table__
+
+    parts = {
+        user_id: [REPORT_LAYOUT_VERSION, username, full_name, level, total_points]
+        for user_id, username, full_name, level, total_points in connection.execute(
+            select(users.c.id, users.c.username, users.c.full_name, users.c.level, users.c.total_points)
+            .where(users.c.id.in_(user_ids))
+        )
+    }
+    for user_id, *figures in connection.execute(
+        select(progress.c.user_id, func.count(progress.c.id), func.max(progress.c.started_at),
+               func.max(progress.c.completed_at), func.sum(progress.c.best_score),
+               func.sum(progress.c.time_spent), func.sum(progress.c.attempts))
+        .where(progress.c.user_id.in_(user_ids))
+        .group_by(progress.c.user_id)
+    ):
+        if user_id in parts:
+            parts[user_id].append(('progress', *figures))
+    for user_id, *figures in connection.execute(
+        select(earned.c.user_id, func.count(earned.c.id), func.max(earned.c.earned_at))
+        .where(earned.c.user_id.in_(user_ids))
+        .group_by(earned.c.user_id)
+    ):
+        if user_id in parts:
+            parts[user_id].append(('achievements', *figures))
+
+    return {user_id: hashlib.sha1(repr(values).encode()).hexdigest()[:16] for user_id, values in parts.items()}
+
+
+class _CsvReport:
+    def __init__(self, path: str):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+
+    def heading(self, text: str):
+        self.writer.writerow([text])
+
+    def row(self, values: List):
+        self.writer.writerow(values)
+
+    def gap(self):
+        self.writer.writerow([])
+
+    def close(self):
+        self.file.close()
+
+
+class _PdfReport:
+    """Writes lines straight onto the page, starting a new one when it fills"""
+
+    MARGIN = 50
+    LINE_HEIGHT = 14
+
+    def __init__(self, path: str):
+        self.canvas = canvas.Canvas(path, pagesize=A4)
+        self.width, self.height = A4
+        self.y = self.height - self.MARGIN
+
+    def _line(self, text: str, font: str = 'Helvetica', size: int = 9):
+        if self.y < self.MARGIN:
+            self.canvas.showPage()
+            self.y = self.height - self.MARGIN
+        self.canvas.setFont(font, size)
+        self.canvas.drawString(self.MARGIN, self.y, text)
+        self.y -= self.LINE_HEIGHT
+
+    def heading(self, text: str):
+        self._line(text, 'Helvetica-Bold', 12)
+
+    def row(self, values: List):
+        self._line('  |  '.join('' if value is None else str(value) for value in values))
+
+    def gap(self):
+        self.y -= self.LINE_HEIGHT
+
+    def close(self):
+        self.canvas.save()
+
+
+def _format_time(value) -> str:
+    return value.strftime('%Y-%m-%d %H:%M') if isinstance(value, datetime) else (value or '')
+
+
+def render_report(database_uri: str, user_id: int, report_format: str, path: str) -> str:
+    """Render one student's report to path.  Runs in a worker process.
+
+    Lesson and achievement rows are streamed in batches and written as they
+    arrive, so memory stays flat however long a student's history is.  The
+    file is written beside path and moved into place once complete.
+    """
+    engine = create_engine(database_uri)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    users, progress, lessons = User.__table__, UserProgress.__table__, Lesson.__table__
+    earned, achievements = UserAchievement.__table__, Achievement.__table__
+    try:
+        with engine.connect() as connection:
+            student = connection.execute(
+                select(users.c.username, users.c.full_name, users.c.level, users.c.total_points,
+                       users.c.average_score)
+                .where(users.c.id == user_id)
+            ).mappings().first()
+            if student is None:
+                raise LookupError(f"Student {user_id} not found")
+
+            report = _PdfReport(temporary) if report_format == 'pdf' else _CsvReport(temporary)
+            try:
+                report.heading(f"Progress report: {student['full_name']} ({student['username']})")
+                report.row(['Level', student['level'] or 1, 'Total points', student['total_points'] or 0,
+                            'Average score', round(student['average_score'] or 0, 1)])
+                report.gap()
+
+                report.heading('Lessons')
+                report.row(LESSON_HEADERS)
+                stream = connection.execution_options(yield_per=STREAM_BATCH_ROWS)
+                for title, subject, started, completed, best_score, time_spent, attempts in stream.execute(
+                    select(lessons.c.title, lessons.c.subject, progress.c.started_at, progress.c.completed_at,
+                           progress.c.best_score, progress.c.time_spent, progress.c.attempts)
+                    .select_from(progress.join(lessons, lessons.c.id == progress.c.lesson_id))
+                    .where(progress.c.user_id == user_id)
+                    .order_by(progress.c.started_at, progress.c.id)
+                ):
+                    report.row([title, subject, _format_time(started), _format_time(completed),
+                                round(best_score or 0, 1), round((time_spent or 0) / 60, 1), attempts or 0])
+                report.gap()
+
+                report.heading('Achievements')
+                report.row(ACHIEVEMENT_HEADERS)
+                for name, category, earned_at in stream.execute(
+                    select(achievements.c.name, achievements.c.category, earned.c.earned_at)
+                    .select_from(earned.join(achievements, achievements.c.id == earned.c.achievement_id))
+                    .where(earned.c.user_id == user_id)
+                    .order_by(earned.c.earned_at, earned.c.id)
+                ):
+                    report.row([name, category, _format_time(earned_at)])
+            finally:
+                report.close()
+        os.replace(temporary, path)
+        return path
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        engine.dispose()
+
+
+class ReportJobQueue:
+    """Queue of report jobs rendered by a pool of worker processes.
+
+    Finished files are named <student>-<data version>.<format>, so asking
+    again for an unchanged student is answered from disk at once, and
+    requests for the same file while it is rendering share one job in the
+    pool.  When a job finishes, notify(job) is called, e.g. to push a
+    Socket.IO event to the teacher who asked for it.
+
+    Jobs are rows in the report_jobs table, so any server worker can answer
+    for a job another one queued.  Finishing a file marks every pending job
+    for it ready, whichever worker queued it; two workers asked for the same
+    file at the same moment may both render it, which is harmless since
+    each render is moved into place whole.
+    """
+
+    FINISHED_JOB_DAYS = 7
+
+    def __init__(self, database_uri: str, root: Optional[str] = None, max_workers: int = 2,
+                 notify: Optional[Callable[[Dict], None]] = None, executor=None, engine=None):
+        self.database_uri = database_uri
+        self.root = root or os.path.join('data', 'reports')
+        self.max_workers = max_workers
+        self.notify = notify
+        self.engine = engine if engine is not None else create_engine(database_uri)
+        self._executor = executor
+        self._rendering = {}  # artifact path -> (future, [job ids]) for renders started by this process
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        report_jobs.create(self.engine, checkfirst=True)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            # Spawned workers start clean instead of inheriting the server's sockets and threads
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def artifact_path(self, user_id: int, version: str, report_format: str) -> str:
+        return os.path.join(self.root, f"{user_id}-{version}.{report_format}")
+
+    # Submitting
+
+    def submit(self, user_ids: Iterable[int], report_format: str, connection,
+               requested_by: Optional[int] = None) -> List[Dict]:
+        """Queue reports for the given students; unknown students are skipped.
+
+        Raises ValueError for a format that cannot be rendered here.
+        """
+        if report_format not in report_formats():
+            raise ValueError(f"Unsupported report format: {report_format}")
+
+        versions = data_versions(connection, user_ids)
+        now = datetime.utcnow()
+        rows = [{
+            'id': uuid.uuid4().hex,
+            'student_id': user_id,
+            'format': report_format,
+            'version': version,
+            'status': PENDING,
+            'requested_by': requested_by,
+            'created_at': now
+        } for user_id, version in versions.items()]
+        with self.engine.begin() as jobs_connection:
+            jobs_connection.execute(delete(report_jobs).where(
+                report_jobs.c.finished_at < now - timedelta(days=self.FINISHED_JOB_DAYS)
+            ))
+            if rows:
+                jobs_connection.execute(insert(report_jobs), rows)
+
+        jobs = []
+        for row in rows:
+            job = self._job(dict(row, finished_at=None, error=None))
+            path = self.artifact_path(row['student_id'], row['version'], report_format)
+            started = None
+            with self._lock:
+                cached = os.path.exists(path)
+                if not cached:
+                    rendering = self._rendering.get(path)
+                    if rendering is None:
+                        started = self.executor.submit(render_report, self.database_uri, row['student_id'],
+                                                       report_format, path)
+                        rendering = self._rendering[path] = (started, [])
+                    rendering[1].append(row['id'])
+            if cached:
+                job = self._complete(path, READY)[row['id']]
+            elif started is not None:
+                # Registered outside the lock: an already finished future runs the callback right here
+                started.add_done_callback(lambda done, path=path: self._finished(path, done))
+            jobs.append(job)
+        return jobs
+
+    # Completion
+
+    def _finished(self, path: str, future):
+        with self._lock:
+            self._rendering.pop(path, None)
+        error = future.exception()
+        if error is None:
+            self._remove_stale(path)
+        else:
+            logger.error(f"Error rendering report {os.path.basename(path)}: {error}")
+        self._complete(path, FAILED if error else READY, error)
+
+    def _complete(self, path: str, status: str, error: Optional[BaseException] = None) -> Dict[str, Dict]:
+        """Finish every pending job for the file at path, by job id"""
+        student, _, rest = os.path.basename(path).partition('-')
+        version, extension = os.path.splitext(rest)
+        pending = ((report_jobs.c.student_id == int(student)) & (report_jobs.c.version == version)
+                   & (report_jobs.c.format == extension[1:]) & (report_jobs.c.status == PENDING))
+        values = {'status': status, 'error': str(error) if error else None, 'finished_at': datetime.utcnow()}
+        with self.engine.begin() as connection:
+            rows = connection.execute(select(report_jobs).where(pending)).mappings().all()
+            connection.execute(update(report_jobs).where(pending).values(**values))
+        jobs = {}
+        for row in rows:
+            job = jobs[row['id']] = self._job(dict(row, **values))
+            if self.notify:
+                try:
+                    self.notify(job)
+                except Exception as e:
+                    logger.error(f"Error notifying report job {job['id']}: {e}")
+        return jobs
+
+    def _remove_stale(self, path: str):
+        """Drop the student's files for older data versions of the same format"""
+        name = os.path.basename(path)
+        student, _, rest = name.partition('-')
+        extension = os.path.splitext(rest)[1]
+        for entry in os.scandir(self.root):
+            if (entry.name != name and entry.name.startswith(f"{student}-")
+                    and entry.name.endswith(extension)):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    # Reads
+
+    @staticmethod
+    def _job(row) -> Dict:
+        job = dict(row)
+        for key in ('created_at', 'finished_at'):
+            if isinstance(job[key], datetime):
+                job[key] = job[key].isoformat()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.engine.connect() as connection:
+            row = connection.execute(select(report_jobs).where(report_jobs.c.id == job_id)).mappings().first()
+        return self._job(row) if row else None
+
+    def path_for(self, job: Dict) -> Optional[str]:
+        if job['status'] != READY:
+            return None
+        path = self.artifact_path(job['student_id'], job['version'], job['format'])
+        return path if os.path.exists(path) else None
+
+    def wait(self, job_ids: Iterable[str], timeout: Optional[float] = None) -> List[Dict]:
+        """Block until the given jobs finish (used by bulk runs and tests)"""
+        job_ids = list(job_ids)
+        with self._lock:
+            futures = [future for future, waiting in self._rendering.values()
+                       if any(job_id in waiting for job_id in job_ids)]
+        wait_futures(futures, timeout=timeout)
+        # Done callbacks may still be running on the pool's thread, or another worker is rendering
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while any((self.get(job_id) or {}).get('status') == PENDING for job_id in job_ids):
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        return [self.get(job_id) for job_id in job_ids]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -1,20 +1,21 @@
-import sqlite3
 import json
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from textblob import TextBlob
 import re
-import os
 from collections import defaultdict
 import numpy as np
+from sqlalchemy import insert, select, update
+from app.services.container import services
+from app.services.storage import storage as default_storage, emotion_logs, mood_patterns, crisis_alerts
 
 logger = logging.getLogger(__name__)
 
 class SentimentService:
-    def __init__(self):
-        self.db_path = "app/data/sentiment_analysis.db"
-        self.init_database()
+    def __init__(self, storage=None):
+        # Tables live on the main database; they are created on first use
+        self.storage = storage or default_storage
         
         # Child-specific emotion keywords
         self.emotion_keywords = {
@@ -84,56 +85,6 @@ class SentimentService:
             'solved', 'got it right', 'passed', 'succeeded'
         ]
     
-    def init_database(self):
-        """Initialize sentiment analysis database"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Emotion tracking table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS emotion_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                text_input TEXT,
-                detected_emotion TEXT,
-                sentiment_score REAL,
-                confidence REAL,
-                context TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                intervention_triggered BOOLEAN DEFAULT FALSE
-            )
-        ''')
-        
-        # Mood patterns table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mood_patterns (
-                user_id INTEGER,
-                date DATE,
-                dominant_emotion TEXT,
-                average_sentiment REAL,
-                emotion_counts TEXT,
-                activities_completed INTEGER,
-                PRIMARY KEY (user_id, date)
-            )
-        ''')
-        
-        # Crisis alerts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS crisis_alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                alert_text TEXT,
-                severity_level INTEGER,
-                handled BOOLEAN DEFAULT FALSE,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
     def analyze_text_sentiment(self, text: str, user_id: int, context: str = 'general') -> Dict:
         """Analyze sentiment of user text input"""
         try:
@@ -156,10 +107,12 @@ class SentimentService:
             response = self.generate_emotional_response(primary_emotion, polarity, crisis_detected)
             
             # Log the analysis
-            self.log_emotion_analysis(user_id, text, primary_emotion, polarity, subjectivity, context, crisis_detected)
-            
-            # Update mood patterns
-            self.update_mood_patterns(user_id, primary_emotion, polarity)
+            # The log entry and the day's mood pattern are written together
+            with self.storage.transaction():
+                self.log_emotion_analysis(user_id, text, primary_emotion, polarity, subjectivity, context, crisis_detected)
+                
+                # Update mood patterns
+                self.update_mood_patterns(user_id, primary_emotion, polarity)
             
             return {
                 'success': True,
@@ -286,81 +239,62 @@ class SentimentService:
                            sentiment_score: float, confidence: float, 
                            context: str, crisis_detected: bool):
         """Log emotion analysis to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO emotion_logs 
-            (user_id, text_input, detected_emotion, sentiment_score, confidence, context, intervention_triggered)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, text, emotion, sentiment_score, confidence, context, crisis_detected))
-        
-        if crisis_detected:
-            cursor.execute('''
-                INSERT INTO crisis_alerts (user_id, alert_text, severity_level)
-                VALUES (?, ?, ?)
-            ''', (user_id, text, 3))  # High severity
-        
-        conn.commit()
-        conn.close()
+        with self.storage.begin() as connection:
+            connection.execute(insert(emotion_logs).values(
+                user_id=user_id, text_input=text, detected_emotion=emotion, sentiment_score=sentiment_score,
+                confidence=confidence, context=context, intervention_triggered=crisis_detected
+            ))
+            
+            if crisis_detected:
+                connection.execute(insert(crisis_alerts).values(
+                    user_id=user_id, alert_text=text, severity_level=3  # High severity
+                ))
     
     def update_mood_patterns(self, user_id: int, emotion: str, sentiment_score: float):
         """Update daily mood patterns"""
         today = datetime.now().date()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get existing pattern for today
-        cursor.execute('''
-            SELECT emotion_counts, average_sentiment, activities_completed
-            FROM mood_patterns WHERE user_id=? AND date=?
-        ''', (user_id, today))
-        
-        result = cursor.fetchone()
-        
-        if result:
-            # Update existing pattern
-            emotion_counts = json.loads(result[0]) if result[0] else {}
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-            
-            # Update average sentiment
-            new_avg = (result[1] + sentiment_score) / 2
+        with self.storage.begin() as connection:
+            # Get existing pattern for today
+            result = connection.execute(
+                select(mood_patterns.c.emotion_counts, mood_patterns.c.average_sentiment)
+                .where(mood_patterns.c.user_id == user_id, mood_patterns.c.date == today)
+            ).first()
             
-            cursor.execute('''
-                UPDATE mood_patterns 
-                SET emotion_counts=?, average_sentiment=?, dominant_emotion=?
-                WHERE user_id=? AND date=?
-            ''', (json.dumps(emotion_counts), new_avg, 
-                  max(emotion_counts.items(), key=lambda x: x[1])[0], user_id, today))
-        else:
-            # Create new pattern
-            emotion_counts = {emotion: 1}
-            cursor.execute('''
-                INSERT INTO mood_patterns 
-                (user_id, date, dominant_emotion, average_sentiment, emotion_counts, activities_completed)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (user_id, today, emotion, sentiment_score, json.dumps(emotion_counts), 0))
-        
-        conn.commit()
-        conn.close()
+            if result:
+                # Update existing pattern
+                emotion_counts = json.loads(result[0]) if result[0] else {}
+                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+                
+                # Update average sentiment
+                new_avg = (result[1] + sentiment_score) / 2
+                
+                connection.execute(
+                    update(mood_patterns)
+                    .where(mood_patterns.c.user_id == user_id, mood_patterns.c.date == today)
+                    .values(emotion_counts=json.dumps(emotion_counts), average_sentiment=new_avg,
+                            dominant_emotion=max(emotion_counts.items(), key=lambda x: x[1])[0])
+                )
+            else:
+                # Create new pattern
+                emotion_counts = {emotion: 1}
+                connection.execute(insert(mood_patterns).values(
+                    user_id=user_id, date=today, dominant_emotion=emotion, average_sentiment=sentiment_score,
+                    emotion_counts=json.dumps(emotion_counts), activities_completed=0
+                ))
     
     def get_mood_insights(self, user_id: int, days: int = 7) -> Dict:
         """Get mood insights for the past N days"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
         
-        cursor.execute('''
-            SELECT date, dominant_emotion, average_sentiment, emotion_counts
-            FROM mood_patterns 
-            WHERE user_id=? AND date BETWEEN ? AND ?
-            ORDER BY date DESC
-        ''', (user_id, start_date, end_date))
-        
-        patterns = cursor.fetchall()
+        with self.storage.begin() as connection:
+            patterns = connection.execute(
+                select(mood_patterns.c.date, mood_patterns.c.dominant_emotion,
+                       mood_patterns.c.average_sentiment, mood_patterns.c.emotion_counts)
+                .where(mood_patterns.c.user_id == user_id, mood_patterns.c.date.between(start_date, end_date))
+                .order_by(mood_patterns.c.date.desc())
+            ).all()
         
         if not patterns:
             return {
@@ -390,8 +324,6 @@ class SentimentService:
         else:
             trend_direction = "stable"
         
-        conn.close()
-        
         return {
             'success': True,
             'most_common_emotion': most_common_emotion,
@@ -487,20 +419,15 @@ class SentimentService:
     
     def emotional_check_in(self, user_id: int) -> Dict:
         """Perform a quick emotional check-in"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         # Get recent emotional data
-        cursor.execute('''
-            SELECT detected_emotion, sentiment_score, timestamp
-            FROM emotion_logs 
-            WHERE user_id=? AND timestamp > datetime('now', '-24 hours')
-            ORDER BY timestamp DESC
-            LIMIT 10
-        ''', (user_id,))
-        
-        recent_emotions = cursor.fetchall()
-        conn.close()
+        with self.storage.begin() as connection:
+            recent_emotions = connection.execute(
+                select(emotion_logs.c.detected_emotion, emotion_logs.c.sentiment_score, emotion_logs.c.timestamp)
+                .where(emotion_logs.c.user_id == user_id,
+                       emotion_logs.c.timestamp > datetime.utcnow() - timedelta(hours=24))
+                .order_by(emotion_logs.c.timestamp.desc())
+                .limit(10)
+            ).all()
         
         if not recent_emotions:
             return {
@@ -555,5 +482,5 @@ class SentimentService:
         
         return encouragements.get(emotion, "You're doing amazing! 🌟 Keep being awesome!")
 
-# Global sentiment service instance
-sentiment_service = SentimentService()
\ No newline at end of file
+# Shared instance, built on first use
+sentiment_service = services.proxy('sentiment')
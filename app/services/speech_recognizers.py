@@ -0,0 +1,245 @@
+"""
+Speech Recognition Backends
+Pluggable speech-to-text engines behind VoiceService, including an offline
+DeepSpeech backend for air-gapped school nodes
+"""
+import os
+import wave
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import speech_recognition as sr
+    GOOGLE_SPEECH_AVAILABLE = True
+except ImportError:
+    GOOGLE_SPEECH_AVAILABLE = False
+
+try:
+    import deepspeech
+    DEEPSPEECH_AVAILABLE = True
+except ImportError:
+    DEEPSPEECH_AVAILABLE = False
+    logging.warning("deepspeech not available. Offline speech recognition will be disabled.")
+
+logger = logging.getLogger(__name__)
+
+# Audio clip as raw 16-bit mono PCM plus its sample rate
+Clip = Tuple[bytes, int]
+
+
+def read_wav_pcm(audio_path: str) -> Clip:
+    """Read a WAV file as 16-bit mono PCM, downmixing multi-channel audio"""
+    with wave.open(audio_path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit WAV audio, got {wav.getsampwidth() * 8}-bit")
+        channels = wav.getnchannels()
+        sample_rate = wav.getframerate()
+        pcm = wav.readframes(wav.getnframes())
+
+    if channels > 1:
+        samples = np.frombuffer(pcm, dtype='<i2').reshape(-1, channels)
+        pcm = samples.mean(axis=1).astype('<i2').tobytes()
+    return pcm, sample_rate
+
+
+def resample_pcm(pcm: bytes, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Linearly resample 16-bit PCM to target_rate, returning int16 samples"""
+    samples = np.frombuffer(pcm, dtype='<i2')
+    if sample_rate == target_rate or samples.size == 0:
+        return samples
+    duration = samples.size / sample_rate
+    target_times = np.arange(int(duration * target_rate)) / target_rate
+    source_times = np.arange(samples.size) / sample_rate
+    return np.interp(target_times, source_times, samples).astype(np.int16)
+
+
+class SpeechRecognizerBackend(ABC):
+    """Interface every speech-to-text backend implements"""
+
+    name = 'base'
+
+    @property
+    @abstractmethod
+    def available(self) -> bool:
+        """Whether the backend can transcribe anything in this environment"""
+
+    def supports_language(self, language: str) -> bool:
+        return True
+
+    @abstractmethod
+    def transcribe(self, pcm: bytes, sample_rate: int, language: str = 'en') -> Optional[str]:
+        """Transcribe one clip of 16-bit mono PCM"""
+
+    def transcribe_batch(self, clips: List[Clip], language: str = 'en') -> List[Optional[str]]:
+        """Transcribe many clips; backends override this when they can do better than a loop"""
+        return [self.transcribe(pcm, sample_rate, language) for pcm, sample_rate in clips]
+
+
+class GoogleSpeechRecognizer(SpeechRecognizerBackend):
+    """Online recognition through the Google Web Speech API"""
+
+    name = 'google'
+
+    def __init__(self, language_codes: Optional[Dict[str, str]] = None):
+        self.language_codes = language_codes or {}
+        self.recognizer = sr.Recognizer() if GOOGLE_SPEECH_AVAILABLE else None
+
+    @property
+    def available(self) -> bool:
+        return self.recognizer is not None
+
+    def transcribe(self, pcm: bytes, sample_rate: int, language: str = 'en') -> Optional[str]:
+        if not self.available or not pcm:
+            return None
+
+        try:
+            audio = sr.AudioData(pcm, sample_rate, 2)
+            language_code = self.language_codes.get(language, 'en-US')
+            return self.recognizer.recognize_google(audio, language=language_code).lower().strip()
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            logger.error(f"Speech recognition service error: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error in Google speech recognition: {e}")
+            return None
+
+
+class DeepSpeechRecognizer(SpeechRecognizerBackend):
+    """Offline CPU recognition with Mozilla DeepSpeech.
+
+    Models live in model_dir as <language>.pbmm with an optional
+    <language>.scorer next to them.  Each model is loaded once per process and
+    shared by every recognizer instance.
+    """
+
+    name = 'deepspeech'
+
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model_dir: str = 'data/models/deepspeech', beam_width: int = 500):
+        self.model_dir = model_dir
+        self.beam_width = beam_width
+
+    @property
+    def available(self) -> bool:
+        """True when deepspeech is installed and at least one language model is present"""
+        return DEEPSPEECH_AVAILABLE and bool(self.languages())
+
+    def languages(self) -> List[str]:
+        """Languages with a model in model_dir"""
+        try:
+            names = os.listdir(self.model_dir)
+        except OSError:
+            return []
+        return sorted(name[:-len('.pbmm')] for name in names if name.endswith('.pbmm'))
+
+    def model_path(self, language: str) -> str:
+        return os.path.join(self.model_dir, f"{language}.pbmm")
+
+    def supports_language(self, language: str) -> bool:
+        return os.path.exists(self.model_path(language))
+
+    def _get_model(self, language: str):
+        """Load the model for a language on first use; returns (model, inference lock)"""
+        path = self.model_path(language)
+        with self._models_lock:
+            if path not in self._models:
+                model = deepspeech.Model(path)
+                model.setBeamWidth(self.beam_width)
+                scorer_path = os.path.join(self.model_dir, f"{language}.scorer")
+                if os.path.exists(scorer_path):
+                    model.enableExternalScorer(scorer_path)
+                self._models[path] = (model, threading.Lock())
+                logger.info(f"Loaded DeepSpeech model {path}")
+            return self._models[path]
+
+    def transcribe(self, pcm: bytes, sample_rate: int, language: str = 'en') -> Optional[str]:
+        results = self.transcribe_batch([(pcm, sample_rate)], language)
+        return results[0] if results else None
+
+    def transcribe_batch(self, clips: List[Clip], language: str = 'en') -> List[Optional[str]]:
+        """Transcribe a backlog of clips with one model load and one lock acquisition"""
+        if not DEEPSPEECH_AVAILABLE or not self.supports_language(language):
+            return [None] * len(clips)
+
+        try:
+            model, inference_lock = self._get_model(language)
+        except Exception as e:
+            logger.error(f"Error loading DeepSpeech model for '{language}': {e}")
+            return [None] * len(clips)
+
+        target_rate = model.sampleRate()
+        buffers = [resample_pcm(pcm, rate, target_rate) if pcm else None for pcm, rate in clips]
+
+        results = []
+        with inference_lock:
+            for samples in buffers:
+                if samples is None or samples.size == 0:
+                    results.append(None)
+                    continue
+                try:
+                    text = model.stt(samples).lower().strip()
+                    results.append(text or None)
+                except Exception as e:
+                    logger.error(f"Error in DeepSpeech recognition: {e}")
+                    results.append(None)
+        return results
+
+
+class FallbackSpeechRecognizer(SpeechRecognizerBackend):
+    """Tries each backend in order until one returns a transcript"""
+
+    def __init__(self, backends: List[SpeechRecognizerBackend]):
+        self.backends = [backend for backend in backends if backend.available]
+        self.name = '+'.join(backend.name for backend in self.backends) or 'none'
+
+    @property
+    def available(self) -> bool:
+        return bool(self.backends)
+
+    def transcribe(self, pcm: bytes, sample_rate: int, language: str = 'en') -> Optional[str]:
+        for backend in self.backends:
+            if backend.supports_language(language):
+                text = backend.transcribe(pcm, sample_rate, language)
+                if text:
+                    return text
+        return None
+
+    def transcribe_batch(self, clips: List[Clip], language: str = 'en') -> List[Optional[str]]:
+        results = [None] * len(clips)
+        for backend in self.backends:
+            if not backend.supports_language(language):
+                continue
+            missing = [i for i, text in enumerate(results) if text is None]
+            if not missing:
+                break
+            for i, text in zip(missing, backend.transcribe_batch([clips[i] for i in missing], language)):
+                results[i] = text
+        return results
+
+
+def get_speech_recognizer(backend: Optional[str] = None,
+                          language_codes: Optional[Dict[str, str]] = None) -> SpeechRecognizerBackend:
+    """Build the configured recognizer.
+
+    SPEECH_RECOGNIZER_BACKEND may be 'deepspeech', 'google' or 'auto' (the
+    default), which prefers the offline model and falls back to Google.
+    """
+    backend = backend or os.environ.get('SPEECH_RECOGNIZER_BACKEND', 'auto')
+    model_dir = os.environ.get('DEEPSPEECH_MODEL_DIR', 'data/models/deepspeech')
+
+    if backend == 'deepspeech':
+        return DeepSpeechRecognizer(model_dir)
+    if backend == 'google':
+        return GoogleSpeechRecognizer(language_codes)
+    return FallbackSpeechRecognizer([
+        DeepSpeechRecognizer(model_dir),
+        GoogleSpeechRecognizer(language_codes)
+    ])
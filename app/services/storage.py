@@ -0,0 +1,206 @@
+"""
+Service Storage
+The tables the side services keep (sentiment, moderation, translation cache)
+on the main database, sharing its connection pool, pragmas and transactions
+"""
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import (Boolean, Column, Date, DateTime, Float, Index, Integer, MetaData, String, Table, Text,
+                        create_engine)
+
+from app.utils.sqlite_profile import apply_pragmas, is_file_database, profile_from_env
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+# Sentiment
+emotion_logs = Table(
+    'emotion_logs', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer),
+    Column('text_input', Text),
+    Column('detected_emotion', String(50)),
+    Column('sentiment_score', Float),
+    Column('confidence', Float),
+    Column('context', String(50)),
+    Column('timestamp', DateTime, default=datetime.utcnow),
+    Column('intervention_triggered', Boolean, default=False),
+    Index('ix_emotion_logs_user_timestamp', 'user_id', 'timestamp')
+)
+mood_patterns = Table(
+    'mood_patterns', metadata,
+    Column('user_id', Integer, primary_key=True),
+    Column('date', Date, primary_key=True),
+    Column('dominant_emotion', String(50)),
+    Column('average_sentiment', Float),
+    Column('emotion_counts', Text),  # JSON emotion -> count
+    Column('activities_completed', Integer, default=0)
+)
+crisis_alerts = Table(
+    'crisis_alerts', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, index=True),
+    Column('alert_text', Text),
+    Column('severity_level', Integer),
+    Column('handled', Boolean, default=False),
+    Column('timestamp', DateTime, default=datetime.utcnow)
+)
+
+# Moderation
+moderation_logs = Table(
+    'moderation_logs', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer),
+    Column('original_text', Text),
+    Column('filtered_text', Text),
+    Column('flags', Text),  # JSON array
+    Column('severity_level', Integer),
+    Column('action_taken', String(50)),
+    Column('timestamp', DateTime, default=datetime.utcnow),
+    Index('ix_moderation_logs_user_timestamp', 'user_id', 'timestamp')
+)
+positive_interactions = Table(
+    'positive_interactions', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer),
+    Column('interaction_text', Text),
+    Column('positive_score', Float),
+    Column('educational_value', String(50)),
+    Column('timestamp', DateTime, default=datetime.utcnow),
+    Index('ix_positive_interactions_user_timestamp', 'user_id', 'timestamp')
+)
+safety_alerts = Table(
+    'safety_alerts', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, index=True),
+    Column('alert_type', String(50)),
+    Column('content', Text),
+    Column('severity', Integer),
+    Column('handled', Boolean, default=False),
+    Column('timestamp', DateTime, default=datetime.utcnow)
+)
+
+# Translation
+translation_cache = Table(
+    'translation_cache', metadata,
+    Column('source_text', Text, primary_key=True),
+    Column('source_lang', String(10), primary_key=True),
+    Column('target_lang', String(10), primary_key=True),
+    Column('translated_text', Text),
+    Column('created_at', DateTime, default=datetime.utcnow)
+)
+
+
+class ServiceStorage:
+    """One engine and one set of tables for every service that keeps its own records.
+
+    Inside the Flask app the engine is the app's own (Flask-SQLAlchemy's
+    db.engine, with the SQLite profile's pool and pragmas); scripts and
+    workers without an app context get a standalone engine for DATABASE_URL
+    with the same profile.  Services write through begin(); wrapping several
+    service calls in transaction() makes them commit or roll back together.
+    In the app both go through db.session, so they also commit or roll back
+    with the ORM changes made in the same request.
+    """
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._fallback = None
+        self._ready = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def engine(self):
+        if self._engine is not None:
+            engine = self._engine
+        else:
+            engine = self._app_engine() or self._standalone_engine()
+        return self._prepared(engine)
+
+    def _prepared(self, engine):
+        """engine, with the service tables created on first use"""
+        if id(engine) not in self._ready:
+            with self._lock:
+                if id(engine) not in self._ready:
+                    metadata.create_all(engine)
+                    self._ready.add(id(engine))
+        return engine
+
+    @staticmethod
+    def _app_engine():
+        from flask import has_app_context
+        if not has_app_context():
+            return None
+        from app import db
+        return db.engine
+
+    def _standalone_engine(self):
+        if self._fallback is None:
+            uri = os.environ.get('DATABASE_URL') or 'sqlite:///eduhope.db'
+            profile = profile_from_env()
+            if profile['enabled'] and is_file_database(uri):
+                self._fallback = create_engine(uri, **profile['engine_options'])
+                apply_pragmas(self._fallback, profile['pragmas'])
+            else:
+                self._fallback = create_engine(uri)
+        return self._fallback
+
+    def _app_session(self):
+        """The app's db.session when these tables live on the app's own engine"""
+        if self._engine is not None or self._app_engine() is None:
+            return None
+        from app import db
+        return db.session
+
+    @contextmanager
+    def begin(self):
+        """Connection for one unit of service work, joining an enclosing transaction() if any.
+
+        Inside the app this is db.session's connection (after a flush), so
+        service writes see and commit with the request's pending ORM changes.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            yield connection
+            return
+        session = self._app_session()
+        if session is None:
+            with self.engine.begin() as connection:
+                yield connection
+            return
+        with self._session_transaction(session) as connection:
+            yield connection
+
+    @contextmanager
+    def transaction(self):
+        """Run several service writes in one transaction on this thread"""
+        if getattr(self._local, 'connection', None) is not None:
+            yield self._local.connection
+            return
+        session = self._app_session()
+        with (self.engine.begin() if session is None else self._session_transaction(session)) as connection:
+            self._local.connection = connection
+            try:
+                yield connection
+            finally:
+                self._local.connection = None
+
+    @contextmanager
+    def _session_transaction(self, session):
+        self._prepared(session.get_bind())
+        try:
+            session.flush()
+            yield session.connection()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+
+storage = ServiceStorage()
@@ -3,16 +3,18 @@ import json
 import logging
 from typing import Dict, List, Optional
 from functools import lru_cache
-import sqlite3
-import os
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.services.container import services
+from app.services.storage import storage as default_storage, translation_cache
 
 logger = logging.getLogger(__name__)
 
 class TranslationService:
-    def __init__(self):
+    def __init__(self, storage=None):
         self.base_url = "http://localhost:5000"  # LibreTranslate local server
-        self.cache_db = "app/data/translation_cache.db"
-        self.init_cache_db()
+        # Cache table lives on the main database; it is created on first use
+        self.storage = storage or default_storage
         
         # Kid-friendly language mapping
         self.language_pets = {
@@ -27,47 +29,34 @@ class TranslationService:
             'hurt', 'sad', 'angry', 'afraid', 'worry'
         ]
         
-    def init_cache_db(self):
-        """Initialize translation cache database"""
-        os.makedirs(os.path.dirname(self.cache_db), exist_ok=True)
-        
-        conn = sqlite3.connect(self.cache_db)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS translation_cache (
-                source_text TEXT,
-                source_lang TEXT,
-                target_lang TEXT,
-                translated_text TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (source_text, source_lang, target_lang)
-            )
-        ''')
-        conn.commit()
-        conn.close()
-    
     def get_cached_translation(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
         """Get translation from cache"""
-        conn = sqlite3.connect(self.cache_db)
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT translated_text FROM translation_cache WHERE source_text=? AND source_lang=? AND target_lang=?',
-            (text, source_lang, target_lang)
-        )
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
+        with self.storage.begin() as connection:
+            return connection.execute(
+                select(translation_cache.c.translated_text).where(
+                    translation_cache.c.source_text == text,
+                    translation_cache.c.source_lang == source_lang,
+                    translation_cache.c.target_lang == target_lang
+                )
+            ).scalar()
     
     def cache_translation(self, text: str, source_lang: str, target_lang: str, translation: str):
         """Cache translation result"""
-        conn = sqlite3.connect(self.cache_db)
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT OR REPLACE INTO translation_cache (source_text, source_lang, target_lang, translated_text) VALUES (?, ?, ?, ?)',
-            (text, source_lang, target_lang, translation)
-        )
-        conn.commit()
-        conn.close()
+        key = (translation_cache.c.source_text == text, translation_cache.c.source_lang == source_lang,
+               translation_cache.c.target_lang == target_lang)
+        try:
+            with self.storage.begin() as connection:
+                replaced = connection.execute(
+                    update(translation_cache).where(*key).values(translated_text=translation)
+                ).rowcount
+                if not replaced:
+                    connection.execute(insert(translation_cache).values(
+                        source_text=text, source_lang=source_lang, target_lang=target_lang,
+                        translated_text=translation
+                    ))
+        except IntegrityError:
+            # Another worker cached the same translation first
+            pass
     
     def make_child_friendly(self, text: str) -> str:
         """Replace inappropriate words with child-friendly alternatives"""
@@ -299,5 +288,5 @@ class TranslationService:
             logger.error(f"Language detection failed: {e}")
             return {'success': False, 'language': 'en', 'confidence': 0}
 
-# Global translation service instance
-translation_service = TranslationService()
\ No newline at end of file
+# Shared instance, built on first use
+translation_service = services.proxy('translation')
@@ -0,0 +1,109 @@
+"""
+Voice Pattern Store
+Database-backed per-user voice score history with an in-process read cache
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import db
+from app.models.voice_pattern import VoicePattern
+
+logger = logging.getLogger(__name__)
+
+
+class VoicePatternStore:
+    """Cache in front of the voice_patterns table that every worker agrees on.
+
+    Each row carries a version that every write bumps.  record() is an
+    optimistic read-modify-write: when another worker wrote the same user's
+    ring in between, the versioned UPDATE matches nothing and the record is
+    reapplied on the fresh row.  get() serves the cached snapshot without
+    touching the database; it may trail another worker's write until this
+    worker records for the same user, which always reloads the row first.
+    """
+
+    def __init__(self, max_entries: int = 10000, attempts: int = 5):
+        self.max_entries = max_entries
+        self.attempts = attempts
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_get(self, user_id: int) -> Optional[Dict]:
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if not entry:
+                return None
+            self._cache.move_to_end(user_id)
+            return entry[1]
+
+    def _cache_put(self, user_id: int, version: int, snapshot: Dict):
+        with self._lock:
+            self._cache[user_id] = (version, snapshot)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def get(self, user_id: int) -> Optional[Dict]:
+        """Current voice pattern snapshot for a user, or None if they have no history"""
+        snapshot = self._cache_get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        try:
+            pattern = VoicePattern.query.filter_by(user_id=user_id).populate_existing().first()
+        except Exception as e:
+            logger.error(f"Error loading voice patterns for user {user_id}: {e}")
+            return None
+
+        if not pattern:
+            return None
+
+        snapshot = pattern.to_dict()
+        self._cache_put(user_id, pattern.version, snapshot)
+        return snapshot
+
+    def record(self, user_id: int, clarity: float, confidence: float) -> Optional[Dict]:
+        """Append one analysis result, retrying when another worker wrote the same ring first"""
+        for _ in range(self.attempts):
+            try:
+                pattern = VoicePattern.query.filter_by(user_id=user_id).populate_existing().first()
+                if not pattern:
+                    pattern = VoicePattern(user_id=user_id)
+                    db.session.add(pattern)
+
+                pattern.record(clarity, confidence)
+                db.session.commit()
+            except (StaleDataError, IntegrityError) as e:
+                # Lost the race (a newer version, or a concurrent first insert); reload and reapply
+                logger.debug(f"Retrying voice pattern write for user {user_id}: {e}")
+                db.session.rollback()
+                continue
+            except OperationalError as e:
+                db.session.rollback()
+                if 'locked' in str(e):
+                    continue
+                logger.error(f"Error saving voice patterns for user {user_id}: {e}")
+                self.invalidate(user_id)
+                return None
+            except Exception as e:
+                logger.error(f"Error saving voice patterns for user {user_id}: {e}")
+                db.session.rollback()
+                self.invalidate(user_id)
+                return None
+
+            snapshot = pattern.to_dict()
+            self._cache_put(user_id, pattern.version, snapshot)
+            return snapshot
+
+        logger.error(f"Gave up saving voice patterns for user {user_id} after {self.attempts} conflicting writes")
+        self.invalidate(user_id)
+        return None
@@ -1,6 +1,5 @@
 import os
 import json
-import tempfile
 import wave
 import numpy as np
 from typing import Dict, List, Optional, Tuple
@@ -9,6 +8,12 @@ import threading
 import time
 from datetime import datetime
 
+from app.services.audio_scratch_service import get_audio_scratch_space
+from app.services.container import services
+from app.services.pronunciation_service import PronunciationScorer
+from app.services.speech_recognizers import get_speech_recognizer, read_wav_pcm
+from app.services.voice_pattern_store import VoicePatternStore
+
 # Speech recognition and synthesis
 try:
     import speech_recognition as sr
@@ -29,8 +34,9 @@ class VoiceService:
         self.tts_engine = None
         self.microphone = None
         self.is_listening = False
-        self.voice_patterns = {}
+        self.voice_patterns = VoicePatternStore()
         self.pronunciation_feedback = {}
+        self.pronunciation_scorer = PronunciationScorer()
         self.supported_languages = {
             'en': 'en-US',
             'es': 'es-ES', 
@@ -39,6 +45,9 @@ class VoiceService:
             'hi': 'hi-IN',
             'zh': 'zh-CN'
         }
+        self.speech_backend = get_speech_recognizer(language_codes=self.supported_languages)
+        self.audio_scratch = get_audio_scratch_space()
+        self.audio_scratch.start_sweeper()
         self.initialize_voice_services()
         
     def initialize_voice_services(self):
@@ -142,21 +151,18 @@ class VoiceService:
                 audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=10)
                 
             # Convert speech to text
-            language_code = self.supported_languages.get(language, 'en-US')
-            text = self.recognizer.recognize_google(audio, language=language_code)
+            text = self.transcribe_pcm(audio.get_raw_data(convert_width=2), audio.sample_rate, language)
+            
+            if not text:
+                logger.info("Could not understand speech")
+                return None
             
             logger.info(f"Recognized speech: {text}")
-            return text.lower().strip()
+            return text
             
         except sr.WaitTimeoutError:
             logger.info("Speech recognition timeout")
             return None
-        except sr.UnknownValueError:
-            logger.info("Could not understand speech")
-            return None
-        except sr.RequestError as e:
-            logger.error(f"Speech recognition service error: {e}")
-            return None
         except Exception as e:
             logger.error(f"Error in speech recognition: {e}")
             return None
@@ -189,62 +195,166 @@ class VoiceService:
     def analyze_pronunciation(self, target_word: str, user_audio_path: str, 
                             language: str = 'en') -> Dict:
         """Analyze pronunciation accuracy"""
-        if not SPEECH_AVAILABLE:
+        try:
+            # Prefer acoustic comparison against the reference clip when one exists
+            acoustic = self.pronunciation_scorer.score(target_word, user_audio_path, language)
+            if acoustic:
+                accuracy = acoustic['overall_score']
+                return {
+                    'accuracy_score': accuracy,
+                    'feedback': self.generate_pronunciation_feedback(target_word, '', accuracy),
+                    'suggestions': self.get_pronunciation_suggestions(target_word, '', accuracy),
+                    'phoneme_windows': acoustic['phoneme_windows'],
+                    'weak_windows': acoustic['weak_windows'],
+                    'scoring_method': 'acoustic'
+                }
+            
+            return self._transcript_result(target_word, self.transcribe_audio_file(user_audio_path, language))
+            
+        except Exception as e:
+            logger.error(f"Error analyzing pronunciation: {e}")
+            return {
+                'accuracy_score': 0.3,
+                'feedback': "Let's try that again! Practice makes perfect!",
+                'suggestions': ["Keep practicing", "Listen carefully", "Try again"]
+            }
+    
+    def _transcript_result(self, target_word: str, user_text: Optional[str]) -> Dict:
+        """Score a recording by comparing its transcript with the target word"""
+        if not self.speech_backend.available:
             return {
                 'accuracy_score': 0.5,
                 'feedback': "Pronunciation analysis not available",
                 'suggestions': []
             }
+        
+        if not user_text:
+            return {
+                'accuracy_score': 0.0,
+                'feedback': "Could not understand your pronunciation. Try speaking more clearly!",
+                'suggestions': ["Speak louder", "Speak more slowly", "Try again"]
+            }
+        
+        accuracy = self.calculate_pronunciation_accuracy(target_word, user_text)
+        return {
+            'accuracy_score': accuracy,
+            'feedback': self.generate_pronunciation_feedback(target_word, user_text, accuracy),
+            'suggestions': self.get_pronunciation_suggestions(target_word, user_text, accuracy),
+            'recognized_text': user_text,
+            'scoring_method': 'transcript'
+        }
+    
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int = 16000, language: str = 'en') -> Optional[str]:
+        """Transcribe raw 16-bit mono PCM, e.g. an utterance streamed from the browser"""
+        if not self.speech_backend.available or not pcm:
+            return None
             
         try:
-            # Get user's pronunciation
-            user_text = self.transcribe_audio_file(user_audio_path, language)
+            return self.speech_backend.transcribe(pcm, sample_rate, language)
             
-            if not user_text:
+        except Exception as e:
+            logger.error(f"Error transcribing streamed audio: {e}")
+            return None
+    
+    def analyze_pronunciation_pcm(self, target_word: str, pcm: bytes, sample_rate: int = 16000,
+                                  language: str = 'en') -> Dict:
+        """Analyze pronunciation of an in-memory utterance without touching disk"""
+        try:
+            samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768.0
+            acoustic = self.pronunciation_scorer.score_samples(target_word, samples, sample_rate, language)
+            user_text = self.transcribe_pcm(pcm, sample_rate, language)
+            
+            if acoustic:
+                accuracy = acoustic['overall_score']
+                result = {
+                    'phoneme_windows': acoustic['phoneme_windows'],
+                    'weak_windows': acoustic['weak_windows'],
+                    'scoring_method': 'acoustic'
+                }
+            elif user_text:
+                accuracy = self.calculate_pronunciation_accuracy(target_word, user_text)
+                result = {'scoring_method': 'transcript'}
+            else:
                 return {
                     'accuracy_score': 0.0,
                     'feedback': "Could not understand your pronunciation. Try speaking more clearly!",
                     'suggestions': ["Speak louder", "Speak more slowly", "Try again"]
                 }
             
-            # Simple pronunciation analysis
-            accuracy = self.calculate_pronunciation_accuracy(target_word, user_text)
-            feedback = self.generate_pronunciation_feedback(target_word, user_text, accuracy)
-            suggestions = self.get_pronunciation_suggestions(target_word, user_text, accuracy)
-            
-            return {
+            result.update({
                 'accuracy_score': accuracy,
-                'feedback': feedback,
-                'suggestions': suggestions,
+                'feedback': self.generate_pronunciation_feedback(target_word, user_text or '', accuracy),
+                'suggestions': self.get_pronunciation_suggestions(target_word, user_text or '', accuracy),
                 'recognized_text': user_text
-            }
+            })
+            return result
             
         except Exception as e:
-            logger.error(f"Error analyzing pronunciation: {e}")
+            logger.error(f"Error analyzing streamed pronunciation: {e}")
             return {
                 'accuracy_score': 0.3,
                 'feedback': "Let's try that again! Practice makes perfect!",
                 'suggestions': ["Keep practicing", "Listen carefully", "Try again"]
             }
     
+    def score_pronunciation_exercise(self, words: List[str], audio_paths: List[str],
+                                     language: str = 'en') -> List[Dict]:
+        """Score every recording of a pronunciation exercise in one pass"""
+        acoustic_results = self.pronunciation_scorer.score_batch(list(zip(words, audio_paths)), language)
+        # Recordings the acoustic scorer could not handle fall back to their transcripts, transcribed in one batch
+        unscored = [audio_path for audio_path, acoustic in zip(audio_paths, acoustic_results) if not acoustic]
+        transcripts = iter(self.transcribe_audio_files(unscored, language) if unscored else [])
+        
+        results = []
+        for word, audio_path, acoustic in zip(words, audio_paths, acoustic_results):
+            if acoustic:
+                accuracy = acoustic['overall_score']
+                results.append({
+                    'word': word,
+                    'accuracy_score': accuracy,
+                    'feedback': self.generate_pronunciation_feedback(word, '', accuracy),
+                    'phoneme_windows': acoustic['phoneme_windows'],
+                    'weak_windows': acoustic['weak_windows'],
+                    'scoring_method': 'acoustic'
+                })
+            else:
+                result = self._transcript_result(word, next(transcripts))
+                result['word'] = word
+                results.append(result)
+        
+        return results
+    
     def transcribe_audio_file(self, audio_path: str, language: str = 'en') -> Optional[str]:
         """Transcribe audio file to text"""
-        if not SPEECH_AVAILABLE or not self.recognizer:
+        if not self.speech_backend.available:
             return None
             
         try:
-            with sr.AudioFile(audio_path) as source:
-                audio = self.recognizer.record(source)
-                
-            language_code = self.supported_languages.get(language, 'en-US')
-            text = self.recognizer.recognize_google(audio, language=language_code)
-            
-            return text.lower().strip()
+            pcm, sample_rate = read_wav_pcm(audio_path)
+            return self.speech_backend.transcribe(pcm, sample_rate, language)
             
         except Exception as e:
             logger.error(f"Error transcribing audio file: {e}")
             return None
     
+    def transcribe_audio_files(self, audio_paths: List[str], language: str = 'en') -> List[Optional[str]]:
+        """Transcribe a backlog of submitted clips in one batch"""
+        if not self.speech_backend.available:
+            return [None] * len(audio_paths)
+        
+        clips, positions = [], []
+        for i, audio_path in enumerate(audio_paths):
+            try:
+                clips.append(read_wav_pcm(audio_path))
+                positions.append(i)
+            except Exception as e:
+                logger.error(f"Error reading audio file {audio_path}: {e}")
+        
+        results = [None] * len(audio_paths)
+        for i, text in zip(positions, self.speech_backend.transcribe_batch(clips, language)):
+            results[i] = text
+        return results
+    
     def calculate_pronunciation_accuracy(self, target: str, recognized: str) -> float:
         """Calculate pronunciation accuracy score"""
         target = target.lower().strip()
@@ -377,12 +487,8 @@ class VoiceService:
                 logger.info(f"Recording for {duration} seconds...")
                 audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=duration)
             
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-            with open(temp_file.name, 'wb') as f:
-                f.write(audio.get_wav_data())
-            
-            return temp_file.name
+            # Save to a tracked scratch file; callers may release() it early
+            return self.audio_scratch.write_bytes(audio.get_wav_data(), suffix='.wav')
             
         except Exception as e:
             logger.error(f"Error recording voice: {e}")
@@ -391,32 +497,18 @@ class VoiceService:
     def analyze_speech_patterns(self, user_id: int, audio_path: str) -> Dict:
         """Analyze user's speech patterns for personalized learning"""
         try:
-            if user_id not in self.voice_patterns:
-                self.voice_patterns[user_id] = {
-                    'clarity_scores': [],
-                    'confidence_scores': [],
-                    'preferred_pace': 'normal',
-                    'common_mistakes': [],
-                    'improvement_areas': [],
-                    'last_analysis': datetime.now()
-                }
-            
-            # Simple analysis (in real implementation, would use more sophisticated audio analysis)
-            patterns = self.voice_patterns[user_id]
+            # Measure clarity and confidence from the recording itself
+            quality = self.pronunciation_scorer.analyze_voice_quality(audio_path)
+            if not quality:
+                raise ValueError("Voice quality analysis not available")
             
-            # Simulate analysis results
-            clarity_score = np.random.uniform(0.6, 0.9)  # In real app, would analyze actual audio
-            confidence_score = np.random.uniform(0.5, 0.8)
+            clarity_score = quality['clarity_score']
+            confidence_score = quality['confidence_score']
             
-            patterns['clarity_scores'].append(clarity_score)
-            patterns['confidence_scores'].append(confidence_score)
-            patterns['last_analysis'] = datetime.now()
-            
-            # Keep only recent scores
-            if len(patterns['clarity_scores']) > 10:
-                patterns['clarity_scores'] = patterns['clarity_scores'][-10:]
-            if len(patterns['confidence_scores']) > 10:
-                patterns['confidence_scores'] = patterns['confidence_scores'][-10:]
+            # Persist into the user's bounded score history
+            patterns = self.voice_patterns.record(user_id, clarity_score, confidence_score)
+            if not patterns:
+                raise RuntimeError("Voice pattern store unavailable")
             
             return {
                 'clarity_score': clarity_score,
@@ -460,7 +552,7 @@ class VoiceService:
         recommendations = []
         
         if patterns['clarity_scores']:
-            avg_clarity = sum(patterns['clarity_scores']) / len(patterns['clarity_scores'])
+            avg_clarity = patterns['average_clarity']
             if avg_clarity < 0.6:
                 recommendations.extend([
                     "Try speaking more slowly",
@@ -475,7 +567,7 @@ class VoiceService:
                 ])
         
         if patterns['confidence_scores']:
-            avg_confidence = sum(patterns['confidence_scores']) / len(patterns['confidence_scores'])
+            avg_confidence = patterns['average_confidence']
             if avg_confidence < 0.5:
                 recommendations.extend([
                     "Don't worry about mistakes - they help you learn!",
@@ -490,11 +582,11 @@ class VoiceService:
     
     def create_personalized_voice_lesson(self, user_id: int, topic: str = 'general') -> Dict:
         """Create a personalized voice lesson based on user's progress"""
-        patterns = self.voice_patterns.get(user_id, {})
+        patterns = self.voice_patterns.get(user_id)
         
         # Determine difficulty based on user's performance
-        if patterns and patterns.get('clarity_scores'):
-            avg_clarity = sum(patterns['clarity_scores']) / len(patterns['clarity_scores'])
+        if patterns and patterns['clarity_scores']:
+            avg_clarity = patterns['average_clarity']
             if avg_clarity < 0.6:
                 difficulty = 'easy'
             elif avg_clarity > 0.8:
@@ -598,7 +690,8 @@ class VoiceService:
     
     def get_voice_statistics(self, user_id: int) -> Dict:
         """Get voice usage statistics for a user"""
-        if user_id not in self.voice_patterns:
+        patterns = self.voice_patterns.get(user_id)
+        if not patterns:
             return {
                 'total_sessions': 0,
                 'average_clarity': 0,
@@ -606,28 +699,26 @@ class VoiceService:
                 'favorite_activities': []
             }
         
-        patterns = self.voice_patterns[user_id]
-        
         return {
-            'total_sessions': len(patterns.get('clarity_scores', [])),
-            'average_clarity': sum(patterns.get('clarity_scores', [0])) / max(1, len(patterns.get('clarity_scores', [1]))),
-            'average_confidence': sum(patterns.get('confidence_scores', [0])) / max(1, len(patterns.get('confidence_scores', [1]))),
+            'total_sessions': patterns['total_sessions'],
+            'average_clarity': patterns['average_clarity'],
+            'average_confidence': patterns['average_confidence'],
             'improvement_trend': self.calculate_improvement_trend(patterns),
             'last_activity': patterns.get('last_analysis'),
             'recommendations': self.get_speech_recommendations(patterns)
         }
     
-    def cleanup_temp_files(self):
-        """Clean up temporary audio files"""
+    def release_recording(self, audio_path: str):
+        """Delete a recording from record_user_voice once it has been processed"""
+        self.audio_scratch.release(audio_path)
+    
+    def cleanup_temp_files(self) -> int:
+        """Evict expired or over-budget audio files from the scratch space"""
         try:
-            temp_dir = tempfile.gettempdir()
-            for filename in os.listdir(temp_dir):
-                if filename.endswith('.wav') and 'speech_' in filename:
-                    file_path = os.path.join(temp_dir, filename)
-                    if os.path.getctime(file_path) < time.time() - 3600:  # Older than 1 hour
-                        os.remove(file_path)
+            return self.audio_scratch.sweep()
         except Exception as e:
             logger.error(f"Error cleaning up temp files: {e}")
+            return 0
 
-# Global instance
-voice_service = VoiceService()
\ No newline at end of file
+# Shared instance, built on first use
+voice_service = services.proxy('voice')
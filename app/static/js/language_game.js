@@ -53,6 +53,15 @@ class LanguageGameEngine {
         this.socket.on('progress_updated', (data) => {
             this.updateProgress(data);
         });
+        
+        // Streamed pronunciation feedback
+        this.socket.on('pronunciation_partial', (data) => {
+            this.showStreamingFeedback(data);
+        });
+        
+        this.socket.on('pronunciation_result', (data) => {
+            this.handleStreamedResult(data);
+        });
     }
     
     initializeSpeechRecognition() {
@@ -316,27 +325,43 @@ class LanguageGameEngine {
     }
     
     recordPronunciation() {
+        // Stream microphone audio to the server (VAD + acoustic scoring);
+        // browser speech recognition is only used where capture is unavailable
+        if (this.isRecording) {
+            if (this.mediaStream) {
+                this.stopAudioStream();
+            } else {
+                this.stopSpeechRecognition();
+            }
+        } else if (navigator.mediaDevices && navigator.mediaDevices.getUserMedia) {
+            this.startAudioStream();
+        } else {
+            this.startSpeechRecognition();
+        }
+    }
+    
+    startSpeechRecognition() {
         if (!this.speechRecognition) {
             this.showFeedback('Speech recognition not supported', 'wrong');
             return;
         }
         
         const recordBtn = document.querySelector('.record-btn');
+        this.isRecording = true;
+        recordBtn.classList.add('recording');
+        recordBtn.innerHTML = '<i class="fas fa-stop"></i> Stop Recording';
         
-        if (!this.isRecording) {
-            this.isRecording = true;
-            recordBtn.classList.add('recording');
-            recordBtn.innerHTML = '<i class="fas fa-stop"></i> Stop Recording';
-            
-            this.speechRecognition.start();
-            this.challengeStartTime = Date.now();
-        } else {
-            this.isRecording = false;
-            recordBtn.classList.remove('recording');
-            recordBtn.innerHTML = '<i class="fas fa-microphone"></i> Record';
-            
-            this.speechRecognition.stop();
-        }
+        this.speechRecognition.start();
+        this.challengeStartTime = Date.now();
+    }
+    
+    stopSpeechRecognition() {
+        const recordBtn = document.querySelector('.record-btn');
+        this.isRecording = false;
+        recordBtn.classList.remove('recording');
+        recordBtn.innerHTML = '<i class="fas fa-microphone"></i> Record';
+        
+        this.speechRecognition.stop();
     }
     
     handleSpeechResult(result) {
@@ -376,6 +401,113 @@ class LanguageGameEngine {
         }, 3000);
     }
     
+    async startAudioStream() {
+        try {
+            this.mediaStream = await navigator.mediaDevices.getUserMedia({ audio: true });
+        } catch (error) {
+            if (this.speechRecognition) {
+                this.startSpeechRecognition();
+            } else {
+                this.handleSpeechError(error);
+            }
+            return;
+        }
+        
+        const targetRate = 16000;
+        this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
+        const source = this.audioContext.createMediaStreamSource(this.mediaStream);
+        this.audioProcessor = this.audioContext.createScriptProcessor(4096, 1, 1);
+        const ratio = this.audioContext.sampleRate / targetRate;
+        
+        this.socket.emit('start_audio_stream', {
+            word: this.currentChallenge ? this.currentChallenge.word : null,
+            language: 'en',
+            sample_rate: targetRate
+        });
+        
+        this.audioProcessor.onaudioprocess = (event) => {
+            // Downsample to 16 kHz 16-bit PCM before sending
+            const input = event.inputBuffer.getChannelData(0);
+            const pcm = new Int16Array(Math.floor(input.length / ratio));
+            for (let i = 0; i < pcm.length; i++) {
+                const sample = Math.max(-1, Math.min(1, input[Math.floor(i * ratio)]));
+                pcm[i] = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+            }
+            this.socket.emit('audio_chunk', pcm.buffer);
+        };
+        
+        source.connect(this.audioProcessor);
+        this.audioProcessor.connect(this.audioContext.destination);
+        
+        this.isRecording = true;
+        const recordBtn = document.querySelector('.record-btn');
+        recordBtn.classList.add('recording');
+        recordBtn.innerHTML = '<i class="fas fa-stop"></i> Stop Recording';
+        this.challengeStartTime = Date.now();
+    }
+    
+    stopAudioStream() {
+        if (this.audioProcessor) {
+            this.audioProcessor.disconnect();
+            this.audioProcessor = null;
+        }
+        if (this.audioContext) {
+            this.audioContext.close();
+            this.audioContext = null;
+        }
+        if (this.mediaStream) {
+            this.mediaStream.getTracks().forEach(track => track.stop());
+            this.mediaStream = null;
+        }
+        
+        this.socket.emit('stop_audio_stream', {});
+        
+        this.isRecording = false;
+        const recordBtn = document.querySelector('.record-btn');
+        recordBtn.classList.remove('recording');
+        recordBtn.innerHTML = '<i class="fas fa-microphone"></i> Record';
+    }
+    
+    showStreamingFeedback(data) {
+        // Server text is set as textContent, never parsed as markup
+        const feedbackDiv = document.getElementById('pronunciationFeedback');
+        feedbackDiv.innerHTML = `
+            <div class="pronunciation-result">
+                <p>I hear: "<strong class="recognized-text"></strong>"</p>
+                <p>Accuracy so far: ${Math.round(data.accuracy_score * 100)}%</p>
+            </div>
+        `;
+        feedbackDiv.querySelector('.recognized-text').textContent = data.recognized || '';
+    }
+    
+    handleStreamedResult(data) {
+        if (this.isRecording) {
+            this.stopAudioStream();
+        }
+        
+        const feedbackDiv = document.getElementById('pronunciationFeedback');
+        const isCorrect = data.accuracy_score >= 0.7;
+        
+        feedbackDiv.innerHTML = `
+            <div class="pronunciation-result ${isCorrect ? 'correct' : 'wrong'}">
+                <h3>${isCorrect ? '🎉 Great!' : '🤔 Try Again'}</h3>
+                <p class="feedback-text"></p>
+                <p>Accuracy: ${Math.round(data.accuracy_score * 100)}%</p>
+            </div>
+        `;
+        feedbackDiv.querySelector('.feedback-text').textContent = data.feedback || '';
+        
+        this.handleAnswerResult(isCorrect);
+        
+        setTimeout(() => {
+            if (this.lives > 0) {
+                this.nextChallenge();
+            } else {
+                this.endGame();
+            }
+        }, 3000);
+    }
+    
     handleSpeechError(error) {
         const feedbackDiv = document.getElementById('pronunciationFeedback');
         feedbackDiv.innerHTML = `
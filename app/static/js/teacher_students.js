@@ -0,0 +1,100 @@
+// Teacher student list: fetches keyset-paginated pages as the teacher scrolls
+class StudentList {
+    constructor(container) {
+        this.container = container;
+        this.body = container.querySelector('tbody');
+        this.sentinel = container.querySelector('.student-list-sentinel');
+        this.endpoint = container.dataset.endpoint;
+        this.sort = 'points';
+        this.order = 'desc';
+        this.cursor = null;
+        this.loading = false;
+        this.finished = false;
+        this.setupEventListeners();
+        this.reset();
+    }
+
+    setupEventListeners() {
+        this.container.querySelectorAll('th[data-sort]').forEach(header => {
+            header.addEventListener('click', () => {
+                const sort = header.dataset.sort;
+                this.order = this.sort === sort && this.order === 'desc' ? 'asc' : 'desc';
+                this.sort = sort;
+                this.reset();
+            });
+        });
+
+        // Load the next page whenever the end of the list scrolls into view
+        this.observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                this.loadNextPage();
+            }
+        }, { rootMargin: '200px' });
+        this.observer.observe(this.sentinel);
+    }
+
+    reset() {
+        this.body.innerHTML = '';
+        this.cursor = null;
+        this.finished = false;
+        this.generation = (this.generation || 0) + 1;
+        this.loadNextPage();
+    }
+
+    async loadNextPage() {
+        if (this.loading || this.finished) return;
+        this.loading = true;
+        const generation = this.generation;
+        const params = new URLSearchParams({ sort: this.sort, order: this.order, limit: 50 });
+        if (this.cursor) params.set('after', this.cursor);
+
+        try {
+            const response = await fetch(`${this.endpoint}?${params}`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const page = await response.json();
+            // Drop the page if a newer sort was chosen while it was in flight
+            if (generation === this.generation) {
+                page.students.forEach(student => this.body.appendChild(this.renderRow(student)));
+                this.cursor = page.next_cursor;
+                this.finished = !page.next_cursor;
+            }
+        } catch (error) {
+            console.error('Failed to load students:', error);
+            this.finished = generation === this.generation;
+        } finally {
+            this.loading = false;
+        }
+
+        // Restart for a newer sort, or keep going while short pages leave the sentinel on screen
+        if (generation !== this.generation || (!this.finished && this.sentinelVisible())) {
+            this.loadNextPage();
+        }
+    }
+
+    sentinelVisible() {
+        const rect = this.sentinel.getBoundingClientRect();
+        return rect.top < window.innerHeight + 200;
+    }
+
+    renderRow(student) {
+        const row = document.createElement('tr');
+        const lastActive = student.last_active ? new Date(student.last_active).toLocaleDateString() : '-';
+        [student.full_name || student.username, student.level, student.total_points,
+         `${student.average_score}%`, lastActive].forEach(value => {
+            const cell = document.createElement('td');
+            cell.textContent = value;
+            row.appendChild(cell);
+        });
+        row.addEventListener('click', () => {
+            window.location.href = `/teacher/student/${student.id}`;
+        });
+        return row;
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const container = document.getElementById('student-list');
+    if (container) {
+        window.studentList = new StudentList(container);
+    }
+});
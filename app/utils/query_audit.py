@@ -0,0 +1,158 @@
+"""
+Query plan audit for the hot filter paths.
+
+Each registered hot query is run through EXPLAIN QUERY PLAN and the audit fails
+when SQLite would answer it by scanning a whole table instead of an index.
+
+    python -m app.utils.query_audit                  # the schema as the models declare it
+    python -m app.utils.query_audit sqlite:///eduhope.db
+"""
+import re
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import MetaData, create_engine, func, select, text, tuple_
+
+# name -> builder(tables) returning a select over the audited metadata
+HOT_QUERIES: Dict[str, Callable] = {}
+
+# "SCAN users" is a full table scan; "SCAN users USING INDEX ..." walks an index in order
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?! USING)')
+
+# Bound into the audited statements; any value gives the same plan
+SINCE = datetime(2026, 1, 1)
+
+
+def hot_query(name: str):
+    """Register a query shape that must stay on an index"""
+    def register(builder: Callable) -> Callable:
+        HOT_QUERIES[name] = builder
+        return builder
+    return register
+
+
+def schema_metadata() -> MetaData:
+    """Every model table on one MetaData (the models are spread over several)"""
+    from app.models.chat import ChatMessage, ChatSession
+    from app.models.emotion import EmotionalState, SupportSession
+    from app.models.game_progress import GameProgress
+    from app.models.lesson import Lesson, UserProgress
+    from app.models.pet import Pet
+    from app.models.story import Story, StoryCollaboration
+    from app.models.user import LearningSession, User
+
+    metadata = MetaData()
+    for model in (User, LearningSession, GameProgress, EmotionalState, SupportSession, ChatSession,
+                  ChatMessage, Pet, Story, StoryCollaboration, Lesson, UserProgress):
+        model.__table__.to_metadata(metadata)
+    return metadata
+
+
+@hot_query('recent learning sessions')
+def _recent_learning_sessions(t):
+    sessions = t['learning_sessions']
+    return (select(sessions).where(sessions.c.user_id == 1, sessions.c.timestamp >= SINCE)
+            .order_by(sessions.c.timestamp.desc()))
+
+
+@hot_query('game progress window')
+def _game_progress_window(t):
+    progress = t['game_progress']
+    return (select(func.count(progress.c.id), func.avg(progress.c.score))
+            .where(progress.c.user_id == 1, progress.c.created_at >= SINCE))
+
+
+@hot_query('emotional state')
+def _emotional_state(t):
+    states = t['emotional_state']
+    return select(states).where(states.c.user_id == 1)
+
+
+@hot_query('recent support sessions')
+def _recent_support_sessions(t):
+    sessions = t['support_session']
+    return (select(sessions).where(sessions.c.user_id == 1, sessions.c.started_at >= SINCE)
+            .order_by(sessions.c.started_at))
+
+
+@hot_query('recent chat messages')
+def _recent_chat_messages(t):
+    messages = t['chat_messages']
+    return (select(messages).where(messages.c.user_id == 1, messages.c.created_at >= SINCE)
+            .order_by(messages.c.created_at))
+
+
+@hot_query('pet by owner')
+def _pet_by_owner(t):
+    pets = t['pet']
+    return select(pets).where(pets.c.user_id == 1)
+
+
+@hot_query('story contributions')
+def _story_contributions(t):
+    contributions = t['story_collaborations']
+    return select(contributions).where(contributions.c.story_id == 1, contributions.c.user_id == 1)
+
+
+@hot_query('recently active students')
+def _recently_active_students(t):
+    users = t['users']
+    return select(func.count(users.c.id)).where(users.c.last_active >= SINCE)
+
+
+@hot_query('student list page')
+def _student_list_page(t):
+    users = t['users']
+    return (select(users.c.id, users.c.username, users.c.total_points)
+            .where(tuple_(users.c.total_points, users.c.id) < tuple_(500, 40))
+            .order_by(users.c.total_points.desc(), users.c.id.desc())
+            .limit(51))
+
+
+@hot_query('lesson progress by student')
+def _lesson_progress_by_student(t):
+    progress = t['user_progress']
+    return select(func.avg(progress.c.best_score)).where(progress.c.user_id == 1)
+
+
+def explain(connection, statement) -> List[str]:
+    sql = str(statement.compile(connection, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def audit(connection, metadata: Optional[MetaData] = None) -> List[Dict]:
+    """Plan of every hot query, with the tables it would scan in full"""
+    tables = (metadata or schema_metadata()).tables
+    results = []
+    for name, builder in HOT_QUERIES.items():
+        plan = explain(connection, builder(tables))
+        full_scans = [match.group(1) for match in map(FULL_SCAN.match, plan) if match]
+        results.append({'query': name, 'plan': plan, 'full_scans': full_scans})
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    metadata = schema_metadata()
+    engine = create_engine(argv[0] if argv else 'sqlite://')
+    if not argv:
+        metadata.create_all(engine)
+
+    with engine.connect() as connection:
+        results = audit(connection, metadata)
+    for result in results:
+        status = 'FULL SCAN of ' + ', '.join(result['full_scans']) if result['full_scans'] else 'ok'
+        print(f"{result['query']}: {status}")
+        for step in result['plan']:
+            print(f"    {step}")
+
+    failures = [result['query'] for result in results if result['full_scans']]
+    if failures:
+        print(f"{len(failures)} hot queries regressed to full table scans: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
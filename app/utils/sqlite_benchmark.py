@@ -0,0 +1,115 @@
+"""
+Concurrent writer benchmark for the SQLite production profile.
+
+Writer threads commit small inserts, the way Socket.IO handlers log learning
+events, while reader threads poll aggregates.  Each run uses a fresh database
+file and reports commits per second and "database is locked" failures.
+
+    python -m app.utils.sqlite_benchmark --writers 8 --readers 4 --transactions 200
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app.utils.sqlite_profile import apply_pragmas, engine_options, sqlite_pragmas
+
+metadata = MetaData()
+events = Table(
+    'benchmark_events', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, nullable=False, index=True),
+    Column('action', String(50)),
+    Column('performance', Float),
+    Column('timestamp', DateTime, server_default=func.current_timestamp())
+)
+
+
+def run(profile: bool, writers: int, readers: int, transactions: int, directory: str) -> Dict:
+    path = os.path.join(directory, f"benchmark_{'profile' if profile else 'default'}.db")
+    uri = f"sqlite:///{path}"
+    if profile:
+        engine = create_engine(uri, **engine_options(pool_size=writers + readers))
+        apply_pragmas(engine, sqlite_pragmas())
+    else:
+        engine = create_engine(uri, pool_size=writers + readers)
+    metadata.create_all(engine)
+
+    locked = []
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def write(writer: int):
+        for n in range(transactions):
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(events).values(user_id=writer, action='question_answered',
+                                                             performance=(n % 10) / 10))
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                with lock:
+                    locked.append(writer)
+
+    def read():
+        while not done.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(
+                        select(events.c.user_id, func.avg(events.c.performance)).group_by(events.c.user_id)
+                    ).all()
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                with lock:
+                    locked.append(-1)
+
+    reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+    for thread in reader_threads:
+        thread.start()
+    started = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in reader_threads:
+        thread.join()
+
+    with engine.connect() as connection:
+        committed = connection.execute(select(func.count()).select_from(events)).scalar()
+    engine.dispose()
+    return {
+        'profile': 'production' if profile else 'default',
+        'committed': committed,
+        'locked_errors': len(locked),
+        'seconds': round(elapsed, 3),
+        'commits_per_second': round(committed / elapsed, 1) if elapsed else 0.0
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--transactions', type=int, default=200, help='commits per writer')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in (False, True):
+            result = run(profile, args.writers, args.readers, args.transactions, directory)
+            print(f"{result['profile']:>10}: {result['committed']} commits in {result['seconds']}s "
+                  f"({result['commits_per_second']}/s), {result['locked_errors']} locked errors")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
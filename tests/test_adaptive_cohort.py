@@ -0,0 +1,21 @@
+import numpy as np
+from app.services.adaptive_learning_services import AdaptiveLearningService
+
+def test_cohort_metrics_match_single_user_formulas():
+    rng = np.random.default_rng(2)
+    users = np.repeat([3, 7, 9], [6, 1, 4])
+    scores = rng.integers(0, 100, size=len(users)).astype(float)
+    game_types = np.array(['color_match', 'sound_match', 'unknown'] * 4, dtype=object)[:len(users)]
+    difficulties = np.array(['beginner', 'advanced'] * 6, dtype=object)[:len(users)]
+
+    metrics = AdaptiveLearningService()._cohort_metrics(users, game_types, scores, difficulties)
+
+    for i, user_id in enumerate([3, 7, 9]):
+        user_scores = scores[users == user_id]
+        assert np.isclose(metrics['accuracy'][i], np.mean(user_scores / 100.0))
+        if len(user_scores) > 1:
+            assert np.isclose(metrics['consistency'][i], 1.0 - np.std(user_scores / 100.0))
+            slope = np.polyfit(np.arange(len(user_scores)), user_scores, 1)[0]
+            assert np.isclose(metrics['slope'][i], slope)
+    assert metrics['trend'][1] == 'insufficient_data'
+    assert np.allclose(metrics['style_scores'].sum(axis=1), 1.0)
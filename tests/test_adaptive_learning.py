@@ -0,0 +1,327 @@
+import gc
+import weakref
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from flask import Flask
+from sqlalchemy import event, insert
+
+from app import db
+from app.bootstrap import backfill_learner_profiles
+from app.models.game_progress import GameProgress
+from app.models.learner_profile import LearnerProfile
+from app.models.user import User
+from app.services.adaptive_learning_services import AdaptiveLearningService
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'adaptive.db'}"
+    db.init_app(app)
+    # users is declared on the user model's own metadata; flushes need it to resolve the FK
+    users = User.__table__.to_metadata(db.metadata)
+    try:
+        with app.app_context():
+            db.metadata.create_all(db.engine, tables=[users, GameProgress.__table__, LearnerProfile.__table__])
+            with db.engine.begin() as connection:
+                connection.execute(insert(users), [
+                    {'id': i, 'username': f'kid{i}', 'email': f'kid{i}@example.com', 'password_hash': 'x',
+                     'full_name': f'Kid {i}', 'age': 7} for i in (1, 2, 3)
+                ])
+            yield app
+            db.session.remove()
+    finally:
+        db.metadata.remove(users)
+
+
+def test_decay_halves_the_weight_of_week_old_results():
+    start = datetime(2026, 3, 1, 10)
+    profile = LearnerProfile(1)
+    profile.record(100, 60, completed=True, difficulty='advanced', style='visual', played_at=start)
+    profile.record(0, 120, completed=False, difficulty='advanced', style='visual',
+                   played_at=start + timedelta(days=LearnerProfile.HALF_LIFE_DAYS))
+
+    stats = profile.snapshot(now=start + timedelta(days=LearnerProfile.HALF_LIFE_DAYS))
+    # The first result now carries half the weight of the second
+    assert stats['weight'] == pytest.approx(1.5)
+    assert stats['accuracy'] == pytest.approx(0.5 / 1.5)
+    assert stats['avg_time'] == pytest.approx((0.5 * 60 + 120) / 1.5)
+    assert stats['completion_rate'] == pytest.approx(0.5 / 1.5)
+    assert stats['recent_accuracy'] == pytest.approx(0.5)
+    assert stats['difficulty']['advanced']['count'] == 2
+    assert stats['total_sessions'] == 2
+
+    # Another half-life later every decayed weight has halved, the means have not
+    later = profile.snapshot(now=start + timedelta(days=2 * LearnerProfile.HALF_LIFE_DAYS))
+    assert later['weight'] == pytest.approx(0.75)
+    assert later['accuracy'] == pytest.approx(stats['accuracy'])
+
+
+def test_late_results_are_discounted_to_their_age():
+    start = datetime(2026, 3, 1, 10)
+    profile = LearnerProfile(1)
+    profile.record(50, 60, played_at=start)
+    profile.record(100, 60, played_at=start - timedelta(days=LearnerProfile.HALF_LIFE_DAYS))
+    stats = profile.snapshot(now=start)
+    assert stats['weight'] == pytest.approx(1.5)
+    assert stats['accuracy'] == pytest.approx((0.5 + 0.5 * 1.0) / 1.5)
+    assert stats['accuracy_std'] == pytest.approx(
+        (((0.25 + 0.5 * 1.0) / 1.5) - stats['accuracy'] ** 2) ** 0.5)
+
+
+def test_first_play_race_keeps_the_game_result(app, monkeypatch):
+    service = AdaptiveLearningService()
+    # Another request created the profile after this one looked for it
+    with db.engine.begin() as connection:
+        connection.execute(insert(LearnerProfile.__table__).values(
+            user_id=1, total_sessions=0, weight=0.0, score_sum=0.0, score_sq_sum=0.0, time_sum=0.0,
+            completed_sum=0.0, style_buckets='{}', difficulty_buckets='{}', hour_buckets='{}'))
+    monkeypatch.setattr(service, '_get_learner_profile', lambda user_id: None)
+
+    result = service.update_real_time_progress(1, {'game_type': 'color_match', 'score': 80, 'time_spent': 90,
+                                                   'completed': True})
+    assert result['success']
+    assert GameProgress.query.filter_by(user_id=1).count() == 1
+    profile = LearnerProfile.query.filter_by(user_id=1).one()
+    assert profile.total_sessions == 1
+    assert profile.score_sum == pytest.approx(0.8)
+
+
+def test_existing_history_is_backfilled_once_by_bootstrap(app):
+    service = AdaptiveLearningService()
+    start = datetime.utcnow() - timedelta(days=2)
+    for i, score in enumerate((40, 60, 80)):
+        db.session.add(GameProgress(2, 'word_puzzle', score=score, time_spent=60, completed=True,
+                                    difficulty='beginner', created_at=start + timedelta(hours=i)))
+    db.session.commit()
+
+    # Reads never build or store a profile
+    assert service._get_learner_profile(2) is None
+    assert service._compute_learning_pattern(2) == service._default_learning_profile()
+    assert LearnerProfile.query.count() == 0
+
+    with db.engine.begin() as connection:
+        assert backfill_learner_profiles(connection) == 1
+        assert backfill_learner_profiles(connection) == 0
+    profile = service._get_learner_profile(2)
+    assert profile.total_sessions == 3
+    assert profile.snapshot()['style_scores'] == {'reading': pytest.approx(
+        sum(0.5 ** (hours / 24 / LearnerProfile.HALF_LIFE_DAYS) * score for hours, score in ((2, 0.4), (1, 0.6), (0, 0.8))))}
+
+
+class LoopReference:
+    """The per-row Python computations the SQL aggregates replaced, for parity checks"""
+
+    def __init__(self, service):
+        self.service = service
+
+    def performance(self, rows):
+        accuracies = [p.score / 100.0 for p in rows if p.score is not None]
+        times = [p.time_spent for p in rows if p.time_spent is not None]
+        accuracy = np.mean(accuracies) if accuracies else 0.5
+        avg_time = np.mean(times) if times else 60.0
+        improvement_rate = 0.0
+        if len(accuracies) >= 3:
+            older = accuracies[:-3]
+            older_avg = np.mean(older) if older else float('nan')
+            if older_avg > 0:
+                improvement_rate = (np.mean(accuracies[-3:]) - older_avg) / older_avg
+        return {
+            'accuracy': round(accuracy, 3),
+            'speed': round(max(0.1, min(2.0, 60.0 / avg_time)), 3),
+            'consistency': round(1.0 - (np.std(accuracies) if len(accuracies) > 1 else 0.5), 3),
+            'improvement_rate': round(improvement_rate, 3),
+            'total_sessions': len(rows)
+        }
+
+    def style(self, rows):
+        scores = defaultdict(float)
+        for p in rows:
+            style = self.service.game_styles.get(p.game_type)
+            if style:
+                scores[style] += p.score / 100.0 if p.score else 0.5
+        total = sum(scores.values())
+        return {style: score / total for style, score in scores.items()}
+
+    def engagement(self, rows):
+        avg_session_time = sum(p.time_spent for p in rows if p.time_spent) / len(rows)
+        avg_completion = np.mean([1.0 if p.completed else 0.0 for p in rows])
+        hours = defaultdict(list)
+        for p in rows:
+            hours[p.created_at.hour].append((p.score / 100.0) * (1.0 if p.completed else 0.5))
+        peak_hours = [hour for hour, scores in hours.items() if len(scores) >= 2 and np.mean(scores) > 0.7]
+        level = avg_completion * 0.4 + min(avg_session_time / 300, 1.0) * 0.3 + (len(rows) / 7) * 0.3
+        return {
+            'level': round(min(level, 1.0), 3),
+            'avg_session_time': round(avg_session_time, 1),
+            'completion_rate': round(avg_completion, 3),
+            'peak_hours': sorted(peak_hours),
+            'consistency': len(rows) / 7
+        }
+
+    def difficulty(self, rows):
+        by_level = defaultdict(list)
+        for p in rows:
+            by_level[p.difficulty or 'intermediate'].append(p.score / 100.0 if p.score else 0.5)
+        optimal, best = 'intermediate', 0.0
+        for level, scores in by_level.items():
+            if len(scores) >= 2 and np.mean(scores) > best:
+                optimal, best = level, np.mean(scores)
+        means = {level: float(np.mean(scores)) for level, scores in by_level.items()}
+        return {
+            'current_optimal': optimal,
+            'performance_by_level': {level: round(mean, 3) for level, mean in means.items()},
+            'recommended_progression': self.service._suggest_difficulty_progression(means)
+        }
+
+
+def test_sql_aggregates_match_the_row_by_row_computation(app):
+    service = AdaptiveLearningService()
+    rng = np.random.default_rng(5)
+    now = datetime.utcnow()
+    game_types = list(service.game_styles) + ['unknown_game']
+    for i in range(40):
+        db.session.add(GameProgress(
+            3, game_types[i % len(game_types)], score=int(rng.integers(0, 101)) if i % 9 else 0,
+            time_spent=int(rng.integers(20, 400)), difficulty=['beginner', 'intermediate', 'advanced', None][i % 4],
+            completed=bool(i % 3), created_at=now - timedelta(days=int(rng.integers(0, 20)), hours=i % 5)
+        ))
+    # Outside the window, and another learner's results
+    db.session.add(GameProgress(3, 'color_match', score=100, created_at=now - timedelta(days=60)))
+    db.session.add(GameProgress(1, 'color_match', score=5, created_at=now))
+    db.session.commit()
+
+    since = now - timedelta(days=30)
+    rows = GameProgress.query.filter(GameProgress.user_id == 3, GameProgress.created_at >= since) \
+        .order_by(GameProgress.created_at).all()
+    assert len(rows) == 40
+    reference = LoopReference(service)
+
+    assert service._analyze_performance(3, since) == reference.performance(rows)
+    style = service._detect_learning_style(3, since)
+    assert style == pytest.approx(reference.style(rows))
+    assert service._calculate_engagement(3, since) == reference.engagement(rows)
+    assert service._assess_difficulty_preference(3, since) == reference.difficulty(rows)
+
+
+def test_game_progress_keeps_difficulty_completion_and_the_users_foreign_key(app):
+    db.session.add(GameProgress(1, 'word_puzzle', score=70, difficulty='advanced', completed=True))
+    db.session.add(GameProgress(1, 'word_puzzle', score=70))
+    db.session.commit()
+    stored = [(p.difficulty, p.completed) for p in GameProgress.query.order_by(GameProgress.id)]
+    assert stored == [('advanced', True), ('intermediate', False)]
+    assert {fk.target_fullname for fk in GameProgress.__table__.c.user_id.foreign_keys} == {'users.id'}
+
+
+def counting_view(user_id):
+    calls = []
+
+    def compute():
+        calls.append(user_id)
+        return {'user_id': user_id, 'history': [len(calls)]}
+    return compute, calls
+
+
+def test_cached_views_are_copies_and_expire(app):
+    service = AdaptiveLearningService()
+    compute, calls = counting_view(1)
+    first = service._read_through(1, ('pattern',), compute)
+    first['history'].append('mutated')
+    assert service._read_through(1, ('pattern',), compute) == {'user_id': 1, 'history': [1]}
+    assert len(calls) == 1
+
+    service.profile_cache_ttl = 0
+    service.invalidate_profile(1)
+    service._read_through(1, ('pattern',), compute)
+    service._read_through(1, ('pattern',), compute)
+    assert len(calls) == 3
+
+
+def test_cache_stats_are_logged_periodically(app, caplog):
+    service = AdaptiveLearningService()
+    service.cache_stats_log_every = 3
+    compute, calls = counting_view(1)
+    with caplog.at_level('INFO', logger='app.services.adaptive_learning_services'):
+        for _ in range(6):
+            service._read_through(1, ('pattern',), compute)
+    logged = [record.getMessage() for record in caplog.records if 'Profile cache' in record.getMessage()]
+    assert logged == [
+        "Profile cache: {'hits': 2, 'misses': 1, 'hit_rate': 0.667, 'cached_users': 1}",
+        "Profile cache: {'hits': 5, 'misses': 1, 'hit_rate': 0.833, 'cached_users': 1}"
+    ]
+
+
+def test_cache_is_invalidated_when_the_game_result_commits(app):
+    service = AdaptiveLearningService()
+    other_worker_thread = AdaptiveLearningService()
+    compute, calls = counting_view(1)
+
+    db.session.add(GameProgress(1, 'color_match', score=80))
+    db.session.flush()
+    # A read between flush and commit caches state other sessions cannot see yet
+    service._read_through(1, ('pattern',), compute)
+    other_worker_thread._read_through(1, ('pattern',), compute)
+    assert service.cache_stats()['cached_users'] == 1
+    db.session.commit()
+    assert service.cache_stats()['cached_users'] == 0
+    assert other_worker_thread.cache_stats()['cached_users'] == 0
+
+    service._read_through(1, ('pattern',), compute)
+    db.session.add(GameProgress(1, 'color_match', score=10))
+    db.session.flush()
+    service._read_through(1, ('pattern',), compute)
+    db.session.rollback()
+    assert service.cache_stats()['cached_users'] == 0
+
+
+def test_discarded_services_are_not_kept_alive_by_the_listeners(app):
+    service = AdaptiveLearningService()
+    ref = weakref.ref(service)
+    del service
+    gc.collect()
+    assert ref() is None
+    db.session.add(GameProgress(1, 'color_match', score=80))
+    db.session.commit()
+
+
+def test_cohort_loads_more_ids_than_sqlite_binds_in_chunks(app):
+    service = AdaptiveLearningService()
+    service.cohort_partition_rows = 7
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        connection.execute(insert(GameProgress.__table__), [
+            {'user_id': user_id, 'game_type': 'color_match', 'score': 40 + i * 10, 'time_spent': 60,
+             'difficulty': None if user_id % 2 else 'advanced', 'completed': True,
+             'created_at': now - timedelta(hours=3 - i)}
+            for user_id in (1, 2, 3) for i in range(3)
+        ])
+
+    # Ids beyond the three learners pad the list past SQLite's bound parameter limit
+    user_ids = list(range(5000, 3000, -1)) + [3, 1, 2]
+    users, game_types, scores, difficulties = service._load_cohort_columns(now - timedelta(days=1), user_ids)
+    assert users.tolist() == [1, 1, 1, 2, 2, 2, 3, 3, 3]
+    assert scores.tolist() == [40.0, 50.0, 60.0] * 3
+    assert difficulties.tolist() == ['intermediate'] * 3 + ['advanced'] * 3 + ['intermediate'] * 3
+
+    cohort = service.analyze_cohort(user_ids, days_back=1)
+    assert cohort['summary']['learners'] == 3
+    assert service.analyze_cohort([4000], days_back=1) == {'users': [], 'summary': {'learners': 0}}
+
+
+def test_cohort_window_is_read_from_the_covering_index(app):
+    service = AdaptiveLearningService()
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: \
+        statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    service.analyze_cohort(days_back=7)
+    event.remove(db.engine, 'before_cursor_execute', listener)
+
+    [(statement, parameters)] = [(s, p) for s, p in statements if 'FROM game_progress' in s]
+    plan = ' '.join(row[-1] for row in db.session.connection().exec_driver_sql(
+        f'EXPLAIN QUERY PLAN {statement}', parameters))
+    assert 'COVERING INDEX ix_game_progress_created_cohort' in plan
+    assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,63 @@
+import os
+import time
+from app.services.audio_scratch_service import AudioScratchSpace
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+def test_sweep_evicts_oldest_files_over_budget(tmp_path):
+    scratch = AudioScratchSpace(root=str(tmp_path), max_bytes=250, grace_seconds=0)
+    first = scratch.write_bytes(b'a' * 100)
+    second = scratch.write_bytes(b'b' * 100)
+    age(first, 30)
+    age(second, 20)
+    third = scratch.write_bytes(b'c' * 100)
+    assert not os.path.exists(first)
+    assert os.path.exists(second) and os.path.exists(third)
+    assert scratch.stats()['total_bytes'] == 200
+
+def test_sweep_evicts_expired_and_release_deletes(tmp_path):
+    scratch = AudioScratchSpace(root=str(tmp_path), max_age_seconds=0, grace_seconds=0)
+    path = scratch.write_bytes(b'data')
+    assert not os.path.exists(path)
+
+    scratch.max_age_seconds = 3600
+    kept = scratch.write_bytes(b'data')
+    scratch.release(kept)
+    assert not os.path.exists(kept)
+    assert scratch.stats()['files'] == 0
+
+def test_budget_is_shared_by_every_worker_on_the_directory(tmp_path):
+    first_worker = AudioScratchSpace(root=str(tmp_path), max_bytes=250, grace_seconds=0)
+    second_worker = AudioScratchSpace(root=str(tmp_path), max_bytes=250, grace_seconds=0)
+    older = second_worker.write_bytes(b'b' * 100)
+    old = first_worker.write_bytes(b'a' * 100)
+    age(old, 20)
+    age(older, 30)
+    newest = second_worker.write_bytes(b'c' * 100)
+    assert not os.path.exists(older)
+    assert os.path.exists(old) and os.path.exists(newest)
+    assert first_worker.stats()['total_bytes'] == 200
+
+def test_files_in_their_grace_period_are_never_evicted(tmp_path):
+    scratch = AudioScratchSpace(root=str(tmp_path), max_bytes=150, max_age_seconds=0, grace_seconds=60)
+    first = scratch.write_bytes(b'a' * 100)
+    second = scratch.write_bytes(b'b' * 100)
+    assert os.path.exists(first) and os.path.exists(second)
+
+    age(first, 120)
+    assert scratch.sweep() == 1
+    assert not os.path.exists(first) and os.path.exists(second)
+
+def test_writes_and_releases_use_the_index_without_scanning(tmp_path, monkeypatch):
+    scratch = AudioScratchSpace(root=str(tmp_path), max_bytes=250, grace_seconds=0)
+    scans = []
+    original = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or original(path))
+
+    paths = [scratch.write_bytes(b'a' * 100) for _ in range(3)]
+    scratch.release(paths[2])
+    assert scans == []
+    assert not os.path.exists(paths[0]) and os.path.exists(paths[1])
+    assert scratch.stats()['total_bytes'] == 100
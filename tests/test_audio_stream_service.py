@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.services.audio_stream_service import AudioStream, AudioStreamService
+
+RATE = 16000
+FRAME = RATE * 30 // 1000  # samples per 30 ms frame
+
+
+def frames(count, loud):
+    amplitude = 3000 if loud else 0
+    return (np.full(FRAME * count, amplitude, dtype='<i2')).tobytes()
+
+
+def make_stream(**options):
+    stream = AudioStream(sample_rate=RATE, preroll_ms=90, end_silence_ms=90, partial_interval_ms=150,
+                         max_utterance_ms=3000, **options)
+    # Energy detection keeps the test independent of webrtcvad being installed
+    stream.vad = None
+    return stream
+
+
+def test_utterance_is_framed_with_preroll_and_ends_on_silence():
+    stream = make_stream()
+    assert stream.feed(frames(2, loud=False)) == []
+
+    events = stream.feed(frames(3, loud=True) + frames(3, loud=False))
+    assert [event['type'] for event in events] == ['speech_start', 'final']
+    # Two preroll frames, the first voiced frame, two more voiced and three silent
+    assert len(events[1]['pcm']) == 8 * FRAME * 2
+
+
+def test_chunks_of_any_size_are_reassembled_into_frames():
+    stream = make_stream()
+    audio = frames(4, loud=True)
+    events = []
+    for offset in range(0, len(audio), 1000):
+        events += stream.feed(audio[offset:offset + 1000])
+    assert [event['type'] for event in events] == ['speech_start']
+    assert len(stream._pending) == 0
+
+
+def test_partials_are_emitted_while_speaking_and_flush_returns_the_rest():
+    stream = make_stream()
+    events = stream.feed(frames(12, loud=True))
+    assert [event['type'] for event in events] == ['speech_start', 'partial', 'partial']
+    assert len(events[2]['pcm']) > len(events[1]['pcm'])
+
+    final = stream.flush()
+    assert final['type'] == 'final'
+    assert len(final['pcm']) == 12 * FRAME * 2
+    assert stream.flush() is None
+
+
+def test_long_utterances_are_cut_at_the_limit():
+    stream = make_stream()
+    events = stream.feed(frames(120, loud=True))
+    finals = [event for event in events if event['type'] == 'final']
+    assert len(finals) == 1
+    assert len(finals[0]['pcm']) == 100 * FRAME * 2
+
+
+def test_invalid_stream_options_are_rejected():
+    with pytest.raises(ValueError):
+        AudioStream(sample_rate=44100)
+    with pytest.raises(ValueError):
+        AudioStream(frame_ms=25)
+
+
+def test_service_tracks_streams_per_connection():
+    service = AudioStreamService()
+    stream = service.open_stream('sid-1', sample_rate=RATE)
+    stream.vad = None
+    stream.feed(frames(12, loud=True))
+    assert service.get_stream('sid-1') is stream
+    assert service.close_stream('sid-1')['type'] == 'final'
+    assert service.get_stream('sid-1') is None
+    assert service.close_stream('sid-1') is None
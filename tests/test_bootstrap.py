@@ -0,0 +1,165 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import MetaData, create_engine, event, func, insert, inspect, select
+
+from app import db
+from app.bootstrap import (PET_TYPES, SEED_VERSION, SUBJECTS, backfill_activity, bootstrap, is_current,
+                           seed_version)
+from app.models.achievement import Achievement
+from app.models.game_progress import GameProgress
+from app.models.lesson import Lesson, Subject, UserProgress
+from app.models.pet import PetType
+from app.models.user import LearningSession, User
+
+
+def count(connection, model):
+    return connection.execute(select(func.count()).select_from(model.__table__)).scalar()
+
+
+def test_bootstrap_is_idempotent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    with engine.begin() as connection:
+        assert not is_current(connection)
+        added = bootstrap(connection)
+    assert added['pet_types'] == len(PET_TYPES)
+    assert added['subjects'] == len(SUBJECTS)
+
+    with engine.begin() as connection:
+        assert is_current(connection)
+        assert seed_version(connection) == SEED_VERSION
+        assert set(bootstrap(connection).values()) == {0}
+        assert count(connection, PetType) == len(PET_TYPES)
+        assert count(connection, Subject) == len(SUBJECTS)
+        assert count(connection, Achievement) == len(Achievement.create_default_achievements())
+        assert count(connection, Lesson) == len(Lesson.create_sample_lessons())
+    engine.dispose()
+
+
+def test_bootstrap_only_adds_missing_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    with engine.begin() as connection:
+        bootstrap(connection)
+        connection.execute(PetType.__table__.delete().where(PetType.__table__.c.name == 'Dragon'))
+        assert bootstrap(connection)['pet_types'] == 1
+    engine.dispose()
+
+
+def test_concurrent_bootstraps_seed_lessons_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}", connect_args={'timeout': 10})
+    first = engine.connect()
+    transaction = first.begin()
+    bootstrap(first)
+
+    second = {}
+
+    def run():
+        with engine.begin() as connection:
+            second.update(bootstrap(connection))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.3)
+    # The second run waits on the first's seed lock instead of reading the catalogues before it commits
+    assert thread.is_alive()
+    transaction.commit()
+    first.close()
+    thread.join()
+
+    assert set(second.values()) == {0}
+    with engine.connect() as connection:
+        assert count(connection, Lesson) == len(Lesson.create_sample_lessons())
+    engine.dispose()
+
+
+def test_each_catalogue_is_one_bulk_insert(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    inserts = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT'):
+            inserts.append(statement)
+
+    with engine.begin() as connection:
+        bootstrap(connection)
+    # pet types, subjects, achievements, lessons and the version row
+    assert len(inserts) == 5
+    engine.dispose()
+
+
+def test_activity_bitmaps_are_backfilled_once_from_learning_sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    users, sessions = User.__table__, LearningSession.__table__
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    with engine.begin() as connection:
+        User.metadata.create_all(connection, tables=[users, sessions])
+        connection.execute(insert(users), [
+            {'id': i, 'username': f'kid{i}', 'email': f'kid{i}@example.com', 'password_hash': 'x',
+             'full_name': f'Kid {i}', 'age': 8, 'longest_streak': 5 if i == 2 else 0} for i in (1, 2, 3)
+        ])
+        played = [(1, 0), (1, 0), (1, 1), (1, 2), (1, 5), (2, 10), (2, 11), (2, 400)]
+        connection.execute(insert(sessions), [
+            {'user_id': user_id, 'action': 'answer_submitted', 'content_type': 'math', 'timestamp': today - timedelta(days=days_ago)}
+            for user_id, days_ago in played
+        ])
+        assert backfill_activity(connection) == 2
+        assert backfill_activity(connection) == 0
+
+        rows = {row.id: row for row in connection.execute(select(users).order_by(users.c.id))}
+    assert (rows[1].last_active_date, rows[1].learning_streak, rows[1].longest_streak) == (today.date(), 3, 3)
+    assert User._streaks_from_bits(int.from_bytes(rows[1].activity_bitmap, 'little')) == (3, 3)
+    # Days outside the window are ignored, and a longer recorded streak is kept
+    assert (rows[2].last_active_date, rows[2].learning_streak, rows[2].longest_streak) == \
+        (today.date() - timedelta(days=10), 2, 5)
+    assert rows[3].last_active_date is None and rows[3].activity_bitmap is None
+    engine.dispose()
+
+
+def test_bootstrap_adds_indexes_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    # users is declared on the user model's own metadata; the game_progress FK needs it to resolve
+    users = User.__table__.to_metadata(db.metadata)
+    try:
+        with engine.begin() as connection:
+            users.create(connection)
+            GameProgress.__table__.create(connection)
+            connection.exec_driver_sql('DROP INDEX ix_game_progress_created_cohort')
+            bootstrap(connection)
+            indexes = {index['name'] for index in inspect(connection).get_indexes('game_progress')}
+        assert 'ix_game_progress_created_cohort' in indexes
+    finally:
+        db.metadata.remove(users)
+        engine.dispose()
+
+
+def test_bootstrap_migrates_tables_deployed_before_their_new_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    with engine.begin() as connection:
+        # users and user_progress are declared on separate metadata; copy them onto one
+        old_schema = MetaData()
+        for model in (User, Lesson, UserProgress):
+            model.__table__.to_metadata(old_schema)
+        old_schema.create_all(connection)
+        connection.execute(insert(User.__table__), [
+            {'id': i, 'username': f'kid{i}', 'email': f'kid{i}@example.com', 'password_hash': 'x',
+             'full_name': f'Kid {i}', 'age': 8} for i in (1, 2)
+        ])
+        connection.execute(insert(UserProgress.__table__), [
+            {'user_id': 1, 'lesson_id': lesson_id, 'best_score': score} for lesson_id, score in ((1, 60), (2, 90))
+        ])
+        # The shape users had before average_score, with points indexed on their own
+        for statement in ('DROP INDEX ix_users_average_score', 'ALTER TABLE users DROP COLUMN average_score',
+                          'DROP INDEX ix_users_total_points',
+                          'CREATE INDEX ix_users_total_points ON users (total_points)'):
+            connection.exec_driver_sql(statement)
+
+        bootstrap(connection)
+        assert is_current(connection)
+        indexes = {index['name']: index['column_names'] for index in inspect(connection).get_indexes('users')}
+        scores = connection.execute(select(User.__table__.c.average_score).order_by(User.__table__.c.id)).scalars()
+        assert list(scores) == [75.0, 0.0]
+    assert indexes['ix_users_total_points'] == ['total_points', 'id']
+    assert indexes['ix_users_average_score'] == ['average_score', 'id']
+    engine.dispose()
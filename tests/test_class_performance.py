@@ -0,0 +1,63 @@
+from sqlalchemy import MetaData, create_engine, event, insert
+
+from app.models.lesson import Lesson, UserProgress
+from app.models.pet import Pet
+from app.models.user import User
+from app.services.class_summary_service import ClassSummaryService
+
+
+def make_engine():
+    engine = create_engine('sqlite://')
+    # The models live on separate metadata objects; gather the tables involved
+    metadata = MetaData()
+    for model in (User, Lesson, UserProgress, Pet):
+        model.__table__.to_metadata(metadata)
+    metadata.create_all(engine)
+    return engine
+
+
+def populate(connection, students):
+    connection.execute(insert(Lesson.__table__), [
+        {'id': 1, 'title': 'Counting', 'subject': 'math', 'age_group': '4-6', 'content': '{}'},
+        {'id': 2, 'title': 'Letters', 'subject': 'reading', 'age_group': '4-6', 'content': '{}'}
+    ])
+    for i in range(1, students + 1):
+        connection.execute(insert(User.__table__).values(
+            id=i, username=f'kid{i}', email=f'kid{i}@example.com', password_hash='x', full_name=f'Kid {i}', age=7
+        ))
+        connection.execute(insert(UserProgress.__table__), [
+            {'user_id': i, 'lesson_id': 1, 'best_score': 60 + i % 40, 'time_spent': 1200 * i},
+            {'user_id': i, 'lesson_id': 2, 'best_score': 90, 'time_spent': 600}
+        ])
+        if i % 2:
+            connection.execute(insert(Pet.__table__).values(user_id=i, name='Sparky', pet_type='fire_dragon',
+                                                            happiness=50 + i % 50))
+
+
+def count_statements(students):
+    engine = make_engine()
+    with engine.begin() as connection:
+        populate(connection, students)
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            performance = ClassSummaryService().class_performance(connection)
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+    return len(statements), performance
+
+
+def test_class_performance_uses_constant_statements():
+    small, performance = count_statements(3)
+    large, _ = count_statements(60)
+    assert small == large == 3
+
+    assert performance['subject_performance'] == {'math': 62.0, 'reading': 90.0}
+    # 30, 50 and 70 minutes spent by the three students
+    assert performance['time_distribution'] == {'0-1 hours': 2, '1-3 hours': 1}
+    assert performance['pet_learning_correlation'] == [
+        {'pet_happiness': 51, 'learning_score': 75.5, 'student_name': 'kid1'},
+        {'pet_happiness': 53, 'learning_score': 76.5, 'student_name': 'kid3'}
+    ]
+
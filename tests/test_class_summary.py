@@ -0,0 +1,105 @@
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, create_engine, event, insert
+from sqlalchemy.orm import Session, registry
+
+from app.models.class_summary import ClassSummary
+from app.models.lesson import Lesson, UserProgress
+from app.models.user import User
+from app.services.class_summary_service import ClassSummaryService
+
+
+class Student:
+    """Stand-in mapped on the users table; the app's User mapper pulls in unrelated models"""
+
+
+class Progress:
+    """Stand-in mapped on the user_progress table"""
+
+
+def make_session(service):
+    engine = create_engine('sqlite://')
+    metadata = MetaData()
+    for model in (User, Lesson, UserProgress, ClassSummary):
+        model.__table__.to_metadata(metadata)
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Lesson.__table__), [
+            {'id': 1, 'title': 'Counting', 'subject': 'math', 'age_group': '4-6', 'content': '{}'},
+            {'id': 2, 'title': 'Letters', 'subject': 'reading', 'age_group': '4-6', 'content': '{}'}
+        ])
+
+    mappers = registry()
+    mappers.map_imperatively(Student, metadata.tables['users'])
+    mappers.map_imperatively(Progress, metadata.tables['user_progress'])
+    # The service's handlers are called directly, as the module's listeners would for User and UserProgress
+    for target, prefix in ((Student, '_on_user_'), (Progress, '_on_progress_')):
+        for action in ('insert', 'update', 'delete'):
+            event.listen(target, f'after_{action}', getattr(service, prefix + action))
+    return engine, mappers
+
+
+def test_summary_matches_full_computation_after_random_changes():
+    rng = random.Random(42)
+    service = ClassSummaryService('random')
+    engine, mappers = make_session(service)
+    now = datetime.now()
+    students, progress, next_id = [], [], 1
+
+    def active_time():
+        # Mostly inside the dashboard window, sometimes long before it
+        return now - timedelta(days=rng.choice([0, 1, 3, 6, 30]), hours=rng.randint(0, 5))
+
+    with Session(engine, expire_on_commit=False) as session:
+        for step in range(300):
+            action = rng.random()
+            if action < 0.2 or not students:
+                student = Student()
+                student.id, student.username = next_id, f'kid{next_id}'
+                student.email, student.password_hash, student.full_name, student.age = \
+                    f'kid{next_id}@example.com', 'x', f'Kid {next_id}', 7
+                student.level, student.total_points = rng.randint(1, 5), rng.randrange(0, 500, 10)
+                student.last_active = active_time()
+                session.add(student)
+                students.append(student)
+                next_id += 1
+            elif action < 0.5:
+                student = rng.choice(students)
+                if rng.random() < 0.3:
+                    # An attribute that was never loaded has no old value to delta against
+                    session.expire(student, ['level', 'last_active'])
+                student.total_points = rng.randrange(0, 500, 10)
+                if rng.random() < 0.5:
+                    student.level = rng.randint(1, 5)
+                if rng.random() < 0.5:
+                    student.last_active = active_time()
+                if rng.random() < 0.1:
+                    student.username = f'kid{student.id}-{step}'
+            elif action < 0.6:
+                student = students.pop(rng.randrange(len(students)))
+                session.delete(student)
+            elif action < 0.8 or not progress:
+                record = Progress()
+                record.user_id, record.lesson_id = rng.choice(students).id, rng.choice([1, 2])
+                record.best_score, record.is_completed = rng.randint(0, 100), rng.random() < 0.7
+                session.add(record)
+                progress.append(record)
+            elif action < 0.95:
+                record = rng.choice(progress)
+                if rng.random() < 0.2:
+                    session.expire(record, ['best_score'])
+                if rng.random() < 0.6:
+                    record.best_score = rng.randint(0, 100)
+                if rng.random() < 0.5:
+                    record.is_completed = not record.is_completed
+            else:
+                record = progress.pop(rng.randrange(len(progress)))
+                session.delete(record)
+
+            session.flush()
+            connection = session.connection()
+            assert service._load(connection) == service._compute(connection), f'step {step}'
+            if step % 50 == 49:
+                session.commit()
+    mappers.dispose()
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from app.services.event_store import ColumnarEventStore
+
+def test_query_slices_time_range_and_user(tmp_path):
+    store = ColumnarEventStore(str(tmp_path), flush_size=4)
+    now = datetime(2026, 3, 10, 12, 0)
+    for day in range(5):
+        for user_id in (1, 2):
+            store.append(user_id, 'quiz', {'subject': 'math', 'accuracy': 0.1 * day, 'duration': 5,
+                                           'difficulty': 'hard'}, now - timedelta(days=day))
+
+    data = store.query(1, now - timedelta(days=2, hours=1), now)
+    assert np.allclose(data['accuracy'], [0.2, 0.1, 0.0])
+    assert (data['user_id'] == 1).all()
+    assert np.allclose(data['difficulty'], 0.75)
+
+    events = store.to_events(store.query(2))
+    assert len(events) == 5
+    assert events[-1]['subject'] == 'math'
+    assert events[-1]['timestamp'] == now
+    assert 'engagement_score' not in events[0]['data']
+
+def test_buffered_events_are_written_after_the_flush_interval(tmp_path):
+    store = ColumnarEventStore(str(tmp_path), flush_size=100, flush_interval=0.05)
+    now = datetime.now()
+    store.append(1, 'quiz', {'subject': 'math', 'accuracy': 0.5}, now)
+    segment = tmp_path / now.date().isoformat() / store.segment / 'timestamp.bin'
+    assert not segment.exists()
+    for _ in range(100):
+        if segment.exists():
+            break
+        time.sleep(0.02)
+    assert segment.stat().st_size == 8
+
+def test_buffered_events_are_written_at_exit(tmp_path):
+    script = ("from app.services.event_store import ColumnarEventStore; "
+              f"ColumnarEventStore({str(tmp_path)!r}, flush_interval=3600).append(1, 'quiz', {{'accuracy': 0.5}})")
+    subprocess.run([sys.executable, '-c', script], cwd=Path(__file__).resolve().parents[1], check=True)
+    assert ColumnarEventStore(str(tmp_path)).count(1) == 1
@@ -0,0 +1,80 @@
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.analytic_services import AnalyticsService
+from app.services.event_store import ColumnarEventStore
+from app.services.forecast_engine import ForecastEngine
+
+
+def test_batch_fit_matches_per_user_least_squares(tmp_path):
+    store = ColumnarEventStore(str(tmp_path))
+    as_of = datetime(2026, 5, 1, 20, 0)
+    rng = np.random.default_rng(4)
+    expected = {}
+    for user_id in range(1, 6):
+        days = sorted(rng.choice(30, size=12, replace=False))
+        accuracy = np.clip(0.3 + 0.01 * user_id * np.array(days) + rng.normal(0, 0.02, len(days)), 0, 1)
+        for day, value in zip(days, accuracy):
+            store.append(user_id, 'quiz', {'accuracy': float(value), 'duration': 10},
+                         datetime(2026, 4, 2, 9, 0) + timedelta(days=int(day)))
+        expected[user_id] = np.polyfit(days, np.float32(accuracy), 1)
+
+    engine = ForecastEngine(store, lookback_days=30)
+    assert engine.run_nightly(as_of) == 5
+
+    model = engine._load()
+    for user_id, (slope, intercept) in expected.items():
+        index = engine._find(model, user_id)
+        assert model['accuracy_slope'][index] == pytest.approx(slope, abs=1e-6)
+        assert model['accuracy_intercept'][index] == pytest.approx(intercept, abs=1e-6)
+
+    forecast = engine.predict(1, horizon_days=10, as_of=as_of)
+    assert forecast['accuracy']['slope_per_day'] == pytest.approx(expected[1][0], abs=1e-6)
+    assert forecast['accuracy']['predicted'] > forecast['accuracy']['current']
+    assert forecast['minutes']['current'] == pytest.approx(10)
+
+
+def test_unfitted_learner_is_fitted_on_demand(tmp_path, monkeypatch):
+    store = ColumnarEventStore(str(tmp_path))
+    as_of = datetime(2026, 5, 1, 20, 0)
+    engine = ForecastEngine(store)
+    engine.run_nightly(as_of)
+
+    store.append(9, 'quiz', {'accuracy': 0.5}, as_of - timedelta(days=2))
+    store.append(9, 'quiz', {'accuracy': 0.7}, as_of - timedelta(days=1))
+    store.append(8, 'quiz', {'accuracy': 0.1}, as_of - timedelta(days=1))
+    store.flush()
+
+    read = []
+    read_rollup = store._read_rollup
+    monkeypatch.setattr(store, '_read_rollup', lambda path: read.append(path) or read_rollup(path))
+    monkeypatch.setattr(store, '_select', None)  # no raw column reads
+    forecast = engine.predict(9, horizon_days=1, as_of=as_of)
+    assert read and all(path.endswith('9.json') for path in read)
+    assert forecast['active_days'] == 2
+    assert forecast['accuracy']['slope_per_day'] == pytest.approx(0.2, abs=1e-6)
+    assert engine.predict(10, as_of=as_of) is None
+
+
+def test_nightly_job_runs_on_the_scheduler(tmp_path, monkeypatch):
+    engine = ForecastEngine(ColumnarEventStore(str(tmp_path)))
+    ran = threading.Event()
+    monkeypatch.setattr(engine, '_seconds_until', lambda hour: 0.01)
+    engine.start_scheduler(job=ran.set)
+    try:
+        assert ran.wait(5)
+    finally:
+        engine.stop_scheduler()
+
+
+def test_overlapping_nightly_runs_are_skipped(tmp_path):
+    fcntl = pytest.importorskip('fcntl')
+    analytics = AnalyticsService(str(tmp_path))
+    analytics.event_store.append(1, 'quiz', {'accuracy': 0.5}, datetime.now() - timedelta(days=1))
+    with open(tmp_path / 'nightly.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert analytics.run_nightly() is None
+    assert analytics.run_nightly() == {'forecasts': 1, 'peers': 1}
@@ -0,0 +1,147 @@
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from app.services.learning_events import InteractionBuffer, LearningEventWriter
+
+writer_db = SQLAlchemy()
+
+
+class Learner(writer_db.Model):
+    """The columns and streak hooks the writer relies on from User"""
+    id = writer_db.Column(writer_db.Integer, primary_key=True)
+    difficulty_preference = writer_db.Column(writer_db.String(20))
+    attention_span = writer_db.Column(writer_db.Integer)
+    last_active_date = writer_db.Column(writer_db.Date)
+    active_days = writer_db.Column(writer_db.Integer, default=0)
+
+    def record_activity(self, day):
+        self.last_active_date = day
+        self.active_days = (self.active_days or 0) + 1
+
+
+class SessionEvent(writer_db.Model):
+    id = writer_db.Column(writer_db.Integer, primary_key=True)
+    user_id = writer_db.Column(writer_db.Integer, nullable=False)
+    action = writer_db.Column(writer_db.String(50), nullable=False)
+    content_type = writer_db.Column(writer_db.String(50))
+    performance = writer_db.Column(writer_db.Float)
+    timestamp = writer_db.Column(writer_db.DateTime)
+
+
+@pytest.fixture
+def writer_app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'events.db'}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 0.1}}
+    writer_db.init_app(app)
+    with app.app_context():
+        writer_db.create_all()
+        writer_db.session.add_all([Learner(id=1), Learner(id=2)])
+        writer_db.session.commit()
+    yield app
+    with app.app_context():
+        writer_db.engine.dispose()
+
+
+@pytest.fixture
+def writer(writer_app):
+    saved = {}
+    writer = LearningEventWriter(writer_app, writer_db, SessionEvent, Learner, flush_interval=3600,
+                                 on_preferences_saved=saved.__setitem__)
+    writer.saved = saved
+    yield writer
+    writer.stop()
+
+
+def stored_actions(app):
+    with app.app_context():
+        return [e.action for e in SessionEvent.query.order_by(SessionEvent.id)]
+
+
+def test_buffer_keeps_the_last_capacity_interactions():
+    buffer = InteractionBuffer(capacity=4, performance_window=3)
+    start = datetime(2026, 3, 1, 10)
+    for i in range(10):
+        buffer.append(start + timedelta(seconds=i), 'answer_submitted', 'math', performance=i / 10)
+
+    assert len(buffer) == 4
+    assert buffer.total == 10
+    assert sorted(buffer.performances.tolist()) == pytest.approx([0.6, 0.7, 0.8, 0.9])
+    # The window reads the newest slots even after the ring wrapped
+    assert buffer.recent_performance() == pytest.approx(0.8)
+    # Session statistics still cover everything that was evicted
+    assert buffer.average_performance == pytest.approx(0.45)
+
+
+def test_response_times_pair_each_question_with_its_answer():
+    buffer = InteractionBuffer(capacity=3)
+    start = datetime(2026, 3, 1, 10)
+    events = [(0, 'question_presented'), (4, 'answer_submitted'), (5, 'hint_requested'),
+              (6, 'answer_submitted'), (10, 'question_presented'), (20, 'answer_submitted')]
+    for seconds, action in events:
+        buffer.append(start + timedelta(seconds=seconds), action, 'reading')
+
+    assert buffer.response_count == 2
+    assert buffer.average_response_time == pytest.approx(7.0)
+    assert buffer.recent_performance() is None
+    assert buffer.average_performance is None
+
+
+def test_recent_performance_skips_interactions_without_a_score():
+    buffer = InteractionBuffer(capacity=8, performance_window=4)
+    start = datetime(2026, 3, 1, 10)
+    for i, performance in enumerate([0.2, None, 1.0, None, 0.4]):
+        buffer.append(start + timedelta(seconds=i), 'answer_submitted', 'math', performance)
+    assert buffer.recent_performance() == pytest.approx(0.7)
+    assert InteractionBuffer().recent_performance() is None
+
+
+def test_writer_commits_events_preferences_and_active_days(writer_app, writer):
+    writer.record(1, 'question_presented', 'math', timestamp=datetime(2026, 3, 1, 9))
+    writer.record(1, 'answer_submitted', 'math', 0.9, timestamp=datetime(2026, 3, 2, 9))
+    writer.update_preferences(2, {'difficulty_preference': 'easy'})
+    writer.update_preferences(2, {'difficulty_preference': 'hard'})
+
+    assert writer.flush() == 2
+    assert stored_actions(writer_app) == ['question_presented', 'answer_submitted']
+    assert writer.saved == {2: {'difficulty_preference': 'hard'}}
+    with writer_app.app_context():
+        learner = writer_db.session.get(Learner, 1)
+        assert (learner.last_active_date, learner.active_days) == (date(2026, 3, 2), 2)
+        assert writer_db.session.get(Learner, 2).difficulty_preference == 'hard'
+
+
+def test_a_bad_event_is_dropped_without_losing_the_batch(writer_app, writer):
+    writer.record(1, 'question_presented', 'math')
+    writer.record(1, None, 'math')
+    writer.record(2, 'answer_submitted', 'reading', 0.5)
+    writer.update_preferences(1, {'difficulty_preference': 'medium'})
+
+    assert writer.flush() == 2
+    assert stored_actions(writer_app) == ['question_presented', 'answer_submitted']
+    assert writer.saved == {1: {'difficulty_preference': 'medium'}}
+    assert writer.pending() == (0, 0)
+
+
+def test_a_busy_database_keeps_the_batch_for_the_next_flush(writer_app, writer, tmp_path):
+    writer.record(1, 'question_presented', 'math')
+    writer.update_preferences(1, {'difficulty_preference': 'hard'})
+
+    other_worker = sqlite3.connect(tmp_path / 'events.db')
+    other_worker.execute('BEGIN EXCLUSIVE')
+    assert writer.flush() == 0
+    # Preferences are not reported as saved until they are committed
+    assert writer.saved == {}
+    writer.record(2, 'answer_submitted', 'math')
+    writer.update_preferences(1, {'attention_span': 120})
+    assert writer.pending() == (2, 1)
+    other_worker.rollback()
+    other_worker.close()
+
+    assert writer.flush() == 2
+    assert stored_actions(writer_app) == ['question_presented', 'answer_submitted']
+    assert writer.saved == {1: {'difficulty_preference': 'hard', 'attention_span': 120}}
@@ -0,0 +1,115 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.analytic_services import AnalyticsService
+
+
+def assert_matches(actual, expected):
+    if isinstance(expected, dict):
+        assert set(actual) == set(expected)
+        for key in expected:
+            assert_matches(actual[key], expected[key])
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for a, e in zip(actual, expected):
+            assert_matches(a, e)
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, abs=1e-9)
+    else:
+        assert actual == expected
+
+
+def test_rollup_report_matches_raw_events(tmp_path):
+    service = AnalyticsService(str(tmp_path))
+    service.event_store.flush_size = 7
+    rng = random.Random(3)
+    now = datetime(2026, 3, 20, 15, 40)
+
+    for user_id in (1, 2):
+        for i in range(400):
+            data = {'session_id': f's{rng.randrange(30)}', 'duration': rng.choice([5, 12, 25, 40]),
+                    'questions_answered': rng.randrange(6), 'correct_answers': rng.randrange(3),
+                    'difficulty': rng.choice(['easy', 'medium', 'hard', 0.6])}
+            if rng.random() < 0.9:
+                data['subject'] = rng.choice(['math', 'reading', 'science'])
+            if rng.random() < 0.8:
+                data['accuracy'] = round(rng.random(), 2)
+            if rng.random() < 0.7:
+                data['engagement_score'] = round(rng.random(), 2)
+            if rng.random() < 0.5:
+                data['concept'] = f'c{rng.randrange(12)}'
+            service.event_store.append(user_id, 'quiz', data, now - timedelta(minutes=rng.randrange(60 * 24 * 12)))
+
+    # Windows that cut through days and hours as well as whole-period ones
+    for start, end in ((now - timedelta(days=5, minutes=17), now - timedelta(hours=3, minutes=2)),
+                       (now - timedelta(days=30), now),
+                       (now - timedelta(minutes=50), now)):
+        events = service._load_events(1, start, end)
+        rollup = service.event_store.rollup(1, start, end)
+        sections = service._report_sections(1, rollup, service._load_series(1, start, end))
+
+        assert rollup['total']['n'] == len(events)
+        assert rollup['total']['n'] == sum(stats['n'] for stats in rollup['daily'])
+        assert_matches(sections, {
+            'summary': service._generate_summary_stats(events),
+            'skill_progression': service._analyze_skill_progression(1, events),
+            'engagement_analysis': service._analyze_engagement_patterns(events),
+            'learning_velocity': service._calculate_learning_velocity(events),
+            'subject_mastery': service._assess_subject_mastery(events),
+            'achievement_progress': service._track_achievement_progress(1, events),
+            'recommendations': service._generate_improvement_recommendations(events),
+            'celebration_moments': service._identify_celebration_moments(events),
+            'challenge_areas': service._identify_challenge_areas(events)
+        })
+
+
+def test_rollup_of_empty_window(tmp_path):
+    service = AnalyticsService(str(tmp_path))
+    service.track_learning_event(1, 'quiz', {'subject': 'math', 'accuracy': 0.9})
+    start = datetime.now() - timedelta(days=60)
+    rollup = service.event_store.rollup(1, start, start + timedelta(days=1))
+
+    assert rollup['total']['n'] == 0
+    series = service._load_series(1, start, start + timedelta(days=1))
+    assert service._report_sections(1, rollup, series)['summary'] == {}
+
+
+def test_empty_period_report_reads_no_raw_events(tmp_path, monkeypatch):
+    service = AnalyticsService(str(tmp_path))
+    service.event_store.append(2, 'quiz', {'subject': 'math', 'accuracy': 0.9}, datetime.now() - timedelta(days=60))
+    service.event_store.flush()
+
+    def raw_read(*args, **kwargs):
+        raise AssertionError('raw event columns were read')
+
+    monkeypatch.setattr(service.event_store, '_select', raw_read)
+    report = service.generate_progress_report(2, period_days=30)
+    assert 'error' not in report and report['summary'] == {}
+    assert service.generate_progress_report(3, period_days=30) == {'error': 'No analytics data available for this user'}
+    assert service.event_store.has_events(2) and not service.event_store.has_events(3)
+
+
+def test_dashboard_and_patterns_come_from_rollups(tmp_path, caplog):
+    service = AnalyticsService(str(tmp_path))
+    now = datetime.now()
+    with caplog.at_level('ERROR'):
+        service.track_learning_event(1, 'quiz', {'subject': 'math', 'accuracy': 0.9, 'duration': 10,
+                                                 'questions_answered': 40, 'correct_answers': 36})
+        for days_ago, subject in ((1, 'math'), (1, 'reading'), (2, 'math'), (40, 'science')):
+            service.event_store.append(1, 'quiz', {'subject': subject, 'accuracy': 0.8, 'engagement_score': 0.9,
+                                                   'duration': 20}, now - timedelta(days=days_ago))
+
+        dashboard = service.get_dashboard_metrics(1)
+        patterns = service.analyze_learning_patterns(1, days_back=7)
+    assert not caplog.records
+
+    assert dashboard['weekly_progress'] == 43 and dashboard['current_streak'] == 3
+    assert dashboard['favorite_subject'] == 'math' and dashboard['total_learning_time'] == 90
+    assert dashboard['next_milestone'] == 'Answer 60 more questions to become a Question Master!'
+    assert set(patterns['subject_preferences']['subjects']) == {'math', 'reading'}
+    assert patterns['subject_preferences']['favorite'] == 'math'
+    assert patterns['difficulty_comfort_zone']['recommended_adjustment'] == 'maintain'
+    assert service.get_dashboard_metrics(2) == service._get_default_dashboard_metrics()
+    assert service.analyze_learning_patterns(2) == {}
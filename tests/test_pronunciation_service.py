@@ -0,0 +1,56 @@
+import numpy as np
+from app.services.pronunciation_service import PronunciationScorer, dtw_align
+
+def test_dtw_align_matches_time_stretched_copy():
+    rng = np.random.default_rng(0)
+    reference = rng.normal(size=(40, 13))
+    stretched = np.repeat(reference, 2, axis=0)
+    cost, acc, path = dtw_align(stretched, reference)
+    assert acc[-1, -1] < 1e-6
+    assert tuple(path[0]) == (0, 0)
+    assert tuple(path[-1]) == (79, 39)
+
+def test_compare_features_scores_windows():
+    rng = np.random.default_rng(1)
+    scorer = PronunciationScorer()
+    reference = rng.normal(size=(40, 13))
+    result = scorer.compare_features(reference.copy(), reference)
+    assert result['overall_score'] == 1.0
+    assert len(result['phoneme_windows']) == 5
+    assert result['weak_windows'] == []
+
+def test_exercise_falls_back_to_one_transcript_batch(tmp_path):
+    import wave
+    from app.services.voice_service import VoiceService
+
+    class AcousticOnce:
+        def score_batch(self, pairs, language='en'):
+            return [None, {'overall_score': 0.9, 'phoneme_windows': [], 'weak_windows': []}]
+
+        def score(self, *args):
+            raise AssertionError('acoustic scoring must not run again for the fallback')
+
+    class Transcripts:
+        available = True
+        batches = []
+
+        def transcribe_batch(self, clips, language='en'):
+            self.batches.append(len(clips))
+            return ['cat']
+
+    paths = []
+    for name in ('cat', 'dog'):
+        path = str(tmp_path / f'{name}.wav')
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(b'\0\0' * 160)
+        paths.append(path)
+
+    service = VoiceService.__new__(VoiceService)
+    service.pronunciation_scorer, service.speech_backend = AcousticOnce(), Transcripts()
+    results = service.score_pronunciation_exercise(['cat', 'dog'], paths)
+    assert [result['scoring_method'] for result in results] == ['transcript', 'acoustic']
+    assert results[0]['recognized_text'] == 'cat' and results[0]['word'] == 'cat'
+    assert service.speech_backend.batches == [1]
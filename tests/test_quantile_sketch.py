@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.analytic_services import AnalyticsService
+from app.services.quantile_sketch import QuantileSketch
+
+
+def test_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(0).lognormal(2, 1, 20000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q, method='lower')
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+    assert sketch.rank(np.median(values)) == pytest.approx(0.5, abs=0.01)
+    assert sketch.rank(values.max() * 2) == 1.0
+
+
+def test_merge_matches_single_sketch():
+    rng = np.random.default_rng(1)
+    left, right, combined = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for value in rng.random(3000):
+        (left if value < 0.3 else right).add(value)
+        combined.add(value)
+    left.add(0.0)
+    combined.add(0.0)
+
+    merged = QuantileSketch.from_dict(left.to_dict()).merge(right)
+    assert merged.count == combined.count
+    assert merged.to_dict() == combined.to_dict()
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_rank_counts_half_of_the_values_own_bucket():
+    sketch = QuantileSketch()
+    for value in (1.0, 2.0, 2.0, 3.0, 0.0):
+        sketch.add(value)
+    assert sketch.rank(2.0) == pytest.approx((2 + 2 / 2) / 5)
+    assert sketch.rank(0.0) == pytest.approx(0.5 / 5)
+    assert sketch.rank(0.5) == pytest.approx(1 / 5)
+    assert sketch.rank(10.0) == 1.0
+
+
+def test_peers_are_ranked_by_learner_averages_across_workers(tmp_path):
+    first, second = AnalyticsService(str(tmp_path)), AnalyticsService(str(tmp_path))
+    second.event_store.segment = 'worker-2'
+    now = datetime.now()
+    yesterday = now - timedelta(days=1)
+    # A very active learner counts once, however many events they have
+    for i in range(500):
+        first.event_store.append(1, 'quiz', {'accuracy': 0.95, 'duration': 30}, yesterday - timedelta(seconds=i))
+    for user_id in range(2, 12):
+        second.event_store.append(user_id, 'quiz', {'accuracy': user_id / 20, 'duration': 10}, yesterday)
+    second.event_store.append(12, 'quiz', {'accuracy': 0.1}, now - timedelta(days=40))
+    first.event_store.flush()
+
+    ages = {user_id: '7-9' for user_id in range(1, 14)}
+    assert second.rebuild_peer_sketches(now, age_groups=ages) == 11
+
+    assert first._get_peer_metrics('7-9')['accuracy'].count == 11
+    comparison = first.compare_peer_performance(1, '7-9')
+    assert comparison['percentile_ranking']['accuracy'] == pytest.approx(100 * 10.5 / 11, abs=0.1)
+    assert comparison['learning_pace_comparison']['pace'] == 'longer'
+    assert comparison['achievement_comparison']['peer_count'] == 11
+    assert first.compare_peer_performance(1, '13-15') == {'error': 'Insufficient data for comparison'}
+
+    # Events since the rebuild update the learner's value on the worker that ingested them at once
+    second.track_learning_event(13, 'quiz', {'accuracy': 0.99, 'age_group': '7-9'})
+    second.track_learning_event(2, 'quiz', {'accuracy': 0.9})  # learner 2 now averages 0.5
+    second.peer_refresh_seconds = first.peer_refresh_seconds = 0
+    assert second._get_peer_metrics('7-9')['accuracy'].count == 12
+    # and reach the other workers once that worker saves its snapshot
+    assert first._get_peer_metrics('7-9')['accuracy'].count == 11
+    second.save_peer_snapshot()
+    peers = first._get_peer_metrics('7-9')
+    assert peers['accuracy'].count == 12
+    assert peers['accuracy'].rank(0.5) == pytest.approx((7 + 2 / 2) / 12)  # beside learner 10
+    assert first.compare_peer_performance(1, '7-9')['percentile_ranking']['accuracy'] == \
+        pytest.approx(100 * 10.5 / 12, abs=0.1)
+
+    # The next rebuild absorbs the snapshots without counting their events twice
+    second.rebuild_peer_sketches(now + timedelta(days=1), age_groups=ages)
+    assert not (tmp_path / 'sketches' / 'workers' / 'worker-2.json').exists()
+    for service in (first, second):
+        peers = service._get_peer_metrics('7-9')
+        assert peers['accuracy'].count == 12
+        assert peers['accuracy'].rank(0.5) == pytest.approx((7 + 2 / 2) / 12)
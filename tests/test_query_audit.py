@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+from sqlalchemy import MetaData, create_engine, text
+
+from app.utils.query_audit import HOT_QUERIES, audit
+
+# Importing every model maps classes (e.g. ChatSession) whose relationships cannot be
+# resolved in one process, which would break ORM use in the tests that follow; the
+# schema is created in a child process and reflected here
+SCHEMA = ('import sys; from sqlalchemy import create_engine; from app.utils.query_audit import schema_metadata; '
+          'schema_metadata().create_all(create_engine(sys.argv[1]))')
+
+
+def make_engine(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'audit.db'}"
+    subprocess.run([sys.executable, '-c', SCHEMA, uri], check=True)
+    engine = create_engine(uri)
+    metadata = MetaData()
+    metadata.reflect(engine)
+    return engine, metadata
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    engine, metadata = make_engine(tmp_path)
+    with engine.connect() as connection:
+        results = audit(connection, metadata)
+    assert len(results) == len(HOT_QUERIES)
+    assert [result for result in results if result['full_scans']] == []
+
+
+def test_dropped_index_is_reported_as_full_scan(tmp_path):
+    engine, metadata = make_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_pet_user_id'))
+        results = {result['query']: result for result in audit(connection, metadata)}
+    assert results['pet by owner']['full_scans'] == ['pet']
+    assert results['recent chat messages']['full_scans'] == []
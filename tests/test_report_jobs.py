@@ -0,0 +1,117 @@
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, create_engine, insert, update
+
+from app.models.achievement import Achievement, UserAchievement
+from app.models.lesson import Lesson, UserProgress
+from app.models.user import User
+from app.services.report_jobs import READY, ReportJobQueue, data_versions
+
+
+def make_database(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'reports.db'}"
+    engine = create_engine(uri)
+    metadata = MetaData()
+    for model in (User, Lesson, UserProgress, Achievement, UserAchievement):
+        model.__table__.to_metadata(metadata)
+    metadata.create_all(engine)
+    start = datetime(2026, 5, 1, 9, 0)
+    with engine.begin() as connection:
+        connection.execute(insert(User.__table__), [
+            {'id': i, 'username': f'kid{i}', 'email': f'kid{i}@example.com', 'password_hash': 'x',
+             'full_name': f'Kid {i}', 'age': 8, 'level': 2, 'total_points': 100 * i}
+            for i in (1, 2)
+        ])
+        connection.execute(insert(Lesson.__table__), [
+            {'id': 1, 'title': 'Counting', 'subject': 'math', 'age_group': '7-9', 'content': '{}'}
+        ])
+        connection.execute(insert(UserProgress.__table__), [
+            {'user_id': 1, 'lesson_id': 1, 'best_score': 50 + n, 'time_spent': 120,
+             'started_at': start + timedelta(days=n)}
+            for n in range(1200)
+        ])
+        connection.execute(insert(Achievement.__table__).values(
+            id=1, name='First Steps', description='Finish a lesson', category='learning'
+        ))
+        connection.execute(insert(UserAchievement.__table__).values(user_id=1, achievement_id=1, earned_at=start))
+    return uri, engine
+
+
+def test_reports_stream_to_csv_and_are_cached_by_data_version(tmp_path):
+    uri, engine = make_database(tmp_path)
+    notified = []
+    queue = ReportJobQueue(uri, root=str(tmp_path / 'reports'), notify=notified.append,
+                           executor=ThreadPoolExecutor(2))
+
+    with engine.connect() as connection:
+        jobs = queue.submit([1, 2, 99], 'csv', connection, requested_by=7)
+    assert [job['student_id'] for job in jobs] == [1, 2]
+    finished = queue.wait([job['id'] for job in jobs], timeout=10)
+    assert [job['status'] for job in finished] == [READY, READY]
+    assert sorted(job['student_id'] for job in notified) == [1, 2]
+
+    with open(queue.path_for(finished[0]), newline='') as report:
+        rows = list(csv.reader(report))
+    assert rows[0] == ['Progress report: Kid 1 (kid1)']
+    lessons = rows[rows.index(['Lessons']) + 2:rows.index(['Achievements']) - 1]
+    assert len(lessons) == 1200
+    assert lessons[0][:2] == ['Counting', 'math'] and lessons[-1][4] == '1249.0'
+    assert rows[-1][:2] == ['First Steps', 'learning']
+
+    # Unchanged data is answered from the cached file without rendering again
+    with engine.connect() as connection:
+        again = queue.submit([1], 'csv', connection, requested_by=7)[0]
+    assert again['status'] == READY and again['version'] == jobs[0]['version']
+
+    # New progress gives a new version; the old file is removed once the new one is ready
+    with engine.begin() as connection:
+        connection.execute(update(User.__table__).where(User.__table__.c.id == 1).values(total_points=150))
+        versions = data_versions(connection, [1, 2])
+    assert versions[1] != jobs[0]['version'] and versions[2] == jobs[1]['version']
+    with engine.connect() as connection:
+        refreshed = queue.submit([1], 'csv', connection)[0]
+    refreshed = queue.wait([refreshed['id']], timeout=10)[0]
+    assert refreshed['status'] == READY
+    assert sorted(os.listdir(tmp_path / 'reports')) == sorted([
+        f"1-{versions[1]}.csv", f"2-{versions[2]}.csv"
+    ])
+    queue.shutdown()
+
+
+def test_concurrent_requests_share_one_render(tmp_path):
+    uri, engine = make_database(tmp_path)
+    executor = ThreadPoolExecutor(1)
+    # Hold the only worker so both requests arrive while the report is queued
+    gate = threading.Event()
+    executor.submit(gate.wait)
+    queue = ReportJobQueue(uri, root=str(tmp_path / 'reports'), executor=executor)
+    with engine.connect() as connection:
+        first = queue.submit([1], 'csv', connection)[0]
+        second = queue.submit([1], 'csv', connection)[0]
+    assert first['id'] != second['id']
+    [(_, waiting)] = queue._rendering.values()
+    assert waiting == [first['id'], second['id']]
+    gate.set()
+    assert [job['status'] for job in queue.wait([first['id'], second['id']], timeout=10)] == [READY, READY]
+    queue.shutdown()
+
+
+def test_spawned_workers_render_and_any_queue_reads_the_job(tmp_path):
+    uri, engine = make_database(tmp_path)
+    queue = ReportJobQueue(uri, root=str(tmp_path / 'reports'), max_workers=1)
+    with engine.connect() as connection:
+        [job] = queue.submit([2], 'csv', connection, requested_by=7)
+    # Another server worker's queue on the same database sees the job
+    other_worker = ReportJobQueue(uri, root=str(tmp_path / 'reports'))
+    assert other_worker.get(job['id'])['requested_by'] == 7
+
+    [finished] = queue.wait([job['id']], timeout=60)
+    assert finished['status'] == READY
+    assert other_worker.get(job['id'])['status'] == READY
+    with open(other_worker.path_for(finished), newline='') as report:
+        assert next(csv.reader(report)) == ['Progress report: Kid 2 (kid2)']
+    queue.shutdown()
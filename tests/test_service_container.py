@@ -0,0 +1,73 @@
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.services.container import DEFAULT_FACTORIES, ServiceContainer
+
+
+class CountingService:
+    built = 0
+
+    def __init__(self):
+        type(self).built += 1
+
+    def greet(self, name):
+        return f"hello {name}"
+
+
+@pytest.fixture
+def container():
+    CountingService.built = 0
+    return ServiceContainer({'greeter': CountingService})
+
+
+def test_services_are_built_once_on_first_use(container):
+    greeter = container.proxy('greeter')
+    assert CountingService.built == 0
+    assert not container.is_built('greeter')
+
+    threads = [threading.Thread(target=container.get, args=('greeter',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert greeter.greet('Ada') == 'hello Ada'
+    assert CountingService.built == 1
+    assert container.get('greeter') is container.get('greeter')
+
+
+def test_override_and_register_swap_implementations(container):
+    greeter = container.proxy('greeter')
+    real = container.get('greeter')
+
+    class FakeGreeter:
+        def greet(self, name):
+            return 'fake'
+
+    with container.override('greeter', FakeGreeter()):
+        assert greeter.greet('Ada') == 'fake'
+    assert container.get('greeter') is real
+
+    container.register('greeter', FakeGreeter)
+    assert isinstance(container.get('greeter'), FakeGreeter)
+    with pytest.raises(KeyError):
+        container.get('missing')
+
+
+def test_factories_can_be_import_paths():
+    container = ServiceContainer({'container': 'app.services.container:ServiceContainer'})
+    assert isinstance(container.get('container'), ServiceContainer)
+    assert set(DEFAULT_FACTORIES) == {'llm', 'sentiment', 'moderation', 'voice', 'translation', 'analytics',
+                                      'adaptive'}
+
+
+def test_importing_the_container_loads_no_services():
+    modules = [module.split(':')[0] for module in DEFAULT_FACTORIES.values()]
+    script = ("import sys, app.services, app.services.container; "
+              f"print([m for m in {modules!r} if m in sys.modules])")
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                            cwd=Path(__file__).resolve().parents[1], check=True)
+    assert result.stdout.strip() == '[]'
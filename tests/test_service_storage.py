@@ -0,0 +1,85 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, func, insert, inspect, select
+
+from app import db
+from app.models.class_summary import ClassSummary
+from app.services.storage import ServiceStorage, crisis_alerts, emotion_logs, translation_cache
+
+
+def make_storage(tmp_path):
+    return ServiceStorage(create_engine(f"sqlite:///{tmp_path / 'eduhope.db'}"))
+
+
+def count(storage, table):
+    with storage.begin() as connection:
+        return connection.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_service_tables_are_created_on_the_shared_engine(tmp_path):
+    storage = make_storage(tmp_path)
+    tables = set(inspect(storage.engine).get_table_names())
+    assert {'emotion_logs', 'mood_patterns', 'crisis_alerts', 'moderation_logs', 'positive_interactions',
+            'safety_alerts', 'translation_cache'} <= tables
+    assert list(tmp_path.iterdir()) == [tmp_path / 'eduhope.db']
+
+
+def test_transaction_spans_service_writes(tmp_path):
+    storage = make_storage(tmp_path)
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            with storage.begin() as connection:
+                connection.execute(insert(emotion_logs).values(user_id=1, detected_emotion='sad'))
+            with storage.begin() as connection:
+                connection.execute(insert(crisis_alerts).values(user_id=1, severity_level=3))
+            raise RuntimeError('moderation failed')
+    assert count(storage, emotion_logs) == 0
+    assert count(storage, crisis_alerts) == 0
+
+    with storage.transaction():
+        with storage.begin() as connection:
+            connection.execute(insert(emotion_logs).values(user_id=1, detected_emotion='happy'))
+        with storage.begin() as connection:
+            connection.execute(insert(crisis_alerts).values(user_id=1, severity_level=1))
+    assert count(storage, emotion_logs) == 1
+    assert count(storage, crisis_alerts) == 1
+
+
+def test_translation_cache_round_trip(tmp_path):
+    pytest.importorskip('requests')
+    from app.services.translation_service import TranslationService
+
+    service = TranslationService(storage=make_storage(tmp_path))
+    assert service.get_cached_translation('hello', 'en', 'es') is None
+    service.cache_translation('hello', 'en', 'es', 'hola')
+    service.cache_translation('hello', 'en', 'es', '¡hola!')
+    assert service.get_cached_translation('hello', 'en', 'es') == '¡hola!'
+    assert count(service.storage, translation_cache) == 1
+
+
+def test_app_context_writes_share_the_session_transaction(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'eduhope.db'}"
+    db.init_app(app)
+    storage = ServiceStorage()
+    with app.app_context():
+        ClassSummary.__table__.create(db.engine)
+
+        with pytest.raises(RuntimeError):
+            with storage.transaction():
+                db.session.add(ClassSummary(class_key='lost'))
+                with storage.begin() as connection:
+                    connection.execute(insert(emotion_logs).values(user_id=1, detected_emotion='sad'))
+                raise RuntimeError('moderation failed')
+        assert count(storage, emotion_logs) == 0
+
+        db.session.add(ClassSummary(class_key='kept'))
+        with storage.begin() as connection:
+            # The pending ORM row is flushed onto the same connection first
+            assert connection.execute(select(func.count()).select_from(ClassSummary.__table__)).scalar() == 1
+            connection.execute(insert(emotion_logs).values(user_id=1, detected_emotion='happy'))
+        db.session.rollback()
+        assert [summary.class_key for summary in ClassSummary.query.all()] == ['kept']
+        assert count(storage, emotion_logs) == 1
+        db.session.remove()
+        db.engine.dispose()
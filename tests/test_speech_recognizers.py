@@ -0,0 +1,111 @@
+import wave
+
+import numpy as np
+import pytest
+
+from app.services import speech_recognizers
+from app.services.speech_recognizers import (DeepSpeechRecognizer, FallbackSpeechRecognizer, SpeechRecognizerBackend,
+                                             read_wav_pcm, resample_pcm)
+
+
+class ScriptedRecognizer(SpeechRecognizerBackend):
+    """Returns canned transcripts and records what it was asked"""
+
+    def __init__(self, name, transcripts, languages=('en',), available=True):
+        self.name = name
+        self.transcripts = transcripts
+        self.languages = languages
+        self._available = available
+        self.calls = []
+
+    @property
+    def available(self):
+        return self._available
+
+    def supports_language(self, language):
+        return language in self.languages
+
+    def transcribe(self, pcm, sample_rate, language='en'):
+        self.calls.append(pcm)
+        return self.transcripts.get(pcm)
+
+
+def test_read_wav_pcm_downmixes_stereo(tmp_path):
+    path = tmp_path / 'stereo.wav'
+    frames = np.array([[100, 300], [-200, 0], [50, 50]], dtype='<i2')
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(frames.tobytes())
+
+    pcm, sample_rate = read_wav_pcm(str(path))
+    assert sample_rate == 8000
+    assert np.frombuffer(pcm, dtype='<i2').tolist() == [200, -100, 50]
+
+
+def test_read_wav_pcm_rejects_8_bit_audio(tmp_path):
+    path = tmp_path / 'narrow.wav'
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(1)
+        wav.setframerate(8000)
+        wav.writeframes(b'\x80' * 10)
+    with pytest.raises(ValueError):
+        read_wav_pcm(str(path))
+
+
+def test_resample_pcm_changes_length_and_keeps_shape():
+    samples = np.linspace(-1000, 1000, 480).astype('<i2')
+    upsampled = resample_pcm(samples.tobytes(), 8000, 16000)
+    assert upsampled.dtype == np.int16
+    assert upsampled.size == 960
+    assert upsampled[0] == samples[0]
+    assert np.all(np.diff(upsampled.astype(int)) >= 0)
+    assert resample_pcm(samples.tobytes(), 16000, 16000).size == 480
+    assert resample_pcm(b'', 8000, 16000).size == 0
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SpeechRecognizerBackend()
+
+
+def test_fallback_tries_backends_in_order():
+    offline = ScriptedRecognizer('offline', {b'one': 'one'})
+    online = ScriptedRecognizer('online', {b'one': 'won', b'two': 'two'}, languages=('en', 'es'))
+    missing = ScriptedRecognizer('missing', {}, available=False)
+    recognizer = FallbackSpeechRecognizer([offline, missing, online])
+
+    assert recognizer.name == 'offline+online'
+    assert recognizer.transcribe(b'one', 16000) == 'one'
+    assert recognizer.transcribe(b'two', 16000) == 'two'
+    assert recognizer.transcribe(b'two', 16000, 'es') == 'two'
+    assert offline.calls == [b'one', b'two']
+
+    offline.calls.clear()
+    online.calls.clear()
+    clips = [(b'one', 16000), (b'two', 16000), (b'three', 16000)]
+    assert recognizer.transcribe_batch(clips) == ['one', 'two', None]
+    # Only the clips the first backend missed reach the second
+    assert online.calls == [b'two', b'three']
+
+
+def test_fallback_without_backends_is_unavailable():
+    recognizer = FallbackSpeechRecognizer([ScriptedRecognizer('missing', {}, available=False)])
+    assert not recognizer.available
+    assert recognizer.name == 'none'
+    assert recognizer.transcribe(b'one', 16000) is None
+
+
+def test_deepspeech_is_available_with_any_language_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(speech_recognizers, 'DEEPSPEECH_AVAILABLE', True)
+    recognizer = DeepSpeechRecognizer(str(tmp_path))
+    assert not recognizer.available
+
+    (tmp_path / 'es.pbmm').write_bytes(b'')
+    assert recognizer.available
+    assert recognizer.languages() == ['es']
+    assert recognizer.supports_language('es')
+    assert not recognizer.supports_language('en')
+    assert not DeepSpeechRecognizer(str(tmp_path / 'absent')).available
@@ -0,0 +1,37 @@
+from sqlalchemy import create_engine, text
+
+from app.utils.sqlite_benchmark import run
+from app.utils.sqlite_profile import apply_pragmas, engine_options, is_file_database, profile_from_env, sqlite_pragmas
+
+
+def test_pragmas_apply_to_every_pooled_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}", **engine_options(pool_size=2))
+    apply_pragmas(engine, sqlite_pragmas(busy_timeout_ms=2500, mmap_mb=16, cache_mb=8))
+    first, second = engine.connect(), engine.connect()
+    try:
+        for connection in (first, second):
+            pragma = lambda name: connection.execute(text(f"PRAGMA {name}")).scalar()
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('synchronous') == 1  # NORMAL
+            assert pragma('busy_timeout') == 2500
+            assert pragma('mmap_size') == 16 * 1024 * 1024
+            assert pragma('cache_size') == -8 * 1024
+    finally:
+        first.close()
+        second.close()
+        engine.dispose()
+
+
+def test_profile_only_targets_file_databases():
+    assert is_file_database('sqlite:///eduhope.db')
+    assert not is_file_database('sqlite://')
+    assert not is_file_database('sqlite:///:memory:')
+    assert not is_file_database('postgresql://localhost/eduhope')
+    assert not profile_from_env({'SQLITE_PROFILE': 'off'})['enabled']
+    assert profile_from_env({'SQLITE_POOL_SIZE': '3'})['engine_options']['pool_size'] == 3
+
+
+def test_concurrent_writers_all_commit(tmp_path):
+    result = run(True, writers=4, readers=2, transactions=25, directory=str(tmp_path))
+    assert result['committed'] == 100
+    assert result['locked_errors'] == 0
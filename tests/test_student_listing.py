@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import MetaData, create_engine, event, insert, select, update
+
+from app.models.lesson import Lesson, UserProgress
+from app.models.user import User
+from app.services.class_summary_service import STUDENT_SORTS, ClassSummaryService
+
+
+def make_engine(students):
+    engine = create_engine('sqlite://')
+    metadata = MetaData()
+    for model in (User, Lesson, UserProgress):
+        model.__table__.to_metadata(metadata)
+    metadata.create_all(engine)
+    start = datetime(2026, 5, 1, 9, 0)
+    with engine.begin() as connection:
+        connection.execute(insert(User.__table__), [
+            {'id': i, 'username': f'kid{i}', 'email': f'kid{i}@example.com', 'password_hash': 'x',
+             'full_name': f'Kid {i}', 'age': 7, 'level': 1 + i % 4, 'total_points': (i * 37) % 11 * 10,
+             'last_active': start + timedelta(hours=i % 9)}
+            for i in range(1, students + 1)
+        ])
+        connection.execute(insert(Lesson.__table__), [
+            {'id': 1, 'title': 'Counting', 'subject': 'math', 'age_group': '4-6', 'content': '{}'}
+        ])
+        connection.execute(insert(UserProgress.__table__), [
+            {'user_id': i, 'lesson_id': 1, 'best_score': 50 + i % 5 * 10} for i in range(1, students + 1)
+        ])
+        ClassSummaryService._refresh_average_scores(connection)
+        # Every seventh student has no value in any sort column yet
+        users = User.__table__
+        connection.execute(update(users).where(users.c.id % 7 == 0)
+                           .values(level=None, total_points=None, last_active=None, average_score=None))
+    return engine
+
+
+def walk(connection, service, sort, descending, limit=7):
+    seen, cursor = [], None
+    while True:
+        page = service.list_students(sort, descending, limit, cursor, connection=connection)
+        assert len(page['students']) <= limit
+        seen.extend(page['students'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize('sort, column', [
+    ('points', 'total_points'), ('level', 'level'), ('last_active', 'last_active'), ('avg_score', 'average_score')
+])
+@pytest.mark.parametrize('descending', [True, False])
+def test_pages_cover_every_student_in_sort_order(sort, column, descending):
+    engine = make_engine(40)
+    service = ClassSummaryService()
+    with engine.connect() as connection:
+        seen = walk(connection, service, sort, descending)
+        rows = connection.execute(select(User.__table__.c.id, User.__table__.c[column])).all()
+
+    # Students with no value come last in either direction
+    valued = sorted((row for row in rows if row[1] is not None), key=lambda row: (row[1], row[0]), reverse=descending)
+    missing = sorted((row for row in rows if row[1] is None), reverse=descending)
+    assert [student['id'] for student in seen] == [user_id for user_id, _ in valued + missing]
+    assert len(seen) == 40
+
+
+def test_average_score_and_bad_cursor():
+    engine = make_engine(5)
+    service = ClassSummaryService()
+    with engine.connect() as connection:
+        page = service.list_students('avg_score', limit=2, connection=connection)
+        assert [(s['id'], s['average_score']) for s in page['students']] == [(4, 90.0), (3, 80.0)]
+        with pytest.raises(ValueError):
+            service.list_students('avg_score', after='not-a-cursor', connection=connection)
+        with pytest.raises(ValueError):
+            service.list_students('shoe_size', connection=connection)
+
+
+@pytest.mark.parametrize('sort', ['points', 'last_active'])
+def test_page_query_uses_sort_index(sort):
+    engine = make_engine(30)
+    service = ClassSummaryService()
+    statements = []
+    listener = lambda connection, cursor, statement, parameters, *args: statements.append((statement, parameters))
+    with engine.connect() as connection:
+        # First page, keyset pages, a page running into the students with no value, and one continuing there
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            walk(connection, service, sort, True, limit=4)
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        for statement, parameters in statements:
+            plan = ' '.join(row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}',
+                                                                          parameters))
+            assert f'ix_users_{User.__table__.c[STUDENT_SORTS[sort]].name}' in plan, statement
+            assert 'TEMP B-TREE' not in plan, statement
+    assert any('IS NULL AND users.id <' in statement for statement, _ in statements)
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager, UserMixin
+from sqlalchemy import insert
+
+from app import db, socketio
+from app.models.achievement import Achievement, UserAchievement
+from app.models.game_progress import GameProgress
+from app.models.lesson import Lesson, UserProgress
+from app.models.user import User
+from app.routes import teacher
+from app.services.report_jobs import READY
+
+
+class Teacher(UserMixin):
+    id = 99
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'teacher.db'}"
+    db.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.request_loader(lambda request: Teacher())
+    socketio.init_app(app)
+    app.register_blueprint(teacher.teacher_bp)
+
+    # Real report queue (spawned workers) writing under tmp_path
+    monkeypatch.setenv('REPORT_DIR', str(tmp_path / 'reports'))
+    monkeypatch.setenv('REPORT_WORKERS', '1')
+    monkeypatch.setattr(teacher, '_report_jobs', None)
+    # Templates extend the full site layout; the routes' figures are what is checked here
+    monkeypatch.setattr(teacher, 'render_template', lambda name, **context: {'template': name, **context})
+
+    # These models are declared on their own metadata; copy them beside class_summaries
+    copies = [model.__table__.to_metadata(db.metadata)
+              for model in (User, Lesson, UserProgress, Achievement, UserAchievement)]
+    try:
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                connection.execute(insert(User.__table__), [
+                    {'id': i, 'username': f'kid{i}', 'email': f'kid{i}@example.com', 'password_hash': 'x',
+                     'full_name': f'Kid {i}', 'age': 7, 'level': i, 'total_points': 100 * i}
+                    for i in (1, 2, 3)
+                ])
+                connection.execute(insert(Lesson.__table__).values(
+                    id=1, title='Counting', subject='math', age_group='4-6', content='{}'
+                ))
+                connection.execute(insert(UserProgress.__table__).values(
+                    user_id=1, lesson_id=1, best_score=80, is_completed=True
+                ))
+            yield app
+            if teacher._report_jobs is not None:
+                teacher._report_jobs.shutdown()
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        for table in copies:
+            db.metadata.remove(table)
+
+
+def test_dashboard_and_student_list(app):
+    client = app.test_client()
+    dashboard = client.get('/teacher/dashboard').get_json()
+    assert dashboard['template'] == 'teacher_dashboard.html'
+    assert dashboard['total_students'] == 3 and dashboard['avg_level'] == 2.0
+    assert [student['id'] for student in dashboard['top_students']] == [3, 2, 1]
+    assert dashboard['lesson_stats'] == [{'name': 'math', 'completions': 1, 'avg_score': 80.0}]
+
+    page = client.get('/teacher/api/students?sort=points&order=asc&limit=2').get_json()
+    assert [student['id'] for student in page['students']] == [1, 2]
+    rest = client.get(f"/teacher/api/students?sort=points&order=asc&after={page['next_cursor']}").get_json()
+    assert [student['id'] for student in rest['students']] == [3] and rest['next_cursor'] is None
+    assert client.get('/teacher/api/students?sort=shoe_size').status_code == 400
+
+
+def test_report_request_notifies_watching_teacher(app):
+    client = app.test_client()
+    watcher = socketio.test_client(app, flask_test_client=client)
+    watcher.emit('watch_reports')
+
+    response = client.post('/teacher/reports', json={'student_ids': [1], 'format': 'csv'})
+    assert response.status_code == 202
+    [job] = response.get_json()['jobs']
+    [finished] = teacher.get_report_jobs().wait([job['id']], timeout=60)
+    assert finished['status'] == READY
+
+    assert client.get(f"/teacher/reports/{job['id']}").get_json()['status'] == READY
+    download = client.get(f"/teacher/reports/{job['id']}/download")
+    assert download.status_code == 200 and download.data.startswith(b'Progress report: Kid 1 (kid1)')
+    download.close()
+    assert client.get('/teacher/reports/unknown').status_code == 404
+    assert client.post('/teacher/reports', json={'student_ids': ['x']}).status_code == 400
+
+    events = [event for event in watcher.get_received() if event['name'] == 'report_ready']
+    assert [event['args'][0]['id'] for event in events] == [job['id']]
+    watcher.disconnect()
+
+
+def test_cohort_analysis(app):
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        connection.execute(insert(GameProgress.__table__), [
+            {'user_id': user_id, 'game_type': 'color_match', 'score': 50 + 10 * i, 'difficulty': 'beginner',
+             'created_at': now - timedelta(days=i)}  # newest results are the lowest
+            for user_id in (1, 2) for i in range(3)
+        ])
+    client = app.test_client()
+
+    cohort = client.get('/teacher/api/cohort?days=7').get_json()
+    assert [user['user_id'] for user in cohort['users']] == [1, 2]
+    assert cohort['users'][0]['sessions'] == 3 and cohort['users'][0]['trend'] == 'declining_fast'
+    assert cohort['summary']['style_distribution']['visual'] == 2
+
+    only_first = client.get('/teacher/api/cohort?student_ids=1').get_json()
+    assert [user['user_id'] for user in only_first['users']] == [1]
+    assert client.get('/teacher/api/cohort?student_ids=one').status_code == 400
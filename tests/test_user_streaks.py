@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.user import User
+
+
+class Streaks:
+    """The streak columns and User's streak methods, without configuring the ORM mappers"""
+    STREAK_WINDOW_DAYS = User.STREAK_WINDOW_DAYS
+    _activity_bits = User._activity_bits
+    _set_activity_bits = User._set_activity_bits
+    _pack_activity_bits = User._pack_activity_bits
+    _streaks_from_bits = staticmethod(User._streaks_from_bits)
+    record_activity = User.record_activity
+
+    def __init__(self):
+        self.last_active_date = None
+        self.activity_bitmap = None
+        self.learning_streak = 0
+        self.longest_streak = 0
+
+
+@pytest.mark.parametrize('bits, expected', [
+    (0, (0, 0)),
+    (0b1, (1, 1)),
+    (0b10, (0, 1)),
+    (0b1011, (2, 2)),
+    (0b1110111, (3, 3)),
+    (0b11110110011, (2, 4)),
+    ((1 << 366) - 1, (366, 366)),
+])
+def test_streaks_from_bits(bits, expected):
+    assert User._streaks_from_bits(bits) == expected
+
+
+def test_record_activity_extends_and_resets_the_current_streak():
+    start = date(2026, 3, 1)
+    user = Streaks()
+    for offset in (0, 1, 2, 2, 5, 6):
+        user.record_activity(start + timedelta(days=offset))
+    assert user.last_active_date == start + timedelta(days=6)
+    assert (user.learning_streak, user.longest_streak) == (2, 3)
+    assert User._streaks_from_bits(user._activity_bits()) == (2, 3)
+
+
+def test_late_activity_can_join_two_runs():
+    start = date(2026, 3, 1)
+    user = Streaks()
+    for offset in (0, 1, 3, 4):
+        user.record_activity(start + timedelta(days=offset))
+    assert (user.learning_streak, user.longest_streak) == (2, 2)
+
+    user.record_activity(start + timedelta(days=2))
+    assert user.last_active_date == start + timedelta(days=4)
+    assert (user.learning_streak, user.longest_streak) == (5, 5)
+    # Days outside the window are ignored
+    user.record_activity(start - timedelta(days=User.STREAK_WINDOW_DAYS))
+    assert user.learning_streak == 5
+
+
+def test_a_long_gap_clears_the_window():
+    user = Streaks()
+    user.record_activity(date(2025, 1, 1))
+    user.record_activity(date(2026, 6, 1))
+    assert user._activity_bits() == 1
+    assert (user.learning_streak, user.longest_streak) == (1, 1)
+
+
+def test_activity_from_days_matches_recording_day_by_day():
+    start = date(2026, 3, 1)
+    days = [start + timedelta(days=offset) for offset in (0, 1, 2, 4, 5, 9, 10, 11, 12)]
+    user = Streaks()
+    for day in days:
+        user.record_activity(day)
+    assert User.activity_from_days(days) == (user.last_active_date, user.activity_bitmap,
+                                             user.learning_streak, user.longest_streak)
+    assert User.activity_from_days([]) == (None, None, 0, 0)
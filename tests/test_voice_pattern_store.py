@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+from flask import Flask
+from sqlalchemy import update
+
+from app import db
+from app.models.user import User
+from app.models.voice_pattern import VoicePattern
+from app.services.voice_pattern_store import VoicePatternStore
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'voice.db'}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 10}}
+    db.init_app(app)
+    # users is declared on the user model's own metadata; flushes need it to resolve the FK
+    users = User.__table__.to_metadata(db.metadata)
+    try:
+        with app.app_context():
+            db.metadata.create_all(db.engine, tables=[users, VoicePattern.__table__])
+            yield app
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        db.metadata.remove(users)
+
+
+def test_ring_keeps_the_last_window_and_running_sums():
+    pattern = VoicePattern(user_id=1)
+    scores = [i / 100 for i in range(1, 26)]
+    for score in scores:
+        pattern.record(score, 1 - score)
+
+    snapshot = pattern.to_dict()
+    assert snapshot['clarity_scores'] == pytest.approx(scores[-10:])
+    assert snapshot['confidence_scores'] == pytest.approx([1 - s for s in scores[-10:]])
+    assert snapshot['average_clarity'] == pytest.approx(sum(scores[-10:]) / 10)
+    assert snapshot['average_confidence'] == pytest.approx(sum(1 - s for s in scores[-10:]) / 10)
+    assert snapshot['total_sessions'] == 25
+
+
+def test_partial_ring_is_ordered_oldest_first():
+    pattern = VoicePattern(user_id=1)
+    for score in (0.2, 0.4, 0.9):
+        pattern.record(score, score)
+    assert pattern.to_dict()['clarity_scores'] == pytest.approx([0.2, 0.4, 0.9])
+    assert pattern.average_clarity == pytest.approx(0.5)
+
+
+def test_record_reapplies_after_a_concurrent_write(app, monkeypatch):
+    store = VoicePatternStore()
+    store.record(7, 0.5, 0.5)
+
+    original = VoicePattern.record
+    raced = []
+
+    def record_after_another_worker(self, clarity, confidence, timestamp=None):
+        if not raced:
+            # Another worker commits a newer version between our read and our write
+            raced.append(True)
+            with db.engine.begin() as connection:
+                table = VoicePattern.__table__
+                connection.execute(update(table).where(table.c.user_id == 7)
+                                   .values(version=table.c.version + 1, total_sessions=table.c.total_sessions + 1))
+        original(self, clarity, confidence, timestamp)
+
+    monkeypatch.setattr(VoicePattern, 'record', record_after_another_worker)
+    snapshot = store.record(7, 0.9, 0.9)
+    assert raced
+    assert snapshot['total_sessions'] == 3
+    assert db.session.query(VoicePattern.version).filter_by(user_id=7).scalar() == 3
+
+
+def test_get_serves_cached_snapshots_until_the_next_write(app):
+    store = VoicePatternStore()
+    store.record(7, 0.5, 0.5)
+    assert store.get(7)['total_sessions'] == 1
+
+    other_worker = VoicePatternStore()
+    other_worker.record(7, 0.7, 0.7)
+    # Reads never query the version; the cached snapshot stands until this worker writes
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql('BEGIN EXCLUSIVE')
+        assert store.get(7)['total_sessions'] == 1
+        connection.rollback()
+
+    assert store.record(7, 0.9, 0.9)['total_sessions'] == 3
+    assert store.get(7)['total_sessions'] == 3
+    assert store.get(8) is None
+
+
+def test_concurrent_workers_keep_every_record(app):
+    VoicePatternStore().record(7, 0.1, 0.1)
+
+    def work():
+        with app.app_context():
+            store = VoicePatternStore(attempts=50)
+            for _ in range(10):
+                assert store.record(7, 0.5, 0.5) is not None
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    pattern = VoicePattern.query.filter_by(user_id=7).one()
+    assert pattern.total_sessions == 31
+    assert pattern.version == 31